@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auditoría de avance (mapa de materias) en lote: kárdex parseados × planes parseados.
+
+Es el mismo cálculo que mapaService.getMapaByExpediente, pero para toda la
+matrícula de una vez y con el plan tomado de la salida de plan_estudio.py en
+lugar de los arreglos fijos PLAN_ISI / MAPA_ISI_SUGERIDO:
+
+  - Cada plan se compila una vez: índice {codigo → posición} y, por
+    acentuación, la lista de posiciones que la forman.
+  - Por alumno solo se recorre su kárdex (map_calificacion_estado) y se
+    resuelve el estatus de cada materia con computeStatusFromRaw.
+  - Resultado: una línea JSON por alumno en stdout (NDJSON), en el orden de
+    entrada; no se acumula nada en memoria.
+
+Entradas:
+  --planes=<archivo>   salida JSON de plan_estudio.py, una lista de ellas o
+                       NDJSON (una por línea). Se indexa por plan.version.
+  <kardex>...          NDJSON con una salida de kardex.py por línea (o un
+                       .json con una sola). Sin archivos se lee stdin.
+
+Uso:
+  python degree_audit.py --planes=planes.ndjson cohorte.ndjson > mapa.ndjson
+      [--plan=2182]          plan por defecto si el kárdex no trae versión
+      [--acentuaciones]      agrega avance de créditos por acentuación
+      [--solo-cursadas]      omite materias not_taken del detalle
+
+Salida por alumno:
+  {"ok": true, "expediente", "plan", "materias": {codigo: status},
+   "resumen": {status: n}, "creditos": {"aprobados", "total"},
+   "acentuaciones"?: [{"nombre", "creditos_aprobados", "creditos_total",
+                       "materias_aprobadas", "materias_total"}],
+   "fuera_de_plan": [codigo]}
+"""
+
+import json
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from kardex import map_calificacion_estado, normalize_materia_codigo
+from json_docs import iter_json_docs  # compartido con Carga-Archivos (ver kardex.SHARED_SCRIPTS)
+
+STATUSES = ("approved", "withdrawn", "in_progress", "failed", "not_taken")
+
+# computeStatusFromRaw (mapaService.ts): el primer grupo que aparezca gana
+IN_PROGRESS = {"INSCRITO", "INS"}
+APPROVED = {"APROBADA", "ACREDITADA", "PARCIALMENTE_ACREDITADA"}
+WITHDRAWN = {"BAJA_VOLUNTARIA", "BAJA", "BAJA_DEFINITIVA"}
+FAILED = {"NO_ACREDITADA", "REPROBADA", "NO_APROBADA"}
+
+# Rango por estatus crudo: el menor gana cuando una materia tiene varios intentos
+_RANK = {
+    **{s: 0 for s in IN_PROGRESS},
+    **{s: 1 for s in APPROVED},
+    **{s: 2 for s in WITHDRAWN},
+    **{s: 3 for s in FAILED},
+}
+_BY_RANK = ("in_progress", "approved", "withdrawn", "failed", "not_taken")
+_NOT_TAKEN = 4
+
+# Los mismos códigos se repiten en toda la matrícula: se normalizan una vez
+codigo_canon = lru_cache(maxsize=None)(normalize_materia_codigo)
+
+
+# ============================================================
+# 1) PLANES
+# ============================================================
+
+class CompiledPlan:
+    """Plan listo para auditar: códigos, créditos y acentuaciones como posiciones."""
+
+    __slots__ = ("version", "codigos", "creditos", "index", "total", "acentuaciones")
+
+    def __init__(self, out: dict):
+        plan = out.get("plan") or {}
+        self.version = str(plan.get("version") or "").strip()
+        self.codigos = []
+        self.creditos = []
+        self.index = {}
+        for m in out.get("materias") or []:
+            codigo = normalize_materia_codigo(m.get("codigo"))
+            if not codigo or codigo in self.index:
+                continue
+            self.index[codigo] = len(self.codigos)
+            self.codigos.append(codigo)
+            self.creditos.append(int(m.get("creditos") or 0))
+        self.total = int(plan.get("total_creditos") or 0) or sum(self.creditos)
+
+        self.acentuaciones = []
+        for a in out.get("acentuaciones") or []:
+            pos = []
+            for m in a.get("materias") or []:
+                codigo = normalize_materia_codigo(m.get("codigo") if isinstance(m, dict) else m)
+                if codigo in self.index:
+                    pos.append(self.index[codigo])
+            if pos:
+                self.acentuaciones.append((a.get("nombre") or "", tuple(sorted(set(pos)))))
+
+
+def load_planes(path: Path) -> dict:
+    planes = {}
+    for out in iter_json_docs(path):
+        if not out.get("ok", True):
+            continue
+        plan = CompiledPlan(out)
+        if plan.version and plan.codigos:
+            planes[plan.version] = plan  # la última salida de una versión gana
+    return planes
+
+
+# ============================================================
+# 2) AUDITORÍA POR ALUMNO
+# ============================================================
+
+def audit_alumno(out: dict, planes: dict, default_plan=None,
+                 with_acent: bool = False, solo_cursadas: bool = False) -> dict:
+    alumno = out.get("alumno") or {}
+    expediente = (alumno.get("expediente") or "").strip()
+    version = (alumno.get("plan") or "").strip() or default_plan
+    plan = planes.get(version)
+    if plan is None:
+        return {"ok": False, "expediente": expediente, "plan": version,
+                "error": f"Plan de estudios no disponible: versión {version}"}
+
+    # Rango por posición del plan; fuera del plan se reporta aparte
+    rank = [_NOT_TAKEN] * len(plan.codigos)
+    fuera = set()
+    index = plan.index
+    for m in out.get("materias") or []:
+        codigo = codigo_canon(m.get("codigo"))
+        if not codigo:
+            continue
+        pos = index.get(codigo)
+        if pos is None:
+            fuera.add(codigo)
+            continue
+        r = _RANK.get(map_calificacion_estado(m)[1], _NOT_TAKEN)
+        if r < rank[pos]:
+            rank[pos] = r
+
+    resumen = dict.fromkeys(STATUSES, 0)
+    materias = {}
+    aprobados = 0
+    for pos, r in enumerate(rank):
+        status = _BY_RANK[r]
+        resumen[status] += 1
+        if r == 1:
+            aprobados += plan.creditos[pos]
+        if r != _NOT_TAKEN or not solo_cursadas:
+            materias[plan.codigos[pos]] = status
+
+    res = {
+        "ok": True,
+        "expediente": expediente,
+        "plan": plan.version,
+        "materias": materias,
+        "resumen": resumen,
+        "creditos": {"aprobados": aprobados, "total": plan.total},
+    }
+    if with_acent:
+        res["acentuaciones"] = [
+            {
+                "nombre": nombre,
+                "creditos_aprobados": sum(plan.creditos[p] for p in pos if rank[p] == 1),
+                "creditos_total": sum(plan.creditos[p] for p in pos),
+                "materias_aprobadas": sum(1 for p in pos if rank[p] == 1),
+                "materias_total": len(pos),
+            }
+            for nombre, pos in plan.acentuaciones
+        ]
+    res["fuera_de_plan"] = sorted(fuera)
+    return res
+
+
+# ============================================================
+# 3) CLI
+# ============================================================
+
+def main() -> None:
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    flags = {a for a in sys.argv[1:] if a.startswith("--") and "=" not in a}
+    inputs = [Path(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if "planes" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: degree_audit.py --planes=<archivo> [kardex.ndjson ...]"}, ensure_ascii=False))
+        sys.exit(1)
+    missing = [str(p) for p in [Path(opts["planes"]), *inputs] if not p.exists()]
+    if missing:
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {missing[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    planes = load_planes(Path(opts["planes"]))
+    if not planes:
+        print(json.dumps({"ok": False, "error": "No se cargó ningún plan válido"}, ensure_ascii=False))
+        sys.exit(1)
+
+    docs = (d for p in inputs for d in iter_json_docs(p)) if inputs else (
+        json.loads(line) for line in sys.stdin if line.strip()
+    )
+    with_acent = "--acentuaciones" in flags
+    solo = "--solo-cursadas" in flags
+    t0 = time.perf_counter()
+    n = fallidos = 0
+    write = sys.stdout.write
+    for out in docs:
+        if not out.get("ok", True):
+            continue
+        res = audit_alumno(out, planes, opts.get("plan"), with_acent, solo)
+        n += 1
+        fallidos += not res["ok"]
+        write(json.dumps(res, ensure_ascii=False, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+    secs = time.perf_counter() - t0
+    print(json.dumps({
+        "alumnos": n,
+        "sin_plan": fallidos,
+        "planes": sorted(planes),
+        "ms": round(secs * 1000, 1),
+        "alumnos_por_segundo": round(n / secs) if secs > 0 else None,
+    }, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
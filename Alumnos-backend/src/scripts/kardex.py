@@ -4,8 +4,21 @@
 """
 Parser de Kárdex UniSon
 
-- Usa pdfplumber para extraer texto y filas de la tabla.
+- La lectura del PDF y el modelo de fila son los de kardex_core.py (el mismo
+  núcleo que usa Carga-Archivos); cabecera, inglés y resumen, los de
+  kardex_alumnos.py. Este script solo tipa las materias con el esquema de
+  Alumnos-backend y agrega la salida COPY y el CLI.
 - Repara acentos y mojibake (ftfy + normalización NFC).
+- Con --page-cache (o $KARDEX_PAGE_CACHE_DB) reutiliza las páginas ya
+  parseadas de descargas anteriores del mismo kárdex (page_cache.py). Las
+  entradas son texto y celdas crudas, compartidas con el kardex.py de Carga.
+- Con --split trata el PDF como varios kárdex impresos seguidos (uno por
+  alumno) y emite NDJSON, un alumno por línea (kardex_split.py).
+- Con --archive=DIR (o $KARDEX_ARCHIVE_DIR) agrega además el resultado al
+  archivo Parquet particionado por periodo y plan (kardex_archive.py); con
+  --split, cada alumno.
+- Cada materia es un Materia (__slots__, texto internado, CIC entero) desde el
+  parseo hasta la salida; solo se vuelve dict al serializar (dumps()).
 - Devuelve JSON estructurado y tipado:
 
   {
@@ -16,505 +29,403 @@ Parser de Kárdex UniSon
   }
 
 La lógica de inserción/actualización en BD (UPSERT) va en el backend.
+
+kardex_core.py, kardex_alumnos.py y page_cache.py viven en
+Carga-Archivos-backend/src/scripts (SHARED_SCRIPTS): una sola copia de las
+reglas para el script y para el servicio de parsers (PARSER_SERVICE_URL).
 """
 
+import os
 import sys
 import json
 import re
-import unicodedata
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+__version__ = "1.3.0"
+
+# Módulos compartidos con Carga-Archivos (mismo repositorio): kardex_core.py,
+# kardex_alumnos.py, page_cache.py, json_docs.py. Una sola copia de cada uno.
+# Va al final de sys.path: los scripts de aquí (kardex.py...) tienen prioridad.
+SHARED_SCRIPTS = Path(__file__).resolve().parents[3] / "Carga-Archivos-backend" / "src" / "scripts"
+if str(SHARED_SCRIPTS) not in sys.path:
+    sys.path.append(str(SHARED_SCRIPTS))
+
+from kardex_core import (  # noqa: E402
+    CORE_VERSION,
+    build_rows,
+    cic_to_period_label,
+    encode_cic,
+    extract_pages,
+    fix_unicode,
+    intern_text,
+    normalize_spaces,
+    row_from_tokens,
+    selftest as core_selftest,
+    to_alumnos_row,
+)
+from kardex_alumnos import alumnos_output, extract_header  # noqa: E402
+
 # ---------- Dependencias de extracción ----------
-try:
-    import pdfplumber  # Para tablas y texto
-except Exception as e:
-    raise SystemExit("Instala pdfplumber: pip install pdfplumber") from e
+# Se cargan al primer uso (no al importar): así un archivo inexistente,
+# --version o --selftest responden sin pagar el import de pdfplumber/ftfy.
+HEAVY_MODULES = ("pdfplumber", "ftfy")
+_pdfplumber = None
 
-# ftfy para reparar mojibake de acentos
-try:
-    from ftfy import fix_text
-except Exception:  # pragma: no cover
-    def fix_text(x: str) -> str:
-        return x
 
+def get_pdfplumber():
+    """pdfplumber (obligatorio para tablas y texto)."""
+    global _pdfplumber
+    if _pdfplumber is None:
+        try:
+            import pdfplumber
+        except Exception as e:
+            raise SystemExit("Instala pdfplumber: pip install pdfplumber") from e
+        _pdfplumber = pdfplumber
+    return _pdfplumber
 
-# ============================================================
-# Utilidades
-# ============================================================
 
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8")
 
-def fix_unicode(s: Optional[str]) -> str:
-    """Repara mojibake y normaliza a NFC."""
-    if not s:
-        return ""
-    s = fix_text(s)
-    return unicodedata.normalize("NFC", s)
-
-
-def normalize_spaces(s: str) -> str:
-    return re.sub(r"[ \t]+", " ", s).strip()
 
+# ============================================================
+# 1) MATERIAS (KardexRow → esquema de Alumnos)
+# ============================================================
 
-def cic_to_period_label(cic: Optional[str]) -> Optional[str]:
+class Materia:
     """
-    Convierte CIC (4 dígitos) a etiqueta de periodo, según la codificación
-    de la UniSon. Ejemplos proporcionados:
-
-      2222 -> 2022-2
-      2231 -> 2023-1
-      2232 -> 2023-2
-      2241 -> 2024-1
-      2242 -> 2024-2
-      2251 -> 2025-1
-      2252 -> 2025-2
+    Una materia del kárdex con los tipos de to_alumnos_row (kardex_core.py).
+    Con lotes de miles de kárdex en memoria un dict por materia pesa: aquí van
+    slots, el texto internado (nombres, claves y E1/E2 se repiten entre
+    alumnos: una copia por valor) y el CIC codificado como en KardexRow
+    (encode_cic: entero si son 4 dígitos; cualquier otro texto, tal cual).
     """
-    if not cic:
-        return None
-    cic = cic.strip()
-    if not re.fullmatch(r"\d{4}", cic):
-        return None
-    a, _, c, d = cic  # '2', '2', '3', '1' en 2231
-    year = 2000 + (10 * int(a) + int(c))
-    ciclo = int(d)
-    return f"{year}-{ciclo}"
 
+    __slots__ = ("cr", "codigo", "nombre", "e1", "e2", "ord", "reg", "_cic",
+                 "inscripciones", "reprobaciones", "bajas")
+    # orden de to_dict() / as_row(); "periodo" se deriva del CIC
+    FIELDS = ("cr", "codigo", "nombre", "e1", "e2", "ord", "reg", "cic",
+              "inscripciones", "reprobaciones", "bajas")
 
-def parse_int_or_none(s: Optional[str]) -> Optional[int]:
-    if not s:
-        return None
-    s = s.strip().replace("*", "")
-    if not s:
-        return None
-    if not re.fullmatch(r"-?\d+", s):
-        return None
-    try:
-        return int(s)
-    except Exception:
-        return None
-
-
-def parse_grade(s: Optional[str]) -> Optional[int]:
-    """
-    Convierte '090' -> 90, '100' -> 100, etc.
-    Devuelve None si no es calificación numérica (ACREDITADA, BV, etc.).
-    """
-    if not s:
-        return None
-    s = s.strip().replace("*", "")
-    if not re.fullmatch(r"\d{2,3}", s):
-        return None
-    val = int(s)
-    if 0 <= val <= 100:
-        return val
-    return None
+    def __init__(self, cr, codigo, nombre, e1, e2, ord, reg, cic, inscripciones, reprobaciones, bajas):
+        self.cr = cr
+        self.codigo = intern_text(codigo)
+        self.nombre = intern_text(nombre)
+        self.e1 = intern_text(e1)
+        self.e2 = intern_text(e2)
+        self.ord = ord
+        self.reg = reg
+        self._cic = encode_cic(cic)
+        self.inscripciones = inscripciones
+        self.reprobaciones = reprobaciones
+        self.bajas = bajas
 
+    @classmethod
+    def from_row(cls, r) -> "Materia":
+        """KardexRow → Materia (mismos valores que to_alumnos_row)."""
+        d = to_alumnos_row(r)
+        return cls(*(d[f] for f in cls.FIELDS))
 
-# ============================================================
-# 1) TEXTO COMPLETO + CABECERA + NIVEL DE INGLÉS
-# ============================================================
+    @property
+    def cic(self) -> Optional[str]:
+        c = self._cic
+        return f"{c:04d}" if isinstance(c, int) else c
 
-def read_text(path: Path) -> str:
-    """
-    Extrae texto del PDF con pdfplumber, repara acentos.
-    """
-    pages_text: List[str] = []
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            pages_text.append(fix_unicode(page_text))
-    return "\n".join(pages_text)
+    @property
+    def periodo(self) -> Optional[str]:
+        return cic_to_period_label(self.cic)
 
+    def key(self) -> tuple:
+        return (self.codigo, self._cic)
 
-def extract_english_info(raw_text: str) -> Dict[str, Any]:
-    """
-    Busca la línea tipo:
-      ACREDITACIÓN DE INGLÉS: ACREDITADO 5.00 DE 5
-    """
-    raw_text = fix_unicode(raw_text)
-    m = re.search(
-        r"ACREDITACI[ÓO]N DE INGL[ÉE]S:\s*([A-ZÁÉÍÓÚ ]+?)\s+([0-9]+(?:\.[0-9]+)?)\s*DE\s*([0-9]+(?:\.[0-9]+)?)",
-        raw_text,
-        re.I,
-    )
-    if not m:
-        return {}
+    def get(self, field: str, default=None):
+        """Lectura estilo dict: map_calificacion_estado / kardex_copy_rows aceptan ambos."""
+        return getattr(self, field, default)
 
-    estado = normalize_spaces(m.group(1)).upper()
-    nivel = float(m.group(2))
-    maximo_pdf = float(m.group(3))
+    def as_row(self) -> list:
+        return [getattr(self, f) for f in self.FIELDS]
 
-    requerido_carrera = 5.0
-    maximo_carrera = 7.0
-    cumple = nivel >= requerido_carrera
+    def to_dict(self) -> Dict[str, Any]:
+        d = dict(zip(self.FIELDS, self.as_row()))
+        d["periodo"] = self.periodo
+        return d
 
-    return {
-        "estado": estado,
-        "nivel": nivel,
-        "maximo_pdf": maximo_pdf,
-        "requerido_carrera": requerido_carrera,
-        "maximo_carrera": maximo_carrera,
-        "cumple_requisito": cumple,
-    }
+    def __reduce__(self):
+        # pickle (pool de kardex_split) → __init__ de nuevo, para internar en el proceso padre
+        return Materia, tuple(self.as_row())
 
 
-def extract_header(raw_text: str) -> Dict[str, Any]:
-    """
-    Cabecera típica:
-      PROGRAMA: ...
-      PLAN: 2182
-      UNIDAD: HERMOSILLO
-      EXPEDIENTE: 222202156  NOMBRE COMPLETO
-      ESTATUS: A .. Alumno activo....
-      Fecha: 21/09/2025
-    """
-    raw_text = fix_unicode(raw_text)
-
-    # Quitamos ruidos comunes
-    cleaned = re.sub(
-        r"Universidad de Sonora.*?KÁRDEX ELECTRÓNICO",
-        "",
-        raw_text,
-        flags=re.S,
-    )
-    cleaned = re.sub(r"Pagina \d+ de \d+", "", cleaned)
-    cleaned = cleaned.replace(".. Alumno activo....", "")  # deja solo 'ESTATUS: A'
-
-    def grab(pat: str, s: str = cleaned, flags: int = re.M) -> Optional[str]:
-        m = re.search(pat, s, flags)
-        return normalize_spaces(fix_unicode(m.group(1))) if m else None
-
-    header: Dict[str, Any] = {
-        "fecha": grab(r"Fecha:\s*(.*)"),
-        "programa": grab(r"PROGRAMA:\s*(.*)"),
-        "plan": grab(r"PLAN:\s*(\d+)"),
-        "unidad": grab(r"UNIDAD:\s*(.*)"),
-        "expediente": grab(r"EXPEDIENTE:\s*([0-9]+)"),
-        "alumno": grab(r"EXPEDIENTE:\s*[0-9]+\s+(.*)"),
-        "estatus": grab(r"ESTATUS:\s*(.*)"),
-    }
+def json_default(o):
+    if isinstance(o, Materia):
+        return o.to_dict()
+    raise TypeError(f"{type(o).__name__} no es serializable a JSON")
 
-    ingles = extract_english_info(raw_text)
-    if ingles:
-        header["ingles"] = ingles
 
-    # Limpia None
-    return {k: v for k, v in header.items() if v is not None}
+def dumps(out: Dict[str, Any]) -> str:
+    """Salida → JSON; aquí (y solo aquí) las materias pasan a dict."""
+    return json.dumps(out, ensure_ascii=False, default=json_default)
 
 
 # ============================================================
-# 2) PARSEO DE UNA FILA DE MATERIA (TOKENS)
+# 2) LECTURA DEL PDF (kardex_core)
 # ============================================================
 
-def parse_subject_tokens(tokens: List[str]) -> Optional[Dict[str, Any]]:
+def read_pages(path: Path, cache=None) -> tuple:
     """
-    Recibe una lista de tokens (split por espacio) que representan una fila completa
-    y la intenta interpretar como:
-
-      CR CVE <NOMBRE ...> E1 E2 [ORD/REG opcionales dispersos] CIC I R B
+    Única lectura del PDF: (texto completo, KardexRow). Con `cache`
+    (page_cache.PageCache) solo las páginas nuevas o cambiadas pasan por
+    extract_text / extract_tables.
     """
-    if len(tokens) < 6:
-        return None
+    with get_pdfplumber().open(str(path)) as pdf:
+        texts, table_rows = extract_pages(pdf, cache)
+    raw_text = "\n".join(texts)
+    return raw_text, build_rows(table_rows, raw_text)
 
-    # Validar CR y CVE al inicio
-    cr_tok, cve_tok = tokens[0], tokens[1]
-    if not (re.fullmatch(r"\d{2}", cr_tok) and re.fullmatch(r"\d{3,5}", cve_tok)):
-        return None
-
-    # Al final deben venir ... CIC I R B
-    if len(tokens) < 6:
-        return None
-    cic_tok = tokens[-4]
-    I_tok = tokens[-3]
-    R_tok = tokens[-2]
-    B_tok = tokens[-1]
-    if not (
-        re.fullmatch(r"\d{4}", cic_tok)
-        and re.fullmatch(r"\d{2}", I_tok)
-        and re.fullmatch(r"\d{2}", R_tok)
-        and re.fullmatch(r"\d{2}", B_tok)
-    ):
-        return None
-
-    cr = int(cr_tok)
-    codigo = cve_tok
-    cic = cic_tok
-    ins = parse_int_or_none(I_tok)
-    rep = parse_int_or_none(R_tok)
-    bajas = parse_int_or_none(B_tok)
-
-    mid_tokens = tokens[2:-4]  # entre CVE y CIC
-    if len(mid_tokens) < 2:
-        return None
-
-    # 1) Detectar calificaciones numéricas dentro de mid_tokens
-    grade_positions: List[int] = []
-    grade_values: List[int] = []
-    for idx, tok in enumerate(mid_tokens):
-        g = parse_grade(tok)
-        if g is not None:
-            grade_positions.append(idx)
-            grade_values.append(g)
-
-    mid_tokens_clean = [
-        tok for i, tok in enumerate(mid_tokens) if i not in grade_positions
-    ]
-
-    ord_val: Optional[int] = None
-    reg_val: Optional[int] = None
-    if grade_values:
-        ord_val = grade_values[0]
-        if len(grade_values) > 1:
-            reg_val = grade_values[1]
-
-    # 2) E1/E2 al final de mid_tokens_clean
-    e1 = None
-    e2 = None
-    nombre_tokens: List[str] = mid_tokens_clean
-
-    if len(mid_tokens_clean) >= 2:
-        e1 = mid_tokens_clean[-2]
-        e2 = mid_tokens_clean[-1]
-        nombre_tokens = mid_tokens_clean[:-2]
-    elif len(mid_tokens_clean) == 1:
-        e2 = mid_tokens_clean[-1]
-        nombre_tokens = []
-
-    nombre = normalize_spaces(" ".join(nombre_tokens))
-    if not nombre:
-        # En caso de que no haya nombre, no consideramos la fila
-        return None
 
-    return {
-        "cr": cr,
-        "codigo": codigo,
-        "nombre": nombre,
-        "e1": e1,
-        "e2": e2,
-        "ord": ord_val,
-        "reg": reg_val,
-        "cic": cic,
-        "inscripciones": ins,
-        "reprobaciones": rep,
-        "bajas": bajas,
-    }
+def build_output(raw_text: str, rows: List) -> Dict[str, Any]:
+    """Texto y KardexRow de un alumno → dict de salida (materias como Materia)."""
+    return alumnos_output(raw_text, rows, make_row=Materia.from_row)
 
 
 # ============================================================
-# 3) MATERIAS DESDE TABLAS Y DESDE TEXTO
+# 3) SALIDA COPY (carga masiva a PostgreSQL)
 # ============================================================
 
-def extract_subjects_from_tables(path: Path) -> List[Dict[str, Any]]:
-    materias: List[Dict[str, Any]] = []
-
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables() or []
-            for t in tables:
-                for row in t:
-                    if not row:
-                        continue
-                    cells = [fix_unicode((c or "").strip()) for c in row]
-                    row_text = normalize_spaces(" ".join(cells))
-                    if not row_text:
-                        continue
-                    up = row_text.upper()
-                    if up.startswith("CR CVE"):
-                        continue
-                    if "ACREDITACIÓN DE INGLÉS" in up:
-                        continue
-
-                    tokens = row_text.split()
-                    subj = parse_subject_tokens(tokens)
-                    if subj:
-                        materias.append(subj)
-
-    return materias
-
-
-def extract_subjects_from_text(raw_text: str) -> List[Dict[str, Any]]:
-    materias: List[Dict[str, Any]] = []
-
-    for line in raw_text.splitlines():
-        line = normalize_spaces(fix_unicode(line))
-        if not line:
-            continue
-        up = line.upper()
-        if up.startswith("CR CVE"):
-            continue
-        if "ACREDITACIÓN DE INGLÉS" in up:
-            continue
+# Columnas del texto COPY: llaves naturales primero (lo que identifica la fila
+# de public.kardex sin ids), luego lo necesario para crear alumno/materia si faltan
+# y las notas para public.calificacion. kardex_copy_load.py usa esta misma lista.
+KARDEX_COPY_COLUMNS = (
+    "expediente",
+    "materia_codigo",
+    "periodo",
+    "calificacion",
+    "estatus",
+    "e2",
+    "ordinario",
+    "extraordinario",
+    "materia_nombre",
+    "creditos",
+    "plan_version",
+    "alumno_nombre",
+    "apellido_paterno",
+    "apellido_materno",
+    "estatus_alumno",
+)
+
+
+def normalize_materia_codigo(raw: Optional[str]) -> Optional[str]:
+    """Igual que normalizeMateriaCodigo (ingestaKardex.ts): solo dígitos, relleno a 5."""
+    digits = re.sub(r"\D+", "", raw or "")
+    if not digits:
+        return None
+    if len(digits) > 5:
+        return digits
+    return (digits.lstrip("0") or "0").zfill(5)
 
-        tokens = line.split()
-        subj = parse_subject_tokens(tokens)
-        if subj:
-            materias.append(subj)
 
-    return materias
+def split_nombre(full: str):
+    """'NOMBRES APELLIDO_P APELLIDO_M' → (nombre, ap, am), como splitNombre en ingestaKardex.ts."""
+    parts = normalize_spaces(full or "").split(" ")
+    if len(parts) < 2:
+        return full or "", "", ""
+    return " ".join(parts[:-2]), parts[-2], parts[-1]
 
 
-def extract_subject_rows(path: Path, raw_text: str) -> List[Dict[str, Any]]:
+def map_calificacion_estado(m: Dict[str, Any]):
     """
-    Extrae materias combinando:
-      - Filas vía tablas de pdfplumber
-      - Filas vía texto línea-por-línea
-    Luego deduplica por (codigo, cic).
+    Port de mapCalificacionYEstado (ingestaKardex.ts): (calificacion, estatus)
+    para la tabla kardex. Mantener ambas versiones en sincronía.
     """
-    from_tables = extract_subjects_from_tables(path)
-    from_text = extract_subjects_from_text(raw_text)
+    ord_v = m.get("ord") if isinstance(m.get("ord"), int) else None
+    reg_v = m.get("reg") if isinstance(m.get("reg"), int) else None
+    e1 = (m.get("e1") or "").upper().strip()
+    e2 = (m.get("e2") or "").upper().strip()
+    bajas = m.get("bajas") or 0
+
+    # Calificación numérica final: preferimos REG sobre ORD
+    final = reg_v if reg_v is not None else ord_v
+
+    if bajas > 0 or e2 == "BV":
+        return final, "BAJA_VOLUNTARIA"
+    if (e1.startswith("PAR") and "ACRED" in e2) or "PARC.ACRED" in e2:
+        return None, "PARCIALMENTE_ACREDITADA"
+    if "ACRED" in e2 or "ACRED" in e1:
+        return None, "ACREDITADA"
+    if e2 in ("1", "2"):
+        return None, "INSCRITO"
+    if final is None and e2 == "A":
+        return None, "APROBADA"
+    if ord_v is not None or reg_v is not None:
+        aprobada = (ord_v is not None and ord_v > 60) or (reg_v is not None and reg_v > 60)
+        return final, "APROBADA" if aprobada else "REPROBADA"
+    return None, "SIN_CALIFICACION"
+
+
+def copy_escape(v: Any) -> str:
+    """Valor → campo de COPY en formato text (\\N para NULL)."""
+    if v is None:
+        return "\\N"
+    s = str(v)
+    return (
+        s.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
-    combined = from_tables + from_text
 
-    seen = set()
-    materias: List[Dict[str, Any]] = []
-    for m in combined:
-        key = (m["codigo"], m["cic"])
-        if key in seen:
+def kardex_copy_rows(out: Dict[str, Any]) -> List[tuple]:
+    """Filas (en el orden de KARDEX_COPY_COLUMNS) a partir de la salida JSON del parser."""
+    alumno = out.get("alumno") or {}
+    expediente = (alumno.get("expediente") or "").strip()
+    if not expediente:
+        return []
+    nombre, ap, am = split_nombre(alumno.get("alumno") or "")
+    estatus_alumno = (alumno.get("estatus") or "").strip()[:1] or None
+    plan = (alumno.get("plan") or "").strip() or None
+
+    rows: List[tuple] = []
+    for m in out.get("materias") or []:
+        codigo = normalize_materia_codigo(m.get("codigo"))
+        periodo = m.get("periodo") or cic_to_period_label(m.get("cic"))
+        if not codigo or not periodo:
             continue
-        seen.add(key)
-        m["periodo"] = cic_to_period_label(m["cic"])
-        materias.append(m)
+        calificacion, estatus = map_calificacion_estado(m)
+        e2 = (m.get("e2") or "").upper().strip() or None
+        rows.append((
+            expediente, codigo, periodo, calificacion, estatus, e2,
+            m.get("ord"), m.get("reg"),
+            normalize_spaces(m.get("nombre") or ""), m.get("cr"), plan,
+            nombre, ap, am, estatus_alumno,
+        ))
+    return rows
 
-    return materias
+
+def write_copy(rows: List[tuple], stream=None) -> None:
+    stream = stream or sys.stdout
+    for r in rows:
+        stream.write("\t".join(copy_escape(v) for v in r) + "\n")
 
 
 # ============================================================
-# 4) RESUMEN (PROMEDIOS / CRÉDITOS / MATERIAS)
+# 4) CLI
 # ============================================================
 
-def extract_summary(raw_text: str) -> dict:
+def parse_kardex(pdf_path: Path, page_cache=None) -> Dict[str, Any]:
     """
-    Extrae de la banda inferior del kárdex:
-      - PROMEDIO de un periodo (ej. 2025-1 *93.33)
-      - PROMEDIO KARDEX (*89.79)
-      - CRÉDITOS: APR / REP / INS
-      - MATERIAS: APR / REP / NMR / INS
+    Parseo completo de un PDF → dict de salida (lo que se imprime como JSON).
+    Con `page_cache` (page_cache.PageCache) las páginas ya vistas no se reparsean.
     """
-    
-    resumen = {
-        "promedios": {},
-        "creditos": {},
-        "materias": {},
-    }
-    
-    # --- PROMEDIOS ---
-    # Buscar la línea completa que contiene promedios y datos
-    # Esta línea contiene: *93.33 *89.79 284 **0 *49 *43 **0 **0 **7
-    full_line_pattern = re.search(
-        r'\*(\d{2,3}[.,]\d{2})\s+\*(\d{2,3}[.,]\d{2})\s+\d+',
-        raw_text
-    )
-    
-    if full_line_pattern:
-        val_periodo = float(full_line_pattern.group(1).replace(',', '.'))
-        val_kardex = float(full_line_pattern.group(2).replace(',', '.'))
-        
-        # Buscar el periodo (YYYY-D) en las líneas anteriores
-        periodo_pattern = re.search(r'(\d{4}-\d)\s+KARDEX', raw_text)
-        if periodo_pattern:
-            periodo = periodo_pattern.group(1)
-            resumen["promedios"][periodo] = val_periodo
-        
-        resumen["promedios"]["kardex"] = val_kardex
-    
-    # --- BUSCAR LA LÍNEA COMPLETA DE DATOS ---
-    # Buscamos la línea que contiene los promedios y todos los números
-    # Patrón: *XX.XX *XX.XX seguido de varios números con asteriscos
-    data_line_pattern = re.search(
-        r'\*(\d{2,3}[.,]\d{2})\s+\*(\d{2,3}[.,]\d{2})\s+(\d+)\s+\*+(\d+)\s+\*(\d+)\s+\*(\d+)\s+\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)',
-        raw_text
-    )
-    
-    if data_line_pattern:
-        # Los grupos son:
-        # 1: promedio periodo (ya extraído)
-        # 2: promedio kardex (ya extraído)
-        # 3-5: CRÉDITOS (APR, REP, INS)
-        # 6-9: MATERIAS (APR, REP, NMR, INS)
-        
-        resumen["creditos"] = {
-            "APR": int(data_line_pattern.group(3)),
-            "REP": int(data_line_pattern.group(4)),
-            "INS": int(data_line_pattern.group(5)),
-        }
-        
-        resumen["materias"] = {
-            "APR": int(data_line_pattern.group(6)),
-            "REP": int(data_line_pattern.group(7)),
-            "NMR": int(data_line_pattern.group(8)),
-            "INS": int(data_line_pattern.group(9)),
-        }
-    else:
-        # --- FALLBACK: Buscar por secciones separadas ---
-        
-        # CRÉDITOS: buscar después de "CREDITOS" en los headers
-        creditos_pattern = re.search(
-            r'CREDITOS.*?APR.*?REP.*?INS.*?\n.*?(\d+)\s+\*+(\d+)\s+\*(\d+)',
-            raw_text,
-            re.IGNORECASE | re.DOTALL
-        )
-        
-        if creditos_pattern:
-            resumen["creditos"] = {
-                "APR": int(creditos_pattern.group(1)),
-                "REP": int(creditos_pattern.group(2)),
-                "INS": int(creditos_pattern.group(3)),
-            }
-        
-        # MATERIAS: buscar después de "MATERIAS" en los headers
-        materias_pattern = re.search(
-            r'MATERIAS.*?APR.*?REP.*?NMR.*?INS.*?\n.*?\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)',
-            raw_text,
-            re.IGNORECASE | re.DOTALL
-        )
-        
-        if materias_pattern:
-            resumen["materias"] = {
-                "APR": int(materias_pattern.group(1)),
-                "REP": int(materias_pattern.group(2)),
-                "NMR": int(materias_pattern.group(3)),
-                "INS": int(materias_pattern.group(4)),
-            }
-
-    return resumen
+    raw_text, rows = read_pages(pdf_path, page_cache)
+    out = build_output(raw_text, rows)
+    if page_cache is not None:
+        out["page_cache"] = page_cache.stats()
+    return out
 
 
+def open_page_cache(argv: List[str]):
+    """--page-cache [--page-cache-db=ruta] o $KARDEX_PAGE_CACHE_DB → PageCache, o None."""
+    db = next((a.split("=", 1)[1] for a in argv if a.startswith("--page-cache-db=")), None)
+    if not (db or "--page-cache" in argv or os.environ.get("KARDEX_PAGE_CACHE_DB")):
+        return None
+    from page_cache import PageCache
+    # Misma llave que el kardex.py de Carga: las páginas guardan texto y celdas crudas
+    return PageCache(db, parser=f"kardex-core@{CORE_VERSION}")
 
 
+def archive_dir(argv: List[str]) -> Optional[str]:
+    """--archive=DIR o $KARDEX_ARCHIVE_DIR → raíz del archivo Parquet, o None."""
+    root = next((a.split("=", 1)[1] for a in argv if a.startswith("--archive=")), None)
+    return root or os.environ.get("KARDEX_ARCHIVE_DIR")
+
+
+def archive_outputs(root: str, outs: List[Dict[str, Any]], documento: str) -> bool:
+    """Agrega salidas al archivo (kardex_archive.py). Un fallo no debe tumbar la
+    ingesta: se reporta en stderr y devuelve False."""
+    try:
+        from kardex_archive import append_outputs
+        append_outputs(root, outs, [documento] * len(outs))
+        return True
+    except (Exception, SystemExit) as e:
+        print(json.dumps({"archive_error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return False
+
+
+def selftest() -> Dict[str, Any]:
+    """Chequeo de las heurísticas de texto sin abrir PDFs ni importar pdfplumber/ftfy."""
+    import importlib.util
+    row = row_from_tokens("06 6881 ESTRUCTURAS DE DATOS O A 090 2231 01 00 00".split())
+    subj = Materia.from_row(row) if row is not None else None
+    header = extract_header("PLAN: 2182\nEXPEDIENTE: 222202156 NOMBRE DE PRUEBA\n")
+    checks = {
+        "cic_to_period_label": cic_to_period_label("2231") == "2023-1",
+        "materia_from_row": subj is not None and subj.codigo == "6881" and subj.ord == 90
+                            and subj.cr == 6 and subj.to_dict()["periodo"] == "2023-1",
+        "extract_header": header.get("expediente") == "222202156",
+        **{f"core.{k}": v for k, v in core_selftest().items()},
+    }
+    return {
+        "ok": all(checks.values()),
+        "version": __version__,
+        "checks": checks,
+        "deps": {m: importlib.util.find_spec(m) is not None for m in HEAVY_MODULES},
+    }
 
-# ============================================================
-# 5) CLI
-# ============================================================
 
 def main() -> None:
-    if len(sys.argv) < 2:
+    # Rutas que no importan nada pesado (sirven para medir el arranque)
+    if "--version" in sys.argv[1:]:
+        print(json.dumps({"ok": True, "script": "kardex.py", "version": __version__}))
+        return
+    if "--selftest" in sys.argv[1:]:
+        res = selftest()
+        print(json.dumps(res, ensure_ascii=False))
+        sys.exit(0 if res["ok"] else 1)
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    emit = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--emit=")), "json")
+    if "--emit" in sys.argv[1:]:
+        i = sys.argv.index("--emit")
+        emit = sys.argv[i + 1] if i + 1 < len(sys.argv) else emit
+        args = [a for a in args if a != emit]
+    if emit not in ("json", "copy"):
+        print(json.dumps({"ok": False, "error": f"--emit inválido: {emit}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    if not args:
         print(json.dumps({"ok": False, "error": "PDF path missing"}, ensure_ascii=False))
         sys.exit(1)
 
-    pdf_path = Path(sys.argv[1])
+    pdf_path = Path(args[0])
     if not pdf_path.exists():
         print(json.dumps({"ok": False, "error": f"No existe el archivo: {pdf_path}"}, ensure_ascii=False))
         sys.exit(1)
 
+    if "--split" in sys.argv[1:]:
+        # PDF con varios kárdex seguidos → NDJSON, un alumno por línea
+        from kardex_split import run_split
+        sys.exit(run_split(pdf_path, sys.argv[1:]))
+
+    cache = open_page_cache(sys.argv[1:])
     try:
-        raw_text = read_text(pdf_path)
-        alumno = extract_header(raw_text)
-        materias = extract_subject_rows(pdf_path, raw_text)
-        resumen = extract_summary(raw_text)
-
-        out = {
-            "ok": True,
-            "alumno": alumno,
-            "materias": materias,
-            "resumen": resumen,
-        }
-        print(json.dumps(out, ensure_ascii=False))
+        out = parse_kardex(pdf_path, cache)
     except Exception as e:
         print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
         sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
 
+    archive = archive_dir(sys.argv[1:])
+    if archive:
+        archive_outputs(archive, [out], str(pdf_path))
+
+    if emit == "copy":
+        # Texto COPY (sin encabezado) para kardex_copy_load.py / COPY ... FROM STDIN
+        write_copy(kardex_copy_rows(out))
+    else:
+        print(dumps(out))
 
 if __name__ == "__main__":
     main()
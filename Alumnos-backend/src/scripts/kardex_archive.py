@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivo columnar (Parquet/Arrow) de los kárdex ya parseados.
+
+La salida de kardex.py solo vive lo que tarda ingestaKardex.ts en insertarla;
+cualquier pregunta analítica ("¿cuánto se reprueba la materia X por periodo?")
+termina en la tabla kardex fila por fila o en volver a parsear PDFs. Aquí cada
+resultado se agrega a un dataset Parquet:
+
+  <raíz>/periodo=2023-1/plan_version=2182/part-<uuid>-0.parquet
+
+- Columnas = KARDEX_COPY_COLUMNS (mismas filas que kardex_copy_rows) más
+  `documento` (hash o ruta del PDF) y `archivado` (UTC).
+- materia_codigo, materia_nombre, estatus, e2 y estatus_alumno van
+  diccionario-codificados: miles de filas comparten unos cientos de valores.
+- Cada append escribe archivos nuevos (nombre con uuid), así que varios procesos
+  pueden archivar a la vez sin pisarse. Reparsear un PDF agrega otra copia;
+  latest() se queda con la más reciente por (expediente, materia, periodo)
+  según `archivado`, y failure_rate() ya cuenta así.
+
+scan() abre el dataset con memory-map, poda particiones (periodo, plan) antes
+de abrir archivos y lee solo las columnas pedidas.
+
+Uso:
+  python kardex.py kardex.pdf --archive=archivo_kardex/      # o $KARDEX_ARCHIVE_DIR
+  python kardex_import.py pdfs/ --archive=archivo_kardex/ ...
+  python kardex_archive.py append salidas.ndjson --root=archivo_kardex/
+  python kardex_archive.py query --root=archivo_kardex/ [--columns=expediente,materia_codigo]
+         [--periodo=2023-1,2023-2] [--plan=2182] [--codigo=06881] [--limit=100]
+  python kardex_archive.py reprobacion --root=archivo_kardex/ [--codigo=06881] [--periodo=...] [--plan=...]
+
+Requiere pyarrow.
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from kardex import KARDEX_COPY_COLUMNS, kardex_copy_rows, normalize_materia_codigo
+
+PARTITION_COLS = ("periodo", "plan_version")
+SIN_PLAN = "SIN_PLAN"  # plan_version vacío; Hive no admite particiones nulas legibles
+DICT_COLS = ("materia_codigo", "materia_nombre", "estatus", "e2", "estatus_alumno")
+INT_COLS = ("calificacion", "ordinario", "extraordinario", "creditos")
+ARCHIVE_COLUMNS = KARDEX_COPY_COLUMNS + ("documento", "archivado")
+LATEST_KEYS = ("expediente", "materia_codigo", "periodo")  # una calificación por alumno, materia y periodo
+
+
+def get_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+    except Exception as e:
+        raise SystemExit("Instala pyarrow: pip install pyarrow") from e
+    return pa, pc, ds, fs
+
+
+def archive_schema():
+    pa, _, _, _ = get_pyarrow()
+    fields = []
+    for name in ARCHIVE_COLUMNS:
+        if name in DICT_COLS:
+            t = pa.dictionary(pa.int32(), pa.string())
+        elif name in INT_COLS:
+            t = pa.int16()
+        elif name == "archivado":
+            t = pa.timestamp("ms", tz="UTC")
+        else:
+            t = pa.string()
+        fields.append(pa.field(name, t))
+    return pa.schema(fields)
+
+
+def partitioning():
+    pa, _, ds, _ = get_pyarrow()
+    return ds.partitioning(pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor="hive")
+
+
+# ============================================================
+# 1) ESCRITURA
+# ============================================================
+def rows_to_table(rows: list, documentos: list):
+    """Filas de kardex_copy_rows (+ documento por fila) → pa.Table con el esquema del archivo."""
+    pa, _, _, _ = get_pyarrow()
+    schema = archive_schema()
+    ahora = datetime.now(timezone.utc)
+    n_copy = len(KARDEX_COPY_COLUMNS)
+    plan_i = KARDEX_COPY_COLUMNS.index("plan_version")
+    cols = [[r[i] for r in rows] for i in range(n_copy)]
+    cols[plan_i] = [v or SIN_PLAN for v in cols[plan_i]]
+    cols.append(documentos)
+    cols.append([ahora] * len(rows))
+    # los diccionarios se arman al convertir: cada valor distinto se guarda una vez
+    arrays = [pa.array(c, type=f.type) for c, f in zip(cols, schema)]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def append_rows(root, rows: list, documentos: list) -> int:
+    """Agrega filas COPY al dataset. Devuelve cuántas filas se escribieron."""
+    if not rows:
+        return 0
+    _, _, ds, _ = get_pyarrow()
+    table = rows_to_table(rows, documentos)
+    Path(root).mkdir(parents=True, exist_ok=True)
+    ds.write_dataset(
+        table,
+        str(root),
+        format="parquet",
+        partitioning=partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",  # otras particiones/archivos se respetan
+    )
+    return table.num_rows
+
+
+def append_outputs(root, outs: list, documentos: list | None = None) -> int:
+    """Salidas JSON de kardex.py → append_rows (documento por salida, opcional)."""
+    rows, docs = [], []
+    for i, out in enumerate(outs):
+        r = kardex_copy_rows(out)
+        rows.extend(r)
+        docs.extend([documentos[i] if documentos else None] * len(r))
+    return append_rows(root, rows, docs)
+
+
+# ============================================================
+# 2) LECTURA
+# ============================================================
+def open_dataset(root):
+    """Dataset del archivo con memory-map; las particiones se leen de las rutas."""
+    _, _, ds, fs = get_pyarrow()
+    return ds.dataset(
+        str(Path(root).resolve()),
+        schema=archive_schema(),
+        format="parquet",
+        partitioning=partitioning(),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def scan(root, columns=None, periodos=None, planes=None, codigos=None, filtro=None, limit=None):
+    """
+    Tabla con solo `columns`, de las particiones de `periodos` / `planes`.
+    `codigos` se normaliza como en ingestaKardex.ts; `filtro` es una expresión
+    de pyarrow.dataset extra. Las condiciones sobre periodo/plan_version podan
+    carpetas completas; las demás usan las estadísticas por row group.
+    """
+    _, _, ds, _ = get_pyarrow()
+    expr = filtro
+    conds = [
+        ("periodo", periodos),
+        ("plan_version", planes),
+        ("materia_codigo", [normalize_materia_codigo(c) for c in codigos] if codigos else None),
+    ]
+    for col, values in conds:
+        if values:
+            cond = ds.field(col).isin(list(values))
+            expr = cond if expr is None else expr & cond
+    dataset = open_dataset(root)
+    columns = list(columns) if columns else None
+    if limit:
+        return dataset.head(limit, columns=columns, filter=expr)  # deja de leer al llegar a `limit`
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def latest(t, keys=LATEST_KEYS):
+    """Una fila por `keys`: la de `archivado` más reciente (a igual hora, la última escrita)."""
+    pa, pc, _, _ = get_pyarrow()
+    t = t.take(pc.sort_indices(t, [("archivado", "ascending")]))  # orden estable
+    t = t.append_column("_fila", pa.array(range(t.num_rows), pa.int64()))
+    keep = t.select(list(keys) + ["_fila"]).group_by(list(keys)).aggregate([("_fila", "max")])
+    return t.take(keep["_fila_max"]).drop_columns(["_fila"])
+
+
+def failure_rate(root, codigos=None, periodos=None, planes=None) -> list:
+    """
+    Por (periodo, materia): cursadas con calificación, reprobadas y tasa.
+    Reparsear un kárdex lo vuelve a archivar: de cada (expediente, materia,
+    periodo) cuenta solo la copia más reciente.
+    """
+    pa, pc, _, _ = get_pyarrow()
+    t = scan(root, LATEST_KEYS + ("materia_nombre", "estatus", "archivado"), periodos, planes, codigos)
+    t = latest(t)
+    t = t.filter(pc.is_in(pc.cast(t["estatus"], pa.string()), pa.array(["APROBADA", "REPROBADA"])))
+    t = pa.table({
+        "periodo": t["periodo"],
+        "materia_codigo": pc.cast(t["materia_codigo"], pa.string()),
+        "materia_nombre": pc.cast(t["materia_nombre"], pa.string()),
+        "reprobada": pc.equal(pc.cast(t["estatus"], pa.string()), "REPROBADA"),
+    })
+    g = t.group_by(["periodo", "materia_codigo"]).aggregate([
+        ("reprobada", "count"), ("reprobada", "sum"), ("materia_nombre", "max"),
+    ])
+    out = []
+    for r in g.to_pylist():
+        n = r["reprobada_count"]
+        out.append({
+            "periodo": r["periodo"],
+            "materia_codigo": r["materia_codigo"],
+            "materia_nombre": r["materia_nombre_max"],
+            "cursadas": n,
+            "reprobadas": r["reprobada_sum"],
+            "tasa_reprobacion": round(r["reprobada_sum"] / n, 4) if n else None,
+        })
+    out.sort(key=lambda r: (r["materia_codigo"], r["periodo"]))
+    return out
+
+
+# ============================================================
+# 3) CLI
+# ============================================================
+def read_outputs(src: str) -> list:
+    text = sys.stdin.read() if src == "-" else Path(src).read_text(encoding="utf-8")
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, list) else [data]
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def csv_opt(opts: dict, key: str):
+    return [v for v in opts[key].split(",") if v] if opts.get(key) else None
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    args = [a for a in argv if not a.startswith("--")]
+    cmd = args[0] if args else None
+    root = opts.get("root")
+    if cmd not in ("append", "query", "reprobacion") or not root or (cmd == "append" and len(args) < 2):
+        print(json.dumps({"ok": False, "error": "Uso: kardex_archive.py append|query|reprobacion --root=DIR [...]"}))
+        sys.exit(1)
+    if cmd != "append" and not Path(root).is_dir():
+        print(json.dumps({"ok": False, "error": f"No existe el directorio: {root}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    try:
+        if cmd == "append":
+            outs = [o for o in read_outputs(args[1]) if o.get("ok", True)]
+            n = append_outputs(root, outs, [args[1] if args[1] != "-" else None] * len(outs))
+            res = {"ok": True, "salidas": len(outs), "filas": n}
+        elif cmd == "reprobacion":
+            res = {"ok": True, "materias": failure_rate(
+                root, csv_opt(opts, "codigo"), csv_opt(opts, "periodo"), csv_opt(opts, "plan"))}
+        else:
+            t = scan(root, csv_opt(opts, "columns"), csv_opt(opts, "periodo"),
+                     csv_opt(opts, "plan"), csv_opt(opts, "codigo"), limit=int(opts.get("limit", 0)) or None)
+            for r in t.to_pylist():
+                sys.stdout.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+            res = {"ok": True, "filas": t.num_rows}
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    res["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    print(json.dumps(res, ensure_ascii=False), file=sys.stderr if cmd == "query" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
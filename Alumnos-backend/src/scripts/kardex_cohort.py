@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analítica de cohorte sobre kárdex ya parseados (vectorizada con NumPy/pandas).
+
+Los reportes (reports.ts getEligibleStudents, userSummary.ts) leen columnas
+precalculadas como alumno.total_creditos, que se quedan viejas cuando cambian
+las reglas del parser. Este script recalcula todo de una vez, para la cohorte
+completa, a partir de los resultados del parser:
+
+  - *.ndjson / *.jsonl   una salida JSON de kardex.py por línea
+  - *.copy               texto COPY de `kardex.py --emit copy` (KARDEX_COPY_COLUMNS)
+  - *.parquet            mismas columnas que el COPY (requiere pyarrow)
+
+Las reglas son las de ingestaKardex.ts, pero sobre columnas completas en vez de
+fila por fila: map_calificacion_estado → np.select y cuentaComoAprobada →
+máscara booleana. Las reglas de texto (código, cic, e1/e2) se evalúan una vez
+por valor distinto (pd.factorize), no por fila. Si un expediente aparece en varios documentos, gana el último.
+
+Salidas (<out>_alumnos y <out>_periodos, Parquet si hay pyarrow; si no, CSV):
+
+  alumnos:  expediente, plan, estatus_alumno, materias, creditos_aprobados,
+            promedio_general, materias_reprobadas, reprobaciones, bajas,
+            ingles_nivel, ingles_acreditado, porcentaje_avance,
+            servicio_social_habilitado, practicas_habilitado, elegible_reporte
+  periodos: expediente, periodo, materias, creditos_inscritos,
+            creditos_aprobados, promedio
+
+El promedio es el promedio simple de las materias con calificación numérica
+(APROBADA / REPROBADA), igual que se ve en el kárdex por periodo.
+
+Uso:
+  python kardex_cohort.py cohorte.ndjson [mas.copy ...] --out=reportes/cohorte
+      [--planes=planes.json] [--format=parquet|csv]
+
+planes.json: {"2182": {"total_creditos": 393, "creditos_servicio": 276,
+              "creditos_practicas": 276}, ...}; si falta servicio/prácticas se
+usa el 70 % del total (como ingestaKardex.ts). Sin plan conocido se usa
+CREDITOS_CARRERA de reports.ts.
+"""
+
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+from kardex import KARDEX_COPY_COLUMNS, cic_to_period_label, normalize_materia_codigo
+
+# Mismos valores que reports.ts / extract_english_info
+CREDITOS_CARRERA = 393
+CREDITOS_MINIMOS = math.ceil(CREDITOS_CARRERA * 0.70)
+INGLES_REQUERIDO = 5.0
+
+NO_CUENTAN = ("BAJA_VOLUNTARIA", "INSCRITO", "SIN_CALIFICACION", "REPROBADA")
+
+
+def get_pandas():
+    try:
+        import numpy as np
+        import pandas as pd
+    except Exception as e:
+        raise SystemExit("Instala pandas: pip install pandas numpy") from e
+    return np, pd
+
+
+def has_pyarrow() -> bool:
+    import importlib.util
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+# ============================================================
+# 1) CARGA → DataFrames columnares
+# ============================================================
+
+MATERIA_COLS = ("codigo", "cic", "periodo", "cr", "e1", "e2", "ord", "reg", "reprobaciones", "bajas")
+ALUMNO_COLS = ("expediente", "doc", "plan", "estatus_alumno", "ingles_nivel", "ingles_cumple")
+
+
+def load_ndjson(path: Path, doc_base: int, pd):
+    """Salidas JSON de kardex.py (una por línea) → (materias, alumnos) como DataFrames."""
+    materias, exps, docs = [], [], []
+    alu = {c: [] for c in ALUMNO_COLS}
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            out = json.loads(line)
+            if not out.get("ok", True):
+                continue
+            alumno = out.get("alumno") or {}
+            exp = (alumno.get("expediente") or "").strip()
+            if not exp:
+                continue
+            doc = doc_base + i
+            ingles = alumno.get("ingles") or {}
+            alu["expediente"].append(exp)
+            alu["doc"].append(doc)
+            alu["plan"].append((alumno.get("plan") or "").strip() or None)
+            alu["estatus_alumno"].append((alumno.get("estatus") or "").strip()[:1] or None)
+            alu["ingles_nivel"].append(ingles.get("nivel"))
+            alu["ingles_cumple"].append(ingles.get("cumple_requisito"))
+            rows = out.get("materias") or []
+            materias.extend(rows)
+            exps.append(exp)
+            docs.append((doc, len(rows)))
+
+    # Una sola construcción columnar (en C) en vez de append por campo
+    mat = pd.DataFrame.from_records(materias, columns=list(MATERIA_COLS)) if materias else pd.DataFrame(columns=list(MATERIA_COLS))
+    counts = [n for _, n in docs]
+    mat.insert(0, "expediente", pd.Series(exps).repeat(counts).to_numpy() if exps else [])
+    mat.insert(1, "doc", pd.Series([d for d, _ in docs]).repeat(counts).to_numpy() if docs else [])
+    return mat, pd.DataFrame(alu, columns=list(ALUMNO_COLS))
+
+
+def frames_from_ndjson(paths, np, pd):
+    mats, alus, base = [], [], 0
+    for p in paths:
+        mat, alu = load_ndjson(p, base, pd)
+        base += 1 << 32  # docs de archivos distintos no chocan y conservan el orden
+        mats.append(mat)
+        alus.append(alu)
+    return pd.concat(mats, ignore_index=True), pd.concat(alus, ignore_index=True)
+
+
+def frames_from_copy(paths, np, pd):
+    """COPY / Parquet: estatus y calificación ya vienen calculados por el parser."""
+    parts = []
+    for i, p in enumerate(paths):
+        if p.suffix == ".parquet":
+            df = pd.read_parquet(p)
+        else:
+            df = pd.read_csv(
+                p, sep="\t", header=None, names=list(KARDEX_COPY_COLUMNS),
+                na_values=["\\N"], keep_default_na=False, dtype={"expediente": str, "materia_codigo": str, "plan_version": str},
+            )
+        # El COPY no marca documentos: cada racha de filas del mismo expediente
+        # es un kárdex (kardex.py --emit copy escribe uno tras otro)
+        run = df["expediente"].ne(df["expediente"].shift()).cumsum()
+        df["doc"] = (i << 32) + run
+        parts.append(df)
+    if not parts:
+        return None
+    return pd.concat(parts, ignore_index=True)
+
+
+# ============================================================
+# 2) REGLAS VECTORIZADAS (port de ingestaKardex.ts)
+# ============================================================
+
+def by_unique(values, pd):
+    """(códigos, valores únicos): las reglas de texto se evalúan una vez por valor distinto."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return codes, list(uniques) + [None]  # código -1 (nulo) → último
+
+
+def lookup(factorized, fn, np, dtype=object):
+    codes, uniques = factorized
+    return np.array([fn(u) for u in uniques], dtype=dtype)[codes]
+
+
+def _norm(x) -> str:
+    return str(x).upper().strip() if x is not None and x == x else ""
+
+
+def _codigo(x):
+    return normalize_materia_codigo(None if x is None or x != x else str(x))
+
+
+def estado_vectorizado(mat, np, pd):
+    """(calificacion, estatus) para todas las filas; mismo orden de reglas que map_calificacion_estado."""
+    ord_v = pd.to_numeric(mat["ord"], errors="coerce").to_numpy(dtype=float)
+    reg_v = pd.to_numeric(mat["reg"], errors="coerce").to_numpy(dtype=float)
+    bajas = pd.to_numeric(mat["bajas"], errors="coerce").fillna(0).to_numpy()
+    e1 = by_unique(mat["e1"], pd)
+    e2 = by_unique(mat["e2"], pd)
+
+    final = np.where(np.isnan(reg_v), ord_v, reg_v)
+    has_num = ~np.isnan(ord_v) | ~np.isnan(reg_v)
+    aprobada = (np.nan_to_num(ord_v, nan=-1) > 60) | (np.nan_to_num(reg_v, nan=-1) > 60)
+    e2_acred = lookup(e2, lambda x: "ACRED" in _norm(x), np, bool)
+
+    conds = [
+        (bajas > 0) | lookup(e2, lambda x: _norm(x) == "BV", np, bool),
+        (lookup(e1, lambda x: _norm(x).startswith("PAR"), np, bool) & e2_acred)
+        | lookup(e2, lambda x: "PARC.ACRED" in _norm(x), np, bool),
+        e2_acred | lookup(e1, lambda x: "ACRED" in _norm(x), np, bool),
+        lookup(e2, lambda x: _norm(x) in ("1", "2"), np, bool),
+        np.isnan(final) & lookup(e2, lambda x: _norm(x) == "A", np, bool),
+        has_num & aprobada,
+        has_num,
+    ]
+    choices = ["BAJA_VOLUNTARIA", "PARCIALMENTE_ACREDITADA", "ACREDITADA", "INSCRITO", "APROBADA", "APROBADA", "REPROBADA"]
+    estatus = np.select(conds, choices, default="SIN_CALIFICACION")
+
+    # Solo BAJA y APROBADA / REPROBADA por nota conservan la calificación
+    keep = conds[0] | (~(conds[1] | conds[2] | conds[3] | conds[4]) & has_num)
+    return np.where(keep, final, np.nan), estatus
+
+
+def cuenta_como_aprobada(estatus, calificacion, np, pd):
+    """cuentaComoAprobada (ingestaKardex.ts) sobre arreglos."""
+    est = by_unique(estatus, pd)
+    cal = np.asarray(calificacion, dtype=float)
+    vacio = lookup(est, lambda x: _norm(x) == "", np, bool) & np.isnan(cal)
+    no_cuenta = lookup(est, lambda x: _norm(x) in NO_CUENTAN, np, bool) | vacio
+    si = lookup(est, lambda x: "ACRED" in _norm(x) or _norm(x) == "APROBADA", np, bool)
+    return (si | (np.nan_to_num(cal, nan=-1) > 60)) & ~no_cuenta
+
+
+# ============================================================
+# 3) AGREGADOS
+# ============================================================
+
+def prepare_rows(mat, np, pd):
+    """Filas de materia listas para agregar: expediente, periodo, cr, calificacion, estatus, aprobada."""
+    if "materia_codigo" in mat.columns:  # COPY / Parquet
+        rows = pd.DataFrame({
+            "expediente": mat["expediente"].astype("string"),
+            "doc": mat["doc"],
+            "codigo": lookup(by_unique(mat["materia_codigo"], pd), _codigo, np),
+            "periodo": mat["periodo"].astype("string"),
+            "cr": pd.to_numeric(mat["creditos"], errors="coerce"),
+            "calificacion": pd.to_numeric(mat["calificacion"], errors="coerce"),
+            "estatus": mat["estatus"].astype("string").fillna(""),
+            "reprobaciones": np.nan,
+        })
+    else:
+        calificacion, estatus = estado_vectorizado(mat, np, pd)
+        periodo = lookup(by_unique(mat["cic"], pd), cic_to_period_label, np)
+        rows = pd.DataFrame({
+            "expediente": mat["expediente"].astype("string"),
+            "doc": mat["doc"],
+            "codigo": lookup(by_unique(mat["codigo"], pd), _codigo, np),
+            "periodo": mat["periodo"].where(mat["periodo"].notna(), periodo),
+            "cr": pd.to_numeric(mat["cr"], errors="coerce"),
+            "calificacion": calificacion,
+            "estatus": estatus,
+            "reprobaciones": pd.to_numeric(mat["reprobaciones"], errors="coerce"),
+        })
+    # Igual que kardex_copy_rows: sin código o sin periodo la fila no entra a kardex
+    rows = rows[rows["codigo"].notna() & rows["periodo"].notna()]
+    # Expediente repetido (kárdex recargado): solo el documento más reciente
+    last = rows.groupby("expediente", sort=False)["doc"].transform("max")
+    rows = rows[rows["doc"].to_numpy() == last.to_numpy()]
+    # dos kárdex seguidos del mismo alumno en un COPY quedan en una racha: como
+    # DEDUP_SQL de kardex_copy_load.py, gana la última fila de cada materia/periodo
+    rows = rows.drop_duplicates(["expediente", "codigo", "periodo"], keep="last").reset_index(drop=True)
+
+    est = rows["estatus"].to_numpy(dtype=object)
+    cal = rows["calificacion"].to_numpy(dtype=float)
+    cr = rows["cr"].fillna(0).to_numpy(dtype=float)
+    aprob = cuenta_como_aprobada(est, cal, np, pd)
+    calificada = np.isin(est, ("APROBADA", "REPROBADA")) & ~np.isnan(cal)
+    rows["aprobada"] = aprob
+    rows["cr_aprobado"] = np.where(aprob, cr, 0.0)
+    rows["cal_promedio"] = np.where(calificada, cal, np.nan)
+    rows["reprobada"] = est == "REPROBADA"
+    rows["baja"] = est == "BAJA_VOLUNTARIA"
+    return rows
+
+
+def aggregate_periodos(rows, pd):
+    g = rows.groupby(["expediente", "periodo"], sort=True)
+    out = g.agg(
+        materias=("codigo", "size"),
+        creditos_inscritos=("cr", "sum"),
+        creditos_aprobados=("cr_aprobado", "sum"),
+        promedio=("cal_promedio", "mean"),
+    ).reset_index()
+    out["promedio"] = out["promedio"].round(2)
+    return out
+
+
+def aggregate_alumnos(rows, alu, planes: dict, np, pd):
+    g = rows.groupby("expediente", sort=True)
+    out = g.agg(
+        materias=("codigo", "size"),
+        creditos_aprobados=("cr_aprobado", "sum"),
+        promedio_general=("cal_promedio", "mean"),
+        materias_reprobadas=("reprobada", "sum"),
+        reprobaciones=("reprobaciones", "sum"),
+        bajas=("baja", "sum"),
+    ).reset_index()
+    out["promedio_general"] = out["promedio_general"].round(2)
+
+    if alu is not None and len(alu):
+        alu = alu.sort_values("doc").drop_duplicates("expediente", keep="last").drop(columns="doc")
+        alu["expediente"] = alu["expediente"].astype("string")
+        out = out.merge(alu, on="expediente", how="left")
+        nivel = pd.to_numeric(out["ingles_nivel"], errors="coerce")
+        cumple = out["ingles_cumple"].astype("boolean").fillna(False)
+        out["ingles_nivel"] = nivel
+        out["ingles_acreditado"] = (cumple | (nivel >= INGLES_REQUERIDO).fillna(False)).astype(bool)
+        out = out.drop(columns="ingles_cumple")
+
+    # Metas del plan: por versión si viene --planes; si no, las constantes de reports.ts
+    plan_col = out["plan"] if "plan" in out.columns else pd.Series([None] * len(out), dtype="object")
+    total = plan_col.map(lambda p: (planes.get(str(p)) or {}).get("total_creditos")).astype(float)
+    servicio = plan_col.map(lambda p: (planes.get(str(p)) or {}).get("creditos_servicio")).astype(float)
+    practicas = plan_col.map(lambda p: (planes.get(str(p)) or {}).get("creditos_practicas")).astype(float)
+    total = total.fillna(CREDITOS_CARRERA).to_numpy()
+    setenta = np.ceil(total * 0.70)
+    servicio = servicio.fillna(pd.Series(setenta, index=servicio.index)).to_numpy()
+    practicas = practicas.fillna(pd.Series(setenta, index=practicas.index)).to_numpy()
+
+    cred = out["creditos_aprobados"].to_numpy(dtype=float)
+    out["porcentaje_avance"] = np.round(np.where(total > 0, cred / total * 100, 0.0), 2)
+    out["servicio_social_habilitado"] = (servicio > 0) & (cred >= servicio)
+    out["practicas_habilitado"] = (practicas > 0) & (cred >= practicas)
+    # getEligibleStudents: créditos >= CREDITOS_MINIMOS y alumno activo
+    activo = out["estatus_alumno"].astype("string").fillna("").eq("A").to_numpy() if "estatus_alumno" in out.columns else True
+    out["elegible_reporte"] = (cred >= CREDITOS_MINIMOS) & activo
+    return out
+
+
+def alumnos_from_copy(mat, pd):
+    """Datos de alumno que trae el COPY (sin inglés: no viaja en ese formato)."""
+    cols = {"expediente": "expediente", "doc": "doc", "plan_version": "plan", "estatus_alumno": "estatus_alumno"}
+    alu = mat[list(cols)].rename(columns=cols)
+    alu["ingles_nivel"] = float("nan")
+    alu["ingles_cumple"] = None
+    return alu.drop_duplicates(["expediente", "doc"])
+
+
+# ============================================================
+# 4) CLI
+# ============================================================
+
+def write_table(df, base: Path, fmt: str) -> str:
+    if fmt == "parquet":
+        path = base.with_name(base.name + ".parquet")
+        df.to_parquet(path, index=False)
+    else:
+        path = base.with_name(base.name + ".csv")
+        df.to_csv(path, index=False)
+    return str(path)
+
+
+def run(inputs: list, out_base: Path, planes: dict, fmt: str) -> dict:
+    np, pd = get_pandas()
+    t0 = time.perf_counter()
+
+    ndjson = [p for p in inputs if p.suffix in (".ndjson", ".jsonl", ".json")]
+    columnar = [p for p in inputs if p not in ndjson]
+    mats, alus = [], []
+    if ndjson:
+        mat, alu = frames_from_ndjson(ndjson, np, pd)
+        mats.append(prepare_rows(mat, np, pd))
+        alus.append(alu)
+    if columnar:
+        mat = frames_from_copy(columnar, np, pd)
+        mat["doc"] = mat["doc"] + (1 << 48)  # después de los NDJSON
+        mats.append(prepare_rows(mat, np, pd))
+        alus.append(alumnos_from_copy(mat, pd))
+    rows = pd.concat(mats, ignore_index=True)
+    if len(mats) > 1:  # el mismo expediente en NDJSON y COPY: gana el último
+        last = rows.groupby("expediente", sort=False)["doc"].transform("max")
+        rows = rows[rows["doc"].to_numpy() == last.to_numpy()]
+    alu = pd.concat(alus, ignore_index=True)
+    t_load = time.perf_counter()
+
+    periodos = aggregate_periodos(rows, pd)
+    alumnos = aggregate_alumnos(rows, alu, planes, np, pd)
+    t_agg = time.perf_counter()
+
+    out_base.parent.mkdir(parents=True, exist_ok=True)
+    files = {
+        "alumnos": write_table(alumnos, out_base.with_name(out_base.name + "_alumnos"), fmt),
+        "periodos": write_table(periodos, out_base.with_name(out_base.name + "_periodos"), fmt),
+    }
+    return {
+        "ok": True,
+        "alumnos": int(len(alumnos)),
+        "periodos": int(len(periodos)),
+        "materias": int(len(rows)),
+        "archivos": files,
+        "ms": {
+            "carga": round((t_load - t0) * 1000, 1),
+            "agregados": round((t_agg - t_load) * 1000, 1),
+            "escritura": round((time.perf_counter() - t_agg) * 1000, 1),
+        },
+    }
+
+
+def main() -> None:
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    inputs = [Path(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if not inputs or "out" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: kardex_cohort.py <entrada>... --out=<base> [--planes=planes.json]"}, ensure_ascii=False))
+        sys.exit(1)
+    missing = [str(p) for p in inputs if not p.exists()]
+    if missing:
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {missing[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    fmt = opts.get("format") or ("parquet" if has_pyarrow() else "csv")
+    if fmt not in ("parquet", "csv"):
+        print(json.dumps({"ok": False, "error": f"--format inválido: {fmt}"}, ensure_ascii=False))
+        sys.exit(1)
+    planes = {}
+    if opts.get("planes"):
+        planes = json.loads(Path(opts["planes"]).read_text(encoding="utf-8"))
+
+    try:
+        res = run(inputs, Path(opts["out"]), planes, fmt)
+    except (ValueError, KeyError, OSError) as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga masiva de kárdex a PostgreSQL a partir de texto COPY (kardex.py --emit copy).
+
+En vez de findOne(periodo) + findOne(materia) + findOne(kardex) + save por cada
+materia (ingestaKardex.ts), todo el lote entra por COPY a una tabla temporal y
+se fusiona con unas cuantas sentencias dentro de una sola transacción:
+
+  1. periodo      INSERT ... ON CONFLICT (etiqueta) DO NOTHING
+  2. materia      INSERT ... ON CONFLICT (codigo) DO UPDATE (nombre, creditos)
+  3. alumno       INSERT ... ON CONFLICT (matricula) DO UPDATE (plan, estado)
+  4. kardex       MERGE por (alumno, materia, periodo)         ← el lote completo
+  5. calificacion INSERT ... ON CONFLICT (kardex_id) DO UPDATE
+  6. alumno.total_creditos recalculado para los expedientes del lote
+
+Igual que ingestaKardex.ts, el plan de estudios debe existir: las filas de un
+plan desconocido se omiten y se reportan.
+
+Uso:
+  python kardex.py a.pdf --emit copy >  lote.copy
+  python kardex.py b.pdf --emit copy >> lote.copy
+  python kardex_copy_load.py lote.copy [--dsn=postgresql://...]
+  ... | python kardex_copy_load.py -            # desde stdin
+
+Conexión: --dsn, $DATABASE_URL o las variables DB_* del backend (.env).
+Requiere psycopg (3) o psycopg2.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from kardex import KARDEX_COPY_COLUMNS
+
+STAGE = "kardex_stage"
+
+STAGE_DDL = f"""
+CREATE TEMP TABLE {STAGE} (
+  expediente       varchar NOT NULL,
+  materia_codigo   varchar NOT NULL,
+  periodo          varchar NOT NULL,
+  calificacion     numeric,
+  estatus          varchar NOT NULL,
+  e2               varchar,
+  ordinario        numeric,
+  extraordinario   numeric,
+  materia_nombre   varchar,
+  creditos         integer,
+  plan_version     varchar,
+  alumno_nombre    varchar,
+  apellido_paterno varchar,
+  apellido_materno varchar,
+  estatus_alumno   varchar
+) ON COMMIT DROP
+"""
+
+# Un mismo (expediente, materia, periodo) puede venir repetido en el lote
+# (p. ej. dos PDFs del mismo alumno): gana la última fila.
+DEDUP_SQL = f"""
+DELETE FROM {STAGE} s
+ USING (
+   SELECT ctid, row_number() OVER (
+            PARTITION BY expediente, materia_codigo, periodo ORDER BY ctid DESC) AS rn
+     FROM {STAGE}
+ ) d
+ WHERE s.ctid = d.ctid AND d.rn > 1
+"""
+
+MERGE_SQL = [
+    # 1) periodos (mismas fechas por defecto que ensurePeriodo)
+    f"""
+    INSERT INTO public.periodo (anio, ciclo, etiqueta, fecha_inicio, fecha_fin)
+    SELECT DISTINCT split_part(periodo, '-', 1)::int,
+                    split_part(periodo, '-', 2)::int,
+                    periodo,
+                    make_date(split_part(periodo, '-', 1)::int, 1, 1),
+                    make_date(split_part(periodo, '-', 1)::int, 12, 31)
+      FROM {STAGE}
+    ON CONFLICT (etiqueta) DO NOTHING
+    """,
+    # 2) materias (código único global; como ensureMateria, actualiza nombre/créditos)
+    f"""
+    INSERT INTO public.materia (codigo, nombre, creditos, tipo, plan_estudio_id)
+    SELECT DISTINCT ON (s.materia_codigo)
+           s.materia_codigo, s.materia_nombre, COALESCE(s.creditos, 0), 'OBLIGATORIA', p.id
+      FROM {STAGE} s
+      JOIN public.plan_estudio p ON p.version = s.plan_version
+     ORDER BY s.materia_codigo
+    ON CONFLICT (codigo) DO UPDATE
+       SET nombre = EXCLUDED.nombre,
+           creditos = COALESCE(NULLIF(EXCLUDED.creditos, 0), public.materia.creditos)
+    """,
+    # 3) alumnos (matrícula = expediente, como ensureAlumno). Los pasos
+    #    siguientes buscan al alumno por matrícula, la llave de este upsert:
+    #    un alumno previo puede tener `expediente` vacío o distinto.
+    f"""
+    INSERT INTO public.alumno (matricula, expediente, nombre, apellido_paterno, apellido_materno,
+                               correo, estado_academico, plan_estudio_id, total_creditos)
+    SELECT DISTINCT ON (s.expediente)
+           s.expediente, s.expediente, s.alumno_nombre, s.apellido_paterno, s.apellido_materno,
+           'a' || s.expediente || '@unison.mx',
+           (CASE WHEN s.estatus_alumno = 'A' THEN 'ACTIVO' ELSE 'BAJA' END)::estado_academico,
+           p.id, 0
+      FROM {STAGE} s
+      JOIN public.plan_estudio p ON p.version = s.plan_version
+     ORDER BY s.expediente
+    ON CONFLICT (matricula) DO UPDATE
+       SET plan_estudio_id = EXCLUDED.plan_estudio_id,
+           estado_academico = CASE WHEN EXCLUDED.estado_academico = 'ACTIVO'
+                                   THEN EXCLUDED.estado_academico
+                                   ELSE public.alumno.estado_academico END
+    """,
+    # 4) kardex: todo el lote en una sola sentencia
+    f"""
+    MERGE INTO public.kardex k
+    USING (
+      SELECT a.id AS alumno_id, m.id AS materia_id, pe.id AS periodo_id,
+             s.calificacion, s.estatus, s.e2
+        FROM {STAGE} s
+        JOIN public.alumno  a  ON a.matricula = s.expediente
+        JOIN public.materia m  ON m.codigo = s.materia_codigo
+        JOIN public.periodo pe ON pe.etiqueta = s.periodo
+    ) src
+       ON k.alumno_id = src.alumno_id AND k.materia_id = src.materia_id AND k.periodo_id = src.periodo_id
+    WHEN MATCHED THEN
+      UPDATE SET calificacion = src.calificacion, estatus = src.estatus, e2 = src.e2
+    WHEN NOT MATCHED THEN
+      INSERT (alumno_id, materia_id, periodo_id, calificacion, estatus, e2, promedio_kardex, promedio_sem_act)
+      VALUES (src.alumno_id, src.materia_id, src.periodo_id, src.calificacion, src.estatus, src.e2, 0, 0)
+    """,
+    # 5) calificacion (1:1 con kardex)
+    f"""
+    INSERT INTO public.calificacion (kardex_id, materia_id, ordinario, extraordinario, final)
+    SELECT k.id, k.materia_id, s.ordinario, s.extraordinario, s.calificacion
+      FROM {STAGE} s
+      JOIN public.alumno  a  ON a.matricula = s.expediente
+      JOIN public.materia m  ON m.codigo = s.materia_codigo
+      JOIN public.periodo pe ON pe.etiqueta = s.periodo
+      JOIN public.kardex  k  ON k.alumno_id = a.id AND k.materia_id = m.id AND k.periodo_id = pe.id
+    ON CONFLICT (kardex_id) DO UPDATE
+       SET ordinario = EXCLUDED.ordinario,
+           extraordinario = EXCLUDED.extraordinario,
+           final = EXCLUDED.final
+    """,
+    # 6) créditos aprobados (misma regla que cuentaComoAprobada)
+    f"""
+    UPDATE public.alumno a
+       SET total_creditos = t.total
+      FROM (
+        SELECT k.alumno_id, COALESCE(SUM(m.creditos) FILTER (
+                 WHERE upper(k.estatus) NOT IN ('BAJA_VOLUNTARIA', 'INSCRITO', 'SIN_CALIFICACION', 'REPROBADA')
+                   AND (upper(k.estatus) LIKE '%ACRED%' OR upper(k.estatus) = 'APROBADA' OR k.calificacion > 60)
+               ), 0) AS total
+          FROM public.kardex k
+          JOIN public.materia m ON m.id = k.materia_id
+         WHERE k.alumno_id IN (SELECT a2.id FROM public.alumno a2 JOIN {STAGE} s ON s.expediente = a2.matricula)
+         GROUP BY k.alumno_id
+      ) t
+     WHERE a.id = t.alumno_id
+    """,
+]
+
+SKIPPED_SQL = f"""
+SELECT s.expediente, count(*)
+  FROM {STAGE} s
+ WHERE NOT EXISTS (SELECT 1 FROM public.plan_estudio p WHERE p.version = s.plan_version)
+ GROUP BY s.expediente
+ ORDER BY s.expediente
+"""
+
+
+def dsn_from_env() -> str:
+    if os.environ.get("DATABASE_URL"):
+        return os.environ["DATABASE_URL"]
+    parts = {
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": os.environ.get("DB_PORT", "5432"),
+        "dbname": os.environ.get("DB_DATABASE", "sga_pds2"),
+        "user": os.environ.get("DB_USERNAME", "postgres"),
+        "password": os.environ.get("DB_PASSWORD", ""),
+    }
+    if os.environ.get("DB_SSL", "").lower() == "true":
+        parts["sslmode"] = "require"
+    return " ".join(f"{k}={v}" for k, v in parts.items() if v)
+
+
+def connect(dsn: str):
+    try:
+        import psycopg
+        return psycopg.connect(dsn), "psycopg"
+    except ImportError:
+        pass
+    try:
+        import psycopg2
+        return psycopg2.connect(dsn), "psycopg2"
+    except ImportError as e:
+        raise SystemExit("Instala psycopg: pip install 'psycopg[binary]'") from e
+
+
+def copy_into_stage(cur, driver: str, stream) -> None:
+    cols = ", ".join(KARDEX_COPY_COLUMNS)
+    sql = f"COPY {STAGE} ({cols}) FROM STDIN"
+    if driver == "psycopg":
+        with cur.copy(sql) as cp:
+            for block in iter(lambda: stream.read(1 << 16), ""):
+                cp.write(block)
+    else:
+        cur.copy_expert(sql, stream)
+
+
+def load_copy(stream, dsn: str) -> dict:
+    """Carga un flujo de texto COPY completo en una transacción."""
+    conn, driver = connect(dsn)
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute(STAGE_DDL)
+            copy_into_stage(cur, driver, stream)
+            cur.execute(f"SELECT count(*) FROM {STAGE}")
+            staged = cur.fetchone()[0]
+            cur.execute(DEDUP_SQL)
+            cur.execute(SKIPPED_SQL)
+            skipped = cur.fetchall()
+            counts = []
+            for sql in MERGE_SQL:
+                cur.execute(sql)
+                counts.append(cur.rowcount)
+        return {
+            "ok": True,
+            "staged": staged,
+            "periodos_nuevos": counts[0],
+            "materias": counts[1],
+            "alumnos": counts[2],
+            "kardex": counts[3],
+            "calificaciones": counts[4],
+            "omitidas_sin_plan": {
+                "filas": sum(n for _, n in skipped),
+                "alumnos": len(skipped),
+                "expedientes": [e for e, _ in skipped],
+            },
+        }
+    finally:
+        conn.close()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    dsn = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--dsn=")), None) or dsn_from_env()
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: kardex_copy_load.py <lote.copy|-> [--dsn=...]"}))
+        sys.exit(1)
+
+    src = args[0]
+    try:
+        if src == "-":
+            out = load_copy(sys.stdin, dsn)
+        else:
+            path = Path(src)
+            if not path.exists():
+                print(json.dumps({"ok": False, "error": f"No existe el archivo: {path}"}, ensure_ascii=False))
+                sys.exit(1)
+            with open(path, encoding="utf-8") as f:
+                out = load_copy(f, dsn)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(out, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importación histórica de kárdex (respaldo de años de PDFs), reanudable.
+
+- Recorre un directorio (recursivo) buscando *.pdf.
+- Calcula el SHA-256 de cada archivo y omite los que ya estén COMPLETADO en el
+  checkpoint local (SQLite), así que se puede relanzar tras una caída.
+- Parsea en todos los núcleos (kardex.py → filas COPY) y carga en lotes grandes
+  con kardex_copy_load.py (una transacción por lote).
+- Estado por archivo como archivo_cargado.estado_proceso:
+    PENDIENTE  → visto, aún no cargado (se reintenta al reanudar)
+    COMPLETADO → sus filas ya están en la BD
+    EXPORTADO  → sus filas están en un lote de --out-dir, NO en la BD: una
+                 importación a la BD lo vuelve a procesar
+    OMITIDO    → la BD no conoce su plan de estudios, no se cargó nada
+    ERROR      → falló el parseo o el archivo no trae materias
+  OMITIDO y ERROR no se reintentan salvo --retry-errors (p. ej. tras dar de alta
+  el plan). Un archivo solo pasa a COMPLETADO después del COMMIT de su lote.
+
+Uso:
+  python kardex_import.py <directorio> [--checkpoint=import_kardex.sqlite]
+         [--batch-rows=50000] [--workers=N] [--retry-errors] [--dsn=...]
+  python kardex_import.py <directorio> --out-dir=lotes/   # solo genera archivos COPY
+  ... [--archive=archivo_kardex/]   # además, cada lote al archivo Parquet (kardex_archive.py)
+
+Con $KARDEX_PAGE_CACHE_DB cada worker usa la caché por página de kardex.py
+(page_cache.py): descargas repetidas del mismo kárdex solo parsean lo nuevo.
+
+Salida: una línea JSON por lote en stderr (progreso) y un resumen JSON en stdout.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+
+from kardex import kardex_copy_rows, open_page_cache, parse_kardex, write_copy
+
+CHECKPOINT_DDL = """
+CREATE TABLE IF NOT EXISTS archivo (
+  hash           TEXT PRIMARY KEY,
+  ruta           TEXT NOT NULL,
+  estado_proceso TEXT NOT NULL DEFAULT 'PENDIENTE',
+  expediente     TEXT,
+  filas          INTEGER,
+  lote           INTEGER,
+  error          TEXT,
+  actualizado    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archivo_estado ON archivo (estado_proceso);
+"""
+
+
+def sha256_file(path: str, chunk: int = 1 << 20) -> tuple:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return path, h.hexdigest()
+
+
+_page_cache = False  # False = aún no se intenta en este proceso
+
+
+def worker_page_cache():
+    """Caché por página del proceso del pool (solo si $KARDEX_PAGE_CACHE_DB está definida)."""
+    global _page_cache
+    if _page_cache is False:
+        _page_cache = open_page_cache([])
+    return _page_cache
+
+
+def parse_file(item: tuple) -> dict:
+    """Corre en el pool: PDF → filas COPY (o error)."""
+    path, file_hash = item
+    try:
+        out = parse_kardex(Path(path), worker_page_cache())
+        rows = kardex_copy_rows(out)
+        return {
+            "hash": file_hash,
+            "ruta": path,
+            "expediente": (out.get("alumno") or {}).get("expediente"),
+            "rows": rows,
+            "error": None if rows else "Sin materias o sin expediente",
+        }
+    except Exception as e:
+        return {"hash": file_hash, "ruta": path, "expediente": None, "rows": [], "error": str(e)}
+
+
+class Checkpoint:
+    def __init__(self, path: Path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(CHECKPOINT_DDL)
+
+    def done_hashes(self, retry_errors: bool, exporting: bool = False) -> set:
+        """Hashes que no hay que volver a procesar en esta corrida."""
+        estados = ["COMPLETADO"]
+        if exporting:
+            estados.append("EXPORTADO")  # ya está en un lote de --out-dir
+        if not retry_errors:
+            estados += ["OMITIDO", "ERROR"]
+        marks = ",".join("?" * len(estados))
+        rows = self.conn.execute(f"SELECT hash FROM archivo WHERE estado_proceso IN ({marks})", estados)
+        return {r[0] for r in rows}
+
+    def mark(self, items: list, estado: str, lote: int | None = None):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO archivo (hash, ruta, estado_proceso, expediente, filas, lote, error, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET ruta = excluded.ruta, estado_proceso = excluded.estado_proceso, "
+                "expediente = excluded.expediente, filas = excluded.filas, lote = excluded.lote, "
+                "error = excluded.error, actualizado = excluded.actualizado",
+                [
+                    (r["hash"], r["ruta"], estado, r.get("expediente"), len(r.get("rows") or []), lote, r.get("error"), now)
+                    for r in items
+                ],
+            )
+
+    def next_lote(self) -> int:
+        row = self.conn.execute("SELECT COALESCE(MAX(lote), 0) FROM archivo").fetchone()
+        return int(row[0]) + 1
+
+    def summary(self) -> dict:
+        rows = self.conn.execute("SELECT estado_proceso, count(*) FROM archivo GROUP BY estado_proceso")
+        return {e: n for e, n in rows}
+
+
+class BatchSink:
+    """Acumula filas de varios archivos y las vacía a la BD (o a un archivo COPY)."""
+
+    def __init__(self, checkpoint: Checkpoint, batch_rows: int, dsn: str | None, out_dir: Path | None,
+                 archive: Path | None = None):
+        self.cp = checkpoint
+        self.archive = archive
+        self.batch_rows = batch_rows
+        self.dsn = dsn
+        self.out_dir = out_dir
+        self.pending: list = []
+        self.n_rows = 0
+        self.lote = checkpoint.next_lote()
+        self.loaded_rows = 0
+        self.exported_rows = 0
+
+    def add(self, result: dict):
+        self.pending.append(result)
+        self.n_rows += len(result["rows"])
+        if self.n_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        buf = io.StringIO()
+        for r in self.pending:
+            write_copy(r["rows"], buf)
+        buf.seek(0)
+        t0 = time.perf_counter()
+        if self.out_dir:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            (self.out_dir / f"lote_{self.lote:05d}.copy").write_text(buf.getvalue(), encoding="utf-8")
+            info = {"ok": True, "archivo": str(self.out_dir / f"lote_{self.lote:05d}.copy")}
+            # Solo exportado: sigue pendiente de cargar a la BD
+            self.cp.mark(self.pending, "EXPORTADO", self.lote)
+            self.exported_rows += self.n_rows
+        else:
+            from kardex_copy_load import load_copy
+            info = load_copy(buf, self.dsn)
+            # Solo después del COMMIT del lote; los de plan desconocido no se cargaron
+            sin_plan = set(info["omitidas_sin_plan"]["expedientes"])
+            cargados, omitidos = [], []
+            for r in self.pending:
+                (omitidos if (r.get("expediente") or "").strip() in sin_plan else cargados).append(r)
+            for r in omitidos:
+                r["error"] = "Plan de estudios desconocido en la BD"
+            self.cp.mark(cargados, "COMPLETADO", self.lote)
+            self.cp.mark(omitidos, "OMITIDO", self.lote)
+            self.loaded_rows += sum(len(r["rows"]) for r in cargados)
+        if self.archive:
+            # El lote ya está cargado y marcado: un archivo que falla solo se reporta
+            try:
+                from kardex_archive import append_rows
+                append_rows(
+                    self.archive,
+                    [row for r in self.pending for row in r["rows"]],
+                    [r["hash"] for r in self.pending for _ in r["rows"]],
+                )
+            except (Exception, SystemExit) as e:
+                print(json.dumps({"lote": self.lote, "archive_error": str(e)}, ensure_ascii=False),
+                      file=sys.stderr, flush=True)
+        print(json.dumps({
+            "lote": self.lote,
+            "archivos": len(self.pending),
+            "filas": self.n_rows,
+            "ms": round((time.perf_counter() - t0) * 1000),
+            "carga": info,
+        }, ensure_ascii=False), file=sys.stderr, flush=True)
+        self.pending, self.n_rows = [], 0
+        self.lote += 1
+
+
+def walk_pdfs(root: Path):
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(dirpath, name)
+
+
+def run_import(root: Path, checkpoint_path: Path, batch_rows: int, workers: int,
+               retry_errors: bool, dsn: str | None, out_dir: Path | None,
+               archive: Path | None = None) -> dict:
+    cp = Checkpoint(checkpoint_path)
+    done = cp.done_hashes(retry_errors, exporting=out_dir is not None)
+    sink = BatchSink(cp, batch_rows, dsn, out_dir, archive)
+    t0 = time.perf_counter()
+    stats = {"vistos": 0, "omitidos": 0, "duplicados": 0, "parseados": 0, "errores": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1) Hash en paralelo; se omiten los ya completados y los repetidos en el archivo
+        todo, seen = [], set()
+        for path, file_hash in pool.map(sha256_file, walk_pdfs(root), chunksize=16):
+            stats["vistos"] += 1
+            if file_hash in done:
+                stats["omitidos"] += 1
+            elif file_hash in seen:
+                stats["duplicados"] += 1
+            else:
+                seen.add(file_hash)
+                todo.append((path, file_hash))
+        cp.mark([{"hash": h, "ruta": p} for p, h in todo], "PENDIENTE")
+
+        # 2) Parseo con ventana acotada de tareas en vuelo (memoria estable)
+        window = max(1, workers) * 4
+        it = iter(todo)
+        inflight = {pool.submit(parse_file, item) for item in islice(it, window)}
+        while inflight:
+            fut = next(as_completed(inflight))
+            inflight.remove(fut)
+            res = fut.result()
+            if res["error"]:
+                stats["errores"] += 1
+                cp.mark([res], "ERROR")
+            else:
+                stats["parseados"] += 1
+                sink.add(res)
+            nxt = next(it, None)
+            if nxt is not None:
+                inflight.add(pool.submit(parse_file, nxt))
+
+    sink.flush()
+    return {
+        "ok": True,
+        **stats,
+        "filas_cargadas": sink.loaded_rows,
+        "filas_exportadas": sink.exported_rows,
+        "segundos": round(time.perf_counter() - t0, 1),
+        "checkpoint": cp.summary(),
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) if "=" in a else (a[2:], "1") for a in sys.argv[1:] if a.startswith("--"))
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: kardex_import.py <directorio> [--checkpoint=...]"}))
+        sys.exit(1)
+
+    root = Path(args[0])
+    if not root.is_dir():
+        print(json.dumps({"ok": False, "error": f"No existe el directorio: {root}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    out_dir = Path(opts["out-dir"]) if opts.get("out-dir") else None
+    dsn = opts.get("dsn")
+    if not out_dir and not dsn:
+        from kardex_copy_load import dsn_from_env
+        dsn = dsn_from_env()
+
+    summary = run_import(
+        root,
+        checkpoint_path=Path(opts.get("checkpoint", "import_kardex.sqlite")),
+        batch_rows=int(opts.get("batch-rows", 50000)),
+        workers=int(opts.get("workers", os.cpu_count() or 1)),
+        retry_errors="retry-errors" in opts,
+        dsn=dsn,
+        out_dir=out_dir,
+        archive=Path(opts["archive"]) if opts.get("archive") else None,
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
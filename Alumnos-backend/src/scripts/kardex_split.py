@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF con muchos kárdex impresos seguidos (uno por alumno) → un resultado por alumno.
+
+Las coordinaciones suelen entregar un solo PDF con decenas de kárdex. Tratado
+como un documento, extract_header() solo ve el primer EXPEDIENTE y las materias
+de todos se mezclan. Aquí:
+
+1) El PDF se reparte en tramos de páginas (--chunk) que leen los workers en
+   paralelo con kardex_core.extract_page: texto y celdas crudas por página
+   (con la caché por página si $KARDEX_PAGE_CACHE_DB está definida, igual que
+   kardex_import.py) y las marcas del encabezado (page_marks).
+2) El proceso padre solo decide las fronteras con esas marcas: empieza un
+   alumno nuevo en "Pagina 1 de N" o cuando cambia el EXPEDIENTE. Una página
+   sin ninguno de los dos sigue al alumno anterior.
+3) Cada rango cerrado vuelve al pool: kardex_core.build_rows + build_output
+   de kardex.py y la serialización corren en un worker; el padre solo
+   escribe las líneas, en orden del documento.
+
+Memoria acotada: como mucho workers×2 tramos y workers×2 alumnos en vuelo,
+los workers se reciclan cada --max-tasks-per-child tareas, y solo se retienen
+las páginas del alumno en curso.
+
+Uso:
+  python kardex_split.py <combinado.pdf> [--workers=N] [--chunk=16]
+  python kardex.py <combinado.pdf> --split [...]      # mismo modo
+  ... [--archive=DIR]   # o $KARDEX_ARCHIVE_DIR: cada alumno al archivo Parquet
+
+Salida: NDJSON en stdout, una salida de kardex.py por alumno más
+"paginas": [primera, última] (1-based) y "advertencias" si el conteo de
+páginas no cuadra con "de N" o falta el expediente. Si falla el armado de un
+alumno su línea es {"ok": false, "paginas", "expediente"?, "error"} y se
+sigue con el resto. Resumen en stderr; un error que corta la lectura del PDF
+también va a stderr (stdout solo trae líneas de alumno) y sale con código 1.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from kardex import archive_dir, archive_outputs, build_output, dumps, fix_unicode, get_pdfplumber
+from kardex_core import build_rows, extract_page
+
+ARCHIVE_BATCH = 500  # salidas por append al archivo Parquet (--archive)
+EXPEDIENTE_RE = re.compile(r"EXPEDIENTE:\s*([0-9]+)")
+PAGINA_RE = re.compile(r"P[aá]gina\s+(\d+)\s+de\s+(\d+)", re.I)
+
+
+def page_marks(text: str) -> tuple:
+    """(expediente, página, total) del encabezado de una página; None si no vienen."""
+    text = fix_unicode(text)
+    exp = EXPEDIENTE_RE.search(text)
+    pag = PAGINA_RE.search(text)
+    return (
+        exp.group(1) if exp else None,
+        int(pag.group(1)) if pag else None,
+        int(pag.group(2)) if pag else None,
+    )
+
+
+def read_chunk(item: tuple) -> list:
+    """Corre en el pool: páginas [inicio, fin) del PDF → [{"text", "rows", "marks"}]."""
+    from kardex_import import worker_page_cache
+
+    path, start, end = item
+    cache = worker_page_cache()
+    out = []
+    with get_pdfplumber().open(path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            hit = extract_page(page, cache)
+            out.append({**hit, "marks": page_marks(hit["text"])})
+            page.close()  # suelta los objetos de layout de la página
+    return out
+
+
+class Splitter:
+    """Recibe páginas en orden y devuelve cada alumno cuando su rango se cierra."""
+
+    def __init__(self):
+        self.current = None
+
+    def feed(self, index: int, page: dict):
+        exp, pagina, total = page["marks"]
+        cur = self.current
+        nuevo = cur is None or pagina == 1 or (exp and cur["expediente"] and exp != cur["expediente"])
+        done = None
+        if nuevo:
+            done = self.finish()
+            cur = self.current = {"expediente": exp, "primera": index, "total": total, "paginas": []}
+        elif exp and not cur["expediente"]:
+            cur["expediente"] = exp
+        if total and not cur["total"]:
+            cur["total"] = total
+        cur["paginas"].append(page)
+        cur["ultima"] = index
+        return done
+
+    def finish(self):
+        done, self.current = self.current, None
+        return done
+
+
+def student_output(st: dict) -> dict:
+    raw_text = "\n".join(p["text"] for p in st["paginas"])
+    table_rows = [r for p in st["paginas"] for r in p["rows"]]
+    out = build_output(raw_text, build_rows(table_rows, raw_text))
+    out["paginas"] = [st["primera"] + 1, st["ultima"] + 1]
+    avisos = []
+    if not st["expediente"]:
+        avisos.append("Sin EXPEDIENTE en el encabezado")
+    n = len(st["paginas"])
+    if st["total"] and st["total"] != n:
+        avisos.append(f"Se esperaban {st['total']} páginas y hay {n}")
+    if avisos:
+        out["advertencias"] = avisos
+    return out
+
+
+def student_line(st: dict) -> tuple:
+    """Corre en el pool: rango de un alumno → (línea NDJSON, con advertencias, ok)."""
+    try:
+        out = student_output(st)
+    except Exception as e:
+        out = {"ok": False, "paginas": [st["primera"] + 1, st["ultima"] + 1], "error": str(e)}
+        if st["expediente"]:
+            out["expediente"] = st["expediente"]
+    return dumps(out) + "\n", bool(out.get("advertencias")), out["ok"]
+
+
+def split_kardex(path: Path, workers: int, chunk: int, max_tasks: int = 50):
+    """Genera (línea, con advertencias, ok) de cada alumno, en orden del documento."""
+    with get_pdfplumber().open(str(path)) as pdf:
+        n_pages = len(pdf.pages)
+    tramos = iter([(str(path), s, min(s + chunk, n_pages)) for s in range(0, n_pages, chunk)])
+
+    splitter = Splitter()
+    index = 0
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=max_tasks) as pool:
+        reads = deque(pool.submit(read_chunk, t) for t in islice(tramos, workers * 2))
+        builds = deque()
+        while reads:
+            pages = reads.popleft().result()
+            nxt = next(tramos, None)
+            if nxt is not None:
+                reads.append(pool.submit(read_chunk, nxt))
+            for page in pages:
+                done = splitter.feed(index, page)
+                index += 1
+                if done is not None:
+                    builds.append(pool.submit(student_line, done))
+            # en orden: sale lo ya armado; si hay demasiados en vuelo, se espera al primero
+            while builds and (builds[0].done() or len(builds) > workers * 2):
+                yield builds.popleft().result()
+        last = splitter.finish()
+        if last is not None:
+            builds.append(pool.submit(student_line, last))
+        while builds:
+            yield builds.popleft().result()
+
+
+def run_split(pdf_path: Path, argv: list) -> int:
+    """Modo --split de kardex.py; devuelve el código de salida."""
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    workers = int(opts.get("workers", os.cpu_count() or 1))
+    chunk = int(opts.get("chunk", 16))
+    archive = archive_dir(argv)
+    por_archivar = []
+    t0 = time.perf_counter()
+    n = avisos = fallidos = archivados = 0
+
+    def archivar():
+        # si el archivo falla una vez se reporta (stderr) y se deja de intentar
+        nonlocal archive, archivados
+        if archive and por_archivar:
+            if archive_outputs(archive, por_archivar, str(pdf_path)):
+                archivados += len(por_archivar)
+            else:
+                archive = None
+        por_archivar.clear()
+
+    try:
+        for line, con_avisos, ok in split_kardex(pdf_path, workers, chunk, int(opts.get("max-tasks-per-child", 50))):
+            n += 1
+            avisos += con_avisos
+            fallidos += not ok
+            sys.stdout.write(line)
+            if archive and ok:
+                por_archivar.append(json.loads(line))
+                if len(por_archivar) >= ARCHIVE_BATCH:
+                    archivar()
+    except Exception as e:
+        sys.stdout.flush()
+        print(json.dumps({"ok": False, "error": str(e), "alumnos": n}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    sys.stdout.flush()
+    archivar()
+    resumen = {
+        "alumnos": n,
+        "con_advertencias": avisos,
+        "con_error": fallidos,
+        "segundos": round(time.perf_counter() - t0, 2),
+    }
+    if archive_dir(argv):
+        resumen["archivados"] = archivados
+    print(json.dumps(resumen, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+def main() -> None:
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: kardex_split.py <combinado.pdf> [--workers=N] [--chunk=16]"}))
+        sys.exit(1)
+    pdf_path = Path(args[0])
+    if not pdf_path.exists():
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {pdf_path}"}, ensure_ascii=False))
+        sys.exit(1)
+    sys.exit(run_split(pdf_path, sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import path from "path";
+
+/**
+ * Servicio de parsers compartido con Carga-Archivos
+ * (Carga-Archivos-backend/src/scripts/parser_service.py). Si PARSER_SERVICE_URL
+ * está definido, el kárdex se parsea ahí con --schema=alumnos: el mismo PDF
+ * subido por el alumno y cargado por la coordinación se parsea una sola vez.
+ * Devuelve `undefined` cuando no hay servicio configurado para que el llamador
+ * caiga al spawn de siempre.
+ */
+export async function callParserService(
+  pdfPath: string,
+  args: string[] = []
+): Promise<any | undefined> {
+  const base = process.env.PARSER_SERVICE_URL;
+  if (!base) return undefined;
+
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), Number(process.env.PARSER_SERVICE_TIMEOUT_MS || 120000));
+  try {
+    const res = await fetch(`${base.replace(/\/$/, "")}/parse`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        tipo: "kardex",
+        path: path.resolve(pdfPath),
+        args: ["--schema=alumnos", ...args],
+        prioridad: "interactive",
+      }),
+      signal: controller.signal,
+    });
+    const data: any = await res.json().catch(() => ({}));
+
+    if (res.status === 429) {
+      const retry = res.headers.get("retry-after");
+      const err: any = new Error(`Servicio de parsers saturado (${data?.reason}); reintentar en ${retry}s`);
+      err.status = 429;
+      err.retryAfter = Number(retry) || 1;
+      throw err;
+    }
+    if (res.status !== 200) {
+      throw new Error(`Servicio de parsers respondió ${res.status}: ${data?.error ?? ""}`);
+    }
+    return data;
+  } finally {
+    clearTimeout(timer);
+  }
+}
@@ -1,7 +1,14 @@
 import { spawn } from "node:child_process";
 import path from "node:path";
+import { callParserService } from "./parserService";
+
+export async function runPythonKardex(pdfPath: string): Promise<any> {
+    const viaService = await callParserService(pdfPath);
+    if (viaService !== undefined) {
+        if (viaService.ok === false) throw new Error(`Python exited 1: ${JSON.stringify(viaService)}`);
+        return viaService;
+    }
 
-export function runPythonKardex(pdfPath: string): Promise<any> {
     return new Promise((resolve, reject) => {
         const pythonExe = "python";
         const script = path.join(process.cwd(), "src/scripts/kardex.py");
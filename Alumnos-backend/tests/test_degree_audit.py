@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""degree_audit.py: estatus entre intentos, códigos con/sin ceros, acentuaciones y NDJSON."""
+
+import itertools
+import json
+import sys
+
+from degree_audit import CompiledPlan, audit_alumno, load_planes, main
+
+# un intento por estatus crudo de map_calificacion_estado
+INTENTOS = {
+    "APROBADA": {"e1": "O", "e2": "A", "ord": 90},
+    "REPROBADA": {"e1": "O", "e2": "A", "ord": 40},
+    "INSCRITO": {"e1": "O", "e2": "1", "ord": None},
+    "BAJA_VOLUNTARIA": {"e1": "O", "e2": "BV", "ord": None, "bajas": 1},
+    "ACREDITADA": {"e1": "O", "e2": "ACRED", "ord": None},
+    "SIN_CALIFICACION": {"e1": "O", "e2": "", "ord": None},
+}
+
+
+def compute_status_from_raw(raw):
+    """computeStatusFromRaw de mapaService.ts, tal cual."""
+    if not raw:
+        return "not_taken"
+    if "INSCRITO" in raw or "INS" in raw:
+        return "in_progress"
+    if any(v in ("APROBADA", "ACREDITADA", "PARCIALMENTE_ACREDITADA") for v in raw):
+        return "approved"
+    if any(v in ("BAJA_VOLUNTARIA", "BAJA", "BAJA_DEFINITIVA") for v in raw):
+        return "withdrawn"
+    if any(v in ("NO_ACREDITADA", "REPROBADA", "NO_APROBADA") for v in raw):
+        return "failed"
+    return "not_taken"
+
+
+def plan_out(version="2182", materias=(("06881", 8), ("4134", 6), ("07001", 5)), acentuaciones=(), total=None):
+    return {"ok": True, "plan": {"version": version, "total_creditos": total},
+            "materias": [{"codigo": c, "nombre": f"MATERIA {c}", "creditos": cr} for c, cr in materias],
+            "acentuaciones": list(acentuaciones)}
+
+
+def kardex_out(expediente, materias, plan="2182"):
+    return {"ok": True, "alumno": {"expediente": expediente, "plan": plan}, "materias": materias}
+
+
+def intento(codigo, estatus):
+    return {"codigo": codigo, **INTENTOS[estatus]}
+
+
+def test_estatus_entre_intentos_como_mapa_service():
+    planes = {"2182": CompiledPlan(plan_out())}
+    for n in (1, 2, 3):
+        for combo in itertools.product(INTENTOS, repeat=n):
+            res = audit_alumno(kardex_out("1", [intento("6881", e) for e in combo]), planes)
+            assert res["materias"]["06881"] == compute_status_from_raw(list(combo)), combo
+
+    def status(*estatus):
+        return audit_alumno(kardex_out("1", [intento("6881", e) for e in estatus]), planes)["materias"]["06881"]
+
+    assert status("REPROBADA", "APROBADA") == status("APROBADA", "REPROBADA") == "approved"
+    assert status("REPROBADA", "BAJA_VOLUNTARIA") == "withdrawn"
+    assert status("REPROBADA", "INSCRITO") == status("APROBADA", "INSCRITO") == "in_progress"
+    assert status("SIN_CALIFICACION") == "not_taken"
+
+
+def test_codigos_con_y_sin_ceros_y_fuera_de_plan():
+    planes = {"2182": CompiledPlan(plan_out(materias=(("06881", 8), ("4134", 6), ("4134", 9))))}
+    assert planes["2182"].codigos == ["06881", "04134"] and planes["2182"].creditos == [8, 6]
+    res = audit_alumno(kardex_out("1", [intento("6881", "APROBADA"), intento("04134", "APROBADA"),
+                                        intento("99999", "APROBADA"), intento("", "APROBADA")]), planes)
+    assert res["materias"] == {"06881": "approved", "04134": "approved"}
+    assert res["creditos"] == {"aprobados": 14, "total": 14}
+    assert res["fuera_de_plan"] == ["99999"]
+
+
+def test_creditos_por_acentuacion():
+    acent = [
+        {"nombre": "REDES", "materias": [{"codigo": "6881"}, "04134", "4134", "55555"]},
+        {"nombre": "DATOS", "materias": ["07001"]},
+        {"nombre": "VACIA", "materias": ["55555"]},
+    ]
+    planes = {"2182": CompiledPlan(plan_out(acentuaciones=acent, total=393))}
+    materias = [intento("6881", "APROBADA"), intento("4134", "REPROBADA"), intento("7001", "INSCRITO")]
+    res = audit_alumno(kardex_out("1", materias), planes, with_acent=True, solo_cursadas=True)
+
+    assert res["acentuaciones"] == [
+        {"nombre": "REDES", "creditos_aprobados": 8, "creditos_total": 14, "materias_aprobadas": 1, "materias_total": 2},
+        {"nombre": "DATOS", "creditos_aprobados": 0, "creditos_total": 5, "materias_aprobadas": 0, "materias_total": 1},
+    ]
+    assert res["creditos"] == {"aprobados": 8, "total": 393}
+    assert res["resumen"] == {"approved": 1, "withdrawn": 0, "in_progress": 1, "failed": 1, "not_taken": 0}
+
+
+def test_una_linea_ndjson_por_alumno(tmp_path, monkeypatch, capsys):
+    planes = tmp_path / "planes.ndjson"
+    planes.write_text("\n".join(json.dumps(p) for p in (
+        plan_out(), plan_out(version="2009"), {"ok": False, "error": "x"})) + "\n", encoding="utf-8")
+    cohorte = tmp_path / "cohorte.ndjson"
+    cohorte.write_text("\n".join(json.dumps(k) for k in (
+        kardex_out("222200001", [intento("6881", "APROBADA")]),
+        {"ok": False, "error": "PDF ilegible"},
+        kardex_out("222200002", [], plan=""),
+        kardex_out("222200003", [intento("4134", "REPROBADA")], plan="1999"),
+    )) + "\n", encoding="utf-8")
+    assert sorted(load_planes(planes)) == ["2009", "2182"]
+
+    monkeypatch.setattr(sys, "argv", ["degree_audit.py", f"--planes={planes}", "--plan=2009", str(cohorte)])
+    main()
+    out, err = capsys.readouterr()
+    res = [json.loads(line) for line in out.splitlines()]
+    assert out == "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in res)
+    assert [(r["ok"], r["expediente"], r["plan"]) for r in res] == [
+        (True, "222200001", "2182"), (True, "222200002", "2009"), (False, "222200003", "1999")]
+    resumen = json.loads(err)
+    assert (resumen["alumnos"], resumen["sin_plan"], resumen["planes"]) == (3, 1, ["2009", "2182"])
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""kardex.py: Materia guarda el CIC como KardexRow (encode_cic) y lo devuelve tal cual."""
+
+import json
+import pickle
+
+from kardex import Materia, dumps
+
+from test_kardex_copy_load import materia
+
+
+def test_cic_de_4_digitos_se_codifica_y_deriva_periodo():
+    m = Materia(**materia("6881", 90, cic="2231"))
+    assert isinstance(m._cic, int) and m.cic == "2231" and m.periodo == "2023-1"
+    assert m.to_dict() == {**materia("6881", 90, cic="2231"), "periodo": "2023-1"}
+
+
+def test_cic_no_numerico_o_corto_se_devuelve_sin_cambios():
+    for cic in ("EQ", "231", "", None):
+        m = Materia(**materia("6881", 90, cic=cic))
+        assert m.cic == (cic or None) and m.periodo is None
+        assert pickle.loads(pickle.dumps(m)).to_dict() == m.to_dict()
+    assert json.loads(dumps({"materias": [Materia(**materia("6881", 90, cic="EQ"))]}))["materias"][0]["cic"] == "EQ"
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""kardex_archive.py: copias de un mismo kárdex, failure_rate y archivo desde los lotes."""
+
+import json
+import time
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from kardex_archive import append_outputs, failure_rate, latest, scan  # noqa: E402
+from kardex_import import BatchSink, Checkpoint  # noqa: E402
+
+from test_kardex_copy_load import materia, salida  # noqa: E402
+from test_kardex_import import estados, resultado  # noqa: E402
+
+
+def test_reparsear_no_cuenta_doble(tmp_path):
+    append_outputs(tmp_path, [salida([materia("6800", 50), materia("6801", 40)], expediente="1"),
+                              salida([materia("6800", 30)], expediente="2")], ["a.pdf", "b.pdf"])
+    time.sleep(0.01)  # `archivado` tiene resolución de ms
+    # el alumno 1 se vuelve a parsear: ya aprobó 6800 y 6801 ya no aparece en ese periodo
+    append_outputs(tmp_path, [salida([materia("6800", 90), materia("6801", 45, cic="2232")], expediente="1")],
+                   ["a2.pdf"])
+
+    assert scan(tmp_path).num_rows == 5
+    rows = latest(scan(tmp_path)).to_pylist()
+    assert sorted((r["expediente"], r["materia_codigo"], r["periodo"], r["documento"]) for r in rows) == [
+        ("1", "06800", "2023-1", "a2.pdf"),
+        ("1", "06801", "2023-1", "a.pdf"),
+        ("1", "06801", "2023-2", "a2.pdf"),
+        ("2", "06800", "2023-1", "b.pdf"),
+    ]
+    assert [(r["periodo"], r["materia_codigo"], r["cursadas"], r["reprobadas"], r["tasa_reprobacion"])
+            for r in failure_rate(tmp_path)] == [
+        ("2023-1", "06800", 2, 1, 0.5),
+        ("2023-1", "06801", 1, 1, 1.0),
+        ("2023-2", "06801", 1, 1, 1.0),
+    ]
+    assert [r["cursadas"] for r in failure_rate(tmp_path, codigos=["6800"], periodos=["2023-1"])] == [2]
+
+
+def test_misma_hora_gana_la_ultima_escrita(tmp_path):
+    append_outputs(tmp_path, [salida([materia("6800", 50)], expediente="1"),
+                              salida([materia("6800", 95)], expediente="1")], ["viejo.pdf", "nuevo.pdf"])
+    (r,) = latest(scan(tmp_path)).to_pylist()
+    assert (r["documento"], r["calificacion"]) == ("nuevo.pdf", 95)
+
+
+def test_lote_se_marca_aunque_falle_el_archivo(tmp_path, capsys):
+    cp = Checkpoint(tmp_path / "import.sqlite")
+    no_es_dir = tmp_path / "archivo"
+    no_es_dir.write_text("", encoding="utf-8")
+    sink = BatchSink(cp, batch_rows=10_000, dsn=None, out_dir=tmp_path / "lotes", archive=no_es_dir)
+    sink.add(resultado("a", "111"))
+    sink.flush()
+
+    assert estados(cp) == {"a": "EXPORTADO"} and sink.pending == []
+    errores = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert errores[0]["lote"] == 1 and errores[0]["archive_error"]
+    assert "carga" in errores[1]
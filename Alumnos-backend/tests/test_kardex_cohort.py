@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""kardex_cohort.py: reglas vectorizadas = reglas fila por fila de kardex.py."""
+
+import itertools
+import json
+
+import pytest
+
+from kardex import kardex_copy_rows, map_calificacion_estado, write_copy
+from kardex_cohort import cuenta_como_aprobada, estado_vectorizado, get_pandas, run
+
+from test_kardex_copy_load import materia, salida
+
+np, pd = get_pandas()
+
+
+def test_estado_vectorizado_igual_que_map_calificacion_estado():
+    combos = list(itertools.product(
+        (None, 40, 60, 61, 100),        # ord
+        (None, 55, 80),                 # reg
+        ("O", "PAR", "ACRED", None),    # e1
+        ("A", "BV", "1", "ACRED", "PARC.ACRED", "", None),  # e2
+        (0, 1),                         # bajas
+    ))
+    materias = [{"ord": o, "reg": r, "e1": e1, "e2": e2, "bajas": b} for o, r, e1, e2, b in combos]
+    cal, est = estado_vectorizado(pd.DataFrame(materias), np, pd)
+
+    for i, m in enumerate(materias):
+        esperado_cal, esperado_est = map_calificacion_estado(m)
+        assert est[i] == esperado_est, m
+        assert (np.isnan(cal[i]) and esperado_cal is None) or cal[i] == esperado_cal, m
+
+
+def test_cuenta_como_aprobada():
+    est = np.array(["APROBADA", "REPROBADA", "ACREDITADA", "BAJA_VOLUNTARIA", "", "", "INSCRITO"], dtype=object)
+    cal = np.array([90, 50, np.nan, 95, 70, np.nan, 80], dtype=float)
+    assert cuenta_como_aprobada(est, cal, np, pd).tolist() == [True, False, True, False, True, False, False]
+
+
+@pytest.fixture
+def cohorte():
+    viejo = salida([materia("6800", 50)], expediente="111")
+    nuevo = salida([materia("6800", 90), materia("6801", 40, cic="2232")], expediente="111")
+    otro = salida([materia("6800", 70, cr=10)], expediente="222")
+    return [viejo, otro, nuevo]
+
+
+def test_ndjson_y_copy_dan_los_mismos_agregados(cohorte, tmp_path):
+    nd = tmp_path / "c.ndjson"
+    nd.write_text("\n".join(json.dumps(o) for o in cohorte), encoding="utf-8")
+    cp = tmp_path / "c.copy"
+    with open(cp, "w", encoding="utf-8") as f:
+        for o in cohorte:
+            write_copy(kardex_copy_rows(o), f)
+
+    res_nd = run([nd], tmp_path / "nd", {}, "csv")
+    res_cp = run([cp], tmp_path / "cp", {}, "csv")
+    assert res_nd["alumnos"] == res_cp["alumnos"] == 2
+    assert res_nd["materias"] == res_cp["materias"] == 3  # el kárdex viejo de 111 no cuenta
+
+    cols = ["expediente", "materias", "creditos_aprobados", "promedio_general", "materias_reprobadas"]
+    a = pd.read_csv(res_nd["archivos"]["alumnos"], dtype={"expediente": str})[cols]
+    b = pd.read_csv(res_cp["archivos"]["alumnos"], dtype={"expediente": str})[cols]
+    pd.testing.assert_frame_equal(a, b)
+    assert a.set_index("expediente").loc["111"].tolist() == [2, 8, 65.0, 1]
+    assert a.set_index("expediente").loc["222"].tolist() == [1, 10, 70.0, 0]
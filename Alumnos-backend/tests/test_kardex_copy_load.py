@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""kardex_copy_load.py contra un PostgreSQL real con el esquema de init.sql."""
+
+import io
+
+import pytest
+
+from kardex import kardex_copy_rows, write_copy
+from kardex_copy_load import load_copy
+
+psycopg = pytest.importorskip("psycopg")
+
+EXPEDIENTE = "222200000"
+
+
+def salida(materias, plan="2182", expediente=EXPEDIENTE):
+    return {
+        "ok": True,
+        "alumno": {"expediente": expediente, "plan": plan, "alumno": "ANA LÓPEZ GARCÍA", "estatus": "A"},
+        "materias": materias,
+    }
+
+
+def materia(codigo, ord_, cic="2231", cr=8):
+    return {"cr": cr, "codigo": codigo, "nombre": f"MATERIA {codigo}", "e1": "O", "e2": "A",
+            "ord": ord_, "reg": None, "cic": cic, "inscripciones": 1, "reprobaciones": 0, "bajas": 0}
+
+
+def copy_stream(*outs) -> io.StringIO:
+    buf = io.StringIO()
+    for out in outs:
+        write_copy(kardex_copy_rows(out), buf)
+    buf.seek(0)
+    return buf
+
+
+@pytest.fixture
+def db(pg_dsn):
+    with psycopg.connect(pg_dsn, autocommit=True) as conn:
+        conn.execute(
+            "INSERT INTO plan_estudio (nombre, version, total_creditos, semestres_sugeridos) "
+            "VALUES ('ISI', '2182', 393, 9)"
+        )
+    return pg_dsn
+
+
+def query(dsn, sql, *params):
+    with psycopg.connect(dsn) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def test_carga_kardex_calificaciones_y_creditos(db):
+    out = salida([materia("6800", 94), materia("6801", 50), materia("6802", 71, cic="2232")])
+    res = load_copy(copy_stream(out), db)
+
+    assert res["ok"] and res["staged"] == 3 and res["kardex"] == 3 and res["calificaciones"] == 3
+    assert res["omitidas_sin_plan"] == {"filas": 0, "alumnos": 0, "expedientes": []}
+    rows = query(db, """
+        SELECT m.codigo, pe.etiqueta, k.estatus, k.calificacion, c.ordinario
+          FROM kardex k JOIN materia m ON m.id = k.materia_id JOIN periodo pe ON pe.id = k.periodo_id
+          JOIN calificacion c ON c.kardex_id = k.id ORDER BY m.codigo""")
+    assert [(r[0], r[1], r[2], int(r[3]), int(r[4])) for r in rows] == [
+        ("06800", "2023-1", "APROBADA", 94, 94),
+        ("06801", "2023-1", "REPROBADA", 50, 50),
+        ("06802", "2023-2", "APROBADA", 71, 71),
+    ]
+    assert query(db, "SELECT total_creditos FROM alumno WHERE matricula = %s", EXPEDIENTE) == [(16,)]
+
+
+def test_alumno_existente_sin_expediente_se_liga_por_matricula(db):
+    # Alumno dado de alta por otra vía: misma matrícula, `expediente` vacío
+    with psycopg.connect(db, autocommit=True) as conn:
+        conn.execute(
+            "INSERT INTO alumno (matricula, nombre, apellido_paterno, plan_estudio_id) "
+            "SELECT %s, 'ANA', 'LÓPEZ', id FROM plan_estudio", (EXPEDIENTE,))
+
+    res = load_copy(copy_stream(salida([materia("6800", 94), materia("6801", 80)])), db)
+
+    assert res["kardex"] == 2 and res["calificaciones"] == 2
+    assert query(db, "SELECT count(*) FROM alumno") == [(1,)]
+    assert query(db, "SELECT count(*) FROM kardex k JOIN alumno a ON a.id = k.alumno_id "
+                     "WHERE a.matricula = %s", EXPEDIENTE) == [(2,)]
+    assert query(db, "SELECT total_creditos FROM alumno") == [(16,)]
+
+
+def test_recarga_actualiza_sin_duplicar(db):
+    load_copy(copy_stream(salida([materia("6800", 50)])), db)
+    # mismo (alumno, materia, periodo) dos veces en el lote: gana la última
+    res = load_copy(copy_stream(salida([materia("6800", 55)]), salida([materia("6800", 90)])), db)
+
+    assert res["staged"] == 2 and res["kardex"] == 1
+    assert query(db, "SELECT estatus, calificacion::int FROM kardex") == [("APROBADA", 90)]
+    assert query(db, "SELECT count(*), max(final)::int FROM calificacion") == [(1, 90)]
+
+
+def test_plan_desconocido_se_omite(db):
+    res = load_copy(copy_stream(salida([materia("6800", 94)], plan="9999", expediente="111")), db)
+
+    assert res["omitidas_sin_plan"] == {"filas": 1, "alumnos": 1, "expedientes": ["111"]}
+    assert res["kardex"] == 0
+    assert query(db, "SELECT count(*) FROM alumno") == [(0,)]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Transiciones de estado del checkpoint de kardex_import.py."""
+
+import pytest
+
+from kardex import kardex_copy_rows
+from kardex_import import BatchSink, Checkpoint
+
+from test_kardex_copy_load import materia, salida
+
+
+def resultado(file_hash, expediente, plan="2182"):
+    """Lo que parse_file entrega para un PDF ya parseado."""
+    out = salida([materia("6800", 94), materia("6801", 80)], plan=plan, expediente=expediente)
+    return {"hash": file_hash, "ruta": f"{file_hash}.pdf", "expediente": expediente,
+            "rows": kardex_copy_rows(out), "error": None}
+
+
+def estados(cp):
+    return dict(cp.conn.execute("SELECT hash, estado_proceso FROM archivo ORDER BY hash"))
+
+
+@pytest.fixture
+def cp(tmp_path):
+    return Checkpoint(tmp_path / "import.sqlite")
+
+
+def test_out_dir_marca_exportado_y_no_cuenta_como_cargado(cp, tmp_path):
+    cp.mark([{"hash": "a", "ruta": "a.pdf"}], "PENDIENTE")
+    sink = BatchSink(cp, batch_rows=10_000, dsn=None, out_dir=tmp_path / "lotes")
+    sink.add(resultado("a", "111"))
+    sink.flush()
+
+    assert estados(cp) == {"a": "EXPORTADO"}
+    assert (tmp_path / "lotes" / "lote_00001.copy").read_text(encoding="utf-8").count("\n") == 2
+    assert sink.loaded_rows == 0 and sink.exported_rows == 2
+    # otra exportación lo salta; una importación a la BD lo vuelve a procesar
+    assert cp.done_hashes(retry_errors=False, exporting=True) == {"a"}
+    assert cp.done_hashes(retry_errors=False) == set()
+
+
+def test_done_hashes_por_estado(cp):
+    for h, estado in (("c", "COMPLETADO"), ("e", "ERROR"), ("o", "OMITIDO"), ("p", "PENDIENTE"), ("x", "EXPORTADO")):
+        cp.mark([{"hash": h, "ruta": f"{h}.pdf"}], estado)
+
+    assert cp.done_hashes(retry_errors=False) == {"c", "e", "o"}
+    assert cp.done_hashes(retry_errors=True) == {"c"}
+    assert cp.done_hashes(retry_errors=True, exporting=True) == {"c", "x"}
+
+
+def test_carga_marca_completado_y_omite_plan_desconocido(cp, pg_dsn):
+    psycopg = pytest.importorskip("psycopg")
+    with psycopg.connect(pg_dsn, autocommit=True) as conn:
+        conn.execute(
+            "INSERT INTO plan_estudio (nombre, version, total_creditos, semestres_sugeridos) "
+            "VALUES ('ISI', '2182', 393, 9)"
+        )
+    sink = BatchSink(cp, batch_rows=10_000, dsn=pg_dsn, out_dir=None)
+    sink.add(resultado("bueno", "111"))
+    sink.add(resultado("sin_plan", "222", plan="9999"))
+    sink.flush()
+
+    assert estados(cp) == {"bueno": "COMPLETADO", "sin_plan": "OMITIDO"}
+    assert sink.loaded_rows == 2
+    error = cp.conn.execute("SELECT error FROM archivo WHERE hash = 'sin_plan'").fetchone()[0]
+    assert "Plan de estudios desconocido" in error
+    # tras dar de alta el plan, --retry-errors lo vuelve a intentar
+    assert "sin_plan" not in cp.done_hashes(retry_errors=True)
+    with psycopg.connect(pg_dsn) as conn:
+        assert conn.execute("SELECT matricula FROM alumno").fetchall() == [("111",)]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""kardex_split.py: fronteras por encabezado, salida en orden y errores."""
+
+import json
+
+import pytest
+
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+pytest.importorskip("pdfplumber")
+
+from kardex_split import Splitter, run_split, student_line  # noqa: E402
+
+
+def combinado(path, alumnos):
+    """alumnos: [(expediente, materias)]; 30 materias por página."""
+    c = canvas.Canvas(str(path))
+    for exp, n in alumnos:
+        paginas = (n + 29) // 30
+        for p in range(paginas):
+            c.setFont("Helvetica", 9)
+            y = 800
+            for linea in (f"Universidad de Sonora KARDEX ELECTRONICO Pagina {p + 1} de {paginas}",
+                          "PLAN: 2182", f"EXPEDIENTE: {exp} ALUMNO DE PRUEBA"):
+                c.drawString(40, y, linea)
+                y -= 14
+            for i in range(p * 30, min(n, (p + 1) * 30)):
+                c.drawString(40, y, f"06 {6800 + i} MATERIA {i} O A 090 2231 01 00 00")
+                y -= 12
+            c.showPage()
+    c.save()
+    return path
+
+
+def pagina(exp=None, n=None, total=None):
+    return {"text": "", "rows": [], "marks": (exp, n, total)}
+
+
+def test_splitter_fronteras():
+    sp = Splitter()
+    cerrados = [sp.feed(i, p) for i, p in enumerate([
+        pagina("1", 1, 2), pagina(None, None, None), pagina("2", 1, 1), pagina("3", None, None),
+    ])]
+    cerrados.append(sp.finish())
+    rangos = [(c["expediente"], c["primera"], c["ultima"]) for c in cerrados if c]
+    assert rangos == [("1", 0, 1), ("2", 2, 2), ("3", 3, 3)]
+
+
+def test_split_en_orden(tmp_path, capsys):
+    alumnos = [("222200001", 45), ("222200002", 10), ("222200003", 61), ("222200004", 5)]
+    pdf = combinado(tmp_path / "combinado.pdf", alumnos)
+    assert run_split(pdf, ["--workers=2", "--chunk=2"]) == 0
+    captured = capsys.readouterr()
+    outs = [json.loads(line) for line in captured.out.splitlines()]
+    assert [(o["alumno"]["expediente"], len(o["materias"])) for o in outs] == [(e, n) for e, n in alumnos]
+    assert [o["paginas"] for o in outs] == [[1, 2], [3, 3], [4, 6], [7, 7]]
+    assert json.loads(captured.err)["alumnos"] == 4
+
+
+def test_error_de_un_alumno_es_su_linea():
+    st = {"expediente": "222200002", "primera": 4, "ultima": 5, "total": 2,
+          "paginas": [{"text": None, "rows": [], "marks": ("222200002", 1, 2)}]}
+    line, con_avisos, ok = student_line(st)
+    assert not ok and not con_avisos
+    out = json.loads(line)
+    assert out["ok"] is False and out["paginas"] == [5, 6] and out["expediente"] == "222200002"
+    assert out["error"]
+
+
+def test_error_fatal_va_a_stderr(tmp_path, capsys):
+    roto = tmp_path / "roto.pdf"
+    roto.write_bytes(b"%PDF-1.4 nada")
+    assert run_split(roto, ["--workers=1"]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert json.loads(captured.err)["ok"] is False
+
+
+def test_split_con_archive(tmp_path, capsys):
+    pytest.importorskip("pyarrow")
+    from kardex_archive import scan
+
+    alumnos = [("222200001", 3), ("222200002", 2)]
+    pdf = combinado(tmp_path / "combinado.pdf", alumnos)
+    assert run_split(pdf, ["--workers=1", f"--archive={tmp_path / 'archivo'}"]) == 0
+    assert json.loads(capsys.readouterr().err)["archivados"] == 2
+    t = scan(tmp_path / "archivo", columns=("expediente", "documento"))
+    assert sorted(t["expediente"].to_pylist()) == ["222200001"] * 3 + ["222200002"] * 2
+    assert set(t["documento"].to_pylist()) == {str(pdf)}
@@ -1,12 +1,14 @@
 
 import { Request, Response } from "express";
 import path from "path";
-import { runPythonKardex } from "../utils/runPythonKardex";
+import { probeKardex, runPythonKardex } from "../utils/runPythonKardex";
 import { AppDataSource } from "../config/data-source";
 import { ArchivoCargado } from "../entities/ArchivoCargado";
 import { AuditoriaCargas } from "../entities/AuditoriaCargas";
 import { ingestarKardex } from "../services/ingestaKardex";
 import { sha256File } from "../utils/fileHash";
+import { motivoRechazoProbe } from "../utils/pdfProbe";
+import fs from "fs";
 
 export const kardexController = {
     uploadFile: async (req: Request, res: Response) => {
@@ -20,6 +22,21 @@ export const kardexController = {
             const nombreArchivo = req.file.originalname;
             const hash = await sha256File(absPath);
 
+            // 0) Sondeo rápido (--probe): si claramente no es un kárdex se rechaza
+            //    antes de registrarlo y de pagar el parseo completo
+            const probe = await probeKardex(absPath).catch(() => null);
+            const rechazo = motivoRechazoProbe(probe, "KARDEX");
+            if (rechazo) {
+                await fs.promises.unlink(absPath).catch(() => undefined);
+                return res.status(400).json({
+                    status: "error",
+                    isValid: false,
+                    message: [rechazo],
+                    file: { name: req.file.originalname },
+                    probe,
+                });
+            }
+
             // 1) Registramos el archivo + auditoría inicial
             const archivoRepo = AppDataSource.getRepository(ArchivoCargado);
             const auditRepo = AppDataSource.getRepository(AuditoriaCargas);
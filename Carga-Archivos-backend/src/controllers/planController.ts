@@ -1,11 +1,15 @@
 import { Request, Response } from "express";
 import path from "path";
-import { runPythonPlan } from "../utils/runPythonPlan";
+import { runPythonPlan, runPlanDelta } from "../utils/runPythonPlan";
 import { AppDataSource } from "../config/data-source";
 import { ArchivoCargado } from "../entities/ArchivoCargado";
 import { AuditoriaCargas } from "../entities/AuditoriaCargas";
 import { sha256File } from "../utils/fileHash";
 import { ingestaPlan } from "../services/ingestaPlan";
+import { In } from "typeorm";
+import fs from "fs";
+import { writeCatalogSnapshot } from "../utils/catalogSnapshot";
+import { motivoRechazoProbe } from "../utils/pdfProbe";
 
 export const planController = {
   uploadFile: async (req: Request, res: Response) => {
@@ -23,6 +27,11 @@ export const planController = {
       const force = String(req.query.force ?? "0") === "1";
       const debug = String(req.query.debug ?? "0") === "1";
       const ocr = String(req.query.ocr ?? "0") === "1";
+      // Caché de planes por hash (plan_cache.py): opt-in con ?cache=1 o PLAN_CACHE=1
+      const cache = String(req.query.cache ?? process.env.PLAN_CACHE ?? "0") === "1";
+      // tabula (default) | plumber (experimental, sin JVM/OpenCV): solo si se pide
+      // explícitamente con ?backend=plumber; su salida trae un aviso de precisión
+      const backend = String(req.query.backend ?? "").trim();
       const usuario = (req.headers["x-usuario"] as string)?.trim() || "system";
 
       // DEDUP por hash (evita UNIQUE violation ux_archivo_hash)
@@ -46,6 +55,17 @@ export const planController = {
         });
       }
 
+      // Sondeo rápido (--probe): si claramente no es un plan se rechaza antes
+      // de registrarlo y de pagar el parseo completo (con ocr=1 se aceptan escaneos)
+      if (!dup) {
+        const probe = await runPythonPlan(fullPath, ["--probe"]).catch(() => null);
+        const rechazo = motivoRechazoProbe(probe, "PLAN", { permitirSinTexto: ocr });
+        if (rechazo) {
+          await fs.promises.unlink(fullPath).catch(() => undefined);
+          return res.status(400).json({ ok: false, error: rechazo, probe });
+        }
+      }
+
       // Si no existe (o force=1), crea/usa un registro de archivo
       const nuevo = repoArchivo.create({
         tipo: "PLAN_ESTUDIO",
@@ -75,8 +95,11 @@ export const planController = {
       const args: string[] = [];
       if (debug) args.push("--debug");
       if (ocr) args.push("--ocr");
+      if (backend) args.push(`--backend=${backend}`);
+      // Caché por hash + comparación contra planes ya vistos (misma version/origen)
+      if (cache) args.push("--compare-to-cache");
 
-      const parsed = await runPythonPlan(fullPath, args);
+      let parsed = await runPythonPlan(fullPath, args);
 
       await repoAud.save(
         repoAud.create({
@@ -85,7 +108,7 @@ export const planController = {
           estado: parsed?.ok ? "OK" : "ERROR",
           detalle: `Plan: ${parsed?.plan?.nombre ?? "?"} v${
             parsed?.plan?.version ?? "?"
-          } | Materias: ${parsed?.materias?.length ?? 0}`,
+          } | Materias: ${parsed?.materias_total ?? parsed?.materias?.length ?? 0}`,
         })
       );
 
@@ -96,6 +119,42 @@ export const planController = {
           .json({ ok: false, error: "No se pudo parsear el PDF del plan.", parsed });
       }
 
+      // 1.0) Delta contra las materias actuales de ESTE plan (nombre, version):
+      // la ingesta solo toca altas y cambios. Si falla, se ingiere completo.
+      const catalogPath = await writeCatalogSnapshot(archivoId, parsed.plan);
+      parsed = await runPlanDelta(parsed, catalogPath)
+        .catch((e: any) => {
+          parsed.warnings = [...(parsed.warnings ?? []), `Delta contra catálogo no disponible: ${e?.message ?? e}`];
+          return parsed;
+        })
+        .finally(() => fs.promises.unlink(catalogPath).catch(() => undefined));
+
+      // 1.1) Mismo contenido que un plan ya ingerido (otro PDF, mismo plan) → no reingestar
+      const sameAs: string[] = parsed?.cache?.same_content_as ?? [];
+      if (!force && sameAs.length) {
+        const previo = await repoArchivo.findOne({
+          where: { hash: In(sameAs), estado_proceso: "COMPLETADO" } as any,
+        });
+        if (previo) {
+          await repoAud.save(
+            repoAud.create({
+              archivo_id: archivoId,
+              etapa: "INGESTA",
+              estado: "OK",
+              detalle: `Mismo contenido que archivo ${previo.id} (plan v${parsed?.plan?.version ?? "?"}); ingesta omitida.`,
+            })
+          );
+          await repoArchivo.update(archivoId, { estado_proceso: "COMPLETADO" });
+          return res.json({
+            ok: true,
+            action: "SAME_PLAN_CONTENT_SKIPPED",
+            archivoId,
+            sameAsArchivoId: previo.id,
+            parsed,
+          });
+        }
+      }
+
       // 2) Ingesta idempotente (solo agrega/actualiza lo nuevo)
       const ingesta = await ingestaPlan(parsed, archivoId);
 
@@ -136,10 +195,14 @@ export const planController = {
       const fullPath = path.resolve(req.file.path);
       const debug = String(req.query.debug ?? "0") === "1";
       const ocr = String(req.query.ocr ?? "0") === "1";
+      // tabula (default) | plumber (experimental, sin JVM/OpenCV): solo si se pide
+      // explícitamente con ?backend=plumber; su salida trae un aviso de precisión
+      const backend = String(req.query.backend ?? "").trim();
 
       const args: string[] = [];
       if (debug) args.push("--debug");
       if (ocr) args.push("--ocr");
+      if (backend) args.push(`--backend=${backend}`);
 
       const parsed = await runPythonPlan(fullPath, args);
       return res.json(parsed);
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Materializa las alertas de faltas por (alumno, grupo) en public.alerta_faltas.
+
+api/attendance/alerts/route.ts contaba FALTA y JUSTIFICACION con dos COUNT(*)
+correlacionados por alumno en cada request, y la campana de notificaciones lo
+llama por profesor. Ahora los totales viven en tablas y este job los mantiene:
+
+  alerta_faltas            (grupo_id, alumno_id) PK, faltas_brutas,
+                           justificaciones, faltas, tipo, actualizado
+  alerta_faltas_pendiente  cola que llena un trigger de incidencia: +1 por
+                           cada FALTA / JUSTIFICACION insertada, -1 por cada
+                           una borrada (un UPDATE es las dos cosas)
+
+Cada corrida vacía la cola con un solo DELETE ... RETURNING (COPY → pandas),
+suma los deltas por (alumno, grupo), los agrega a los totales que ya había,
+clasifica contra LIMIT_FALTAS con np.select y escribe con un COPY + un upsert,
+todo en la misma transacción.
+
+No hay marca de "último id leído": un id más bajo puede confirmarse después de
+uno más alto (secuencia tomada antes, COMMIT después), y una marca por id lo
+saltaría para siempre. Una fila de la cola solo se ve cuando su transacción
+confirma, y se borra en la misma transacción que la suma, así que cada
+incidencia se cuenta exactamente una vez sin importar el orden de los COMMIT.
+Los borrados también llegan a la cola, así que ya no hace falta --full para
+ellos.
+
+La primera corrida (sin trigger) crea tablas y trigger y recalcula todo desde
+incidencia; --full hace lo mismo a mano. En ambos casos se bloquea incidencia
+en modo SHARE para que nadie escriba entre el recálculo y el vaciado de la cola.
+
+route.ts arma los miembros en vivo (alumno_grupo, y kárdex en la vista por
+grupo) y les suma alerta_faltas + lo que siga en la cola, así que entre
+corridas las alertas no se quedan viejas.
+
+Uso:
+  python alertas_faltas.py [--full] [--limite=14] [--dsn=postgresql://...]
+  python alertas_faltas.py --selftest        # solo pandas, sin base de datos
+
+Conexión: --dsn, $DATABASE_URL o las variables DB_* del backend (.env).
+Requiere pandas y psycopg (3) o psycopg2.
+"""
+
+import io
+import json
+import sys
+import time
+
+from asistencia_copy_load import connect, dsn_from_env
+
+LIMIT_FALTAS = 14  # mismo valor que api/attendance/alerts/route.ts
+TIPOS = ("REPROBADO", "CRITICO", "ADVERTENCIA", "NORMAL")
+
+STAGE = "alerta_faltas_stage"
+STAGE_COLS = ("alumno_id", "grupo_id", "faltas_brutas", "justificaciones", "faltas", "tipo")
+DELTA_COLS = ("alumno_id", "grupo_id", "faltas_brutas", "justificaciones")
+TRIGGER = "alerta_faltas_encolar"
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS public.alerta_faltas (
+      alumno_id       integer NOT NULL REFERENCES public.alumno(id),
+      grupo_id        integer NOT NULL REFERENCES public.grupo(id),
+      faltas_brutas   integer NOT NULL DEFAULT 0,
+      justificaciones integer NOT NULL DEFAULT 0,
+      faltas          integer NOT NULL DEFAULT 0,
+      tipo            varchar NOT NULL DEFAULT 'NORMAL',
+      actualizado     timestamptz NOT NULL DEFAULT now(),
+      CONSTRAINT alerta_faltas_pkey PRIMARY KEY (grupo_id, alumno_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.alerta_faltas_pendiente (
+      id              bigserial PRIMARY KEY,
+      alumno_id       integer NOT NULL,
+      grupo_id        integer NOT NULL,
+      faltas_brutas   integer NOT NULL,
+      justificaciones integer NOT NULL
+    )
+    """,
+    # route.ts suma la cola por grupo en cada request
+    """
+    CREATE INDEX IF NOT EXISTS alerta_faltas_pendiente_grupo_idx
+        ON public.alerta_faltas_pendiente (grupo_id)
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION public.{TRIGGER}() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+      IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.tipo IN ('FALTA', 'JUSTIFICACION') THEN
+        INSERT INTO public.alerta_faltas_pendiente (alumno_id, grupo_id, faltas_brutas, justificaciones)
+        VALUES (OLD.alumno_id, OLD.grupo_id, -(OLD.tipo = 'FALTA')::int, -(OLD.tipo = 'JUSTIFICACION')::int);
+      END IF;
+      IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.tipo IN ('FALTA', 'JUSTIFICACION') THEN
+        INSERT INTO public.alerta_faltas_pendiente (alumno_id, grupo_id, faltas_brutas, justificaciones)
+        VALUES (NEW.alumno_id, NEW.grupo_id, (NEW.tipo = 'FALTA')::int, (NEW.tipo = 'JUSTIFICACION')::int);
+      END IF;
+      RETURN NULL;
+    END
+    $$
+    """,
+]
+
+# una corrida a la vez (no bloquea las lecturas de route.ts)
+LOCK_SQL = "LOCK TABLE public.alerta_faltas IN SHARE ROW EXCLUSIVE MODE"
+
+HAS_TRIGGER_SQL = f"""
+SELECT 1 FROM pg_trigger WHERE tgname = '{TRIGGER}' AND tgrelid = 'public.incidencia'::regclass
+"""
+
+TRIGGER_SQL = f"""
+CREATE TRIGGER {TRIGGER}
+ AFTER INSERT OR DELETE OR UPDATE OF alumno_id, grupo_id, tipo ON public.incidencia
+ FOR EACH ROW EXECUTE FUNCTION public.{TRIGGER}()
+"""
+
+# recálculo: nadie escribe incidencias hasta el COMMIT; la cola se descarta
+RESET_SQL = [
+    "LOCK TABLE public.incidencia IN SHARE MODE",
+    "TRUNCATE public.alerta_faltas",
+    "DELETE FROM public.alerta_faltas_pendiente",
+]
+
+# lecturas (COPY ... TO STDOUT); mismas columnas que la cola
+INCIDENCIAS_SQL = """
+SELECT alumno_id, grupo_id, (tipo = 'FALTA')::int, (tipo = 'JUSTIFICACION')::int
+  FROM public.incidencia
+ WHERE tipo IN ('FALTA', 'JUSTIFICACION')
+"""
+PENDIENTES_SQL = """
+DELETE FROM public.alerta_faltas_pendiente
+RETURNING alumno_id, grupo_id, faltas_brutas, justificaciones
+"""
+
+STAGE_DDL = f"""
+CREATE TEMP TABLE {STAGE} (
+  alumno_id       integer NOT NULL,
+  grupo_id        integer NOT NULL,
+  faltas_brutas   integer,
+  justificaciones integer,
+  faltas          integer,
+  tipo            varchar
+) ON COMMIT DROP
+"""
+
+# totales previos de las llaves tocadas (las del stage)
+PREVIOS_SQL = f"""
+SELECT af.alumno_id, af.grupo_id, af.faltas_brutas, af.justificaciones
+  FROM public.alerta_faltas af
+  JOIN {STAGE} s ON s.grupo_id = af.grupo_id AND s.alumno_id = af.alumno_id
+"""
+
+UPSERT_SQL = f"""
+INSERT INTO public.alerta_faltas AS af
+       (alumno_id, grupo_id, faltas_brutas, justificaciones, faltas, tipo, actualizado)
+SELECT alumno_id, grupo_id, faltas_brutas, justificaciones, faltas, tipo, now()
+  FROM {STAGE}
+ON CONFLICT (grupo_id, alumno_id) DO UPDATE
+   SET faltas_brutas   = EXCLUDED.faltas_brutas,
+       justificaciones = EXCLUDED.justificaciones,
+       faltas          = EXCLUDED.faltas,
+       tipo            = EXCLUDED.tipo,
+       actualizado     = now()
+"""
+
+
+def get_pandas():
+    try:
+        import numpy as np
+        import pandas as pd
+    except Exception as e:
+        raise SystemExit("Instala pandas: pip install pandas numpy") from e
+    return np, pd
+
+
+# ============================================================
+# 1) CÁLCULO (columnar, sin base de datos)
+# ============================================================
+def clasificar(faltas, limite: int = LIMIT_FALTAS):
+    """Mismo semáforo que route.ts, sobre una columna completa."""
+    np, _ = get_pandas()
+    return np.select(
+        [faltas >= limite, faltas == limite - 1, faltas > 6],
+        list(TIPOS[:3]),
+        default=TIPOS[3],
+    )
+
+
+def deltas(pendientes):
+    """Filas de la cola (±1 por incidencia) → un renglón por (alumno, grupo)."""
+    return pendientes.groupby(["alumno_id", "grupo_id"], as_index=False)[
+        ["faltas_brutas", "justificaciones"]].sum()
+
+
+def totales(delta, previos, limite: int = LIMIT_FALTAS):
+    """Suma los deltas a los totales guardados y recalcula faltas / tipo."""
+    np, _ = get_pandas()
+    llave = ["alumno_id", "grupo_id"]
+    out = delta.set_index(llave).join(previos.set_index(llave), how="left", rsuffix="_prev")
+    for col in ("faltas_brutas", "justificaciones"):
+        out[col] = out[col] + out[f"{col}_prev"].fillna(0).astype("int64")
+    out["faltas"] = np.maximum(out["faltas_brutas"] - out["justificaciones"], 0)
+    out["tipo"] = clasificar(out["faltas"].to_numpy(), limite)
+    return out.reset_index()[list(STAGE_COLS)]
+
+
+# ============================================================
+# 2) BASE DE DATOS
+# ============================================================
+def copy_out(cur, driver: str, sql: str, columns: tuple):
+    """COPY (query) TO STDOUT → DataFrame."""
+    _, pd = get_pandas()
+    buf = io.BytesIO()
+    stmt = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)"
+    if driver == "psycopg":
+        with cur.copy(stmt) as cp:
+            for block in cp:
+                buf.write(block)
+    else:
+        cur.copy_expert(stmt, buf)
+    buf.seek(0)
+    if not buf.getbuffer().nbytes:
+        return pd.DataFrame({c: pd.Series(dtype="object" if c == "tipo" else "int64") for c in columns})
+    return pd.read_csv(buf, header=None, names=list(columns))
+
+
+def copy_in(cur, driver: str, df, columns: tuple) -> None:
+    buf = io.StringIO()
+    df[list(columns)].to_csv(buf, header=False, index=False)
+    buf.seek(0)
+    stmt = f"COPY {STAGE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    if driver == "psycopg":
+        with cur.copy(stmt) as cp:
+            cp.write(buf.getvalue())
+    else:
+        cur.copy_expert(stmt, buf)
+
+
+def refresh(dsn: str, full: bool = False, limite: int = LIMIT_FALTAS) -> dict:
+    """Una corrida (incremental o completa) en una sola transacción."""
+    get_pandas()
+    t0 = time.perf_counter()
+    conn, driver = connect(dsn)
+    try:
+        with conn:
+            cur = conn.cursor()
+            # el DDL solo la primera vez: CREATE INDEX IF NOT EXISTS esperaría a
+            # cualquier transacción que esté escribiendo en la cola
+            cur.execute(HAS_TRIGGER_SQL)
+            if cur.fetchone() is None:
+                for sql in SCHEMA_SQL:
+                    cur.execute(sql)
+                cur.execute(TRIGGER_SQL)
+                full = True  # lo anterior al trigger no está en la cola
+            cur.execute(LOCK_SQL)
+            if full:
+                for sql in RESET_SQL:
+                    cur.execute(sql)
+            leidas = copy_out(cur, driver, INCIDENCIAS_SQL if full else PENDIENTES_SQL, DELTA_COLS)
+            delta = deltas(leidas)
+
+            filas = 0
+            if len(delta):
+                cur.execute(STAGE_DDL)
+                copy_in(cur, driver, delta, ("alumno_id", "grupo_id"))
+                previos = copy_out(cur, driver, PREVIOS_SQL, DELTA_COLS)
+                nuevos = totales(delta, previos, limite)
+                cur.execute(f"TRUNCATE {STAGE}")
+                copy_in(cur, driver, nuevos, STAGE_COLS)
+                cur.execute(UPSERT_SQL)
+                filas = cur.rowcount
+                alertas = nuevos["tipo"].value_counts().to_dict()
+            else:
+                alertas = {}
+        return {
+            "ok": True,
+            "modo": "completo" if full else "incremental",
+            "filas_leidas": len(leidas),
+            "filas_actualizadas": filas,
+            "tipos_actualizados": {t: int(alertas.get(t, 0)) for t in TIPOS},
+            "ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+    finally:
+        conn.close()
+
+
+# ============================================================
+# 3) CLI
+# ============================================================
+def selftest() -> dict:
+    _, pd = get_pandas()
+    cola = pd.DataFrame({
+        "alumno_id": [1, 1, 1, 2, 2],
+        "grupo_id": [10, 10, 10, 10, 10],
+        "faltas_brutas": [1, 1, 0, 0, -1],
+        "justificaciones": [0, 0, 1, 1, 0],
+    })
+    previos = pd.DataFrame({"alumno_id": [1, 2], "grupo_id": [10, 10],
+                            "faltas_brutas": [12, 1], "justificaciones": [0, 0]})
+    out = totales(deltas(cola), previos).set_index("alumno_id")
+    checks = {
+        "suma_previos": int(out.loc[1, "faltas"]) == 13 and out.loc[1, "tipo"] == "CRITICO",
+        "borrado_resta": int(out.loc[2, "faltas_brutas"]) == 0,
+        "sin_negativos": int(out.loc[2, "faltas"]) == 0 and out.loc[2, "tipo"] == "NORMAL",
+        "semaforo": list(clasificar(pd.Series([14, 13, 7, 6]))) == ["REPROBADO", "CRITICO", "ADVERTENCIA", "NORMAL"],
+    }
+    return {"ok": all(checks.values()), "checks": checks}
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if "--selftest" in argv:
+        res = selftest()
+        print(json.dumps(res, ensure_ascii=False))
+        sys.exit(0 if res["ok"] else 1)
+
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    try:
+        res = refresh(opts.get("dsn") or dsn_from_env(), "--full" in argv, int(opts.get("limite", LIMIT_FALTAS)))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parser de listas de asistencia ("AlumnosMateria.xlsx") en streaming.
+
+Mismas reglas que leerListaAsistencia (utils/parseAsistencia.ts), pero con
+openpyxl en modo read_only: la hoja se recorre fila por fila, sin armar el
+libro completo ni el arreglo sheet_to_json en memoria.
+
+- meta: título/mes, materia (código y nombre), grupo, lugar y horario de las
+  primeras filas no vacías.
+- rows: {expediente, nombre, total (∑F), rowIndex} desde dos filas después
+  del encabezado "Expediente | Nombre". rowIndex cuenta filas no vacías, como
+  sheet_to_json(blankrows: false) en el backend.
+- incidencias: las marcas por día de cada alumno ("F"/"X" → FALTA,
+  "J" → JUSTIFICACION, igual que excel-students.service.ts). El día sale de
+  la fila bajo el encabezado; mes de meta.mes y año de --anio o del periodo.
+  El año solo se usa para esas fechas: meta.anio queda en null, como en
+  parseAsistencia.ts.
+
+Uso:
+  python asistencia.py <lista.xlsx>                       # JSON {ok, meta, rows, incidencias}
+  python asistencia.py <dir|xlsx ...> --periodo=2025-2 --emit=copy [--workers=N] > mes.copy
+  python asistencia_copy_load.py mes.copy                 # unas cuantas sentencias por lote
+
+Con --emit=copy se procesan todas las .xlsx (recursivo en directorios) y sale
+texto COPY para asistencia_copy_load.py: una fila por alumno (inscripción al
+grupo) y una por incidencia. Avisos por archivo en stderr (JSON).
+
+  python asistencia.py --version | --selftest   # no importan openpyxl
+"""
+
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+__version__ = "1.0.0"
+
+HEAVY_MODULES = ("openpyxl",)
+_openpyxl = None
+
+
+def get_openpyxl():
+    """openpyxl (obligatorio para leer .xlsx)."""
+    global _openpyxl
+    if _openpyxl is None:
+        try:
+            import openpyxl
+        except Exception as e:
+            raise SystemExit("Instala openpyxl: pip install openpyxl") from e
+        _openpyxl = openpyxl
+    return _openpyxl
+
+
+MATERIA_RE = re.compile(r"Materia:\s*([0-9]+)\s*-\s*(.+?)\s+Grupo:\s*(.+?)\s+Lugar:\s*(.+)$", re.I)
+MES_RE = re.compile(r"MES DE\s+([A-ZÁÉÍÓÚÑ]+)")
+
+MESES = {
+    "ENERO": 1, "FEBRERO": 2, "MARZO": 3, "ABRIL": 4, "MAYO": 5, "JUNIO": 6,
+    "JULIO": 7, "AGOSTO": 8, "SEPTIEMBRE": 9, "SETIEMBRE": 9, "OCTUBRE": 10,
+    "NOVIEMBRE": 11, "DICIEMBRE": 12,
+}
+MARCAS = {"F": "FALTA", "X": "FALTA", "J": "JUSTIFICACION"}
+
+# Columnas del texto COPY; asistencia_copy_load.py usa esta misma lista.
+# Fila de alumno: fecha/tipo vacíos. Fila de incidencia: con fecha y tipo.
+ASISTENCIA_COPY_COLUMNS = (
+    "expediente",
+    "materia_codigo",
+    "clave_grupo",
+    "periodo",
+    "archivo",
+    "fila",
+    "fecha",
+    "tipo",
+)
+
+
+def js_string(v) -> str:
+    """String(v) de JS para lo que devuelve openpyxl (1.0 → '1', None → '')."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def js_number(v):
+    """Number(v) de JS; None si no es numérico o viene vacío."""
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return int(v) if float(v).is_integer() else v
+    s = str(v).strip()
+    if not s:
+        return None
+    try:
+        n = float(s)
+    except ValueError:
+        return None
+    return int(n) if n.is_integer() else n
+
+
+def empty_meta() -> dict:
+    return {
+        "titulo": None,
+        "materiaCodigo": None,
+        "materiaNombre": None,
+        "grupoTexto": None,
+        "lugar": None,
+        "mes": None,
+        "anio": None,
+        "horarioTexto": None,
+    }
+
+
+def trim_row(row: tuple) -> list:
+    """Quita celdas vacías al final (como el arreglo de sheet_to_json)."""
+    row = list(row)
+    while row and (row[-1] is None or row[-1] == ""):
+        row.pop()
+    return row
+
+
+def read_meta_row(meta: dict, cell0: str) -> None:
+    upper = cell0.upper()
+    if not meta["titulo"] and "LISTA DE ASISTENCIA" in upper:
+        meta["titulo"] = cell0
+        m = MES_RE.search(upper)
+        if m:
+            meta["mes"] = m.group(1).strip()
+    if not meta["materiaCodigo"] and upper.startswith("MATERIA:"):
+        m = MATERIA_RE.search(cell0)
+        if m:
+            meta["materiaCodigo"] = m.group(1).strip()
+            meta["materiaNombre"] = m.group(2).strip()
+            meta["grupoTexto"] = m.group(3).strip()
+            meta["lugar"] = m.group(4).strip()
+    if not meta["horarioTexto"] and upper.startswith("HORARIO:"):
+        meta["horarioTexto"] = cell0.strip()
+
+
+def sum_column(header: list) -> int:
+    for j, cell in enumerate(header):
+        if cell is None:
+            continue
+        txt = js_string(cell).strip().upper()
+        if txt.startswith("∑") or txt in ("SUMA", "TOTAL"):
+            return j
+    return len(header) - 1
+
+
+def day_columns(days_row: list, first: int, stop: int) -> dict:
+    """{columna: día del mes} de la fila bajo el encabezado ("- | - | 1 | 2 | ...")."""
+    out = {}
+    for j in range(first, min(stop, len(days_row))):
+        d = js_number(days_row[j])
+        if isinstance(d, int) and 1 <= d <= 31:
+            out[j] = d
+    return out
+
+
+def read_lista(path, anio: int | None = None) -> dict:
+    """Una lista .xlsx → {ok, meta, rows, incidencias, warnings}."""
+    wb = get_openpyxl().load_workbook(str(path), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        meta = empty_meta()
+        rows, incidencias, warnings = [], [], []
+        header = days = None
+        sum_col = -1
+        fechas = {}
+        i = -1  # índice entre filas no vacías (raw[i] en parseAsistencia.ts)
+        for values in ws.iter_rows(values_only=True):
+            row = trim_row(values)
+            if not row:
+                continue
+            i += 1
+            if i < 5:
+                read_meta_row(meta, js_string(row[0]))
+
+            if header is None:
+                first = js_string(row[0]).strip().upper()
+                second = js_string(row[1]).strip().upper() if len(row) > 1 else ""
+                if first == "EXPEDIENTE" and second == "NOMBRE":
+                    header, sum_col = row, sum_column(row)
+                continue
+            if days is None:
+                days = row
+                fechas = dated_columns(meta, anio, day_columns(days, 2, sum_col), warnings)
+                continue
+
+            expediente = js_string(row[0]).strip()
+            nombre = js_string(row[1]).strip() if len(row) > 1 else ""
+            if not expediente and not nombre:
+                continue
+            total = js_number(row[sum_col]) if 0 <= sum_col < len(row) else None
+            rows.append({"expediente": expediente, "nombre": nombre, "total": total, "rowIndex": i + 1})
+            for j, fecha in fechas.items():
+                if j < len(row):
+                    tipo = MARCAS.get(js_string(row[j]).strip().upper())
+                    if tipo and expediente:
+                        incidencias.append({"expediente": expediente, "fecha": fecha, "tipo": tipo})
+    finally:
+        wb.close()
+
+    if header is None:
+        warnings.append("No se encontró el encabezado Expediente | Nombre")
+    return {"ok": True, "meta": meta, "rows": rows, "incidencias": incidencias, "warnings": warnings}
+
+
+def dated_columns(meta: dict, anio: int | None, dias: dict, warnings: list) -> dict:
+    """{columna: 'YYYY-MM-DD'} para las columnas de día; vacío si falta mes o año."""
+    if not dias:
+        return {}
+    mes = MESES.get((meta.get("mes") or "").upper())
+    if not mes or not anio:
+        warnings.append("Sin mes o año: no se generan incidencias por día")
+        return {}
+    import datetime as dt
+
+    out = {}
+    for j, d in dias.items():
+        try:
+            out[j] = dt.date(anio, mes, d).isoformat()
+        except ValueError:
+            warnings.append(f"Día inválido en la columna {j + 1}: {d}/{mes}/{anio}")
+    return out
+
+
+# ============================================================
+# Salida COPY (lote de listas)
+# ============================================================
+
+def copy_escape(v) -> str:
+    if v is None:
+        return r"\N"
+    s = str(v)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(out: dict, periodo: str, archivo: str) -> list:
+    """Salida de read_lista → filas COPY (ASISTENCIA_COPY_COLUMNS).
+
+    Sin materia las filas de alumno salen igual (ingestaAsistencia.ts los
+    inscribe al periodo aunque no haya grupo); las incidencias no.
+    """
+    meta = out["meta"]
+    base = (meta.get("materiaCodigo"), (meta.get("grupoTexto") or "").strip() or None, periodo, archivo)
+    rows = [(r["expediente"], *base, r["rowIndex"], None, None) for r in out["rows"] if r["expediente"]]
+    if meta.get("materiaCodigo"):
+        rows.extend((inc["expediente"], *base, None, inc["fecha"], inc["tipo"]) for inc in out["incidencias"])
+    return rows
+
+
+def parse_for_copy(item: tuple) -> dict:
+    """Corre en el pool: una lista → filas COPY (o error)."""
+    path, periodo, anio = item
+    try:
+        out = read_lista(path, anio)
+        rows = copy_rows(out, periodo, os.path.basename(path))
+        warnings = list(out["warnings"])
+        if not out["meta"].get("materiaCodigo"):
+            warnings.append("Sin materia: solo inscripción al periodo")
+        if not rows:
+            warnings.append("Sin alumnos")
+        return {"archivo": path, "rows": rows, "alumnos": len(out["rows"]),
+                "incidencias": len(out["incidencias"]), "warnings": warnings, "error": None}
+    except Exception as e:
+        return {"archivo": path, "rows": [], "alumnos": 0, "incidencias": 0, "warnings": [], "error": str(e)}
+
+
+def iter_listas(inputs: list):
+    for p in inputs:
+        if p.is_dir():
+            for dirpath, _, files in os.walk(p):
+                for name in sorted(files):
+                    if name.lower().endswith(".xlsx") and not name.startswith("~$"):
+                        yield os.path.join(dirpath, name)
+        else:
+            yield str(p)
+
+
+def emit_copy(inputs: list, periodo: str, anio: int, workers: int, write) -> dict:
+    items = [(p, periodo, anio) for p in iter_listas(inputs)]
+    stats = {"archivos": len(items), "errores": 0, "alumnos": 0, "incidencias": 0, "filas": 0}
+    if workers > 1 and len(items) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parse_for_copy, items, chunksize=8))
+    else:
+        results = map(parse_for_copy, items)
+    for res in results:
+        if res["error"] or res["warnings"]:
+            print(json.dumps({"archivo": res["archivo"], "error": res["error"], "warnings": res["warnings"]},
+                             ensure_ascii=False), file=sys.stderr)
+        stats["errores"] += bool(res["error"])
+        stats["alumnos"] += res["alumnos"]
+        stats["incidencias"] += res["incidencias"]
+        stats["filas"] += len(res["rows"])
+        for r in res["rows"]:
+            write("\t".join(copy_escape(v) for v in r) + "\n")
+    return stats
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def selftest() -> dict:
+    import importlib.util
+
+    meta = empty_meta()
+    read_meta_row(meta, "Lista de Asistencia del mes de SEPTIEMBRE")
+    read_meta_row(meta, "Materia: 4134 - PRÁCTICA DE DESARROLLO Grupo: 1 - TEORIA Lugar: 5G-A201")
+    checks = {
+        "meta": (meta["mes"], meta["materiaCodigo"], meta["grupoTexto"], meta["lugar"])
+        == ("SEPTIEMBRE", "4134", "1 - TEORIA", "5G-A201"),
+        "sum_column": sum_column(["Expediente", "Nombre", "L", "M", "∑F"]) == 4,
+        "js_number": (js_number("3"), js_number(""), js_number("x"), js_number(2.0)) == (3, None, None, 2),
+        "day_columns": day_columns(["-", "-", 1, 2, "x", 31], 2, 6) == {2: 1, 3: 2, 5: 31},
+        "dated_columns": dated_columns(meta, 2025, {2: 1}, []) == {2: "2025-09-01"},
+        "copy_escape": copy_escape("a\tb") == "a\\tb" and copy_escape(None) == r"\N",
+    }
+    return {
+        "ok": all(checks.values()),
+        "version": __version__,
+        "checks": checks,
+        "deps": {m: importlib.util.find_spec(m) is not None for m in HEAVY_MODULES},
+    }
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if "--version" in argv:
+        print(json.dumps({"ok": True, "script": "asistencia.py", "version": __version__}))
+        return
+    if "--selftest" in argv:
+        res = selftest()
+        print(json.dumps(res, ensure_ascii=False))
+        sys.exit(0 if res["ok"] else 1)
+
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    inputs = [Path(a) for a in argv if not a.startswith("--")]
+    if not inputs:
+        print(json.dumps({"ok": False, "error": "Uso: asistencia.py <lista.xlsx|dir ...> [--periodo=2025-2] [--emit=copy]"}))
+        sys.exit(1)
+    missing = [str(p) for p in inputs if not p.exists()]
+    if missing:
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {missing[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    periodo = (opts.get("periodo") or "").strip()
+    anio = opts.get("anio") or (periodo.split("-", 1)[0] if periodo else None)
+    anio = int(anio) if anio and anio.isdigit() else None
+    emit = opts.get("emit", "json")
+
+    if emit == "copy":
+        if not periodo:
+            print(json.dumps({"ok": False, "error": "--emit=copy requiere --periodo=AAAA-C"}))
+            sys.exit(1)
+        stats = emit_copy(inputs, periodo, anio, int(opts.get("workers", os.cpu_count() or 1)), sys.stdout.write)
+        sys.stdout.flush()
+        print(json.dumps({"ok": True, **stats}, ensure_ascii=False), file=sys.stderr)
+        return
+    if emit != "json":
+        print(json.dumps({"ok": False, "error": f"--emit inválido: {emit}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    try:
+        out = read_lista(inputs[0], anio)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(out, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
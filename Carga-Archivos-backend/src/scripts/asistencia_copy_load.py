@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga masiva de listas de asistencia a PostgreSQL desde texto COPY
+(asistencia.py --emit=copy).
+
+ingestaAsistencia.ts hace, por cada alumno de cada lista, SELECT alumno +
+SELECT/INSERT inscripcion + SELECT/INSERT alumno_grupo. Aquí el lote (p. ej.
+todas las listas del mes) entra por COPY a una tabla temporal y se resuelve con
+unas cuantas sentencias en una sola transacción, con las mismas reglas:
+
+  1. periodo por etiqueta; si no existe, error (ingestaAsistencia.ts lanza)
+  2. grupo por (periodo, materia, clave_grupo) si la lista trae clave; si no,
+     el único grupo de la materia en el periodo (con varios, ninguno); si la
+     materia no tiene ninguno, se crea uno con la clave de la primera lista del
+     lote (o GRUPO_LISTA_ASISTENCIA) y las listas siguientes lo reutilizan,
+     como pasa al procesarlas una por una en el backend
+  3. inscripcion   alumnos sin inscripción en el periodo → INSCRITO, tengan o
+                   no grupo
+  4. alumno_grupo  fuente LISTA_ASISTENCIA, solo las que faltan; archivo_id de
+                   la primera lista del lote que trae al alumno
+  5. incidencia    FALTA / JUSTIFICACION por (alumno, grupo, día), sin repetir;
+                   profesor = titular del grupo (asignacion_profesor) o --profesor-id
+
+Diferencias con AsistenciaController.process + ingestaAsistencia.ts:
+
+- archivo_id: el backend lo recibe de la ruta. Aquí sale de archivo_cargado
+  (tipo ASISTENCIA) por el nombre del .xlsx, que debe coincidir con
+  stored_name o nombre_archivo (el registro más reciente si hay varios). Las
+  listas que no estén registradas se ligan con archivo_id NULL y se reportan en
+  "archivos_sin_registro".
+- cupo: el INSERT del backend no lo manda y en init.sql es NOT NULL sin
+  default, así que ahí la creación falla. Aquí los grupos nuevos llevan
+  cupo = 0, lo mismo que horariosController.ts cuando no se indica cupo.
+- incidencia: el backend no las registra; aquí salen de las marcas por día.
+- No se tocan archivo_cargado.estado_proceso ni auditoria_cargas.
+- Avisos: conteos por lote en lugar de un mensaje por fila, y un error en
+  cualquier lista revierte el lote completo.
+
+Uso:
+  python asistencia.py listas/ --periodo=2025-2 --emit=copy > mes.copy
+  python asistencia_copy_load.py mes.copy [--dsn=postgresql://...] [--profesor-id=N]
+  ... | python asistencia_copy_load.py -
+
+Conexión: --dsn, $DATABASE_URL o las variables DB_* del backend (.env).
+Requiere psycopg (3) o psycopg2.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from asistencia import ASISTENCIA_COPY_COLUMNS
+
+STAGE = "asistencia_stage"
+
+STAGE_DDL = f"""
+CREATE TEMP TABLE {STAGE} (
+  orden          bigint GENERATED ALWAYS AS IDENTITY,
+  expediente     varchar NOT NULL,
+  materia_codigo varchar,
+  clave_grupo    varchar,
+  periodo        varchar NOT NULL,
+  archivo        varchar,
+  fila           integer,
+  fecha          date,
+  tipo           varchar,
+  alumno_id      integer,
+  periodo_id     integer,
+  archivo_id     integer,
+  grupo_id       integer
+) ON COMMIT DROP
+"""
+
+RESOLVE_SQL = [
+    # ids de alumno y periodo
+    f"""
+    UPDATE {STAGE} s
+       SET alumno_id = a.id
+      FROM public.alumno a
+     WHERE a.expediente = trim(s.expediente)
+    """,
+    f"""
+    UPDATE {STAGE} s
+       SET periodo_id = p.id
+      FROM public.periodo p
+     WHERE p.etiqueta = s.periodo
+    """,
+    # archivo_cargado del .xlsx (stored_name o nombre original; el más reciente)
+    f"""
+    UPDATE {STAGE} s
+       SET archivo_id = r.id
+      FROM (
+        SELECT x.archivo, max(ac.id) AS id
+          FROM (SELECT DISTINCT archivo FROM {STAGE}) x
+          JOIN public.archivo_cargado ac
+            ON ac.tipo = 'ASISTENCIA' AND x.archivo IN (ac.stored_name, ac.nombre_archivo)
+         GROUP BY x.archivo
+      ) r
+     WHERE r.archivo = s.archivo
+    """,
+    # 1a) grupo exacto por clave_grupo
+    f"""
+    UPDATE {STAGE} s
+       SET grupo_id = g.id
+      FROM public.grupo g
+      JOIN public.materia m ON m.id = g.materia_id
+     WHERE g.periodo_id = s.periodo_id
+       AND m.codigo = s.materia_codigo
+       AND g.clave_grupo = s.clave_grupo
+    """,
+    # 1b) si no, el único grupo de la materia en el periodo
+    f"""
+    UPDATE {STAGE} s
+       SET grupo_id = u.grupo_id
+      FROM (
+        SELECT g.periodo_id, m.codigo, min(g.id) AS grupo_id
+          FROM public.grupo g
+          JOIN public.materia m ON m.id = g.materia_id
+         GROUP BY g.periodo_id, m.codigo
+        HAVING count(*) = 1
+      ) u
+     WHERE s.grupo_id IS NULL
+       AND u.periodo_id = s.periodo_id
+       AND u.codigo = s.materia_codigo
+    """,
+]
+
+# 1c) materia sin ningún grupo en el periodo → uno solo por (periodo, materia),
+#     con la clave de la primera lista del lote; todas sus filas van a él
+CREATE_GROUPS_SQL = f"""
+WITH nuevos AS (
+  INSERT INTO public.grupo (periodo_id, materia_id, clave_grupo, cupo)
+  SELECT s.periodo_id, m.id,
+         (array_agg(COALESCE(s.clave_grupo, 'GRUPO_LISTA_ASISTENCIA') ORDER BY s.orden))[1],
+         0
+    FROM {STAGE} s
+    JOIN public.materia m ON m.codigo = s.materia_codigo
+   WHERE s.grupo_id IS NULL
+     AND NOT EXISTS (SELECT 1 FROM public.grupo g WHERE g.periodo_id = s.periodo_id AND g.materia_id = m.id)
+   GROUP BY s.periodo_id, m.id
+  RETURNING id, periodo_id, materia_id
+), asignados AS (
+  UPDATE {STAGE} s
+     SET grupo_id = n.id
+    FROM nuevos n
+    JOIN public.materia m ON m.id = n.materia_id
+   WHERE s.grupo_id IS NULL
+     AND n.periodo_id = s.periodo_id
+     AND m.codigo = s.materia_codigo
+)
+SELECT count(*) FROM nuevos
+"""
+
+MERGE_SQL = [
+    # 3) inscripción al periodo
+    f"""
+    INSERT INTO public.inscripcion (alumno_id, periodo_id, estatus)
+    SELECT DISTINCT s.alumno_id, s.periodo_id, 'INSCRITO'::estatus_inscripcion
+      FROM {STAGE} s
+     WHERE s.alumno_id IS NOT NULL AND s.periodo_id IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM public.inscripcion i
+                        WHERE i.alumno_id = s.alumno_id AND i.periodo_id = s.periodo_id)
+    """,
+    # 4) alumno_grupo; archivo_id de la primera lista que trae al alumno
+    f"""
+    INSERT INTO public.alumno_grupo (alumno_id, grupo_id, archivo_id, fuente)
+    SELECT DISTINCT ON (s.alumno_id, s.grupo_id) s.alumno_id, s.grupo_id, s.archivo_id, 'LISTA_ASISTENCIA'
+      FROM {STAGE} s
+     WHERE s.alumno_id IS NOT NULL AND s.grupo_id IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM public.alumno_grupo ag
+                        WHERE ag.alumno_id = s.alumno_id AND ag.grupo_id = s.grupo_id)
+     ORDER BY s.alumno_id, s.grupo_id, s.orden
+    """,
+    # 5) incidencias: una por (alumno, grupo, día; J gana sobre F); la que ya exista ese día se respeta
+    f"""
+    INSERT INTO public.incidencia (alumno_id, profesor_id, materia_id, grupo_id, tipo, fecha, descripcion)
+    SELECT DISTINCT ON (s.alumno_id, s.grupo_id, s.fecha)
+           s.alumno_id, COALESCE(t.profesor_id, %(profesor_id)s::int), g.materia_id, s.grupo_id,
+           s.tipo, s.fecha, 'Lista de asistencia ' || COALESCE(s.archivo, '')
+      FROM {STAGE} s
+      JOIN public.grupo g ON g.id = s.grupo_id
+      LEFT JOIN LATERAL (
+        SELECT ap.profesor_id FROM public.asignacion_profesor ap
+         WHERE ap.grupo_id = s.grupo_id
+         ORDER BY (ap.rol_docente = 'TITULAR') DESC, ap.id
+         LIMIT 1
+      ) t ON true
+     WHERE s.fecha IS NOT NULL AND s.alumno_id IS NOT NULL
+       AND COALESCE(t.profesor_id, %(profesor_id)s::int) IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM public.incidencia i
+                        WHERE i.alumno_id = s.alumno_id AND i.grupo_id = s.grupo_id
+                          AND date(i.fecha) = s.fecha)
+     ORDER BY s.alumno_id, s.grupo_id, s.fecha, s.tipo DESC
+    """,
+]
+
+REPORT_SQL = f"""
+SELECT count(*) FILTER (WHERE fecha IS NULL),
+       count(*) FILTER (WHERE fecha IS NOT NULL),
+       count(DISTINCT expediente) FILTER (WHERE alumno_id IS NULL),
+       count(*) FILTER (WHERE fecha IS NULL AND alumno_id IS NOT NULL AND grupo_id IS NULL),
+       coalesce(array_agg(DISTINCT archivo) FILTER (WHERE grupo_id IS NULL), '{{}}'),
+       coalesce(array_agg(DISTINCT archivo) FILTER (WHERE archivo_id IS NULL), '{{}}')
+  FROM {STAGE}
+"""
+
+
+def dsn_from_env() -> str:
+    if os.environ.get("DATABASE_URL"):
+        return os.environ["DATABASE_URL"]
+    parts = {
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": os.environ.get("DB_PORT", "5432"),
+        "dbname": os.environ.get("DB_DATABASE", "sga_pds2"),
+        "user": os.environ.get("DB_USERNAME", "postgres"),
+        "password": os.environ.get("DB_PASSWORD", ""),
+    }
+    if os.environ.get("DB_SSL", "").lower() == "true":
+        parts["sslmode"] = "require"
+    return " ".join(f"{k}={v}" for k, v in parts.items() if v)
+
+
+def connect(dsn: str):
+    try:
+        import psycopg
+        return psycopg.connect(dsn), "psycopg"
+    except ImportError:
+        pass
+    try:
+        import psycopg2
+        return psycopg2.connect(dsn), "psycopg2"
+    except ImportError as e:
+        raise SystemExit("Instala psycopg: pip install 'psycopg[binary]'") from e
+
+
+def copy_into_stage(cur, driver: str, stream) -> None:
+    cols = ", ".join(ASISTENCIA_COPY_COLUMNS)
+    sql = f"COPY {STAGE} ({cols}) FROM STDIN"
+    if driver == "psycopg":
+        with cur.copy(sql) as cp:
+            for block in iter(lambda: stream.read(1 << 16), ""):
+                cp.write(block)
+    else:
+        cur.copy_expert(sql, stream)
+
+
+def load_copy(stream, dsn: str, profesor_id: int | None = None) -> dict:
+    """Carga un flujo de texto COPY completo en una transacción."""
+    conn, driver = connect(dsn)
+    params = {"profesor_id": profesor_id}
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute(STAGE_DDL)
+            copy_into_stage(cur, driver, stream)
+            for sql in RESOLVE_SQL:
+                cur.execute(sql)
+            cur.execute(f"SELECT DISTINCT periodo FROM {STAGE} WHERE periodo_id IS NULL")
+            faltan = [r[0] for r in cur.fetchall()]
+            if faltan:
+                raise ValueError(f'No se encontró periodo con etiqueta "{faltan[0]}"')
+            cur.execute(CREATE_GROUPS_SQL)
+            grupos_creados = cur.fetchone()[0]
+            counts = []
+            for sql in MERGE_SQL:
+                cur.execute(sql, params if "%(" in sql else None)
+                counts.append(cur.rowcount)
+            cur.execute(REPORT_SQL)
+            filas, marcas, sin_alumno, sin_grupo, archivos_sin_grupo, sin_registro = cur.fetchone()
+        return {
+            "ok": True,
+            "filas_alumno": filas,
+            "filas_incidencia": marcas,
+            "grupos_creados": grupos_creados,
+            "inscripciones_creadas": counts[0],
+            "alumnos_vinculados": counts[1],
+            "incidencias": counts[2],
+            "expedientes_sin_alumno": sin_alumno,
+            "alumnos_sin_grupo": sin_grupo,
+            "archivos_sin_grupo": list(archivos_sin_grupo or []),
+            "archivos_sin_registro": list(sin_registro or []),
+        }
+    finally:
+        conn.close()
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    dsn = opts.get("dsn") or dsn_from_env()
+    profesor_id = int(opts["profesor-id"]) if opts.get("profesor-id") else None
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: asistencia_copy_load.py <lote.copy|-> [--dsn=...] [--profesor-id=N]"}))
+        sys.exit(1)
+
+    src = args[0]
+    try:
+        if src == "-":
+            out = load_copy(sys.stdin, dsn, profesor_id)
+        else:
+            path = Path(src)
+            if not path.exists():
+                print(json.dumps({"ok": False, "error": f"No existe el archivo: {path}"}, ensure_ascii=False))
+                sys.exit(1)
+            with open(path, encoding="utf-8") as f:
+                out = load_copy(f, dsn, profesor_id)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(out, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
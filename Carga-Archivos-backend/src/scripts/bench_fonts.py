@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ahorro por documento de la caché de fuentes entre documentos (font_cache.py).
+
+Simula un worker del servicio: en un mismo proceso parsea los PDFs dados
+`--runs` veces sin la caché y luego `--runs` veces con ella (cada fase con una
+vuelta de calentamiento que no se mide, igual que un worker ya caliente).
+
+Sin PDFs genera el juego sintético de referencia (el mismo tipo de PDF que usa
+tests/test_font_cache.py): --docs kárdex con tres subconjuntos TrueType
+incrustados, tomados de las fuentes .ttf del sistema (o --ttf=a.ttf,b.ttf),
+en un directorio temporal que se borra al terminar.
+
+Uso:
+  python bench_fonts.py [<pdf> ...] [--tipo=kardex|plan] [--runs=20]
+                        [--docs=5] [--ttf=<fuente.ttf>[,...]] [--seed=0]
+
+Salida: JSON con la mediana de ms por documento en cada fase, el ahorro, si la
+salida del parser es idéntica con y sin caché, y los aciertos de la caché.
+"""
+
+import glob
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import font_cache
+
+TTF_PATTERNS = ("/usr/share/fonts/**/*.ttf", "/usr/local/share/fonts/**/*.ttf", "/root/**/fonts/*.ttf")
+
+
+def find_ttfs(n: int = 3) -> list:
+    """Hasta `n` fuentes TrueType del sistema (orden estable), o [] si no hay."""
+    for pattern in TTF_PATTERNS:
+        found = sorted(glob.glob(pattern, recursive=True))
+        if found:
+            return found[:n]
+    return []
+
+
+def synthetic_kardex(path: Path, ttfs: list, expediente: int, materias: int = 40, seed: int = 0) -> Path:
+    """Kárdex de prueba con encabezado y materias, cada bloque en una fuente TrueType incrustada."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    names = []
+    for ttf in ttfs:
+        name = f"Bench-{Path(ttf).stem}"
+        if name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(name, ttf))
+        names.append(name)
+    head, sub, body = (names * 3)[:3]
+    rnd = random.Random(seed)
+    c = canvas.Canvas(str(path))
+    c.setFont(head, 10)
+    c.drawString(40, 800, "UNIVERSIDAD DE SONORA KARDEX ELECTRÓNICO  Fecha: 12/08/2025 10:31")
+    c.drawString(40, 786, f"EXPEDIENTE: {expediente} NOMBRE DE PRUEBA GARCÍA")
+    c.setFont(sub, 10)
+    c.drawString(40, 772, "PROGRAMA: INGENIERÍA EN SISTEMAS DE INFORMACIÓN  PLAN: 2182")
+    c.setFont(body, 8)
+    y = 752
+    for i in range(materias):
+        if y < 60:
+            c.showPage()
+            c.setFont(body, 8)
+            y = 800
+        c.drawString(40, y, f"{rnd.randint(4, 9):02d} {6800 + i} MATERIA NÚMERO {i} O A "
+                            f"{rnd.randint(70, 100):03d} 2231 01 00 00")
+        y -= 12
+    c.save()
+    return path
+
+
+def parser_for(tipo: str):
+    if tipo == "kardex":
+        import kardex
+
+        return lambda p: kardex.parse_kardex(str(p), schema="all")
+    import plan_estudio
+
+    return lambda p: plan_estudio.parse_plan(str(p), backend="plumber")
+
+
+def phase(parse, pdfs: list, runs: int) -> tuple:
+    """(ms por documento, salidas de la vuelta de calentamiento)."""
+    outs = [parse(p) for p in pdfs]  # calentamiento
+    ms = []
+    for _ in range(runs):
+        for p in pdfs:
+            t0 = time.perf_counter()
+            parse(p)
+            ms.append((time.perf_counter() - t0) * 1000)
+    return ms, outs
+
+
+def main() -> None:
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    pdfs = [Path(a) for a in sys.argv[1:] if not a.startswith("--")]
+    tipo = opts.get("tipo", "kardex")
+    runs = int(opts.get("runs", 20))
+    if tipo not in ("kardex", "plan") or (not pdfs and tipo != "kardex"):
+        print(json.dumps({"ok": False, "error": "Uso: bench_fonts.py [<pdf> ...] [--tipo=kardex|plan] [--runs=20]"}))
+        sys.exit(1)
+    missing = [str(p) for p in pdfs if not p.exists()]
+    if missing:
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {missing[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+    if pdfs:
+        return run(pdfs, tipo, runs, fixture=None)
+
+    ttfs = opts["ttf"].split(",") if opts.get("ttf") else find_ttfs()
+    if not ttfs:
+        print(json.dumps({"ok": False, "error": "Sin fuentes .ttf en el sistema: usa --ttf=<fuente.ttf> o pasa PDFs"}))
+        sys.exit(1)
+    seed = int(opts.get("seed", 0))
+    with tempfile.TemporaryDirectory(prefix="bench-fonts-") as tmp:
+        pdfs = [synthetic_kardex(Path(tmp) / f"k{i}.pdf", ttfs, 222200000 + i, seed=seed + i)
+                for i in range(int(opts.get("docs", 5)))]
+        run(pdfs, tipo, runs, fixture={"ttf": [Path(t).name for t in ttfs], "seed": seed})
+
+
+def run(pdfs: list, tipo: str, runs: int, fixture: dict | None) -> None:
+    parse = parser_for(tipo)
+    sin, sin_outs = phase(parse, pdfs, runs)
+    if not font_cache.install():
+        print(json.dumps({"ok": False, "error": "pdfminer no está instalado"}))
+        sys.exit(1)
+    con, con_outs = phase(parse, pdfs, runs)
+
+    sin_ms, con_ms = statistics.median(sin), statistics.median(con)
+    print(json.dumps({
+        "ok": True,
+        "tipo": tipo,
+        "documentos": len(pdfs),
+        "runs": runs,
+        "sin_cache_ms": round(sin_ms, 2),
+        "con_cache_ms": round(con_ms, 2),
+        "ahorro_ms_por_documento": round(sin_ms - con_ms, 2),
+        "ahorro_pct": round(100 * (sin_ms - con_ms) / sin_ms, 1) if sin_ms else None,
+        "misma_salida": sin_outs == con_outs,
+        "font_cache": font_cache.stats(),
+        **({"sintetico": fixture} if fixture else {}),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
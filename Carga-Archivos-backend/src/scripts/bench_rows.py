@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memoria de N kárdex / planes parseados retenidos a la vez (modo lote / cohorte).
+
+Compara las representaciones de una materia con las mismas filas:
+  dict     un dict por materia con cadenas nuevas por fila (lo que armaban los
+           parsers antes: cr/codigo/nombre/.../periodo)
+  slots    KardexRow de kardex_core (slots, texto internado, CIC entero)
+  materia  Materia de Alumnos-backend/src/scripts/kardex.py (la fila que
+           retiene el lote de Alumnos: KardexRow → to_alumnos_row → Materia)
+y, para los planes de estudio, el dict por materia contra PlanMateria de
+plan_estudio.py.
+
+Las filas de kárdex son sintéticas pero con la forma del kárdex (CR CVE NOMBRE
+E1 E2 ORD CIC I R B), un catálogo de --catalogo materias y 10 ciclos, y pasan
+por row_from_tokens igual que las del PDF. Los planes toman --malla materias
+del mismo catálogo (código, nombre, créditos, tipo, semestre, requisitos). El
+tiempo se toma en una pasada aparte; la memoria con tracemalloc (solo
+asignaciones de Python), total y bytes por materia.
+
+Uso:
+  python bench_rows.py [--kardex=10000] [--materias=45] [--catalogo=400]
+                       [--planes=2000] [--malla=60] [--seed=1]
+
+Salida: JSON con MB, bytes/materia y segundos de cada representación.
+"""
+
+import gc
+import importlib.util
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from kardex_core import cic_to_period_label, parse_grade, parse_int_or_none, row_from_tokens
+from plan_estudio import PlanMateria
+
+# kardex.py de Alumnos choca de nombre con el kardex.py de aquí: se carga por ruta
+ALUMNOS_KARDEX = Path(__file__).resolve().parents[3] / "Alumnos-backend" / "src" / "scripts" / "kardex.py"
+
+CICLOS = ("2192", "2201", "2202", "2211", "2212", "2221", "2222", "2231", "2232", "2241")
+PALABRAS = ("PROGRAMACIÓN", "ESTRUCTURAS", "DE", "DATOS", "BASES", "SISTEMAS", "REDES", "CÁLCULO",
+            "DIFERENCIAL", "INTEGRAL", "ÁLGEBRA", "LINEAL", "INGENIERÍA", "SOFTWARE", "ANÁLISIS", "I", "II")
+
+
+def synthetic_catalog(n_catalogo: int, rnd: random.Random) -> list:
+    return [
+        (f"{rnd.randint(2, 12):02d}", str(6000 + i), " ".join(rnd.sample(PALABRAS, rnd.randint(2, 5))))
+        for i in range(n_catalogo)
+    ]
+
+
+def synthetic_lines(n_kardex: int, n_materias: int, n_catalogo: int, seed: int):
+    """Por kárdex, la lista de líneas de materia (texto como lo deja el PDF)."""
+    rnd = random.Random(seed)
+    catalogo = synthetic_catalog(n_catalogo, rnd)
+    for _ in range(n_kardex):
+        lines = []
+        for cr, cve, nombre in rnd.sample(catalogo, n_materias):
+            grade = f"{rnd.randint(40, 100):03d}"
+            lines.append(f"{cr} {cve} {nombre} O A {grade} {rnd.choice(CICLOS)} 01 00 00")
+        yield lines
+
+
+def synthetic_plans(n_planes: int, n_malla: int, n_catalogo: int, seed: int):
+    """Por plan, las materias de la malla como "codigo|nombre|creditos|tipo|semestre|requisitos"."""
+    rnd = random.Random(seed)
+    catalogo = synthetic_catalog(n_catalogo, rnd)
+    for _ in range(n_planes):
+        lines = []
+        for i, (cr, cve, nombre) in enumerate(rnd.sample(catalogo, n_malla)):
+            requisitos = ",".join(c for _, c, _ in rnd.sample(catalogo, rnd.randint(0, 2)))
+            lines.append(f"{cve}|{nombre}|{int(cr)}|{rnd.choice(('OBL', 'OBL', 'OPT'))}|{i // 7 + 1}|{requisitos}")
+        yield lines
+
+
+def dict_row(line: str) -> dict | None:
+    """Representación anterior: dict por materia, cadenas propias de la fila."""
+    tokens = line.split()
+    if row_from_tokens(tokens) is None:  # mismas validaciones que el parser
+        return None
+    return {
+        "cr": int(tokens[0]),
+        "codigo": tokens[1],
+        "nombre": " ".join(tokens[2:-7]),
+        "e1": tokens[-7],
+        "e2": tokens[-6],
+        "ord": parse_grade(tokens[-5]),
+        "reg": None,
+        "cic": tokens[-4],
+        "inscripciones": parse_int_or_none(tokens[-3]),
+        "reprobaciones": parse_int_or_none(tokens[-2]),
+        "bajas": parse_int_or_none(tokens[-1]),
+        "periodo": cic_to_period_label(tokens[-4]),
+    }
+
+
+def slots_row(line: str):
+    return row_from_tokens(line.split())
+
+
+def materia_row(materia_cls):
+    """Materia de Alumnos: la KardexRow intermedia no se retiene."""
+    def build(line: str):
+        r = row_from_tokens(line.split())
+        return None if r is None else materia_cls.from_row(r)
+    return build
+
+
+def plan_fields(line: str) -> tuple:
+    codigo, nombre, creditos, tipo, semestre, requisitos = line.split("|")
+    return codigo, nombre, int(creditos), tipo, int(semestre), requisitos.split(",") if requisitos else []
+
+
+def dict_plan_row(line: str) -> dict:
+    codigo, nombre, creditos, tipo, semestre, requisitos = plan_fields(line)
+    return {"codigo": codigo, "nombre": nombre, "creditos": creditos, "tipo": tipo,
+            "semestre": semestre, "requisitos": requisitos, "creditos_requisito": None}
+
+
+def plan_row(line: str) -> PlanMateria:
+    return PlanMateria(*plan_fields(line))
+
+
+def load_materia():
+    spec = importlib.util.spec_from_file_location("alumnos_kardex", ALUMNOS_KARDEX)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Materia
+
+
+def ahorro(res: dict, base: dict):
+    return round(100 * (1 - res["mb"] / base["mb"]), 1) if base["mb"] else None
+
+
+def measure(build, corpus) -> dict:
+    """Tiempo sin tracemalloc (su costo por asignación lo distorsiona) y luego memoria."""
+    gc.collect()
+    t0 = time.perf_counter()
+    held = [[build(line) for line in lines] for lines in corpus]
+    seconds = time.perf_counter() - t0
+    del held
+    gc.collect()
+    tracemalloc.start()
+    held = [[build(line) for line in lines] for lines in corpus]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = sum(len(k) for k in held)
+    del held
+    return {"mb": round(current / 2**20, 1), "bytes_por_materia": round(current / n), "segundos": round(seconds, 2)}
+
+
+def main() -> None:
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    n_kardex = int(opts.get("kardex", 10000))
+    n_materias = int(opts.get("materias", 45))
+    n_catalogo = int(opts.get("catalogo", 400))
+    n_planes = int(opts.get("planes", 2000))
+    n_malla = int(opts.get("malla", 60))
+    seed = int(opts.get("seed", 1))
+    if max(n_materias, n_malla) > n_catalogo:
+        print(json.dumps({"ok": False, "error": "--materias y --malla no pueden ser mayores que --catalogo"}))
+        sys.exit(1)
+
+    corpus = list(synthetic_lines(n_kardex, n_materias, n_catalogo, seed))
+    # slots primero: así las cadenas internadas cuentan para slots y no para dict
+    res_slots = measure(slots_row, corpus)
+    res_materia = measure(materia_row(load_materia()), corpus)
+    res_dict = measure(dict_row, corpus)
+    del corpus
+
+    planes = list(synthetic_plans(n_planes, n_malla, n_catalogo, seed))
+    res_plan_slots = measure(plan_row, planes)
+    res_plan_dict = measure(dict_plan_row, planes)
+    print(json.dumps({
+        "ok": True,
+        "kardex": n_kardex,
+        "materias": n_kardex * n_materias,
+        "dict": res_dict,
+        "slots": res_slots,
+        "materia": res_materia,
+        "ahorro_pct": ahorro(res_slots, res_dict),
+        "ahorro_materia_pct": ahorro(res_materia, res_dict),
+        "plan": {
+            "planes": n_planes,
+            "materias": n_planes * n_malla,
+            "dict": res_plan_dict,
+            "slots": res_plan_slots,
+            "ahorro_pct": ahorro(res_plan_slots, res_plan_dict),
+        },
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
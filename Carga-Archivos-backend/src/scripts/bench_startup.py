@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de arranque de los parsers (un proceso por petición).
+
+Corre cada script con `python -X importtime <script> --version`, suma el tiempo
+acumulado de los imports de primer nivel y falla (exit 1) si:
+  - se pasa del presupuesto (ms), o
+  - se importó alguna dependencia pesada (pandas, pdfplumber, tabula, ...),
+    que solo deben cargarse al primer uso.
+
+Uso:
+  python bench_startup.py [script.py ...] [--budget-ms=80] [--runs=5]
+
+Sin scripts, mide kardex.py y plan_estudio.py de esta carpeta.
+Salida: JSON con la mediana por script.
+"""
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_SCRIPTS = [HERE / "kardex.py", HERE / "plan_estudio.py"]
+HEAVY = ("pandas", "numpy", "pdfplumber", "pdfminer", "tabula", "camelot", "PyPDF2", "ftfy")
+
+# "import time:  self [us] | cumulative | imported package"
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(script: Path) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script), "--version"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    total_us = 0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if indent <= 1:  # primer nivel: el acumulado ya incluye a sus hijos
+            total_us += cumulative
+        root = name.split(".")[0]
+        if root in HEAVY:
+            heavy.add(root)
+    return {"ms": total_us / 1000, "heavy": sorted(heavy), "exit": proc.returncode}
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    budget_ms = float(opts.get("budget-ms", os.environ.get("PARSER_IMPORT_BUDGET_MS", 80)))
+    runs = int(opts.get("runs", 5))
+    scripts = [Path(a) for a in args] or DEFAULT_SCRIPTS
+
+    report, ok = {}, True
+    for script in scripts:
+        samples = [measure(script) for _ in range(runs)]
+        med = statistics.median(s["ms"] for s in samples)
+        heavy = sorted({h for s in samples for h in s["heavy"]})
+        failed = any(s["exit"] != 0 for s in samples)
+        passed = med <= budget_ms and not heavy and not failed
+        ok = ok and passed
+        report[str(script)] = {
+            "import_ms_median": round(med, 2),
+            "heavy_imported": heavy,
+            "ok": passed,
+        }
+
+    print(json.dumps({"ok": ok, "budget_ms": budget_ms, "runs": runs, "scripts": report}, ensure_ascii=False))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de fuentes de pdfminer entre documentos (workers de larga vida).
+
+Todos los kárdex y planes de UniSon traen las mismas pocas fuentes con sus
+ToUnicode, pero pdfplumber crea un PDFResourceManager por documento y su caché
+es por número de objeto: cada PDF vuelve a decodificar fuentes (programa de la
+fuente, anchos) y a parsear sus CMaps antes de sacar la primera línea de texto.
+
+install() envuelve PDFResourceManager.get_font para que, en todo el proceso,
+las tablas ya decodificadas de una fuente (anchos, codificación, ToUnicode,
+CMap) se reutilicen entre documentos. La llave es la huella del diccionario de
+la fuente, no su número de objeto:
+
+  - valores del diccionario y de su FontDescriptor / DescendantFonts;
+  - streams (ToUnicode, FontFile*, CIDToGIDMap) por SHA-256 de sus bytes
+    crudos, sin decodificarlos; el prefijo de subconjunto "ABCDEF+" se ignora
+    porque cambia en cada impresión aunque el programa sea el mismo.
+
+Fuera de caché: Type3 (sus glifos son contenido con recursos propios) y
+cualquier fuente cuya huella no se pueda calcular; esas van por el camino
+normal de pdfminer.
+
+Lo que se guarda no es el PDFFont del documento sino una copia desligada
+(detached()): sin `descriptor`, `fontfile` ni `cidsysteminfo`, que guardan
+PDFObjRef / PDFStream y con ellos el documento, su parser y el buffer (o mmap)
+del archivo. Después de construir la fuente pdfminer solo usa las tablas, así
+que la copia decodifica igual. Si queda alguna otra referencia al documento la
+fuente no se cachea (cuenta como `skipped`).
+
+LRU acotado ($PARSER_FONT_CACHE_SIZE, 256 por defecto); como no retiene
+documentos, el tamaño solo cuesta las tablas.
+
+Solo tiene sentido en procesos que parsean muchos documentos: parser_service.py
+lo instala en cada worker. Un `python kardex.py archivo.pdf` suelto no lo usa.
+"""
+
+import copy
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+SUBSET_RE = re.compile(rb"^/?[A-Z]{6}\+")
+
+_lock = threading.Lock()
+_fonts: OrderedDict = OrderedDict()
+_max = int(os.environ.get("PARSER_FONT_CACHE_SIZE", 256))
+_stats = {"hits": 0, "misses": 0, "skipped": 0}
+_installed = False
+
+
+class _Unhashable(Exception):
+    pass
+
+
+def _digest(h, obj, depth: int = 0) -> None:
+    """Serializa `obj` en `h` sin números de objeto; streams por sus bytes crudos."""
+    from pdfminer.pdftypes import PDFStream, resolve1
+
+    if depth > 6:
+        raise _Unhashable()
+    obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        h.update(b"S(")
+        _digest(h, {k: v for k, v in obj.attrs.items() if k != "Length"}, depth + 1)
+        raw = obj.get_rawdata() if hasattr(obj, "get_rawdata") else None
+        h.update(hashlib.sha256(raw if raw is not None else obj.get_data()).digest())
+        h.update(b")")
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=str):
+            h.update(str(k).encode("utf-8") + b":")
+            _digest(h, obj[k], depth + 1)
+            h.update(b",")
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for v in obj:
+            _digest(h, v, depth + 1)
+            h.update(b",")
+        h.update(b"]")
+    elif hasattr(obj, "name"):  # PSLiteral / PSKeyword
+        name = obj.name if isinstance(obj.name, bytes) else str(obj.name).encode("utf-8")
+        h.update(b"/" + SUBSET_RE.sub(b"", name))
+    elif isinstance(obj, (bytes, bytearray)):
+        h.update(b"b" + bytes(obj))
+    elif obj is None or isinstance(obj, (bool, int, float, str)):
+        h.update(repr(obj).encode("utf-8"))
+    else:
+        raise _Unhashable()
+
+
+def font_key(spec) -> str | None:
+    """Huella del diccionario de fuente, o None si no se debe/puede cachear."""
+    from pdfminer.pdftypes import resolve1
+
+    try:
+        spec = resolve1(spec)
+        if not isinstance(spec, dict):
+            return None
+        if getattr(resolve1(spec.get("Subtype")), "name", None) == "Type3":
+            return None
+        h = hashlib.sha256()
+        _digest(h, spec)
+        return h.hexdigest()
+    except Exception:
+        return None
+
+
+# Atributos de PDFFont que apuntan al documento y no se usan al decodificar
+DOC_ATTRS = ("descriptor", "fontfile", "cidsysteminfo")
+
+
+def _holds_doc(obj, depth: int = 0) -> bool:
+    """¿`obj` (valores, listas, dicts) guarda un PDFObjRef o PDFStream?"""
+    from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+    if isinstance(obj, (PDFObjRef, PDFStream)):
+        return True
+    if depth > 4:
+        return False
+    if isinstance(obj, dict):
+        return any(_holds_doc(v, depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return any(_holds_doc(v, depth + 1) for v in obj)
+    return False
+
+
+def detached(font):
+    """Copia de `font` solo con sus tablas decodificadas; None si aún apunta al documento."""
+    out = copy.copy(font)
+    for attr in DOC_ATTRS:
+        if attr in vars(out):
+            setattr(out, attr, {} if attr != "fontfile" else None)
+    if any(_holds_doc(v) for v in vars(out).values()):
+        return None
+    return out
+
+
+def install() -> bool:
+    """Activa la caché en este proceso (idempotente). False si pdfminer no está."""
+    global _installed
+    if _installed:
+        return True
+    try:
+        from pdfminer.pdfinterp import PDFResourceManager
+    except Exception:
+        return False
+
+    original = PDFResourceManager.get_font
+
+    def get_font(self, objid, spec):
+        per_doc = getattr(self, "_cached_fonts", None)
+        if objid and per_doc is not None and objid in per_doc:
+            return per_doc[objid]
+        key = font_key(spec)
+        if key is None:
+            with _lock:
+                _stats["skipped"] += 1
+            return original(self, objid, spec)
+        with _lock:
+            font = _fonts.get(key)
+            if font is not None:
+                _fonts.move_to_end(key)
+                _stats["hits"] += 1
+        if font is None:
+            built = original(self, objid, spec)
+            font = detached(built)
+            with _lock:
+                if font is None:
+                    _stats["skipped"] += 1
+                else:
+                    _stats["misses"] += 1
+                    _fonts[key] = font
+                    while len(_fonts) > _max:
+                        _fonts.popitem(last=False)
+            if font is None:
+                font = built
+        if objid and per_doc is not None:
+            per_doc[objid] = font
+        return font
+
+    PDFResourceManager.get_font = get_font
+    _installed = True
+    return True
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "size": len(_fonts), "max": _max, "installed": _installed}
+
+
+def clear() -> None:
+    with _lock:
+        _fonts.clear()
+        for k in _stats:
+            _stats[k] = 0
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Choques de horario (aula / profesor / grupo) sobre el formato normalizado de
+parseHorarios.ts, con índices de intervalos por día (sin dependencias).
+
+ingestaHorarios.ts mezcla ISI + Prelistas y escribe cada slot sin revisar
+traslapes; compararlos por pares sería O(n²) para todo el semestre. Aquí:
+
+1) Cada slot se vuelve un intervalo [inicio, fin) en minutos y se indexa por
+   (dimensión, recurso, día): aula, profesor (noEmpleado o, si no viene, el
+   nombre) y grupo (nrc, o materia + grupo). Slots idénticos de la misma clase
+   (la misma fila en ISI y en Prelistas) se cuentan una vez.
+2) Cada lista se ordena por inicio y se barre con un heap de fines activos:
+   al entrar un intervalo salen los que ya terminaron y los que quedan se
+   traslapan con él. O(n log n + choques). 11:00-12:00 y 12:00-13:00 no chocan,
+   ni la misma materia a la misma hora en aula/profesor (secciones juntas, o
+   la misma clase vista en ISI y en Prelistas).
+3) ScheduleIndex.overlapping() responde "¿qué ocupa esta aula/profesor/grupo
+   en este horario?" con bisect, para revisar un slot nuevo sin barrer todo.
+
+Entrada (JSON, NDJSON o '-' para stdin), cualquiera de:
+  - lista de NormalizedHorario {nombreMateria, grupo, nrc, profesor,
+    noEmpleado, aula, slots: [{dia, horaInicio, horaFin}]}
+  - el payload de ingestaHorarios {fromISI: [...], fromPrelistas: [...]}
+  - slots planos {dia, horaInicio, horaFin, aula, noEmpleado, grupo, ...}
+
+Uso:
+  python horario_conflicts.py horarios.json [--solo=aula,profesor] [--max-detalle=500]
+
+Salida: {ok, slots, conflictos: {aula, profesor, grupo}, detalle: [...], ms}
+"""
+
+import heapq
+import json
+import re
+import sys
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+DIMENSIONES = ("aula", "profesor", "grupo")
+DIAS = ("LUN", "MAR", "MIE", "JUE", "VIE", "SAB")
+HORA_RE = re.compile(r"^(\d{1,2}):(\d{2})")
+SIN_AULA = {"", "S/A", "SA", "N/A", "NA"}
+
+
+def minutos(h) -> int | None:
+    m = HORA_RE.match(str(h or "").strip())
+    return int(m.group(1)) * 60 + int(m.group(2)) if m else None
+
+
+def hhmm(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def norm(s) -> str:
+    return re.sub(r"\s+", " ", str(s or "")).strip().upper()
+
+
+class Slot:
+    __slots__ = ("dia", "ini", "fin", "aula", "profesor", "grupo", "materia", "ref")
+
+    def __init__(self, dia, ini, fin, aula, profesor, grupo, materia, ref):
+        self.dia = dia
+        self.ini = ini
+        self.fin = fin
+        self.aula = aula
+        self.profesor = profesor
+        self.grupo = grupo
+        self.materia = materia
+        self.ref = ref
+
+    def to_dict(self) -> dict:
+        return {
+            "materia": self.materia,
+            "grupo": self.grupo,
+            "aula": self.aula,
+            "profesor": self.profesor,
+            "horario": f"{hhmm(self.ini)}-{hhmm(self.fin)}",
+            "fila": self.ref,
+        }
+
+
+# ============================================================
+# 1) ENTRADA → SLOTS
+# ============================================================
+def recursos(r: dict) -> tuple:
+    """(aula, profesor, grupo) de una fila normalizada; None si no se conoce."""
+    aula = re.sub(r"[\s-]+", "", norm(r.get("aula")))  # "5G-101" == "5G 101"
+    aula = None if aula in SIN_AULA else aula
+    profesor = str(r.get("noEmpleado") or "").strip() or norm(r.get("profesor")) or None
+    materia = norm(r.get("claveMateria") or r.get("codigoMateria") or r.get("nombreMateria"))
+    if r.get("nrc"):
+        grupo = f"NRC {str(r['nrc']).strip()}"
+    elif r.get("grupo"):
+        grupo = f"{materia} / {norm(r['grupo'])}"
+    else:
+        grupo = None  # ISI no trae grupo: no se puede saber si dos filas son la misma clase
+    return aula, profesor, grupo
+
+
+def iter_rows(data):
+    """Cualquier forma de entrada → filas con `slots` (las planas se envuelven)."""
+    if isinstance(data, dict) and ("fromISI" in data or "fromPrelistas" in data):
+        yield from data.get("fromPrelistas") or []
+        yield from data.get("fromISI") or []
+        return
+    for r in data if isinstance(data, list) else [data]:
+        if "slots" in r:
+            yield r
+        else:
+            yield {**r, "slots": [{k: r.get(k) for k in ("dia", "horaInicio", "horaFin")}]}
+
+
+def build_slots(data) -> tuple:
+    """(slots, descartados). Repetidos exactos (misma clase y horario) se quitan."""
+    slots, seen, descartados = [], set(), 0
+    for i, r in enumerate(iter_rows(data)):
+        aula, profesor, grupo = recursos(r)
+        materia = norm(r.get("nombreMateria")) or None
+        for s in r.get("slots") or []:
+            dia = norm(s.get("dia"))[:3]
+            ini, fin = minutos(s.get("horaInicio")), minutos(s.get("horaFin"))
+            if dia not in DIAS or ini is None or fin is None or fin <= ini:
+                descartados += 1
+                continue
+            key = (dia, ini, fin, aula, profesor, grupo or materia)
+            if key in seen:
+                continue
+            seen.add(key)
+            slots.append(Slot(dia, ini, fin, aula, profesor, grupo, materia, i))
+    return slots, descartados
+
+
+# ============================================================
+# 2) ÍNDICE Y BARRIDO
+# ============================================================
+class ScheduleIndex:
+    """Intervalos ordenados por inicio para cada (dimensión, recurso, día)."""
+
+    def __init__(self, slots: list, dimensiones=DIMENSIONES):
+        self.dimensiones = tuple(dimensiones)
+        buckets: dict = {}
+        for s in slots:
+            for dim in self.dimensiones:
+                recurso = getattr(s, dim)
+                if recurso:
+                    buckets.setdefault((dim, recurso, s.dia), []).append(s)
+        self.lists = {}
+        for key, lst in buckets.items():
+            lst.sort(key=lambda s: (s.ini, s.fin))
+            # inicios para bisect y la duración máxima acota hacia atrás la búsqueda
+            self.lists[key] = (lst, [s.ini for s in lst], max(s.fin - s.ini for s in lst))
+
+    def overlapping(self, dim: str, recurso: str, dia: str, ini: int, fin: int) -> list:
+        """Slots de ese recurso y día que se traslapan con [ini, fin)."""
+        entry = self.lists.get((dim, recurso, dia))
+        if entry is None:
+            return []
+        lst, starts, max_dur = entry
+        lo = bisect_left(starts, ini - max_dur + 1)
+        hi = bisect_left(starts, fin)
+        return [s for s in lst[lo:hi] if s.fin > ini]
+
+    def conflicts(self):
+        """(dimensión, recurso, día, a, b) por cada par traslapado."""
+        for (dim, recurso, dia), (lst, _, _) in self.lists.items():
+            if len(lst) < 2:
+                continue
+            active = []  # heap (fin, n, slot)
+            for n, s in enumerate(lst):
+                while active and active[0][0] <= s.ini:
+                    heapq.heappop(active)
+                for _, _, a in active:
+                    if not same_class(dim, a, s):
+                        yield dim, recurso, dia, a, s
+                heapq.heappush(active, (s.fin, n, s))
+
+
+def same_class(dim: str, a: Slot, b: Slot) -> bool:
+    """
+    En aula y profesor, misma materia a la misma hora es la misma clase:
+    secciones que se imparten juntas, o la fila de ISI (sin grupo, profesor por
+    nombre) y la de Prelistas (NRC, noEmpleado). En grupo siempre es choque.
+    """
+    if dim == "grupo":
+        return False
+    return a.materia == b.materia and a.ini == b.ini and a.fin == b.fin
+
+
+def detect(data, dimensiones=DIMENSIONES, max_detalle: int | None = 500) -> dict:
+    t0 = time.perf_counter()
+    slots, descartados = build_slots(data)
+    index = ScheduleIndex(slots, dimensiones)
+    counts = dict.fromkeys(index.dimensiones, 0)
+    detalle = []
+    for dim, recurso, dia, a, b in index.conflicts():
+        counts[dim] += 1
+        if max_detalle is None or len(detalle) < max_detalle:
+            detalle.append({
+                "tipo": dim,
+                "recurso": recurso,
+                "dia": dia,
+                "traslape": f"{hhmm(max(a.ini, b.ini))}-{hhmm(min(a.fin, b.fin))}",
+                "a": a.to_dict(),
+                "b": b.to_dict(),
+            })
+    return {
+        "ok": True,
+        "slots": len(slots),
+        "descartados": descartados,
+        "conflictos": counts,
+        "detalle": detalle,
+        "detalle_truncado": sum(counts.values()) > len(detalle),
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+
+
+# ============================================================
+# 3) CLI
+# ============================================================
+def load_input(src: str):
+    text = sys.stdin.read() if src == "-" else Path(src).read_text(encoding="utf-8")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def selftest() -> dict:
+    data = [
+        {"nombreMateria": "A", "nrc": "1", "aula": "5G-101", "noEmpleado": "10",
+         "slots": [{"dia": "LUN", "horaInicio": "11:00", "horaFin": "12:00"}]},
+        {"nombreMateria": "B", "nrc": "2", "aula": "5G 101", "noEmpleado": "20",
+         "slots": [{"dia": "LUN", "horaInicio": "11:30", "horaFin": "13:00"}]},
+        {"nombreMateria": "C", "nrc": "3", "aula": "5G-102", "noEmpleado": "10",
+         "slots": [{"dia": "LUN", "horaInicio": "12:00", "horaFin": "13:00"}]},
+    ]
+    res = detect(data)
+    slots, _ = build_slots(data)
+    idx = ScheduleIndex(slots)
+    checks = {
+        "aula": res["conflictos"]["aula"] == 1,
+        "profesor_contiguo": res["conflictos"]["profesor"] == 0,
+        "overlapping": [s.materia for s in idx.overlapping("aula", "5G101", "LUN", 720, 780)] == ["B"],
+    }
+    return {"ok": all(checks.values()), "checks": checks}
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if "--selftest" in argv:
+        res = selftest()
+        print(json.dumps(res, ensure_ascii=False))
+        sys.exit(0 if res["ok"] else 1)
+
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    args = [a for a in argv if not a.startswith("--")]
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: horario_conflicts.py <horarios.json|-> [--solo=aula,profesor,grupo]"}))
+        sys.exit(1)
+    if args[0] != "-" and not Path(args[0]).exists():
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {args[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+    dims = tuple(d for d in (opts.get("solo") or ",".join(DIMENSIONES)).split(",") if d)
+    bad = [d for d in dims if d not in DIMENSIONES]
+    if bad:
+        print(json.dumps({"ok": False, "error": f"Dimensión desconocida: {bad[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    try:
+        res = detect(load_input(args[0]), dims, int(opts.get("max-detalle", 500)))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
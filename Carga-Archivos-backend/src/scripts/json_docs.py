@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lectura de salidas JSON de los parsers (plan_estudio.py, kardex.py) guardadas
+en archivo. La usan plan_requisitos.py y, desde Alumnos-backend,
+degree_audit.py.
+
+- `.json`: el archivo completo es un objeto o una lista de ellos; si no es un
+  solo documento (varias líneas), se lee como NDJSON.
+- Cualquier otra extensión: NDJSON, una salida por línea, sin cargar el
+  archivo entero en memoria.
+"""
+
+import json
+from pathlib import Path
+
+
+def iter_json_docs(path: Path):
+    """Un .json (objeto o lista) o NDJSON → documentos uno por uno."""
+    if path.suffix == ".json":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            pass  # .json con varias líneas: se trata como NDJSON
+        else:
+            yield from (data if isinstance(data, list) else [data])
+            return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
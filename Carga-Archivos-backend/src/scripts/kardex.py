@@ -1,23 +1,65 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys, json, re, unicodedata
+"""
+Parser de Kárdex UniSon (Carga-Archivos).
+
+La lectura del PDF y el modelo de fila viven en kardex_core.py; este script
+arma la salida con el esquema pedido:
+  python kardex.py <pdf> [--schema=carga|alumnos|all] [--page-cache] [--mmap] [--probe]
+
+Cambios en las materias del esquema carga desde 1.3.0 (kardex_core.build_rows):
+  - Ya no salen solo de las tablas: las filas que pdfplumber no detecta como
+    tabla se toman de las líneas del texto. Un kárdex sin tablas (p. ej. el
+    generado como texto plano) trae sus materias en lugar de una lista vacía.
+  - Se deduplica por (CVE sin ceros a la izquierda, CIC) en lugar de
+    (CR, CVE, Materia, CIC): la misma materia del mismo ciclo sale una vez
+    aunque el nombre o los créditos cambien entre páginas (gana la primera).
+"""
+
+import os, sys, json, re, unicodedata
+from contextlib import nullcontext
 from pathlib import Path
 
+from parse_limits import ParseLimitExceeded, count_pages, guarded, set_stage
+from pdf_source import as_source, open_input, source_from_argv
+import kardex_core
+
+__version__ = "1.3.0"
+
 # ---------- Dependencias de extracción ----------
-try:
-    import pdfplumber  # Para tablas (materias) y texto
-except Exception as e:
-    raise SystemExit("Instala pdfplumber: pip install pdfplumber") from e
-
-# (Opcional) afinar texto con pdfminer si lo deseas
-try:
-    from pdfminer_high_level import extract_text as pdfminer_extract_text  # algunos entornos
-except Exception:
-    try:
-        from pdfminer.high_level import extract_text as pdfminer_extract_text
-    except Exception:
-        pdfminer_extract_text = None
+# Se cargan al primer uso (no al importar): así un archivo inexistente,
+# --version o --selftest responden sin pagar el import de pdfplumber/pdfminer.
+HEAVY_MODULES = ("pdfplumber", "pdfminer")
+_pdfplumber = None
+_pdfminer_extract_text = False  # False = aún no se intenta; None = no disponible
+
+
+def get_pdfplumber():
+    """pdfplumber (obligatorio para tablas y texto)."""
+    global _pdfplumber
+    if _pdfplumber is None:
+        try:
+            import pdfplumber
+        except Exception as e:
+            raise SystemExit("Instala pdfplumber: pip install pdfplumber") from e
+        _pdfplumber = pdfplumber
+    return _pdfplumber
+
+
+def get_pdfminer_extract_text():
+    """(Opcional) afinar texto con pdfminer si lo deseas."""
+    global _pdfminer_extract_text
+    if _pdfminer_extract_text is False:
+        try:
+            from pdfminer_high_level import extract_text  # algunos entornos
+        except Exception:
+            try:
+                from pdfminer.high_level import extract_text
+            except Exception:
+                extract_text = None
+        _pdfminer_extract_text = extract_text
+    return _pdfminer_extract_text
 
 
 # ============================================================
@@ -47,22 +89,36 @@ def tofloat(num_s: str | None) -> float | None:
 # ============================================================
 # 1) TEXTO
 # ============================================================
-def read_text(path: Path) -> str:
+def open_plumber(source, pdf=None):
+    """El documento pdfplumber ya abierto (se comparte) o uno nuevo sobre el buffer."""
+    if pdf is not None:
+        return nullcontext(pdf)
+    return get_pdfplumber().open(open_input(source))
+
+
+def read_text(source, pdf=None) -> str:
     """
     Extrae texto del PDF. Primero pdfplumber; si sale muy corto,
     intenta pdfminer para mayor continuidad de líneas.
+    `source` es un PdfSource (o ruta); `pdf`, un documento pdfplumber ya abierto.
     """
     text = []
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
+    with open_plumber(source, pdf) as pdf:
+        count_pages(len(pdf.pages))
+        for i, page in enumerate(pdf.pages, 1):
+            set_stage(f"texto:p{i}")
             page_text = page.extract_text() or ""
             text.append(page_text)
-    out = "\n".join(text)
+    return finish_text("\n".join(text), source)
+
 
+def finish_text(out: str, source) -> str:
+    """Texto de todas las páginas → texto final (respaldo con pdfminer + NFC)."""
     # Fallback: si salió demasiado corto, intenta pdfminer
-    if pdfminer_extract_text and len(out) < 100:
+    pdfminer_extract_text = get_pdfminer_extract_text() if len(out) < 100 else None
+    if pdfminer_extract_text:
         try:
-            mix = pdfminer_extract_text(str(path)) or ""
+            mix = pdfminer_extract_text(open_input(source)) or ""
             if len(mix) > len(out):
                 out = mix
         except Exception:
@@ -122,75 +178,27 @@ def extract_header(raw_text: str) -> dict:
 
 
 # ============================================================
-# 3) MATERIAS (vía tablas)
+# 3) MATERIAS (vía kardex_core)
 # ============================================================
-def extract_subject_rows(path: Path) -> list:
+def read_pages(source, pdf=None, page_cache=None) -> tuple:
     """
-    Extrae filas de materias leyendo las tablas de cada página.
-    Estructura esperada por fila:
-      CR, CVE, MATERIA, E1, E2, ORD, REG, CIC, I, R, B
-    - Heurísticas tolerantes (CR puede venir 1–2 dígitos, CVE 3–10 alfanum).
-    - Deduplica por (CR, CVE, Materia, CIC).
+    Única lectura del PDF: (texto completo, KardexRow) con kardex_core.
+    Con `page_cache` solo las páginas nuevas o cambiadas pasan por
+    extract_text / extract_tables.
     """
-    materias = []
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables() or []
-
-            for t in tables:
-                for row in t:
-                    if not row or len(row) < 3:
-                        continue
-
-                    # Limpia y normaliza celdas
-                    cells = [normalize_spaces(nfc(c or "")) for c in row]
-
-                    CR  = cells[0] if len(cells) > 0 else ""
-                    CVE = cells[1] if len(cells) > 1 else ""
-                    MAT = cells[2] if len(cells) > 2 else ""
-
-                    # Heurística: CR = 1–2 dígitos (p.ej. 6 o 06 o 12)
-                    if not re.fullmatch(r"\d{1,2}", CR):
-                        continue
-                    # CVE: 3–10 alfanum (algunas carreras usan guion bajo)
-                    if not re.fullmatch(r"[A-Z0-9][A-Z0-9_-]{2,9}", CVE):
-                        continue
-                    # Materia: no vacía
-                    if not MAT:
-                        continue
-
-                    E1  = cells[3]  if len(cells) > 3  else None
-                    E2  = cells[4]  if len(cells) > 4  else None
-                    ORD = cells[5]  if len(cells) > 5  else None
-                    REG = cells[6]  if len(cells) > 6  else None
-                    CIC = cells[7]  if len(cells) > 7  else None
-                    I   = cells[8]  if len(cells) > 8  else None
-                    R   = cells[9]  if len(cells) > 9  else None
-                    B   = cells[10] if len(cells) > 10 else None
-
-                    materias.append({
-                        "CR": CR,
-                        "CVE": CVE,
-                        "Materia": MAT,
-                        "E1": E1 or None,
-                        "E2": E2 or None,
-                        "ORD": ORD or None,
-                        "REG": REG or None,
-                        "CIC": CIC or None,
-                        "I": I or None,
-                        "R": R or None,
-                        "B": B or None,
-                    })
-
-    # Deduplicar por (CR, CVE, Materia, CIC)
-    seen, dedup = set(), []
-    for m in materias:
-        key = (m["CR"], m["CVE"], m["Materia"], m["CIC"])
-        if key in seen:
-            continue
-        seen.add(key)
-        dedup.append(m)
-    return dedup
+    with open_plumber(source, pdf) as pdf:
+        count_pages(len(pdf.pages))
+        texts, table_rows = kardex_core.extract_pages(
+            pdf, page_cache, on_page=lambda i, etapa: set_stage(f"{etapa}:p{i}")
+        )
+    raw_text = finish_text("\n".join(texts), source)
+    return raw_text, kardex_core.build_rows(table_rows, raw_text)
+
+
+def extract_subject_rows(source, pdf=None) -> list:
+    """Filas de materias con el esquema de Carga: CR, CVE, Materia, E1, E2, ORD, REG, CIC, I, R, B."""
+    _, rows = read_pages(source, pdf)
+    return [kardex_core.to_carga_row(r) for r in rows]
 
 
 # ============================================================
@@ -278,34 +286,144 @@ def extract_summary(raw_text: str) -> dict:
 # ============================================================
 # 5) CLI
 # ============================================================
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"ok": False, "error": "PDF path missing"}, ensure_ascii=False))
-        sys.exit(1)
+def page_cache_selftest() -> bool:
+    """Enmascarado de la banda de fecha y reinyección en el texto cacheado."""
+    from page_cache import mask_volatile, refresh_text
+
+    old, new = [], []
+    a = mask_volatile(b"BT (Fecha: 21/09/2025) Tj (Pagina 1 de 3) Tj ET", old)
+    b = mask_volatile(b"BT (Fecha: 02/02/2026) Tj (Pagina 1 de 4) Tj ET", new)
+    return a == b and refresh_text("Fecha: 21/09/2025\nPagina 1 de 3", old, new) == "Fecha: 02/02/2026\nPagina 1 de 4"
+
+
+def selftest() -> dict:
+    """Chequeo de las heurísticas de texto sin abrir PDFs ni importar pdfplumber."""
+    import importlib.util
+    sample = (
+        "PROGRAMA: INGENIERIA EN SISTEMAS DE INFORMACION\nPLAN: 2182\n"
+        "EXPEDIENTE: 222202156 NOMBRE DE PRUEBA\nFecha: 21/09/2025\n"
+        "CREDITOS APR 284 REP 0 INS 49\n"
+    )
+    header = extract_header(sample)
+    resumen = extract_summary(sample)
+    checks = {
+        "extract_header": header.get("expediente") == "222202156" and header.get("plan") == "2182",
+        "extract_summary": resumen["creditos"].get("APR") == 284,
+        "tofloat": tofloat("93,33") == 93.33,
+        "page_cache": page_cache_selftest(),
+        **{f"core.{k}": v for k, v in kardex_core.selftest().items()},
+    }
+    return {
+        "ok": all(checks.values()),
+        "version": __version__,
+        "checks": checks,
+        "deps": {m: importlib.util.find_spec(m) is not None for m in HEAVY_MODULES},
+    }
 
-    pdf_path = Path(sys.argv[1])
-    if not pdf_path.exists():
-        print(json.dumps({"ok": False, "error": f"No existe el archivo: {pdf_path}"}, ensure_ascii=False))
-        sys.exit(1)
+
+SCHEMAS = ("carga", "alumnos", "all")
+
+
+def carga_output(raw_text: str, rows: list) -> dict:
+    return {
+        "ok": True,
+        "alumno": extract_header(raw_text),
+        "materias": [kardex_core.to_carga_row(r) for r in rows],
+        "resumen": extract_summary(raw_text),
+    }
+
+
+def render(schema: str, raw_text: str, rows: list) -> dict:
+    """
+    Salida con el esquema pedido a partir de la misma lectura:
+      carga   CR/CVE/Materia/... (este backend)
+      alumnos cr/codigo/nombre/... con inglés (Alumnos-backend, ver kardex_alumnos.py)
+      all     {"schemas": {"carga": ..., "alumnos": ...}} (servicio de parsers)
+    """
+    if schema == "carga":
+        return carga_output(raw_text, rows)
+    from kardex_alumnos import alumnos_output
+
+    if schema == "alumnos":
+        return alumnos_output(raw_text, rows)
+    return {"ok": True, "schemas": {"carga": carga_output(raw_text, rows), "alumnos": alumnos_output(raw_text, rows)}}
+
+
+def parse_kardex(pdf, page_cache=None, schema: str = "carga") -> dict:
+    """
+    Parseo completo de un PDF (ruta o PdfSource) → dict de salida (lo que se
+    imprime como JSON). El documento se abre una sola vez para texto y tablas.
+    Con `page_cache` (page_cache.PageCache) las páginas ya vistas no se reparsean.
+    """
+    with as_source(pdf) as src:
+        raw_text, rows = read_pages(src, page_cache=page_cache)
+    set_stage("resumen")
+    out = render(schema, raw_text, rows)
+    if page_cache is not None:
+        out["page_cache"] = page_cache.stats()
+    return out
+
+
+def open_page_cache(argv: list):
+    """--page-cache [--page-cache-db=ruta] o $KARDEX_PAGE_CACHE_DB → PageCache, o None."""
+    db = next((a.split("=", 1)[1] for a in argv if a.startswith("--page-cache-db=")), None)
+    if not (db or "--page-cache" in argv or os.environ.get("KARDEX_PAGE_CACHE_DB")):
+        return None
+    from page_cache import PageCache
+    # Las páginas guardan texto y celdas crudas: una entrada sirve a todos los esquemas
+    return PageCache(db, parser=f"kardex-core@{kardex_core.CORE_VERSION}")
+
+
+def run(argv: list) -> dict:
+    """
+    Ejecuta el CLI sobre `argv` (sin el nombre del script) y devuelve el dict
+    de salida. main() lo imprime; el servicio de parsers lo llama en proceso.
+    """
+    # Rutas que no importan nada pesado (sirven para medir el arranque)
+    if "--version" in argv:
+        return {"ok": True, "script": "kardex.py", "version": __version__}
+    if "--selftest" in argv:
+        return selftest()
+
+    args = [a for a in argv if not a.startswith("--")]
+    if not args:
+        return {"ok": False, "error": "PDF path missing"}
+    schema = next((a.split("=", 1)[1] for a in argv if a.startswith("--schema=")), "carga")
+    if schema not in SCHEMAS:
+        return {"ok": False, "error": f"--schema debe ser uno de {SCHEMAS}"}
+
+    # `-` = bytes por stdin; --mmap mapea el archivo en vez de leerlo
+    if args[0] != "-" and not Path(args[0]).exists():
+        return {"ok": False, "error": f"No existe el archivo: {args[0]}"}
 
     try:
-        raw_text = read_text(pdf_path)
-        alumno = extract_header(raw_text)
-        materias = extract_subject_rows(pdf_path)
-        resumen = extract_summary(raw_text)
-
-        out = {
-            "ok": True,
-            "alumno": alumno,
-            "materias": materias,
-            "resumen": resumen,
-        }
-        print(json.dumps(out, ensure_ascii=False))
+        with source_from_argv(args[0], argv) as src:
+            if "--probe" in argv:
+                # Clasificación en milisegundos sin parseo completo (pdf_probe.py)
+                from pdf_probe import probe
+                return probe(src)
+            # Límites de pared/CPU/RSS por documento (ver parse_limits.py)
+            cache = open_page_cache(argv)
+            try:
+                with guarded("kardex"):
+                    out = parse_kardex(src, cache, schema)
+            finally:
+                if cache is not None:
+                    cache.close()
+            out["file_hash"] = src.sha256
+            return out
+    except ParseLimitExceeded as e:
+        return e.to_dict()
     except Exception as e:
-        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        return {"ok": False, "error": str(e)}
+
+
+def main():
+    out = run(sys.argv[1:])
+    print(json.dumps(out, ensure_ascii=False))
+    if not out["ok"]:
         sys.exit(1)
 
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptador de salida con el esquema de Alumnos-backend para kardex_core.py.
+
+La forma que imprime Alumnos-backend/src/scripts/kardex.py:
+  {ok, alumno: {..., ingles?}, materias: [{cr, codigo, nombre, e1, e2, ord, reg,
+   cic, inscripciones, reprobaciones, bajas, periodo}], resumen}
+Las reglas de cabecera, inglés y resumen viven solo aquí: ese script las
+importa (desde Alumnos-backend esta carpeta está en sys.path).
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from kardex_core import fix_unicode, normalize_spaces, to_alumnos_row
+
+
+def extract_english_info(raw_text: str) -> Dict[str, Any]:
+    """
+    Busca la línea tipo:
+      ACREDITACIÓN DE INGLÉS: ACREDITADO 5.00 DE 5
+    """
+    raw_text = fix_unicode(raw_text)
+    m = re.search(
+        r"ACREDITACI[ÓO]N DE INGL[ÉE]S:\s*([A-ZÁÉÍÓÚ ]+?)\s+([0-9]+(?:\.[0-9]+)?)\s*DE\s*([0-9]+(?:\.[0-9]+)?)",
+        raw_text,
+        re.I,
+    )
+    if not m:
+        return {}
+
+    estado = normalize_spaces(m.group(1)).upper()
+    nivel = float(m.group(2))
+    maximo_pdf = float(m.group(3))
+
+    requerido_carrera = 5.0
+    maximo_carrera = 7.0
+    cumple = nivel >= requerido_carrera
+
+    return {
+        "estado": estado,
+        "nivel": nivel,
+        "maximo_pdf": maximo_pdf,
+        "requerido_carrera": requerido_carrera,
+        "maximo_carrera": maximo_carrera,
+        "cumple_requisito": cumple,
+    }
+
+
+def extract_header(raw_text: str) -> Dict[str, Any]:
+    """
+    Cabecera típica:
+      PROGRAMA: ...
+      PLAN: 2182
+      UNIDAD: HERMOSILLO
+      EXPEDIENTE: 222202156  NOMBRE COMPLETO
+      ESTATUS: A .. Alumno activo....
+      Fecha: 21/09/2025
+    """
+    raw_text = fix_unicode(raw_text)
+
+    # Quitamos ruidos comunes
+    cleaned = re.sub(
+        r"Universidad de Sonora.*?KÁRDEX ELECTRÓNICO",
+        "",
+        raw_text,
+        flags=re.S,
+    )
+    cleaned = re.sub(r"Pagina \d+ de \d+", "", cleaned)
+    cleaned = cleaned.replace(".. Alumno activo....", "")  # deja solo 'ESTATUS: A'
+
+    def grab(pat: str, s: str = cleaned, flags: int = re.M) -> Optional[str]:
+        m = re.search(pat, s, flags)
+        return normalize_spaces(fix_unicode(m.group(1))) if m else None
+
+    header: Dict[str, Any] = {
+        "fecha": grab(r"Fecha:\s*(.*)"),
+        "programa": grab(r"PROGRAMA:\s*(.*)"),
+        "plan": grab(r"PLAN:\s*(\d+)"),
+        "unidad": grab(r"UNIDAD:\s*(.*)"),
+        "expediente": grab(r"EXPEDIENTE:\s*([0-9]+)"),
+        "alumno": grab(r"EXPEDIENTE:\s*[0-9]+\s+(.*)"),
+        "estatus": grab(r"ESTATUS:\s*(.*)"),
+    }
+
+    ingles = extract_english_info(raw_text)
+    if ingles:
+        header["ingles"] = ingles
+
+    # Limpia None
+    return {k: v for k, v in header.items() if v is not None}
+
+
+def extract_summary(raw_text: str) -> dict:
+    """
+    Extrae de la banda inferior del kárdex:
+      - PROMEDIO de un periodo (ej. 2025-1 *93.33)
+      - PROMEDIO KARDEX (*89.79)
+      - CRÉDITOS: APR / REP / INS
+      - MATERIAS: APR / REP / NMR / INS
+    """
+    
+    resumen = {
+        "promedios": {},
+        "creditos": {},
+        "materias": {},
+    }
+    
+    # --- PROMEDIOS ---
+    # Buscar la línea completa que contiene promedios y datos
+    # Esta línea contiene: *93.33 *89.79 284 **0 *49 *43 **0 **0 **7
+    full_line_pattern = re.search(
+        r'\*(\d{2,3}[.,]\d{2})\s+\*(\d{2,3}[.,]\d{2})\s+\d+',
+        raw_text
+    )
+    
+    if full_line_pattern:
+        val_periodo = float(full_line_pattern.group(1).replace(',', '.'))
+        val_kardex = float(full_line_pattern.group(2).replace(',', '.'))
+        
+        # Buscar el periodo (YYYY-D) en las líneas anteriores
+        periodo_pattern = re.search(r'(\d{4}-\d)\s+KARDEX', raw_text)
+        if periodo_pattern:
+            periodo = periodo_pattern.group(1)
+            resumen["promedios"][periodo] = val_periodo
+        
+        resumen["promedios"]["kardex"] = val_kardex
+    
+    # --- BUSCAR LA LÍNEA COMPLETA DE DATOS ---
+    # Buscamos la línea que contiene los promedios y todos los números
+    # Patrón: *XX.XX *XX.XX seguido de varios números con asteriscos
+    data_line_pattern = re.search(
+        r'\*(\d{2,3}[.,]\d{2})\s+\*(\d{2,3}[.,]\d{2})\s+(\d+)\s+\*+(\d+)\s+\*(\d+)\s+\*(\d+)\s+\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)',
+        raw_text
+    )
+    
+    if data_line_pattern:
+        # Los grupos son:
+        # 1: promedio periodo (ya extraído)
+        # 2: promedio kardex (ya extraído)
+        # 3-5: CRÉDITOS (APR, REP, INS)
+        # 6-9: MATERIAS (APR, REP, NMR, INS)
+        
+        resumen["creditos"] = {
+            "APR": int(data_line_pattern.group(3)),
+            "REP": int(data_line_pattern.group(4)),
+            "INS": int(data_line_pattern.group(5)),
+        }
+        
+        resumen["materias"] = {
+            "APR": int(data_line_pattern.group(6)),
+            "REP": int(data_line_pattern.group(7)),
+            "NMR": int(data_line_pattern.group(8)),
+            "INS": int(data_line_pattern.group(9)),
+        }
+    else:
+        # --- FALLBACK: Buscar por secciones separadas ---
+        
+        # CRÉDITOS: buscar después de "CREDITOS" en los headers
+        creditos_pattern = re.search(
+            r'CREDITOS.*?APR.*?REP.*?INS.*?\n.*?(\d+)\s+\*+(\d+)\s+\*(\d+)',
+            raw_text,
+            re.IGNORECASE | re.DOTALL
+        )
+        
+        if creditos_pattern:
+            resumen["creditos"] = {
+                "APR": int(creditos_pattern.group(1)),
+                "REP": int(creditos_pattern.group(2)),
+                "INS": int(creditos_pattern.group(3)),
+            }
+        
+        # MATERIAS: buscar después de "MATERIAS" en los headers
+        materias_pattern = re.search(
+            r'MATERIAS.*?APR.*?REP.*?NMR.*?INS.*?\n.*?\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)\s+\*+(\d+)',
+            raw_text,
+            re.IGNORECASE | re.DOTALL
+        )
+        
+        if materias_pattern:
+            resumen["materias"] = {
+                "APR": int(materias_pattern.group(1)),
+                "REP": int(materias_pattern.group(2)),
+                "NMR": int(materias_pattern.group(3)),
+                "INS": int(materias_pattern.group(4)),
+            }
+
+    return resumen
+
+
+def alumnos_output(raw_text: str, rows: List, make_row=to_alumnos_row) -> Dict[str, Any]:
+    """
+    Texto + KardexRow → salida JSON con el esquema de Alumnos-backend.
+    `make_row` tipa cada fila (Alumnos kardex.py pasa Materia.from_row).
+    """
+    raw_text = fix_unicode(raw_text)
+    return {
+        "ok": True,
+        "alumno": extract_header(raw_text),
+        "materias": [make_row(r) for r in rows],
+        "resumen": extract_summary(raw_text),
+    }
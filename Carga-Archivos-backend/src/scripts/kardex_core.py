@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Núcleo compartido del parser de kárdex: una sola lectura del PDF, un solo
+modelo de fila, y adaptadores por esquema de salida.
+
+Antes el mismo PDF se parseaba dos veces con heurísticas distintas:
+Alumnos-backend (cr/codigo/nombre/..., filas por tokens) y Carga-Archivos
+(CR/CVE/Materia/..., filas por celdas). Aquí:
+
+1) extract_pages(): texto y filas crudas de tabla por página (con la caché
+   por página de page_cache.py si se pasa). Es lo único que toca el PDF.
+2) build_rows(): KardexRow a partir de esas filas. Primero por celdas (las
+   columnas de la tabla); si la fila viene pegada en una celda, por tokens; y
+   al final las líneas del texto que no salieron en tablas. Deduplica por
+   (clave, ciclo) conservando la primera.
+3) Adaptadores: to_carga_row() (CR/CVE/...) y to_alumnos_row() (minúsculas,
+   con calificaciones numéricas y periodo). Cabecera y resumen de cada esquema
+   van en kardex.py (Carga) y kardex_alumnos.py (Alumnos).
+
+Los valores de KardexRow son el texto tal como viene en el PDF; cada
+adaptador decide cómo tiparlos. Para que un lote de miles de kárdex quepa en
+memoria, el texto se interna (nombres de materia, claves y calificaciones se
+repiten entre alumnos: una sola copia por valor) y el CIC se guarda como
+entero; los dicts de salida se arman solo en los adaptadores.
+"""
+
+import re
+import sys
+import unicodedata
+
+CORE_VERSION = "1.0.0"
+
+_fix_text = None
+
+
+def fix_text(x: str) -> str:
+    """ftfy para reparar mojibake de acentos (identidad si no está instalado)."""
+    global _fix_text
+    if _fix_text is None:
+        try:
+            from ftfy import fix_text as _ftfy_fix_text
+        except Exception:
+            def _ftfy_fix_text(x: str) -> str:
+                return x
+        _fix_text = _ftfy_fix_text
+    return _fix_text(x)
+
+
+def fix_unicode(s: str | None) -> str:
+    """Repara mojibake y normaliza a NFC."""
+    if not s:
+        return ""
+    return unicodedata.normalize("NFC", fix_text(s))
+
+
+def normalize_spaces(s: str) -> str:
+    return re.sub(r"[ \t]+", " ", s or "").strip()
+
+
+# ============================================================
+# 1) PÁGINAS
+# ============================================================
+def extract_pages(pdf, cache=None, on_page=None) -> tuple:
+    """
+    Documento pdfplumber abierto → (textos por página, filas crudas de tabla).
+    Las filas son listas de celdas ya normalizadas (NFC, espacios).
+    `on_page(i, etapa)` permite marcar la etapa (parse_limits.set_stage).
+    """
+    texts, table_rows = [], []
+    for i, page in enumerate(pdf.pages, 1):
+        on_stage = (lambda etapa, i=i: on_page(i, etapa)) if on_page else None
+        hit = extract_page(page, cache, on_stage)
+        texts.append(hit["text"])
+        table_rows.extend(hit["rows"])
+    return texts, table_rows
+
+
+def extract_page(page, cache=None, on_stage=None) -> dict:
+    """
+    {"text", "rows"} de una página pdfplumber; con `cache` (page_cache.PageCache)
+    una página ya vista no pasa por extract_text / extract_tables.
+    """
+    fp = None
+    if cache is not None:
+        from page_cache import page_fingerprint
+
+        fp = page_fingerprint(page)
+        hit = cache.get(fp)
+        if hit is not None:
+            return hit
+    if on_stage:
+        on_stage("texto")
+    text = page.extract_text() or ""
+    if on_stage:
+        on_stage("tablas")
+    rows = [
+        [normalize_spaces(fix_unicode(c or "")) for c in row]
+        for t in page.extract_tables() or []
+        for row in t
+        if row
+    ]
+    hit = {"text": text, "rows": rows}
+    if cache is not None:
+        cache.put(fp, hit)
+    return hit
+
+
+# ============================================================
+# 2) MODELO DE FILA
+# ============================================================
+def intern_text(s):
+    """Texto no vacío → copia internada (una por valor en todo el proceso); si no, None."""
+    return sys.intern(s) if s else None
+
+
+_CIC_CODES: dict = {}
+
+
+def encode_cic(cic):
+    """'2231' → 2231 (entero compartido); otro texto se guarda tal cual."""
+    if not cic:
+        return None
+    if len(cic) == 4 and cic.isdigit():
+        n = int(cic)
+        return _CIC_CODES.setdefault(n, n)
+    return intern_text(cic)
+
+
+class KardexRow:
+    """Una materia del kárdex; valores como texto del PDF (None si no viene)."""
+
+    __slots__ = ("cr", "codigo", "nombre", "e1", "e2", "ord", "reg", "_cic", "ins", "rep", "bajas")
+
+    def __init__(self, cr, codigo, nombre, e1=None, e2=None, ord=None, reg=None,
+                 cic=None, ins=None, rep=None, bajas=None):
+        self.cr = intern_text(cr)
+        self.codigo = intern_text(codigo)
+        self.nombre = intern_text(nombre)
+        self.e1 = intern_text(e1)
+        self.e2 = intern_text(e2)
+        self.ord = intern_text(ord)
+        self.reg = intern_text(reg)
+        self._cic = encode_cic(cic)
+        self.ins = intern_text(ins)
+        self.rep = intern_text(rep)
+        self.bajas = intern_text(bajas)
+
+    @property
+    def cic(self) -> str | None:
+        c = self._cic
+        return f"{c:04d}" if isinstance(c, int) else c
+
+    def __reduce__(self):
+        # al cruzar procesos (pickle) se reconstruye con __init__ para volver a internar
+        return KardexRow, (self.cr, self.codigo, self.nombre, self.e1, self.e2, self.ord,
+                           self.reg, self.cic, self.ins, self.rep, self.bajas)
+
+    def key(self) -> tuple:
+        return ((self.codigo or "").lstrip("0"), self._cic)
+
+
+def row_from_cells(cells: list) -> KardexRow | None:
+    """Fila de tabla con columnas CR, CVE, MATERIA, E1, E2, ORD, REG, CIC, I, R, B."""
+    if len(cells) < 3:
+        return None
+    cr, cve, mat = cells[0], cells[1], cells[2]
+    # CR = 1–2 dígitos; CVE 3–10 alfanum (algunas carreras usan guion bajo); materia no vacía
+    if not re.fullmatch(r"\d{1,2}", cr):
+        return None
+    if not re.fullmatch(r"[A-Z0-9][A-Z0-9_-]{2,9}", cve):
+        return None
+    if not mat:
+        return None
+    rest = list(cells[3:11]) + [None] * max(0, 8 - len(cells[3:11]))
+    return KardexRow(cr, cve, mat, *rest)
+
+
+def parse_grade(s: str | None) -> int | None:
+    """'090' -> 90; None si no es calificación numérica (ACREDITADA, BV, ...)."""
+    if not s:
+        return None
+    s = s.strip().replace("*", "")
+    if not re.fullmatch(r"\d{2,3}", s):
+        return None
+    val = int(s)
+    return val if 0 <= val <= 100 else None
+
+
+def row_from_tokens(tokens: list) -> KardexRow | None:
+    """
+    Fila pegada en una sola cadena:
+      CR CVE <NOMBRE ...> E1 E2 [ORD/REG opcionales dispersos] CIC I R B
+    """
+    if len(tokens) < 6:
+        return None
+    cr, cve = tokens[0], tokens[1]
+    if not (re.fullmatch(r"\d{2}", cr) and re.fullmatch(r"\d{3,5}", cve)):
+        return None
+    cic, ins, rep, bajas = tokens[-4:]
+    if not (re.fullmatch(r"\d{4}", cic) and all(re.fullmatch(r"\d{2}", t) for t in (ins, rep, bajas))):
+        return None
+
+    mid = tokens[2:-4]  # entre CVE y CIC
+    if len(mid) < 2:
+        return None
+    grades = [i for i, tok in enumerate(mid) if parse_grade(tok) is not None]
+    ord_v = mid[grades[0]] if grades else None
+    reg_v = mid[grades[1]] if len(grades) > 1 else None
+    clean = [tok for i, tok in enumerate(mid) if i not in grades]
+
+    e1 = e2 = None
+    nombre_tokens = clean
+    if len(clean) >= 2:
+        e1, e2 = clean[-2], clean[-1]
+        nombre_tokens = clean[:-2]
+    elif len(clean) == 1:
+        e2 = clean[-1]
+        nombre_tokens = []
+    nombre = normalize_spaces(" ".join(nombre_tokens))
+    if not nombre:
+        return None
+    return KardexRow(cr, cve, nombre, e1, e2, ord_v, reg_v, cic, ins, rep, bajas)
+
+
+def _skip_line(up: str) -> bool:
+    return up.startswith("CR CVE") or "ACREDITACIÓN DE INGLÉS" in up
+
+
+def build_rows(table_rows: list, raw_text: str) -> list:
+    """Filas de tabla (celdas, o tokens si vienen pegadas) + líneas del texto, sin repetir."""
+    rows, seen = [], set()
+
+    def add(r):
+        if r is not None and r.key() not in seen:
+            seen.add(r.key())
+            rows.append(r)
+
+    for cells in table_rows:
+        r = row_from_cells(cells)
+        if r is None:
+            line = normalize_spaces(" ".join(c for c in cells if c))
+            if not line or _skip_line(line.upper()):
+                continue
+            r = row_from_tokens(line.split())
+        add(r)
+
+    for line in (raw_text or "").splitlines():
+        line = normalize_spaces(fix_unicode(line))
+        if line and not _skip_line(line.upper()):
+            add(row_from_tokens(line.split()))
+    return rows
+
+
+# ============================================================
+# 3) ADAPTADORES DE FILA
+# ============================================================
+def parse_int_or_none(s: str | None) -> int | None:
+    if not s:
+        return None
+    s = s.strip().replace("*", "")
+    if not re.fullmatch(r"-?\d+", s):
+        return None
+    return int(s)
+
+
+def cic_to_period_label(cic: str | None) -> str | None:
+    """CIC de 4 dígitos → periodo UniSon: 2231 → 2023-1, 2222 → 2022-2."""
+    if not cic or not re.fullmatch(r"\d{4}", cic.strip()):
+        return None
+    a, _, c, d = cic.strip()
+    return f"{2000 + 10 * int(a) + int(c)}-{int(d)}"
+
+
+def to_carga_row(r: KardexRow) -> dict:
+    """Esquema de Carga-Archivos (ingestaKardex.ts de Carga)."""
+    return {
+        "CR": r.cr,
+        "CVE": r.codigo,
+        "Materia": r.nombre,
+        "E1": r.e1,
+        "E2": r.e2,
+        "ORD": r.ord,
+        "REG": r.reg,
+        "CIC": r.cic,
+        "I": r.ins,
+        "R": r.rep,
+        "B": r.bajas,
+    }
+
+
+def to_alumnos_row(r: KardexRow) -> dict:
+    """Esquema de Alumnos-backend (ingestaKardex.ts de Alumnos)."""
+    return {
+        "cr": parse_int_or_none(r.cr),
+        "codigo": r.codigo,
+        "nombre": r.nombre,
+        "e1": r.e1,
+        "e2": r.e2,
+        "ord": parse_grade(r.ord),
+        "reg": parse_grade(r.reg),
+        "cic": r.cic,
+        "inscripciones": parse_int_or_none(r.ins),
+        "reprobaciones": parse_int_or_none(r.rep),
+        "bajas": parse_int_or_none(r.bajas),
+        "periodo": cic_to_period_label(r.cic),
+    }
+
+
+def selftest() -> dict:
+    pegada = row_from_tokens("06 6881 ESTRUCTURAS DE DATOS O A 090 2231 01 00 00".split())
+    celdas = row_from_cells(["06", "6881", "ESTRUCTURAS DE DATOS", "O", "A", "090", "", "2231", "01", "00", "00"])
+    rows = build_rows([["06", "6881", "ESTRUCTURAS DE DATOS", "O", "A", "090", "", "2231", "01", "00", "00"]],
+                      "06 6881 ESTRUCTURAS DE DATOS O A 090 2231 01 00 00\n08 6882 BASES DE DATOS O A 085 2231 01 00 00")
+    return {
+        "row_from_tokens": pegada is not None and to_alumnos_row(pegada)["ord"] == 90,
+        "row_from_cells": celdas is not None and to_carga_row(celdas) == to_carga_row(pegada),
+        "build_rows": [to_alumnos_row(r)["codigo"] for r in rows] == ["6881", "6882"],
+        "cic_to_period_label": cic_to_period_label("2231") == "2023-1",
+    }
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché por página para el parser de kárdex (SQLite, sin dependencias propias).
+
+Cada descarga del kárdex cambia el SHA-256 del archivo (Fecha:, metadatos del
+PDF), pero las páginas de materias suelen ser idénticas a las del semestre
+anterior. Aquí la llave es la huella de la *página*, no del archivo:
+
+- SHA-256 de los content streams ya decodificados (y de los Form XObjects que
+  dibujan), más la parte de las fuentes que afecta el texto (ToUnicode,
+  Encoding, anchos; sin el prefijo aleatorio de subconjunto "ABCDEF+").
+- Antes de hashear se enmascaran los tokens de la banda de encabezado que
+  cambian en cada descarga: fechas, horas y "Pagina N de M". Los valores se
+  guardan aparte y, en un acierto, se sustituyen en el texto cacheado, así que
+  el texto devuelto es el que daría extract_text() sobre la página nueva.
+
+Si el PDF no expone los streams (o la sustitución no cuadra) la página se
+trata como miss y se parsea normal.
+
+Ubicación por defecto: $KARDEX_PAGE_CACHE_DB o
+Carga-Archivos-backend/cache/kardex_pages.sqlite (junto a este módulo, no en el
+directorio de trabajo: Node, el servicio y Alumnos-backend usan la misma BD).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_cache (
+  page_hash  TEXT NOT NULL,
+  parser     TEXT NOT NULL,
+  tokens     TEXT NOT NULL,
+  result     TEXT NOT NULL,
+  created_at REAL NOT NULL,
+  PRIMARY KEY (page_hash, parser)
+);
+"""
+
+# Fechas, horas y la numeración de página (solo los números) del encabezado
+VOLATILE_RE = re.compile(
+    rb"\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}:\d{2}(?::\d{2})?|(?<=gina )\d+ de \d+"
+)
+SUBSET_RE = re.compile(r"^/?[A-Z]{6}\+")
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]  # Carga-Archivos-backend/
+
+
+def default_db_path() -> Path:
+    return Path(os.environ.get("KARDEX_PAGE_CACHE_DB") or BACKEND_ROOT / "cache" / "kardex_pages.sqlite")
+
+
+# ============================================================
+# Huella de página (pdfminer, vía page.page_obj de pdfplumber)
+# ============================================================
+def _stream_data(obj) -> bytes:
+    from pdfminer.pdftypes import resolve1
+
+    obj = resolve1(obj)
+    return obj.get_data() if hasattr(obj, "get_data") else b""
+
+
+def _canon(obj, depth: int = 0):
+    """Objeto PDF → valor comparable entre documentos (sin números de objeto)."""
+    from pdfminer.pdftypes import resolve1
+
+    obj = resolve1(obj)
+    if depth > 4:
+        return None
+    if isinstance(obj, dict):
+        return {str(k): _canon(v, depth + 1) for k, v in sorted(obj.items())}
+    if isinstance(obj, (list, tuple)):
+        return [_canon(v, depth + 1) for v in obj]
+    if hasattr(obj, "name"):  # PSLiteral
+        return "/" + str(obj.name)
+    if isinstance(obj, (int, float, str, bytes)) or obj is None:
+        return obj
+    return type(obj).__name__
+
+
+def _font_key(font) -> str:
+    from pdfminer.pdftypes import resolve1
+
+    font = resolve1(font) or {}
+    parts = [SUBSET_RE.sub("", str(_canon(font.get("BaseFont"))))]
+    for k in ("Encoding", "Widths", "FirstChar"):
+        parts.append(repr(_canon(font.get(k))))
+    if font.get("ToUnicode") is not None:
+        parts.append(hashlib.sha256(_stream_data(font["ToUnicode"])).hexdigest())
+    for d in resolve1(font.get("DescendantFonts")) or []:
+        d = resolve1(d) or {}
+        parts.append(repr(_canon(d.get("W"))))
+    return "|".join(parts)
+
+
+def _resources_digest(h, resources, tokens: list, depth: int = 0) -> None:
+    """Fuentes y Form XObjects (recursivo, acotado) de un diccionario de recursos."""
+    from pdfminer.pdftypes import resolve1
+
+    resources = resolve1(resources) or {}
+    fonts = resolve1(resources.get("Font")) or {}
+    for name in sorted(fonts):
+        h.update(f"F:{name}:{_font_key(fonts[name])}".encode("utf-8"))
+    xobjs = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjs):
+        x = resolve1(xobjs[name])
+        attrs = getattr(x, "attrs", {}) or {}
+        subtype = getattr(attrs.get("Subtype"), "name", "")
+        h.update(f"X:{name}:{subtype}".encode("utf-8"))
+        if subtype == "Form" and depth < 3:
+            h.update(mask_volatile(x.get_data(), tokens))
+            _resources_digest(h, attrs.get("Resources"), tokens, depth + 1)
+        elif hasattr(x, "get_rawdata"):
+            h.update(hashlib.sha256(x.get_rawdata() or b"").digest())
+
+
+def mask_volatile(data: bytes, tokens: list) -> bytes:
+    """Reemplaza fechas/horas/paginación por un marcador y acumula los valores originales."""
+    def sub(m):
+        tokens.append(m.group(0).decode("latin-1"))
+        return b"\x00"
+    return VOLATILE_RE.sub(sub, data)
+
+
+def page_fingerprint(page):
+    """(hash, tokens) de una página pdfplumber, o None si no se puede leer su contenido."""
+    try:
+        obj = page.page_obj
+        h = hashlib.sha256()
+        tokens: list = []
+        h.update(repr([round(float(v), 2) for v in obj.mediabox]).encode("ascii"))
+        contents = obj.contents if isinstance(obj.contents, list) else [obj.contents]
+        for c in contents:
+            h.update(mask_volatile(_stream_data(c), tokens))
+        _resources_digest(h, obj.resources, tokens)
+        return h.hexdigest(), tokens
+    except Exception:
+        return None
+
+
+def refresh_text(text: str, old: list, new: list):
+    """Sustituye en orden los tokens volátiles cacheados por los de la página nueva."""
+    if old == new:
+        return text
+    if len(old) != len(new):
+        return None
+    pos = 0
+    for o, n in zip(old, new):
+        i = text.find(o, pos)
+        if i < 0:
+            return None
+        text = text[:i] + n + text[i + len(o):]
+        pos = i + len(n)
+    return text
+
+
+# ============================================================
+# Caché
+# ============================================================
+class PageCache:
+    """`parser` separa resultados de parsers/versiones distintas en la misma BD."""
+
+    def __init__(self, db_path: Path | None = None, parser: str = "kardex"):
+        self.db_path = Path(db_path or default_db_path())
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(str(self.db_path), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # varios workers a la vez
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, fp) -> dict | None:
+        """Resultado cacheado de la página (con `text` ya actualizado) o None."""
+        if fp is None:
+            self.misses += 1
+            return None
+        row = self.conn.execute(
+            "SELECT tokens, result FROM page_cache WHERE page_hash = ? AND parser = ?",
+            (fp[0], self.parser),
+        ).fetchone()
+        result = json.loads(row[1]) if row else None
+        if result is not None and "text" in result:
+            result["text"] = refresh_text(result["text"], json.loads(row[0]), fp[1])
+            if result["text"] is None:
+                result = None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, fp, result: dict) -> None:
+        if fp is None:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_cache (page_hash, parser, tokens, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fp[0], self.parser, json.dumps(fp[1]), json.dumps(result, ensure_ascii=False), time.time()),
+            )
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Límites por documento para los parsers (kardex.py / plan_estudio.py).
+
+Un PDF malformado o enorme puede tener a extract_tables / camelot ocupados por
+minutos. Cada parseo corre dentro de `guarded(tipo)`:
+
+  - reloj de pared: SIGALRM (setitimer) → ParseLimitExceeded("timeout")
+  - CPU: RLIMIT_CPU suave = CPU ya usada + cpu_s → SIGXCPU → "cpu_limit"
+    (la CPU es acumulada por proceso; así también sirve en workers reciclados)
+  - memoria: un hilo vigía mide el RSS y avisa al hilo principal (SIGUSR1)
+    → "memory_limit"
+  - respaldo: si tras wall_s + HARD_GRACE_S el parseo sigue atorado dentro de
+    código C (no vuelve al intérprete para atender la señal), el vigía deja el
+    JSON de timeout y termina el proceso con os._exit(EXIT_HARD_TIMEOUT). En el
+    CLI el JSON va a stdout; en un worker del pool va al archivo indicado con
+    set_hard_report(), que lee el proceso padre (parser_service.py): el stdout
+    del worker es el del servicio.
+
+No se usa RLIMIT_AS: tabula levanta una JVM hija que hereda los límites y
+reserva mucho espacio virtual aunque no lo use.
+
+Las señales solo se instalan en el hilo principal (CLI y workers del pool); en
+otro hilo, o en Windows (sin `resource` ni SIGALRM/SIGXCPU), queda solo el
+vigía de respaldo.
+
+Además lleva el tiempo acumulado por etapa y las páginas leídas del último
+parseo (telemetry()), que parser_service.py publica como métricas.
+
+Límites por tipo (DEFAULT_LIMITS) sobreescribibles por entorno:
+  PARSE_<TIPO>_WALL_S, PARSE_<TIPO>_CPU_S, PARSE_<TIPO>_RSS_MB   (p. ej. PARSE_PLAN_WALL_S=300)
+"""
+
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+POSIX_SIGNALS = all(hasattr(signal, s) for s in ("SIGALRM", "SIGXCPU", "SIGUSR1", "setitimer"))
+
+DEFAULT_LIMITS = {
+    "kardex": {"wall_s": 60, "cpu_s": 60, "rss_mb": 1024},
+    "plan": {"wall_s": 240, "cpu_s": 240, "rss_mb": 2048},
+}
+HARD_GRACE_S = 10
+EXIT_HARD_TIMEOUT = 3
+WATCH_INTERVAL_S = 0.25
+
+_stage = "inicio"
+_stage_started = time.perf_counter()
+_stage_seconds: dict = {}
+_pages = 0
+_hard_report = None  # ruta del reporte del respaldo duro (None = stdout)
+PAGE_SUFFIX_RE = re.compile(r":p\d+$")  # "tablas:p3" → "tablas" en la telemetría
+
+
+class ParseLimitExceeded(BaseException):
+    # BaseException (como KeyboardInterrupt): los extractores tienen muchos
+    # `except Exception: pass` que de otro modo se tragarían el límite.
+    def __init__(self, error: str, stage: str, limit: dict):
+        super().__init__(f"{error} en {stage}")
+        self.error = error
+        self.stage = stage
+        self.limit = limit
+
+    def to_dict(self) -> dict:
+        return {"ok": False, "error": self.error, "stage": self.stage, "limite": self.limit}
+
+
+def set_stage(name: str):
+    """Marca la etapa actual del parseo (se reporta si se rebasa un límite)."""
+    global _stage, _stage_started
+    now = time.perf_counter()
+    prev = PAGE_SUFFIX_RE.sub("", _stage)
+    _stage_seconds[prev] = _stage_seconds.get(prev, 0.0) + (now - _stage_started)
+    _stage, _stage_started = name, now
+
+
+def count_pages(n: int):
+    global _pages
+    _pages += n
+
+
+def reset_telemetry():
+    global _stage, _stage_started, _pages
+    _stage_seconds.clear()
+    _stage, _stage_started, _pages = "inicio", time.perf_counter(), 0
+
+
+def telemetry() -> dict:
+    """Segundos por etapa y páginas del último parseo (o del que va en curso)."""
+    return {"stages": dict(_stage_seconds), "pages": _pages, "rss_mb": rss_mb()}
+
+
+def current_stage() -> str:
+    return _stage
+
+
+def set_hard_report(path: str | None):
+    """
+    El respaldo duro escribe su JSON en `path` en vez de imprimirlo (None:
+    stdout otra vez). Borra un reporte anterior con la misma ruta.
+    """
+    global _hard_report
+    _hard_report = path
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def limits_for(tipo: str) -> dict:
+    lim = dict(DEFAULT_LIMITS.get(tipo, DEFAULT_LIMITS["kardex"]))
+    for key in lim:
+        env = os.environ.get(f"PARSE_{tipo.upper()}_{key.upper()}")
+        if env:
+            lim[key] = float(env)
+    return lim
+
+
+def rss_mb() -> float:
+    """RSS actual del proceso (Linux: /proc; otro SO: pico de getrusage; 0 si no hay cómo)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except Exception:
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _cpu_used_s() -> float:
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime
+
+
+class _Watchdog(threading.Thread):
+    def __init__(self, lim: dict, main_ident: int | None):
+        super().__init__(name="parse-watchdog", daemon=True)
+        self.lim = lim
+        self.main_ident = main_ident
+        self.deadline = time.monotonic() + lim["wall_s"] + HARD_GRACE_S
+        self.done = threading.Event()
+        self.tripped = None
+
+    def run(self):
+        while not self.done.wait(WATCH_INTERVAL_S):
+            if self.tripped is None and rss_mb() > self.lim["rss_mb"]:
+                self.tripped = "memory_limit"
+                if self.main_ident is not None:
+                    signal.pthread_kill(self.main_ident, signal.SIGUSR1)
+            if time.monotonic() > self.deadline:
+                # Atorado en código nativo: no queda más que salir del proceso
+                err = ParseLimitExceeded(self.tripped or "timeout", current_stage(), self.lim)
+                report = json.dumps({**err.to_dict(), "hard": True}, ensure_ascii=False)
+                try:
+                    if _hard_report:
+                        tmp = f"{_hard_report}.{os.getpid()}.tmp"
+                        with open(tmp, "w", encoding="utf-8") as f:
+                            f.write(report)
+                        os.replace(tmp, _hard_report)
+                    else:
+                        print(report, flush=True)
+                finally:
+                    os._exit(EXIT_HARD_TIMEOUT)
+
+
+@contextmanager
+def guarded(tipo: str):
+    """Corre el bloque con los límites de `tipo`; lanza ParseLimitExceeded al rebasarlos."""
+    lim = limits_for(tipo)
+    reset_telemetry()
+    in_main = POSIX_SIGNALS and resource is not None and threading.current_thread() is threading.main_thread()
+    watchdog = _Watchdog(lim, threading.main_thread().ident if in_main else None)
+
+    def raise_limit(error):
+        def handler(signum, frame):
+            raise ParseLimitExceeded(error, current_stage(), lim)
+        return handler
+
+    saved = {}
+    old_cpu = None
+    if in_main:
+        for sig, error in ((signal.SIGALRM, "timeout"), (signal.SIGXCPU, "cpu_limit"), (signal.SIGUSR1, "memory_limit")):
+            saved[sig] = signal.signal(sig, raise_limit(error))
+        signal.setitimer(signal.ITIMER_REAL, lim["wall_s"])
+        old_cpu = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = int(_cpu_used_s() + lim["cpu_s"]) + 1
+        hard = old_cpu[1]
+        if hard == resource.RLIM_INFINITY or soft < hard:
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    watchdog.start()
+    try:
+        yield lim
+    finally:
+        watchdog.done.set()
+        set_stage("fin")  # cierra el tiempo de la última etapa
+        if in_main:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            if old_cpu is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, old_cpu)
+            for sig, old in saved.items():
+                signal.signal(sig, old)
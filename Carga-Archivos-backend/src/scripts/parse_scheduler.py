@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador delante de los parsers (lo usa parser_service.py).
+
+- Single-flight: peticiones concurrentes con la misma llave (tipo + SHA-256 del
+  archivo + argumentos) comparten un solo parseo en vuelo; todas reciben el
+  mismo resultado. Si una petición interactiva coincide con un trabajo bulk que
+  aún está en cola, el trabajo se promueve al carril interactivo.
+- Dos carriles con cola acotada:
+    interactive → subidas de alumnos/coordinadores (siempre se despachan primero)
+    bulk        → re-importaciones por lote
+  Bulk nunca ocupa más de `bulk_slots` workers (por defecto N-1), así siempre
+  queda un worker para lo interactivo, y solo se despacha con la cola
+  interactiva vacía.
+- Contrapresión: si la cola del carril está llena, o si la espera estimada de
+  lo interactivo supera `interactive_target_ms`, submit() lanza Overloaded con
+  un Retry-After sugerido (el servicio responde 429).
+- close() deja de despachar: lo que sigue en cola falla con SchedulerClosed
+  (ningún Future queda sin resolver) y lo que ya corre termina normalmente.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+LANES = ("interactive", "bulk")
+
+
+class Overloaded(Exception):
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"{lane}: {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SchedulerClosed(RuntimeError):
+    """El planificador se cerró antes de despachar el trabajo."""
+
+
+class _Job:
+    __slots__ = ("key", "lane", "fn", "args", "future", "enqueued", "waiters")
+
+    def __init__(self, key, lane, fn, args):
+        self.key = key
+        self.lane = lane
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+        self.waiters = 1
+
+
+class Scheduler:
+    def __init__(
+        self,
+        executor,
+        workers: int,
+        max_queue: dict | None = None,
+        bulk_slots: int | None = None,
+        interactive_target_ms: float = 5000.0,
+    ):
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.max_queue = {"interactive": 64, "bulk": 1000, **(max_queue or {})}
+        self.bulk_slots = max(0, self.workers - 1) if bulk_slots is None else bulk_slots
+        if self.workers == 1:
+            self.bulk_slots = max(self.bulk_slots, 1)
+        self.interactive_target_ms = interactive_target_ms
+
+        self._cv = threading.Condition()
+        self._queues = {lane: deque() for lane in LANES}
+        self._inflight: dict = {}  # key → _Job (en cola o corriendo)
+        self._running = {lane: 0 for lane in LANES}
+        self._service_ms = 1000.0  # EWMA de duración de un parseo
+        self.counters = {"submitted": 0, "coalesced": 0, "promoted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        # callbacks(evento, **datos) para métricas: coalesced, rejected, dispatched, finished
+        self.listeners = []
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch_loop, name="parse-dispatch", daemon=True)
+        self._thread.start()
+
+    # ---------------- API ----------------
+    def submit(self, key, lane: str, fn, *args) -> Future:
+        """Encola fn(*args) bajo `key`; devuelve el Future compartido del parseo."""
+        if lane not in LANES:
+            raise ValueError(f"Carril desconocido: {lane}")
+        with self._cv:
+            if self._closed:
+                raise SchedulerClosed("Planificador cerrado")
+            job = self._inflight.get(key)
+            if job is not None:
+                job.waiters += 1
+                self.counters["coalesced"] += 1
+                if lane == "interactive" and job.lane == "bulk" and job in self._queues["bulk"]:
+                    self._queues["bulk"].remove(job)
+                    job.lane = "interactive"
+                    self._queues["interactive"].append(job)
+                    self.counters["promoted"] += 1
+                    self._cv.notify()
+                self._emit("coalesced", lane=lane)
+                return job.future
+
+            self._admit(lane)
+            job = _Job(key, lane, fn, args)
+            self._inflight[key] = job
+            self._queues[lane].append(job)
+            self.counters["submitted"] += 1
+            self._cv.notify()
+            return job.future
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {
+                "workers": self.workers,
+                "bulk_slots": self.bulk_slots,
+                "queued": {lane: len(q) for lane, q in self._queues.items()},
+                "running": dict(self._running),
+                "service_ms_ewma": round(self._service_ms, 1),
+                **self.counters,
+            }
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            # lo encolado ya no se despacha: se vacía aquí, con el lock, para que
+            # el hilo despachador nunca saque un trabajo después del cierre
+            pending = [job for lane in LANES for job in self._queues[lane]]
+            for q in self._queues.values():
+                q.clear()
+            for job in pending:
+                self._inflight.pop(job.key, None)
+            self._cv.notify_all()
+        for job in pending:
+            job.future.set_exception(SchedulerClosed("Planificador cerrado"))
+        self._thread.join(timeout=5)
+
+    # ---------------- internos ----------------
+    def _emit(self, event: str, **data):
+        for cb in self.listeners:
+            try:
+                cb(event, **data)
+            except Exception:
+                pass
+
+    def _admit(self, lane: str):
+        """Contrapresión (con el lock tomado)."""
+        q = self._queues[lane]
+        if len(q) >= self.max_queue[lane]:
+            self.counters["rejected"] += 1
+            self._emit("rejected", lane=lane, reason="queue_full")
+            raise Overloaded(lane, "queue_full", self._retry_after(lane))
+        if lane == "interactive":
+            slots = self.workers
+            est_ms = (len(q) + self._running["interactive"]) / slots * self._service_ms
+            if est_ms > self.interactive_target_ms:
+                self.counters["rejected"] += 1
+                self._emit("rejected", lane=lane, reason="latency_target")
+                raise Overloaded(lane, "latency_target", self._retry_after(lane))
+
+    def _retry_after(self, lane: str) -> float:
+        slots = self.workers if lane == "interactive" else max(1, self.bulk_slots)
+        return round(max(1.0, len(self._queues[lane]) / slots * self._service_ms / 1000), 1)
+
+    def _next_job(self):
+        """Elige el siguiente trabajo respetando prioridades y límites (con el lock tomado)."""
+        busy = sum(self._running.values())
+        if busy >= self.workers:
+            return None
+        if self._queues["interactive"]:
+            return self._queues["interactive"].popleft()
+        if self._queues["bulk"] and self._running["bulk"] < self.bulk_slots:
+            return self._queues["bulk"].popleft()
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cv:
+                job = None
+                while not self._closed:  # cerrado → no se saca nada de la cola
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cv.wait()
+                if job is None:
+                    return
+                self._running[job.lane] += 1
+            wait_ms = (time.monotonic() - job.enqueued) * 1000
+            self._emit("dispatched", lane=job.lane, wait_ms=wait_ms)
+            started = time.monotonic()
+            try:
+                inner = self.executor.submit(job.fn, *job.args)
+            except Exception as e:  # executor roto / cerrado
+                self._finish(job, started, error=e)
+                continue
+            inner.add_done_callback(lambda f, job=job, started=started: self._on_done(job, started, f))
+
+    def _on_done(self, job: _Job, started: float, inner: Future):
+        err = inner.exception()
+        self._finish(job, started, result=None if err else inner.result(), error=err)
+
+    def _finish(self, job: _Job, started: float, result=None, error=None):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._cv:
+            self._running[job.lane] -= 1
+            self._inflight.pop(job.key, None)
+            self._service_ms = 0.8 * self._service_ms + 0.2 * elapsed_ms
+            self.counters["failed" if error else "completed"] += 1
+            self._cv.notify()
+        self._emit("finished", lane=job.lane, ms=elapsed_ms, key=job.key, result=result, error=error)
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
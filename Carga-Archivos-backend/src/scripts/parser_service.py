@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servicio de parsers de larga vida (kardex.py / plan_estudio.py) sobre HTTP local.
+
+En vez de un proceso de Python por petición, Node hace POST a este servicio y
+un pool de workers corre el mismo CLI en proceso (kardex.run / plan_estudio.run),
+con el planificador de parse_scheduler.py delante (single-flight + carriles).
+
+Endpoints:
+  POST /parse   {"tipo": "kardex"|"plan", "path": "<pdf>", "args": [...],
+                 "prioridad": "interactive"|"bulk"}
+                → 200 con el mismo JSON que imprime el script
+                  (kardex: args ["--schema=alumnos"] para el esquema de
+                  Alumnos-backend; ambos esquemas comparten el mismo parseo)
+                → 429 + Retry-After si el carril está saturado
+  GET  /health  → estado del planificador
+  GET  /metrics → métricas en formato Prometheus (ver ServiceMetrics)
+
+Workers: por defecto nacen de un forkserver que ya importó y calentó todo
+(worker_preload.py) y comparten esa memoria copy-on-write; --start-method=spawn
+vuelve al arranque independiente por worker. Medición de PSS: bench_workers.py.
+Cada worker reutiliza las fuentes/CMaps ya decodificadas entre documentos
+(font_cache.py; ahorro medible con bench_fonts.py).
+
+Límites por documento: cada parseo corre con parse_limits.guarded() dentro del
+worker. Los workers se reciclan cada --max-tasks-per-child parseos (memoria
+fragmentada de pdfplumber/pandas). Si uno muere por el respaldo duro del vigía
+(os._exit), el pool se recrea: la petición atorada recibe el timeout que el
+vigía dejó en su archivo de estado ({"ok": false, "error": "timeout", "stage":
+..., "hard": true}) y los demás trabajos en vuelo se reenvían una vez al pool
+nuevo; si vuelven a caer reciben {"error": "worker_crashed"}.
+
+Uso:
+  python parser_service.py [--port=5055] [--workers=N] [--bulk-slots=N-1]
+                           [--interactive-target-ms=5000] [--max-tasks-per-child=50]
+                           [--metrics-file=parser.prom] [--metrics-interval=15]
+                           [--start-method=forkserver|spawn]
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from parse_metrics import Registry
+from parse_scheduler import Overloaded, Scheduler, SchedulerClosed
+
+DOC_TYPES = ("kardex", "plan")
+KARDEX_SCHEMAS = ("carga", "alumnos")
+
+
+def sha256_file(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def run_job(tipo: str, argv: list, status_path: str | None = None) -> dict:
+    """
+    Corre dentro de un worker: el CLI correspondiente, en proceso, más su
+    telemetría. `status_path`: ahí deja el vigía el timeout duro antes de
+    terminar el worker (ver ParserService.parse).
+    """
+    import font_cache
+    import parse_limits
+
+    if tipo == "kardex":
+        import kardex as mod
+    else:
+        import plan_estudio as mod
+    font_cache.install()
+    fonts0 = font_cache.stats()
+    parse_limits.reset_telemetry()
+    parse_limits.set_hard_report(status_path)
+    try:
+        out = mod.run(argv)
+    except SystemExit as e:  # p. ej. "Instala pdfplumber": no debe tumbar al worker
+        out = {"ok": False, "error": str(e.code)}
+    finally:
+        parse_limits.set_hard_report(None)
+    fonts1 = font_cache.stats()
+    fonts = {k: fonts1[k] - fonts0[k] for k in ("hits", "misses")}
+    return {"out": out, "telemetry": {**parse_limits.telemetry(), "pid": os.getpid(), "fonts": fonts}}
+
+
+def worker_context(start_method: str):
+    """
+    Contexto de multiprocessing del pool. "forkserver" (default donde existe):
+    el forkserver importa worker_preload.py una vez (dependencias pesadas,
+    parseo de prueba, gc.freeze) y cada worker es un fork suyo, con esa memoria
+    compartida copy-on-write. "spawn": cada worker importa todo por su cuenta.
+    """
+    if start_method == "forkserver" and "forkserver" not in multiprocessing.get_all_start_methods():
+        start_method = "spawn"
+    ctx = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        ctx.set_forkserver_preload(["worker_preload"])
+    return ctx
+
+
+LIMIT_ERRORS = {"timeout", "cpu_limit", "memory_limit", "worker_crashed"}
+
+
+def error_class(out: dict | None, exc: BaseException | None = None) -> str | None:
+    """Clase acotada de error para la etiqueta `error` (los mensajes son texto libre)."""
+    if exc is not None:
+        return "worker_crashed" if isinstance(exc, BrokenProcessPool) else type(exc).__name__
+    if out is None or out.get("ok"):
+        return None
+    err = out.get("error")
+    if err in LIMIT_ERRORS:
+        return err
+    if err is None:
+        return "sin_materias"
+    if str(err).startswith("Instala "):
+        return "missing_dependency"
+    return "parse_error"
+
+
+class ServiceMetrics:
+    PAGE_RATE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200)
+
+    def __init__(self, service: "ParserService"):
+        self.service = service
+        r = self.registry = Registry()
+        self.parse_seconds = r.histogram("parser_parse_seconds", "Duración del parseo en el worker", ("tipo", "lane"))
+        self.stage_seconds = r.histogram("parser_stage_seconds", "Duración por etapa del parseo", ("tipo", "stage"))
+        self.queue_wait = r.histogram("parser_queue_wait_seconds", "Espera en cola antes de despachar", ("lane",))
+        self.pages = r.counter("parser_pages_total", "Páginas leídas", ("tipo",))
+        self.pages_per_second = r.histogram(
+            "parser_pages_per_second", "Páginas por segundo por documento", ("tipo",), self.PAGE_RATE_BUCKETS)
+        self.documents = r.counter("parser_documents_total", "Documentos parseados", ("tipo", "ok"))
+        self.errors = r.counter("parser_errors_total", "Errores por clase", ("tipo", "error"))
+        self.fonts = r.counter("parser_font_cache_total", "Fuentes de pdfminer reutilizadas entre documentos", ("tipo", "result"))
+        self.cache = r.counter("parser_cache_requests_total", "Consultas a la caché de resultados", ("tipo", "result"))
+        self.coalesced = r.counter("parser_singleflight_coalesced_total", "Peticiones unidas a un parseo en vuelo", ("lane",))
+        self.rejected = r.counter("parser_rejected_total", "Peticiones rechazadas (429)", ("lane", "reason"))
+        self.queue_depth = r.gauge("parser_queue_depth", "Trabajos en cola", ("lane",))
+        self.running = r.gauge("parser_running", "Trabajos corriendo", ("lane",))
+        self.workers = r.gauge("parser_workers", "Tamaño del pool")
+        self.worker_rss = r.gauge("parser_worker_rss_bytes", "RSS del worker al terminar su último parseo", ("pid",))
+
+    def on_event(self, event: str, **data):
+        if event == "coalesced":
+            self.coalesced.inc(lane=data["lane"])
+        elif event == "rejected":
+            self.rejected.inc(lane=data["lane"], reason=data["reason"])
+        elif event == "dispatched":
+            self.queue_wait.observe(data["wait_ms"] / 1000, lane=data["lane"])
+        elif event == "finished":
+            self._finished(data["key"][0], data["lane"], data["ms"] / 1000, data["result"], data["error"])
+
+    def _finished(self, tipo: str, lane: str, seconds: float, result: dict | None, exc):
+        out = (result or {}).get("out")
+        tel = (result or {}).get("telemetry") or {}
+        self.parse_seconds.observe(seconds, tipo=tipo, lane=lane)
+        for stage, secs in tel.get("stages", {}).items():
+            self.stage_seconds.observe(secs, tipo=tipo, stage=stage)
+        pages = tel.get("pages") or 0
+        if pages:
+            self.pages.inc(pages, tipo=tipo)
+            self.pages_per_second.observe(pages / max(seconds, 1e-6), tipo=tipo)
+        if tel.get("pid"):
+            self.worker_rss.set(tel["rss_mb"] * (1 << 20), pid=tel["pid"])
+        for kind, n in (tel.get("fonts") or {}).items():
+            if n:
+                self.fonts.inc(n, tipo=tipo, result="hit" if kind == "hits" else "miss")
+        cache = (out or {}).get("cache")
+        if cache is not None:
+            self.cache.inc(tipo=tipo, result="hit" if cache.get("hit") else "miss")
+        err = error_class(out, exc)
+        self.documents.inc(tipo=tipo, ok="false" if err else "true")
+        if err:
+            self.errors.inc(tipo=tipo, error=err)
+
+    def render(self) -> str:
+        stats = self.service.scheduler.stats()
+        for lane, n in stats["queued"].items():
+            self.queue_depth.set(n, lane=lane)
+        for lane, n in stats["running"].items():
+            self.running.set(n, lane=lane)
+        self.workers.set(stats["workers"])
+        for (pid,) in self.worker_rss.keys():  # workers reciclados ya no existen
+            try:
+                os.kill(int(pid), 0)
+            except (OSError, ValueError):
+                self.worker_rss.remove(pid=pid)
+        return self.registry.render()
+
+    def write_file(self, path: str):
+        self.render()
+        self.registry.write_file(path)
+
+
+class ParserService:
+    def __init__(self, workers: int, bulk_slots: int | None, interactive_target_ms: float,
+                 max_tasks_per_child: int = 50, start_method: str = "forkserver"):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.start_method = start_method
+        self._pool_lock = threading.Lock()
+        self.status_dir = tempfile.mkdtemp(prefix="parser-status-")
+        self.executor = self._new_executor()
+        self.scheduler = Scheduler(
+            self.executor,
+            workers=workers,
+            bulk_slots=bulk_slots,
+            interactive_target_ms=interactive_target_ms,
+        )
+        self.metrics = ServiceMetrics(self)
+        self.scheduler.listeners.append(self.metrics.on_event)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=worker_context(self.start_method),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def _recover(self, broken: ProcessPoolExecutor):
+        """Recrea el pool si un worker murió (os._exit del vigía, OOM killer, ...)."""
+        with self._pool_lock:
+            if self.executor is broken:
+                self.executor = self._new_executor()
+                self.scheduler.executor = self.executor
+                broken.shutdown(wait=False, cancel_futures=True)
+
+    def _status_path(self, key: tuple) -> str:
+        """Archivo de estado por llave: todos los que esperan el mismo parseo lo comparten."""
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.status_dir, f"{name}.json")
+
+    @staticmethod
+    def _hard_timeout(status_path: str) -> dict | None:
+        try:
+            with open(status_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def parse(self, tipo: str, path: Path, args: list, prioridad: str) -> dict:
+        file_hash = sha256_file(path)
+        schema = None
+        run_args = list(args)
+        if tipo == "kardex":
+            # Un solo parseo por archivo para ambos backends: el worker arma los
+            # dos esquemas (--schema=all) y aquí se entrega el que se pidió
+            schema = next((a.split("=", 1)[1] for a in args if a.startswith("--schema=")), "carga")
+            if schema not in KARDEX_SCHEMAS:
+                raise ValueError(f"--schema debe ser uno de {KARDEX_SCHEMAS}")
+            args = [a for a in args if not a.startswith("--schema=")]
+            run_args = [*args, "--schema=all"]
+        key = (tipo, file_hash, tuple(args))
+        status_path = self._status_path(key)
+        for _ in range(2):
+            executor = self.executor
+            # --mmap: el worker mapea el archivo (páginas compartidas vía page cache);
+            # --sha256: el hash de la llave, para que el worker no lo recalcule
+            argv = [str(path), *run_args, "--mmap", f"--sha256={file_hash}"]
+            fut = self.scheduler.submit(key, prioridad, run_job, tipo, argv, status_path)
+            try:
+                out = fut.result()["out"]
+                break
+            except BrokenProcessPool:
+                # Un worker murió y con él todo el pool: si fue este parseo el
+                # que se atoró, el vigía dejó su timeout; si no, se reenvía
+                self._recover(executor)
+                hard = self._hard_timeout(status_path)
+                if hard is not None:
+                    return hard
+        else:
+            return {"ok": False, "error": "worker_crashed", "stage": None}
+        if schema and "schemas" in out:
+            extra = {k: v for k, v in out.items() if k not in ("ok", "schemas")}
+            return {**out["schemas"][schema], **extra}
+        return out
+
+    def close(self):
+        self.scheduler.close()
+        self.executor.shutdown(cancel_futures=True)
+        shutil.rmtree(self.status_dir, ignore_errors=True)
+
+
+def make_handler(service: ParserService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: dict, headers: dict | None = None):
+            raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, {"ok": True, "scheduler": service.scheduler.stats()})
+            if self.path == "/metrics":
+                raw = service.metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                return
+            self._send(404, {"ok": False, "error": "No encontrado"})
+
+        def do_POST(self):
+            if self.path != "/parse":
+                return self._send(404, {"ok": False, "error": "No encontrado"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                req = json.loads(self.rfile.read(length) or b"{}")
+            except Exception:
+                return self._send(400, {"ok": False, "error": "JSON inválido"})
+
+            tipo = req.get("tipo")
+            prioridad = req.get("prioridad") or "interactive"
+            args = [str(a) for a in req.get("args") or []]
+            if tipo not in DOC_TYPES:
+                return self._send(400, {"ok": False, "error": f"tipo debe ser uno de {DOC_TYPES}"})
+            path = Path(req.get("path") or "")
+            if not path.is_file():
+                return self._send(404, {"ok": False, "error": f"No existe el archivo: {path}"})
+
+            try:
+                out = service.parse(tipo, path, args, prioridad)
+            except Overloaded as e:
+                return self._send(
+                    429,
+                    {"ok": False, "error": "overloaded", "lane": e.lane, "reason": e.reason},
+                    {"Retry-After": str(int(e.retry_after + 0.999))},
+                )
+            except SchedulerClosed as e:
+                return self._send(503, {"ok": False, "error": str(e)})
+            except ValueError as e:
+                return self._send(400, {"ok": False, "error": str(e)})
+            except Exception as e:
+                return self._send(500, {"ok": False, "error": str(e)})
+            self._send(200, out)
+
+        def log_message(self, fmt, *args):  # silencioso: stdout/stderr quedan para Node
+            pass
+
+    return Handler
+
+
+def main():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    workers = int(opts.get("workers", os.environ.get("PARSER_WORKERS", os.cpu_count() or 2)))
+    port = int(opts.get("port", os.environ.get("PARSER_SERVICE_PORT", 5055)))
+    bulk_slots = int(opts["bulk-slots"]) if "bulk-slots" in opts else None
+    target = float(opts.get("interactive-target-ms", 5000))
+    max_tasks = int(opts.get("max-tasks-per-child", os.environ.get("PARSER_MAX_TASKS_PER_CHILD", 50)))
+    start_method = opts.get("start-method", os.environ.get("PARSER_START_METHOD", "forkserver"))
+    if start_method not in ("forkserver", "spawn"):
+        print(json.dumps({"ok": False, "error": "--start-method debe ser forkserver o spawn"}), flush=True)
+        sys.exit(1)
+
+    service = ParserService(workers, bulk_slots, target, max_tasks, start_method)
+    metrics_file = opts.get("metrics-file") or os.environ.get("PARSER_METRICS_FILE")
+    if metrics_file:
+        interval = float(opts.get("metrics-interval", 15))
+
+        def dump_metrics():
+            while True:
+                try:
+                    service.metrics.write_file(metrics_file)
+                except OSError as e:
+                    print(json.dumps({"ok": False, "error": f"metrics-file: {e}"}), file=sys.stderr, flush=True)
+                time.sleep(interval)
+
+        threading.Thread(target=dump_metrics, name="metrics-file", daemon=True).start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(service))
+    print(json.dumps({"ok": True, "port": port, "workers": workers, "start_method": start_method}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
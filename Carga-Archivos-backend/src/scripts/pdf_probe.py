@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sondeo rápido de un PDF (--probe de kardex.py y plan_estudio.py).
+
+Clasifica el documento antes de pagar un parseo completo, leyendo solo los
+bytes crudos del archivo (sin pdfplumber / pdfminer):
+
+  - páginas: objetos /Type /Page (o /Count del árbol de páginas; también dentro
+    de object streams comprimidos)
+  - texto: cadenas de los operadores Tj / TJ / ' / " de los primeros content
+    streams (FlateDecode con zlib); imágenes, programas de fuente y demás
+    streams con /Subtype (salvo formularios) se saltan
+  - clase: KARDEX | PLAN_OFICIAL | PLAN_ALUMNO | UNKNOWN, con las mismas
+    heurísticas que los parsers (detect_origen de plan_estudio.py), sobre
+    cualquier texto que se haya podido sacar
+  - cifrado: trae /Encrypt; requiere_password: además no abre con contraseña
+    de usuario vacía (los PDFs con solo contraseña de dueño se leen normal)
+
+Si las cadenas crudas no sirven (fuentes con Identity-H sin mapear, PDF
+cifrado, p. ej.) y pdfminer está instalado, se lee solo la primera página con
+pdfminer; `metodo` dice cuál camino se usó.
+
+Uso:
+  python pdf_probe.py <archivo.pdf>
+
+Salida (JSON):
+{ ok, probe: true, clase, paginas, tiene_texto, cifrado, requiere_password, expediente?, plan?, metodo, ms }
+"""
+
+import base64
+import json
+import re
+import sys
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+
+from pdf_source import PdfSource
+
+CLASSES = ("KARDEX", "PLAN_OFICIAL", "PLAN_ALUMNO", "UNKNOWN")
+MAX_CONTENT_STREAMS = 6  # basta con la primera página (los encabezados se repiten)
+MIN_TEXT_CHARS = 200
+
+STREAM_RE = re.compile(rb"(?<!end)stream\r?\n")  # no el cierre `endstream`
+OBJ_RE = re.compile(rb"\d+\s+\d+\s+obj\b")
+# Programas de fuente (/FontFile*, /Length1-3) y streams con /Subtype que no son
+# contenido de página (imágenes, XML de metadatos, Type1C/OpenType...): sus
+# bytes parecen operadores de texto y ensucian el sondeo. /Form sí dibuja texto.
+SKIP_HEAD_RE = re.compile(rb"/FontFile|/Length[123]\b|/DCTDecode|/JPXDecode")
+SUBTYPE_RE = re.compile(rb"/Subtype\s*/(\w+)")
+FILTER_RE = re.compile(rb"/Filter\s*(?:\[([^\]]*)\]|(/\w+))")
+PAGE_RE = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+COUNT_RE = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", re.S)
+TEXT_OP_RE = re.compile(
+    rb"\((?P<lit>(?:\\.|[^\\)])*)\)\s*(?:Tj|'|\")"     # (texto) Tj
+    rb"|\[(?P<arr>(?:\\.|[^\]\\])*)\]\s*TJ"           # [(te) -20 (xto)] TJ
+    rb"|(?P<nl>T\*|Td|TD|ET)\b",                      # saltos de línea / fin de bloque
+    re.S,
+)
+LIT_RE = re.compile(rb"\((?:\\.|[^\\)])*\)", re.S)
+ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"(": b"(", b")": b")", b"\\": b"\\"}
+
+EXPEDIENTE_RE = re.compile(r"EXPEDIENTE:?\s*(\d{6,10})", re.I)
+PLAN_RE = re.compile(r"\bPLAN\b\s*[:\-]?\s*(\d{4})(?!\d)", re.I)
+
+
+def _unescape(raw: bytes) -> bytes:
+    out, i = bytearray(), 0
+    while i < len(raw):
+        c = raw[i:i + 1]
+        if c == b"\\" and i + 1 < len(raw):
+            nxt = raw[i + 1:i + 2]
+            if nxt in ESCAPES:
+                out += ESCAPES[nxt]
+                i += 2
+                continue
+            m = re.match(rb"[0-7]{1,3}", raw[i + 1:i + 4])
+            if m:
+                out.append(int(m.group(0), 8) & 0xFF)
+                i += 1 + len(m.group(0))
+                continue
+            i += 1
+            continue
+        out += c
+        i += 1
+    return bytes(out)
+
+
+def stream_head(data: bytes, stream_at: int) -> bytes:
+    """Diccionario del stream: desde `N G obj` (así entran los << >> anidados)."""
+    window = max(0, stream_at - 4096)
+    heads = list(OBJ_RE.finditer(data, window, stream_at))
+    if heads:
+        return data[heads[-1].end():stream_at]
+    dict_start = data.rfind(b"<<", window, stream_at)
+    return data[dict_start:stream_at] if dict_start != -1 else b""
+
+
+def skip_stream(head: bytes) -> bool:
+    if SKIP_HEAD_RE.search(head):
+        return True
+    sub = SUBTYPE_RE.search(head)
+    return sub is not None and sub.group(1) != b"Form"
+
+
+def iter_streams(data: bytes):
+    """(diccionario, contenido decodificado) de cada stream que pueda traer texto."""
+    for m in STREAM_RE.finditer(data):
+        start = m.end()
+        head = stream_head(data, m.start())
+        if skip_stream(head):
+            continue
+        end = data.find(b"endstream", start)
+        if end == -1:
+            break
+        body = decode_stream(head, data[start:end])
+        if body is not None:
+            yield head, body
+
+
+def decode_stream(head: bytes, body: bytes) -> bytes | None:
+    """Aplica la cadena /Filter; None si trae un filtro que no vale la pena en un sondeo (LZW, ...)."""
+    m = FILTER_RE.search(head)
+    names = re.findall(rb"/(\w+)", m.group(1) or m.group(2)) if m else []
+    for name in names:
+        try:
+            if name == b"FlateDecode":
+                body = zlib.decompressobj().decompress(body)
+            elif name == b"ASCII85Decode":
+                body = base64.a85decode(body.strip().removesuffix(b"~>") + b"~>", adobe=True)
+            elif name == b"ASCIIHexDecode":
+                body = bytes.fromhex(re.sub(rb"\s+", b"", body).removesuffix(b">").decode("ascii"))
+            else:
+                return None
+        except (zlib.error, ValueError):
+            return None
+    return body
+
+
+def content_text(body: bytes) -> str:
+    """Texto aproximado de un content stream (orden de dibujo)."""
+    parts = []
+    for m in TEXT_OP_RE.finditer(body):
+        if m.group("nl"):
+            parts.append("\n")
+        elif m.group("lit") is not None:
+            parts.append(_unescape(m.group("lit")).decode("latin-1"))
+        else:
+            parts.append("".join(_unescape(s[1:-1]).decode("latin-1") for s in LIT_RE.findall(m.group("arr"))))
+            parts.append(" ")
+    return re.sub(r"[ \t]+", " ", "".join(parts))
+
+
+def readable(text: str) -> bool:
+    """
+    ¿Las cadenas crudas son texto usable (y no glifos de una fuente sin mapear)?
+    Cuenta letras y dígitos: un kárdex es casi todo claves y calificaciones.
+    """
+    visible = len(text.replace(" ", "").replace("\n", ""))
+    alnum = sum(ch.isalnum() for ch in text)
+    return len(text) >= 20 and alnum / max(1, visible) > 0.5
+
+
+def count_pages(data: bytes, decoded_objstms: list[bytes]) -> int:
+    n = len(PAGE_RE.findall(data)) + sum(len(PAGE_RE.findall(b)) for b in decoded_objstms)
+    if n:
+        return n
+    counts = [int(a or b) for a, b in COUNT_RE.findall(data)]
+    for b in decoded_objstms:
+        counts += [int(x or y) for x, y in COUNT_RE.findall(b)]
+    return max(counts, default=0)
+
+
+def classify(text: str) -> str:
+    from plan_estudio import detect_origen
+
+    up = unicodedata.normalize("NFKD", text.upper())
+    up_noacc = "".join(ch for ch in up if not unicodedata.combining(ch))
+    if "KARDEX" in up_noacc or ("EXPEDIENTE" in up_noacc and re.search(r"\bESTATUS\b", up_noacc)):
+        return "KARDEX"
+    origen = detect_origen(text)
+    if origen == "OFICIAL":
+        return "PLAN_OFICIAL"
+    if origen == "ALUMNO":
+        return "PLAN_ALUMNO"
+    return "UNKNOWN"
+
+
+def needs_password(fp) -> bool:
+    """¿El PDF cifrado NO abre con contraseña de usuario vacía? (solo con pdfminer)."""
+    try:
+        from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+        from pdfminer.pdfparser import PDFParser
+    except Exception:
+        return True  # sin pdfminer no se puede comprobar: se trata como protegido
+    if isinstance(fp, str):
+        with open(fp, "rb") as f:
+            return needs_password(f)
+    try:
+        PDFDocument(PDFParser(fp), password="")
+    except PDFPasswordIncorrect:
+        return True
+    except Exception:
+        return False  # otro problema: que lo decida el parser completo
+    return False
+
+
+def first_page_text_pdfminer(fp) -> str | None:
+    try:
+        from pdfminer.high_level import extract_text
+    except Exception:
+        return None
+    try:
+        return extract_text(fp, maxpages=1) or ""
+    except Exception:
+        return None
+
+
+def probe(pdf) -> dict:
+    """`pdf`: ruta o PdfSource (se reutiliza su buffer en memoria; bytes o mmap)."""
+    t0 = time.perf_counter()
+    if isinstance(pdf, PdfSource):
+        data, open_fp = pdf.data, pdf.open
+    else:
+        data = Path(pdf).read_bytes()
+        open_fp = lambda: str(pdf)  # noqa: E731
+    if data[:4] != b"%PDF":
+        return {"ok": False, "probe": True, "clase": "UNKNOWN", "error": "No es un PDF"}
+
+    cifrado = b"/Encrypt" in data[-4096:] or b"/Encrypt" in data[:4096]
+    requiere_password = cifrado and needs_password(open_fp())
+    objstms, chunks, has_text_ops, seen = [], [], False, 0
+    for head, body in iter_streams(data):
+        if b"/ObjStm" in head:
+            objstms.append(body)
+            continue
+        if b"BT" not in body:
+            continue
+        has_text_ops = True
+        seen += 1
+        chunks.append(content_text(body))
+        if seen >= MAX_CONTENT_STREAMS or sum(map(len, chunks)) >= MIN_TEXT_CHARS * 10:
+            break
+
+    text = "\n".join(chunks)
+    metodo = "raw"
+    # cifrado con contraseña vacía: las cadenas crudas están cifradas, pdfminer las descifra
+    if (cifrado or not readable(text)) and not requiere_password:
+        alt = first_page_text_pdfminer(open_fp())
+        if alt is not None:
+            text, metodo = alt, "pdfminer"
+            has_text_ops = has_text_ops or bool(alt.strip())
+
+    out = {
+        "ok": True,
+        "probe": True,
+        "clase": classify(text) if text.strip() else "UNKNOWN",
+        "paginas": count_pages(data, objstms),
+        "tiene_texto": has_text_ops,
+        "cifrado": cifrado,
+        "requiere_password": requiere_password,
+        "metodo": metodo,
+    }
+    m = EXPEDIENTE_RE.search(text)
+    if m:
+        out["expediente"] = m.group(1)
+    m = PLAN_RE.search(text)
+    if m:
+        out["plan"] = m.group(1)
+    out["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return out
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print(json.dumps({"ok": False, "error": "Uso: pdf_probe.py <archivo.pdf>"}))
+        sys.exit(1)
+    path = Path(args[0])
+    if not path.exists():
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {path}"}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(probe(path), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
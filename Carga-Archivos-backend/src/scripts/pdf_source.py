@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Documento PDF abierto una sola vez en memoria, compartido por todos los extractores.
+
+Antes cada extractor reabría el archivo por ruta (pdfplumber para texto, otra
+vez para tablas, pdfminer como respaldo, tabula/camelot) y el hash se calculaba
+aparte. PdfSource lee el documento una vez y calcula el SHA-256 en la misma pasada:
+
+  - PdfSource.from_stdin()          bytes por stdin (`kardex.py -`)
+  - PdfSource.from_path(p)          lectura por bloques (hash al vuelo)
+  - PdfSource.from_path(p, mmap)    archivo mapeado en memoria (--mmap)
+
+Si quien llama ya tiene el SHA-256 (parser_service.py lo calcula para su llave
+de single-flight y lo pasa con --sha256=<hex>), from_path lo toma tal cual y no
+vuelve a hashear el archivo.
+
+open() entrega un lector nuevo (seekable) sobre el mismo buffer, sin copiarlo;
+filename() da una ruta real para las librerías que solo aceptan rutas (camelot,
+tabula): la original si existe, o un temporal escrito una sola vez.
+"""
+
+import io
+import os
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+
+CHUNK = 1 << 20
+
+
+class _MemoryReader(io.RawIOBase):
+    """Lector seekable sobre un buffer (p. ej. mmap) sin copiarlo."""
+
+    def __init__(self, buf):
+        self._mv = memoryview(buf)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._mv) - self._pos))
+        b[:n] = self._mv[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._mv)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._mv.release()
+        super().close()
+
+
+class PdfSource:
+    def __init__(self, data, sha256: str, path: Path | None = None, mm=None):
+        self.data = data  # bytes o mmap
+        self.sha256 = sha256
+        self.path = path
+        self._mm = mm
+        self._tmp: str | None = None
+
+    # ---------- construcción ----------
+    @classmethod
+    def _read_hashing(cls, fh, path: Path | None, sha256: str | None = None) -> "PdfSource":
+        if sha256 is not None:
+            return cls(fh.read(), sha256, path)
+        import hashlib  # al primer uso: --version / --selftest no lo pagan
+
+        h, chunks = hashlib.sha256(), []
+        for block in iter(lambda: fh.read(CHUNK), b""):
+            h.update(block)
+            chunks.append(block)
+        return cls(b"".join(chunks), h.hexdigest(), path)
+
+    @classmethod
+    def from_stdin(cls) -> "PdfSource":
+        return cls._read_hashing(sys.stdin.buffer, None)
+
+    @classmethod
+    def from_path(cls, path: Path, use_mmap: bool = False, sha256: str | None = None) -> "PdfSource":
+        """`sha256`: digest ya calculado por quien llama (no se vuelve a hashear)."""
+        path = Path(path)
+        with open(path, "rb") as fh:
+            if not use_mmap or path.stat().st_size == 0:
+                return cls._read_hashing(fh, path, sha256)
+            import mmap
+
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if sha256 is None:
+            import hashlib
+
+            sha256 = hashlib.sha256(mm).hexdigest()
+        return cls(mm, sha256, path, mm)
+
+    # ---------- acceso ----------
+    def __len__(self):
+        return len(self.data)
+
+    def open(self):
+        """Lector binario nuevo sobre el buffer compartido (cada extractor el suyo)."""
+        if isinstance(self.data, bytes):
+            return io.BytesIO(self.data)  # BytesIO comparte los bytes hasta que se escriba
+        return io.BufferedReader(_MemoryReader(self.data), buffer_size=1 << 16)
+
+    def filename(self) -> str:
+        """Ruta en disco para librerías que no aceptan streams (camelot, tabula)."""
+        if self.path is not None and self.path.exists():
+            return str(self.path)
+        if self._tmp is None:
+            import tempfile  # solo en este caso (stdin + camelot/tabula)
+
+            fd, self._tmp = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+        return self._tmp
+
+    def close(self):
+        if self._tmp:
+            try:
+                os.unlink(self._tmp)
+            except OSError:
+                pass
+            self._tmp = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:  # aún hay lectores vivos; se libera con el proceso
+                pass
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __str__(self):
+        return str(self.path) if self.path else "<stdin>"
+
+
+def open_input(pdf):
+    """Lo que aceptan pdfplumber / pdfminer / PyPDF2: stream del buffer, o la ruta tal cual."""
+    return pdf.open() if isinstance(pdf, PdfSource) else str(pdf)
+
+
+def filename_of(pdf) -> str:
+    return pdf.filename() if isinstance(pdf, PdfSource) else str(pdf)
+
+
+def as_source(pdf, use_mmap: bool = False):
+    """Context manager: PdfSource tal cual (no se cierra aquí) o uno nuevo desde una ruta."""
+    if isinstance(pdf, PdfSource):
+        return nullcontext(pdf)
+    return PdfSource.from_path(Path(pdf), use_mmap=use_mmap)
+
+
+def source_from_argv(pdf_arg: str, argv: list) -> PdfSource:
+    """`-` → stdin; ruta → lectura única (o mmap con --mmap; --sha256=<hex> si ya se hasheó)."""
+    if pdf_arg == "-":
+        return PdfSource.from_stdin()
+    sha256 = next((a.split("=", 1)[1] for a in argv if a.startswith("--sha256=")), None)
+    return PdfSource.from_path(Path(pdf_arg), use_mmap="--mmap" in argv, sha256=sha256)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de planes de estudio ya parseados (SQLite, sin dependencias).
+
+- Llave primaria: (SHA-256 del archivo PDF, backend) → resultado completo de
+  plan_estudio.py. tabula y plumber pueden sacar materias distintas del mismo
+  PDF, así que un resultado de un backend nunca se sirve al otro.
+- Índice secundario: (version, origen) → permite preguntar “¿ya tenemos este plan?”
+  aunque el PDF nuevo tenga otro hash (otra fecha de impresión, metadatos, etc.).
+- content_hash: huella del contenido normalizado (materias + requisitos +
+  acentuaciones), independiente del archivo; dos PDFs del mismo plan dan el
+  mismo content_hash.
+- Cada resultado guarda la versión del parser que lo produjo; get() con otra
+  versión es un miss (p. ej. resultados previos a la captura de requisitos).
+
+Ubicación por defecto: $PLAN_CACHE_DB o <Carga-Archivos-backend>/cache/plan_cache.sqlite
+(relativa a este script, no al directorio desde el que se lance).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_cache (
+  file_hash    TEXT NOT NULL,
+  backend      TEXT NOT NULL,
+  version      TEXT NOT NULL,
+  origen       TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  result       TEXT NOT NULL,
+  created_at   REAL NOT NULL,
+  PRIMARY KEY (file_hash, backend)
+);
+CREATE INDEX IF NOT EXISTS ix_plan_cache_version_origen ON plan_cache (version, origen, created_at);
+CREATE INDEX IF NOT EXISTS ix_plan_cache_content ON plan_cache (content_hash);
+"""
+
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]  # Carga-Archivos-backend/
+
+
+def default_db_path() -> Path:
+    return Path(os.environ.get("PLAN_CACHE_DB") or BACKEND_ROOT / "cache" / "plan_cache.sqlite")
+
+
+def sha256_file(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_hash(result: dict) -> str:
+    """
+    Huella del contenido del plan: versión + materias (codigo, nombre, creditos, tipo,
+    requisitos) + membresía de acentuaciones, todo ordenado para que no dependa del
+    orden de extracción.
+    """
+    materias = sorted(
+        (m.get("codigo"), m.get("nombre"), m.get("creditos"), m.get("tipo"),
+         sorted(m.get("requisitos") or []), m.get("creditos_requisito"))
+        for m in result.get("materias") or []
+    )
+    acents = sorted(
+        (a.get("nombre"), sorted(m.get("codigo") for m in a.get("materias") or []))
+        for a in result.get("acentuaciones") or []
+    )
+    payload = {
+        "version": (result.get("plan") or {}).get("version"),
+        "materias": materias,
+        "acentuaciones": acents,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, db_path: Path | None = None):
+        self.db_path = Path(db_path or default_db_path())
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=10)
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(plan_cache)")}
+        if cols and "backend" not in cols:
+            # caché anterior llaveada solo por archivo: no sabemos qué backend
+            # produjo cada resultado, se descarta (es solo caché)
+            self.conn.executescript("DROP TABLE plan_cache;")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- lecturas ----
+    def get(self, file_hash: str, parser_version: str | None = None, backend: str = "tabula") -> dict | None:
+        row = self.conn.execute(
+            "SELECT result FROM plan_cache WHERE file_hash = ? AND backend = ?", (file_hash, backend)
+        ).fetchone()
+        if not row:
+            return None
+        result = json.loads(row[0])
+        stored_version = result.pop("parser_version", None)
+        if parser_version is not None and stored_version != parser_version:
+            return None
+        return result
+
+    def latest(self, version: str, origen: str) -> dict | None:
+        """Entrada más reciente para (version, origen)."""
+        row = self.conn.execute(
+            "SELECT file_hash, content_hash, created_at FROM plan_cache "
+            "WHERE version = ? AND origen = ? ORDER BY created_at DESC LIMIT 1",
+            (version, origen),
+        ).fetchone()
+        if not row:
+            return None
+        return {"file_hash": row[0], "content_hash": row[1], "created_at": row[2]}
+
+    def same_content(self, chash: str, exclude_file_hash: str | None = None) -> list[str]:
+        """Hashes de archivo con exactamente el mismo contenido de plan."""
+        rows = self.conn.execute(
+            "SELECT file_hash FROM plan_cache WHERE content_hash = ? "
+            "GROUP BY file_hash ORDER BY MIN(created_at)",  # un archivo puede estar con ambos backends
+            (chash,),
+        ).fetchall()
+        return [r[0] for r in rows if r[0] != exclude_file_hash]
+
+    # ---- escritura ----
+    def put(self, file_hash: str, result: dict, parser_version: str | None = None, backend: str = "tabula") -> str:
+        """Guarda solo resultados válidos; devuelve el content_hash."""
+        chash = content_hash(result)
+        if not result.get("ok"):
+            return chash
+        version = str((result.get("plan") or {}).get("version") or "N/A")
+        origen = str(result.get("origen") or "DESCONOCIDO")
+        stored = {k: v for k, v in result.items() if k not in ("debug", "cache")}
+        if parser_version is not None:
+            stored["parser_version"] = parser_version
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO plan_cache (file_hash, backend, version, origen, content_hash, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_hash, backend, version, origen, chash, json.dumps(stored, ensure_ascii=False), time.time()),
+            )
+        return chash
+
+    def compare(self, file_hash: str, result: dict) -> dict:
+        """
+        Reporte para --compare-to-cache: ¿el contenido coincide con lo que ya
+        tenemos para la misma (version, origen)? Se calcula antes de guardar.
+        """
+        chash = content_hash(result)
+        version = str((result.get("plan") or {}).get("version") or "N/A")
+        origen = str(result.get("origen") or "DESCONOCIDO")
+        prev = self.latest(version, origen)
+        if prev and prev["file_hash"] == file_hash:
+            # el mismo archivo ya estaba: compara contra lo anterior a él
+            row = self.conn.execute(
+                "SELECT file_hash, content_hash FROM plan_cache WHERE version = ? AND origen = ? "
+                "AND file_hash <> ? ORDER BY created_at DESC LIMIT 1",
+                (version, origen, file_hash),
+            ).fetchone()
+            prev = {"file_hash": row[0], "content_hash": row[1]} if row else None
+        return {
+            "version": version,
+            "origen": origen,
+            "content_hash": chash,
+            "previous_file_hash": prev["file_hash"] if prev else None,
+            "same_as_latest": bool(prev and prev["content_hash"] == chash),
+            "same_content_as": self.same_content(chash, exclude_file_hash=file_hash),
+        }
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Delta de un plan parseado contra el catálogo actual de materias.
+
+Snapshot aceptado (--catalog=<archivo>):
+- JSON lista:   [{codigo, nombre, creditos, tipo, acentuacion?}, ...]
+- JSON objeto:  {materias: [...], acentuaciones?: [{nombre, materias: [codigo | {codigo}]}]}
+- JSON por versión: {"2182": <lista u objeto como arriba>, ...}  → se toma la del plan parseado
+- CSV con encabezado: codigo,nombre,creditos,tipo[,acentuacion]
+
+El tipo se compara canonizado (OBL/OPT), así que da igual si el snapshot viene
+de la BD (OBLIGATORIA/OPTATIVA) o de una salida previa del parser.
+
+Uso como paso aparte (el controlador de planes lo corre después del parseo,
+con un snapshot solo del plan parseado):
+  python plan_delta.py <resultado.json | -> --catalog=<snapshot.json|csv>
+Imprime el mismo resultado con `materias` reducido a altas y cambios,
+`materias_total` y `delta` (ver apply_delta).
+"""
+
+import csv
+import json
+import re
+import sys
+from pathlib import Path
+
+DELTA_FIELDS = ("nombre", "creditos", "tipo")
+
+
+def canon_codigo(c) -> str:
+    digits = re.search(r"\d+", str(c or ""))
+    if not digits:
+        return ""
+    d = digits.group(0)
+    return d.zfill(5) if len(d) < 5 else d
+
+
+def canon_tipo(t) -> str:
+    s = str(t or "").upper()
+    return "OPT" if re.search(r"OP|ELE|SEL", s) else "OBL"
+
+
+def canon_nombre(n) -> str:
+    return re.sub(r"\s{2,}", " ", str(n or "")).strip()
+
+
+def canon_creditos(v):
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return None
+
+
+def _canon_materia(m: dict) -> dict:
+    return {
+        "codigo": canon_codigo(m.get("codigo")),
+        "nombre": canon_nombre(m.get("nombre")),
+        "creditos": canon_creditos(m.get("creditos")),
+        "tipo": canon_tipo(m.get("tipo")),
+    }
+
+
+def _acents_from_rows(rows) -> dict:
+    """Membresía {nombre_acentuación: {codigos}} a partir de filas con columna 'acentuacion'."""
+    out: dict = {}
+    for r in rows:
+        nombre = canon_nombre(r.get("acentuacion"))
+        if nombre:
+            out.setdefault(nombre, set()).add(canon_codigo(r.get("codigo")))
+    return out
+
+
+def _acents_from_blocks(blocks) -> dict:
+    out: dict = {}
+    for a in blocks or []:
+        nombre = canon_nombre(a.get("nombre"))
+        cods = out.setdefault(nombre, set())
+        for m in a.get("materias") or []:
+            cods.add(canon_codigo(m.get("codigo") if isinstance(m, dict) else m))
+    return out
+
+
+def load_catalog(path: Path, version: str | None = None) -> dict:
+    """
+    Carga el snapshot y lo deja como:
+      {"materias": {codigo: materia_canon}, "acentuaciones": {nombre: {codigos}} | None}
+    `acentuaciones` es None si el snapshot no trae membresías (entonces no se comparan).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = [{(k or "").strip().lower(): v for k, v in r.items()} for r in csv.DictReader(f)]
+        acents = _acents_from_rows(rows) if rows and "acentuacion" in rows[0] else None
+        materias = rows
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        # Snapshot por versión
+        if isinstance(data, dict) and "materias" not in data:
+            data = data.get(str(version), [])
+        if isinstance(data, list):
+            materias = data
+            acents = _acents_from_rows(data) if any("acentuacion" in m for m in data) else None
+        else:
+            materias = data.get("materias") or []
+            acents = _acents_from_blocks(data["acentuaciones"]) if "acentuaciones" in data else None
+
+    by_code = {}
+    for m in materias:
+        cm = _canon_materia(m)
+        if cm["codigo"]:
+            by_code[cm["codigo"]] = cm
+    return {"materias": by_code, "acentuaciones": acents}
+
+
+def compute_delta(result: dict, catalog: dict) -> dict:
+    """
+    Compara materias/acentuaciones parseadas contra el catálogo:
+      inserted: materias nuevas (completas)
+      updated:  [{codigo, campos, antes, despues}]
+      removed:  códigos del catálogo que ya no vienen en el plan
+      acentuaciones: {added: [{nombre, codigo}], removed: [{nombre, codigo}]}
+    """
+    actual = catalog["materias"]
+    parsed = {}
+    for m in result.get("materias") or []:
+        cm = _canon_materia(m)
+        if cm["codigo"]:
+            parsed[cm["codigo"]] = (cm, m)
+
+    inserted, updated = [], []
+    unchanged = 0
+    for cod, (cm, original) in parsed.items():
+        prev = actual.get(cod)
+        if prev is None:
+            inserted.append(original)
+            continue
+        campos = [f for f in DELTA_FIELDS if cm[f] != prev[f]]
+        if campos:
+            updated.append({
+                "codigo": cod,
+                "campos": campos,
+                "antes": {f: prev[f] for f in campos},
+                "despues": {f: original.get(f) for f in campos},
+            })
+        else:
+            unchanged += 1
+    removed = sorted(set(actual) - set(parsed))
+
+    delta = {
+        "inserted": inserted,
+        "updated": updated,
+        "removed": removed,
+        "unchanged": unchanged,
+    }
+
+    if catalog["acentuaciones"] is not None:
+        nuevas = _acents_from_blocks(result.get("acentuaciones"))
+        viejas = catalog["acentuaciones"]
+        added, gone = [], []
+        for nombre in sorted(set(nuevas) | set(viejas)):
+            n, v = nuevas.get(nombre, set()), viejas.get(nombre, set())
+            added += [{"nombre": nombre, "codigo": c} for c in sorted(n - v)]
+            gone += [{"nombre": nombre, "codigo": c} for c in sorted(v - n)]
+        delta["acentuaciones"] = {"added": added, "removed": gone}
+
+    return delta
+
+
+def apply_delta(result: dict, catalog: dict) -> dict:
+    """
+    Deja en `result` solo altas y cambios contra `catalog` (en sitio) y agrega
+    `materias_total` (todas las parseadas) y `delta`.
+    """
+    delta = compute_delta(result, catalog)
+    changed = {u["codigo"] for u in delta["updated"]}
+    result["materias_total"] = len(result.get("materias") or [])
+    result["materias"] = delta["inserted"] + [
+        m for m in result.get("materias") or [] if canon_codigo(m.get("codigo")) in changed
+    ]
+    result["delta"] = delta
+    return result
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    args = [a for a in argv if not a.startswith("--")]
+    if not args or not opts.get("catalog"):
+        print(json.dumps({"ok": False, "error": "Uso: plan_delta.py <resultado.json|-> --catalog=<snapshot>"}))
+        sys.exit(1)
+    try:
+        text = sys.stdin.read() if args[0] == "-" else Path(args[0]).read_text(encoding="utf-8")
+        result = json.loads(text)
+        if result.get("ok"):
+            catalog = load_catalog(Path(opts["catalog"]), version=(result.get("plan") or {}).get("version"))
+            apply_delta(result, catalog)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
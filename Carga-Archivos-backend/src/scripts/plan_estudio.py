@@ -6,48 +6,136 @@ Parser unificado de Plan de Estudios (UNISON – ISI)
   a) PDF descargado por el alumno (portal de alumnos)
   b) PDF oficial de docentes (“Listado de Materias Oficial ...”)
 - Extrae materias (codigo, nombre, tipo, creditos) y datos básicos del plan.
+- En el oficial también los requisitos por materia (claves y créditos mínimos);
+  plan_requisitos.py los compila en un DAG por versión.
 - Detecta y opcionalmente captura las acentuaciones (hoja 3 del oficial).
 
 Uso:
-  python plan_estudio.py <ruta.pdf> [--debug] [--cont=N]
+  python plan_estudio.py <ruta.pdf> [--debug] [--cont=N] [--backend tabula|plumber]
+  python plan_estudio.py <ruta.pdf> --parity     # compara salida tabula vs plumber
+  python plan_estudio.py <ruta.pdf> --cache [--cache-db=ruta.sqlite]
+  python plan_estudio.py <ruta.pdf> --compare-to-cache
+
+Caché (plan_cache.py): por hash del archivo, con índice (version, origen).
+--compare-to-cache agrega `cache.same_as_latest` / `cache.same_content_as`
+para saber si el PDF trae el mismo plan que uno ya procesado.
+
+  python plan_estudio.py --version | --selftest   # no importan dependencias pesadas
+  python plan_estudio.py <ruta.pdf> --probe       # clase/páginas/texto en ms (pdf_probe.py)
+  cat plan.pdf | python plan_estudio.py - ...     # PDF por stdin; --mmap para mapear el archivo
+  python plan_estudio.py <ruta.pdf> --catalog=<snapshot.json|csv>
+Con --catalog (ver plan_delta.py) `materias` trae solo altas y cambios contra el
+catálogo actual y se agrega `delta` {inserted, updated, removed, acentuaciones}.
+
+Límites por documento (parse_limits.py, PARSE_PLAN_WALL_S / _CPU_S / _RSS_MB):
+al rebasarlos sale {ok: false, error: "timeout"|"cpu_limit"|"memory_limit", stage, limite}.
+
+Backends:
+  tabula  (default) Tabula y, si no saca nada, Camelot (requieren JVM / Ghostscript).
+  plumber solo pdfplumber (palabras + geometría de líneas), sin dependencias nativas.
+          Experimental y solo a petición explícita (--backend=plumber): no se ha
+          medido su paridad contra tabula sobre PDFs reales del plan, así que
+          la salida lleva PLUMBER_CAVEAT en `warnings`. Usar --parity para
+          comparar antes de confiar en él.
+
+En el OFICIAL, las páginas se clasifican primero con el texto de cada hoja
+(malla / acentuaciones / resto) y solo las relevantes pasan por Tabula/Camelot.
+
+Las materias de la malla son PlanMateria (__slots__, texto internado) durante
+el parseo, la deduplicación y la limpieza; parse_plan() las vuelve dicts al
+armar la salida. Los frames se recorren como tuplas (itertuples), sin copias
+intermedias ni una Series por fila.
 
 Salida (JSON):
 {
   ok: bool,
   plan: { nombre, version, total_creditos, semestres_sugeridos },
-  materias: [{ codigo, nombre, creditos, tipo, semestre? }],
+  materias: [{ codigo, nombre, creditos, tipo, semestre?, requisitos?: [codigo], creditos_requisito? }],
   origen: "OFICIAL" | "ALUMNO" | "DESCONOCIDO",
   acentuaciones?: [
     { nombre: "DESARROLLO WEB", materias: [{codigo, nombre, creditos?}] }, ...
   ],
   warnings: [...],
-  debug?: { extractor, frames_detected, row_text_examples: [...] }
+  debug?: { extractor, frames_detected, row_text_examples: [...] },
+  cache?: { hit, file_hash, content_hash?, same_as_latest?, same_content_as?: [file_hash...] },
+  materias_total?: int,
+  delta?: { inserted: [...], updated: [{codigo, campos, antes, despues}], removed: [codigo],
+            unchanged: int, acentuaciones?: { added: [...], removed: [...] } }
 }
 """
-try:
-    from pdfminer.high_level import extract_text as pdfminer_extract_text
-except Exception:
-    pdfminer_extract_text = None
+from __future__ import annotations
 
 import sys, json, re
+from functools import lru_cache
 from pathlib import Path
-import pandas as pd
+from typing import TYPE_CHECKING
+
+from parse_limits import ParseLimitExceeded, count_pages, guarded, set_stage
+from pdf_source import PdfSource, filename_of, open_input, source_from_argv
+
+if TYPE_CHECKING:  # solo para anotaciones; en ejecución pandas se carga con pandas()
+    import pandas as pd
+
+__version__ = "1.3.0"
+
 
 # ---- Dependencias opcionales (no truenan si no están) ----
-try:
-    import tabula
-except Exception:
-    tabula = None
+# Se importan al primer uso: con un proceso por petición, importar pandas,
+# tabula, camelot y PyPDF2 de entrada cuesta cientos de ms aunque la corrida
+# solo ocupe uno de ellos (o ninguno, p. ej. --version / --selftest).
+HEAVY_MODULES = ("pandas", "pdfminer", "PyPDF2", "tabula", "camelot", "pdfplumber")
+
+
+@lru_cache(maxsize=None)
+def optional_import(module: str, attr: str | None = None):
+    """Importa `module` (o `module.attr`) una sola vez; None si no está disponible."""
+    try:
+        import importlib
+        mod = importlib.import_module(module)
+        return getattr(mod, attr) if attr else mod
+    except Exception:
+        return None
+
+
+def pandas():
+    pd = optional_import("pandas")
+    if pd is None:
+        raise RuntimeError("Instala pandas: pip install pandas")
+    return pd
 
-try:
-    import camelot
-except Exception:
-    camelot = None
 
-try:
-    from PyPDF2 import PdfReader
-except Exception:
-    PdfReader = None
+# ------------------------ Modelo de fila ------------------------
+class PlanMateria:
+    """
+    Materia de la malla. Slots en vez de dict y nombre/clave internados: un
+    lote de planes repite las mismas materias y así se guarda una copia por valor.
+    `requisitos` None = el formato no trae la columna (portal / filas pegadas):
+    to_dict() omite entonces requisitos y creditos_requisito, como antes.
+    """
+
+    __slots__ = ("codigo", "nombre", "creditos", "tipo", "semestre", "requisitos", "creditos_requisito")
+
+    def __init__(self, codigo, nombre, creditos, tipo, semestre=None, requisitos=None, creditos_requisito=None):
+        self.codigo = sys.intern(codigo)
+        self.nombre = sys.intern(nombre)
+        self.creditos = creditos
+        self.tipo = sys.intern(tipo)
+        self.semestre = semestre
+        self.requisitos = requisitos
+        self.creditos_requisito = creditos_requisito
+
+    def to_dict(self) -> dict:
+        d = {
+            "codigo": self.codigo,
+            "nombre": self.nombre,
+            "creditos": self.creditos,
+            "tipo": self.tipo,
+            "semestre": self.semestre,
+        }
+        if self.requisitos is not None:
+            d["requisitos"] = list(self.requisitos)
+            d["creditos_requisito"] = self.creditos_requisito
+        return d
 
 
 # ------------------------ Utils ------------------------
@@ -89,29 +177,41 @@ def normalize_code(raw: str) -> str:
     return num
 
 
-def read_text_basic(path: Path) -> str:
-    """Texto crudo: intenta primero pdfminer (mejor layout), luego PyPDF2."""
+def read_pages_basic(path: Path) -> list[str]:
+    """
+    Texto crudo por página: intenta primero pdfminer (mejor layout), luego PyPDF2.
+    pdfminer separa las páginas con un salto de página (form feed), así que basta con partirlo.
+    """
     # 1) pdfminer (si está disponible)
+    pdfminer_extract_text = optional_import("pdfminer.high_level", "extract_text")
     if pdfminer_extract_text:
         try:
-            t = pdfminer_extract_text(str(path)) or ""
+            t = pdfminer_extract_text(open_input(path)) or ""
             if t.strip():
-                return t
+                pages = t.split("\f")
+                # el último \f deja una "página" vacía al final
+                if len(pages) > 1 and not pages[-1].strip():
+                    pages = pages[:-1]
+                return pages
         except Exception:
             pass
     # 2) PyPDF2 como respaldo
-    text = ""
+    pages = []
+    PdfReader = optional_import("PyPDF2", "PdfReader")
     if not PdfReader:
-        return text
+        return pages
     try:
-        reader = PdfReader(str(path))
+        reader = PdfReader(open_input(path))
         for p in reader.pages:
-            t = p.extract_text() or ""
-            text += t + "\n"
+            pages.append(p.extract_text() or "")
     except Exception:
         pass
-    return text
+    return pages
+
 
+def read_text_basic(path: Path) -> str:
+    """Texto crudo completo (todas las páginas unidas)."""
+    return "\n".join(read_pages_basic(path))
 
 
 def detect_origen(text: str) -> str:
@@ -149,58 +249,116 @@ def detect_origen(text: str) -> str:
     return "DESCONOCIDO"
 
 
+# ----------------- Clasificación de páginas (OFICIAL) -----------------
+MALLA_HDR_RE = re.compile(r"\b(CLAVE|CVE)\b.*\bMATERIA\b", re.S)
+MALLA_ROW_RE = re.compile(r"\b\d{4,5}\b[^\n]*\b(OBL|OPT|ELE|SEL)\b")
+
+
+def classify_pages(pages: list[str]) -> dict:
+    """
+    Clasifica las páginas del PDF oficial para mandar a los extractores de
+    tablas solo lo que importa (números de página base 1):
+    - "acentuaciones": la hoja titulada “MATERIAS QUE CONFORMAN LAS ACENTUACIONES”
+      y sus continuaciones (páginas con códigos que no son malla).
+    - "malla": páginas con encabezado Clave/Materia o varias filas “<codigo> ... OBL|OPT”.
+    Portadas y hojas de texto legal quedan fuera.
+    """
+    malla, acent = [], []
+    in_acent = False
+    for i, raw in enumerate(pages, start=1):
+        up = (raw or "").upper()
+        if "MATERIAS QUE CONFORMAN LAS ACENTUACIONES" in up:
+            acent.append(i)
+            in_acent = True
+            continue
+        row_hits = len(MALLA_ROW_RE.findall(up))
+        if MALLA_HDR_RE.search(up) and (row_hits >= 2 or "TIPO" in up):
+            malla.append(i)
+            in_acent = False
+            continue
+        if row_hits >= 3:
+            malla.append(i)
+            in_acent = False
+            continue
+        # Continuación de acentuaciones: sigue habiendo códigos pero sin malla
+        if in_acent and re.search(r"\b\d{4,5}\b", up):
+            acent.append(i)
+            continue
+        in_acent = False
+    return {"malla": malla, "acentuaciones": acent}
+
+
 # ----------------- Extracción de tablas -----------------
-def try_tabula_frames(path: Path):
-    """Intenta Tabula en lattice y stream; devuelve lista de DataFrames normalizados."""
+def fix_cols(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Forma normalizada de un frame: celdas str sin 'nan', encabezados en MAYÚSCULAS
+    y, si vienen "Unnamed"/vacíos, la primera fila como encabezado real.
+    Todos los backends (tabula / plumber) entregan frames con esta forma.
+    """
+    df2 = df.copy()
+    # Normaliza valores -> string y limpia nan
+    for c in df2.columns:
+        df2[c] = df2[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
+    # Si headers "Unnamed" o vacíos: usar primera fila como encabezado real
+    has_unnamed = any(str(c).lower().startswith("unnamed") for c in df2.columns)
+    empty_headers = any(not str(c).strip() for c in df2.columns)
+    if (has_unnamed or empty_headers) and len(df2) > 0:
+        new_cols = [str(x).strip().upper() for x in list(df2.iloc[0])]
+        if any(new_cols):
+            df2 = df2.iloc[1:].reset_index(drop=True)
+            df2.columns = new_cols
+    else:
+        df2.columns = [str(c).strip().upper() for c in df2.columns]
+    return df2
+
+
+def try_tabula_frames(path: Path, pages="all", lattice=True, stream=True):
+    """
+    Intenta Tabula en lattice y stream; devuelve lista de DataFrames normalizados.
+    `pages` acepta "all" o una lista de páginas (base 1); `lattice`/`stream`
+    permiten elegir los modos que convienen a cada tipo de página.
+    """
     frames = []
+    tabula = optional_import("tabula")
     if not tabula:
         return frames
 
-    def _fix_cols(df: pd.DataFrame) -> pd.DataFrame:
-        df2 = df.copy()
-        # Normaliza valores -> string y limpia nan
-        for c in df2.columns:
-            df2[c] = df2[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
-        # Si headers "Unnamed" o vacíos: usar primera fila como encabezado real
-        has_unnamed = any(str(c).lower().startswith("unnamed") for c in df2.columns)
-        empty_headers = any(not str(c).strip() for c in df2.columns)
-        if (has_unnamed or empty_headers) and len(df2) > 0:
-            new_cols = [str(x).strip().upper() for x in list(df2.iloc[0])]
-            if any(new_cols):
-                df2 = df2.iloc[1:].reset_index(drop=True)
-                df2.columns = new_cols
-        else:
-            df2.columns = [str(c).strip().upper() for c in df2.columns]
-        return df2
+    if not pages:
+        return frames
 
     # 1) LATTICE
-    try:
-        dfs_lattice = tabula.read_pdf(
-            str(path), pages="all", multiple_tables=True, lattice=True, stream=False, guess=False
-        )
-        for df in dfs_lattice or []:
-            frames.append(_fix_cols(df))
-    except Exception:
-        pass
+    if lattice:
+        try:
+            dfs_lattice = tabula.read_pdf(
+                filename_of(path), pages=pages, multiple_tables=True, lattice=True, stream=False, guess=False
+            )
+            for df in dfs_lattice or []:
+                frames.append(fix_cols(df))
+        except Exception:
+            pass
 
     # 2) STREAM
-    try:
-        dfs_stream = tabula.read_pdf(
-            str(path), pages="all", multiple_tables=True, lattice=False, stream=True, guess=True
-        )
-        for df in dfs_stream or []:
-            frames.append(_fix_cols(df))
-    except Exception:
-        pass
+    if stream:
+        try:
+            dfs_stream = tabula.read_pdf(
+                filename_of(path), pages=pages, multiple_tables=True, lattice=False, stream=True, guess=True
+            )
+            for df in dfs_stream or []:
+                frames.append(fix_cols(df))
+        except Exception:
+            pass
 
     return frames
 
 
-def try_camelot_frames(path: Path):
-    """Camelot como respaldo (si está disponible)."""
+def try_camelot_frames(path: Path, pages="all", lattice=True, stream=True):
+    """Camelot como respaldo (si está disponible). Mismos parámetros que Tabula."""
     frames = []
-    if not camelot:
+    camelot = optional_import("camelot")
+    if not camelot or not pages:
         return frames
+    if not isinstance(pages, str):
+        pages = ",".join(str(p) for p in pages)
 
     def _df_from_table(t):
         df = t.df.copy()
@@ -212,19 +370,132 @@ def try_camelot_frames(path: Path):
             df[c] = df[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
         return df
 
+    if lattice:
+        try:
+            tables = camelot.read_pdf(filename_of(path), pages=pages, flavor="lattice")
+            frames += [_df_from_table(t) for t in tables]
+        except Exception:
+            pass
+    if stream:
+        try:
+            tables = camelot.read_pdf(filename_of(path), pages=pages, flavor="stream")
+            frames += [_df_from_table(t) for t in tables]
+        except Exception:
+            pass
+    return frames
+
+
+# Backend “plumber”: solo Python (pdfplumber), sin JVM ni Ghostscript/OpenCV.
+# - lattice → celdas a partir de la geometría de líneas/rectángulos de la página
+# - stream  → columnas inferidas por alineación de palabras
+PLUMBER_LATTICE = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+PLUMBER_STREAM = {
+    "vertical_strategy": "text",
+    "horizontal_strategy": "text",
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+    "min_words_vertical": 2,
+    "min_words_horizontal": 1,
+}
+
+
+def try_plumber_frames(path: Path, pages="all", lattice=True, stream=True):
+    """
+    Mismo contrato que try_tabula_frames, pero con pdfplumber (palabras + líneas).
+    Cada tabla se entrega sin encabezado ("Unnamed: i") y pasa por fix_cols,
+    así que los parsers reciben exactamente la misma forma de frame.
+    """
+    frames = []
+    pdfplumber = optional_import("pdfplumber")
+    if not pdfplumber or not pages:
+        return frames
+
+    def _df_from_rows(rows):
+        rows = [[("" if c is None else str(c).replace("\n", " ")) for c in r] for r in rows if r]
+        if not rows:
+            return None
+        width = max(len(r) for r in rows)
+        rows = [r + [""] * (width - len(r)) for r in rows]
+        df = pandas().DataFrame(rows, columns=[f"Unnamed: {i}" for i in range(width)])
+        return fix_cols(df)
+
     try:
-        tables = camelot.read_pdf(str(path), pages="all", flavor="lattice")
-        frames += [_df_from_table(t) for t in tables]
-    except Exception:
-        pass
-    try:
-        tables = camelot.read_pdf(str(path), pages="all", flavor="stream")
-        frames += [_df_from_table(t) for t in tables]
+        with pdfplumber.open(open_input(path)) as pdf:
+            if pages == "all":
+                selected = pdf.pages
+            else:
+                selected = [pdf.pages[n - 1] for n in pages if 1 <= n <= len(pdf.pages)]
+            for page in selected:
+                modes = []
+                # sin líneas dibujadas no tiene caso intentar lattice
+                if lattice and (page.lines or page.rects):
+                    modes.append(PLUMBER_LATTICE)
+                if stream:
+                    modes.append(PLUMBER_STREAM)
+                for settings in modes:
+                    try:
+                        tables = page.extract_tables(settings) or []
+                    except Exception:
+                        continue
+                    for t in tables:
+                        df = _df_from_rows(t)
+                        if df is not None:
+                            frames.append(df)
     except Exception:
         pass
     return frames
 
 
+# Ajustes por tipo de página del OFICIAL:
+# - malla: tabla con líneas → lattice primero; stream como complemento.
+# - acentuaciones: listado sin rejilla → solo stream.
+OFICIAL_PAGE_MODES = {
+    "malla": {"lattice": True, "stream": True},
+    "acentuaciones": {"lattice": False, "stream": True},
+}
+
+
+# plumber no tiene paridad medida contra tabula sobre planes reales: cada salida
+# lo avisa para que nadie ingiera esas materias sin revisarlas.
+PLUMBER_CAVEAT = (
+    "Backend plumber (experimental): materias y créditos no verificados contra "
+    "tabula en PDFs reales del plan; revisar con --parity antes de ingerir."
+)
+
+BACKENDS = {
+    # backend → extractores en orden de preferencia
+    "tabula": (("tabula", try_tabula_frames), ("camelot", try_camelot_frames)),
+    "plumber": (("plumber", try_plumber_frames),),
+}
+
+
+def extract_frames(path: Path, backend: str = "tabula"):
+    """Frames de todo el documento con la cadena de extractores del backend."""
+    chain = BACKENDS[backend]
+    for extractor, fn in chain:
+        set_stage(f"tablas:{extractor}")
+        frames = fn(path)
+        if frames:
+            return frames, extractor
+    return [], chain[-1][0]
+
+
+def extract_frames_oficial(path: Path, page_map: dict, backend: str = "tabula"):
+    """
+    Extrae frames solo de las páginas clasificadas (malla / acentuaciones),
+    cada grupo con su configuración. Devuelve (malla_frames, acent_frames, extractor).
+    """
+    chain = BACKENDS[backend]
+    for extractor, fn in chain:
+        set_stage(f"tablas_malla:{extractor}")
+        malla = fn(path, pages=page_map["malla"], **OFICIAL_PAGE_MODES["malla"])
+        set_stage(f"tablas_acentuaciones:{extractor}")
+        acent = fn(path, pages=page_map["acentuaciones"], **OFICIAL_PAGE_MODES["acentuaciones"])
+        if malla or acent:
+            return malla, acent, extractor
+    return [], [], chain[-1][0]
+
+
 # -------------- Parsers (Alumno vs Oficial) --------------
 COD_RE = re.compile(r"\b\d{2,6}\b")
 TIPO_RE = re.compile(r"^(OBL|OPT|ELE|SEL|\*?OBL|\*?OPT)$", re.I)
@@ -237,7 +508,7 @@ def is_small_credit(s) -> bool:
     return v is not None and 1 <= v <= 30
 
 
-def parse_frames_portal_alumno(frames, want_debug=False):
+def parse_frames_portal_alumno(frames, want_debug=False, max_cont=None):
     """
     Reusa la máquina de estados previa (pegado de líneas) porque los PDFs
     del portal de alumnos suelen venir con filas fragmentadas.
@@ -248,11 +519,9 @@ def parse_frames_portal_alumno(frames, want_debug=False):
     for df in frames:
         if df.empty:
             continue
-        df = df.loc[~(df == "").all(axis=1)]
-        if df.empty:
-            continue
-        for _, row in df.iterrows():
-            toks = [norm(str(row.iloc[j])) for j in range(df.shape[1])]
+        # filas vacías salen como línea vacía y se saltan abajo
+        for row in df.itertuples(index=False, name=None):
+            toks = [norm(str(v)) for v in row]
             toks = [t for t in toks if t and not re.fullmatch(r"Unnamed:\s*\d+", t, re.I)]
             line = re.sub(r"\s{2,}", " ", " ".join(toks)).strip()
             if line:
@@ -323,7 +592,7 @@ def parse_frames_portal_alumno(frames, want_debug=False):
                 if pre_name_buffer:
                     name_parts.extend(pre_name_buffer)
                 pre_used = True
-                take_continuation = MAX_CONT_LINES
+                take_continuation = MAX_CONT_LINES if max_cont is None else max_cont
 
             # continuaciones (solo si NO hubo inline)
             while take_continuation > 0 and (i + 1) < len(lines):
@@ -340,13 +609,9 @@ def parse_frames_portal_alumno(frames, want_debug=False):
             nombre = norm(" ".join(name_parts))
 
             if codigo and nombre and creditos is not None and 1 <= creditos <= 30:
-                materias.append({
-                    "codigo": codigo,
-                    "nombre": nombre,
-                    "creditos": int(creditos),
-                    "tipo": "OPT" if (tipo in ("OPT", "ELE", "SEL")) else "OBL",
-                    "semestre": None
-                })
+                materias.append(PlanMateria(
+                    codigo, nombre, int(creditos), "OPT" if (tipo in ("OPT", "ELE", "SEL")) else "OBL"
+                ))
                 if pre_used:
                     pre_name_buffer = []
             i += 1
@@ -360,7 +625,7 @@ def parse_frames_portal_alumno(frames, want_debug=False):
     # dedup por código
     uniq = {}
     for m in materias:
-        uniq[m["codigo"]] = m
+        uniq[m.codigo] = m
     materias = list(uniq.values())
 
     return materias, debug_rows
@@ -379,14 +644,49 @@ OFI_COL_MAP = {
     "HORAS TEO.": None,
     "HORAS LAB.": None,
     "EJE": None,
-    "CRÉDITOS REQ.": None,
-    "CREDITOS REQ.": None,
-    "REQ. MATERIAS REQUISTO": None,
-    "REQ. MATERIAS REQUISITO": None,
-    "REQUISITOS": None,
-    "REQ.": None,
+    # requisitos (el PDF trae la errata “REQUISTO”)
+    "CRÉDITOS REQ.": "creditos_requisito",
+    "CREDITOS REQ.": "creditos_requisito",
+    "REQ. MATERIAS REQUISTO": "requisitos",
+    "REQ. MATERIAS REQUISITO": "requisitos",
+    "REQUISITOS": "requisitos",
+    "REQ.": "requisitos",
 }
 
+
+def _cell(v) -> str:
+    """Celda de frame → texto normalizado ('' para vacío / nan)."""
+    s = str(v)
+    return norm(s) if s and s.lower() != "nan" else ""
+
+
+def ofi_column(columns, field: str):
+    """
+    Columna para `field` de OFI_COL_MAP. Tabula a veces parte o pega los
+    encabezados largos, así que si no hay coincidencia exacta se busca por partes.
+    """
+    keys = {c: re.sub(r"\s+", " ", c).strip() for c in columns}
+    exact = next((c for c, k in keys.items() if OFI_COL_MAP.get(k) == field), None)
+    if exact or field not in ("requisitos", "creditos_requisito"):
+        return exact
+    for c, k in keys.items():
+        credit = "CRÉDIT" in k or "CREDIT" in k
+        if field == "creditos_requisito" and credit and "REQ" in k:
+            return c
+        if field == "requisitos" and not credit and ("REQUIS" in k or k.startswith("REQ")):
+            return c
+    return None
+
+
+def parse_requisitos(raw: str) -> list[str]:
+    """'6881, 6884' / '6881 Y 6884' / '6881.0' → ['06881', '06884'] (sin repetir, en orden)."""
+    out = []
+    for num in re.findall(r"\b\d{3,6}\b", raw or ""):
+        codigo = normalize_code(num)
+        if codigo and codigo not in out:
+            out.append(codigo)
+    return out
+
 ACENT_TITLE_RE = re.compile(r"^\s*MATERIAS QUE CONFORMAN LAS ACENTUACIONES\s*$", re.I)
 
 
@@ -397,10 +697,14 @@ def normalize_tipo(val: str) -> str:
     return "OBL" if v == "OBL" else (v or "OBL")
 
 
-def parse_frames_oficial(frames, text_full: str, want_debug=False):
+def parse_frames_oficial(frames, text_full: str, want_debug=False, acent_frames=None):
     """
     Intenta leer tablas por columnas. Algunas páginas se parten en 2 tablas;
     las fusionamos lógicamente. Filtramos filas de encabezados y pies.
+
+    Si se pasan `acent_frames` (frames de las páginas ya clasificadas como
+    acentuaciones), esos se leen como acentuaciones y `frames` se trata
+    únicamente como malla; si no, se usa la heurística por forma de la tabla.
     """
     materias = []
     debug_rows = []
@@ -411,9 +715,55 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
     #    Si no se encuentra, seguimos normal.
     acent_mode = False
     acent_actual = None
-    if "MATERIAS QUE CONFORMAN LAS ACENTUACIONES" in (text_full or "").upper():
+    if acent_frames is None and "MATERIAS QUE CONFORMAN LAS ACENTUACIONES" in (text_full or "").upper():
         acent_mode = True
 
+    def consume_acent_frame(df):
+        """Lee un frame de acentuaciones: títulos de bloque + filas “codigo nombre creditos?”."""
+        nonlocal acent_actual
+        # Intenta extraer pares (codigo, nombre, creditos?)
+        # Primero detecta si hay títulos de acentuación (líneas en MAYÚSCULAS sin código)
+        # Construcción lineal por filas (celdas a texto normalizado)
+        for row in df.itertuples(index=False, name=None):
+            row_vals = [norm(str(v)) for v in row]
+            line = " ".join([v for v in row_vals if v]).strip()
+            if not line:
+                continue
+
+            # título de acentuación (sin códigos)
+            if not re.search(r"\b\d{2,6}\b", line) and line.isupper() and len(line) <= 40:
+                # Cierra bloque anterior
+                if acent_actual and acent_actual["materias"]:
+                    acentuaciones.append(acent_actual)
+                # Abre nuevo bloque
+                acent_actual = {"nombre": line, "materias": []}
+                continue
+
+            # buscar código y nombre (+ crédito opcional al final)
+            mc = re.search(r"\b(\d{2,6})\b", line)
+            if mc:
+                codigo = normalize_code(mc.group(1))
+                # nombre: quita el código inicial y posible entero al final
+                tail_credit = None
+                tmp = re.sub(r"^\s*\b\d{2,6}\b\s*", "", line)
+                m_last_int = re.search(r"(\d+)\s*$", tmp)
+                if m_last_int:
+                    tail_credit = to_int_strict(m_last_int.group(1), None)
+                    tmp = tmp[:m_last_int.start()].strip()
+                nombre = norm(tmp)
+                if acent_actual is None:
+                    acent_actual = {"nombre": "ACENTUACIÓN", "materias": []}
+                acent_actual["materias"].append({
+                    "codigo": codigo,
+                    "nombre": nombre,
+                    **({"creditos": int(tail_credit)} if tail_credit else {})
+                })
+
+    # 1.1) Páginas de acentuaciones ya identificadas
+    for df in acent_frames or []:
+        if not df.empty:
+            consume_acent_frame(df)
+
     # 2) Procesar frames
     for df in frames:
         if df.empty:
@@ -430,69 +780,27 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
 
         # También si el DataFrame es de 2-3 columnas y muchas filas de “codigo nombre numero”
         if acent_mode and (looks_acents or (len(df.columns) in (2, 3))):
-            # Intenta extraer pares (codigo, nombre, creditos?)
-            # Primero detecta si hay títulos de acentuación (líneas en MAYÚSCULAS sin código)
-            # Normaliza columnas a texto
-            d = df.copy()
-            d.columns = [norm(str(c).upper()) for c in d.columns]
-            for c in d.columns:
-                d[c] = d[c].astype(str).map(lambda x: norm(x))
-
-            # Construcción lineal por filas
-            for _, row in d.iterrows():
-                row_vals = [norm(str(v)) for v in row.tolist()]
-                line = " ".join([v for v in row_vals if v]).strip()
-                if not line:
-                    continue
-
-                # título de acentuación (sin códigos)
-                if not re.search(r"\b\d{2,6}\b", line) and line.isupper() and len(line) <= 40:
-                    # Cierra bloque anterior
-                    if acent_actual and acent_actual["materias"]:
-                        acentuaciones.append(acent_actual)
-                    # Abre nuevo bloque
-                    acent_actual = {"nombre": line, "materias": []}
-                    continue
-
-                # buscar código y nombre (+ crédito opcional al final)
-                mc = re.search(r"\b(\d{2,6})\b", line)
-                if mc:
-                    codigo = normalize_code(mc.group(1))
-                    # nombre: quita el código inicial y posible entero al final
-                    tail_credit = None
-                    tmp = re.sub(r"^\s*\b\d{2,6}\b\s*", "", line)
-                    m_last_int = re.search(r"(\d+)\s*$", tmp)
-                    if m_last_int:
-                        tail_credit = to_int_strict(m_last_int.group(1), None)
-                        tmp = tmp[:m_last_int.start()].strip()
-                    nombre = norm(tmp)
-                    if acent_actual is None:
-                        acent_actual = {"nombre": "ACENTUACIÓN", "materias": []}
-                    acent_actual["materias"].append({
-                        "codigo": codigo,
-                        "nombre": nombre,
-                        **({"creditos": int(tail_credit)} if tail_credit else {})
-                    })
+            consume_acent_frame(df)
             continue  # no mezclar con materias “normales” de la malla
 
         # Si no es acentuación, parseo de malla normal
-        # 2.1 Normaliza columnas y crea un mapeo flexible
-        df2 = df.copy()
-        df2.columns = [norm(str(c).upper()) for c in df2.columns]
-        for c in df2.columns:
-            df2[c] = df2[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
+        # 2.1 Normaliza columnas y celdas (listas de texto; sin copiar el frame)
+        columns = [norm(str(c).upper()) for c in df.columns]
+        rows = [[_cell(v) for v in row] for row in df.itertuples(index=False, name=None)]
 
         # Intentar encontrar columnas clave por aproximación
-        col_codigo = next((c for c in df2.columns if re.search(r"\bCLAVE\b|\bCVE\b", c)), None)
-        col_nombre = next((c for c in df2.columns if "MATERIA" in c), None)
-        col_tipo   = next((c for c in df2.columns if "TIPO" in c), None)
-        col_cred   = next((c for c in df2.columns if "CRÉDIT" in c or "CREDIT" in c), None)
+        col_codigo = next((c for c in columns if re.search(r"\bCLAVE\b|\bCVE\b", c)), None)
+        col_nombre = next((c for c in columns if "MATERIA" in c), None)
+        col_tipo   = next((c for c in columns if "TIPO" in c), None)
+        col_cred   = next((c for c in columns if ("CRÉDIT" in c or "CREDIT" in c) and "REQ" not in c), None)
+        col_req    = ofi_column(columns, "requisitos")
+        col_cred_req = ofi_column(columns, "creditos_requisito")
 
         # A veces Tabula separa “Clave Materia Tipo Créditos …” en una sola cadena por fila.
         if not any([col_codigo, col_nombre, col_tipo, col_cred]):
             # Intento por filas “pegadas”
-            for _, row in df2.iterrows():
-                row_vals = [v for v in row.tolist() if v]
+            for row in rows:
+                row_vals = [v for v in row if v]
                 line = " ".join(row_vals)
                 if want_debug and len(debug_rows) < 12:
                     debug_rows.append(line)
@@ -513,21 +821,18 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
                 nombre_seg = line[m_code.end():m_tipo.start()]
                 nombre = norm(nombre_seg)
                 if codigo and nombre and is_small_credit(creditos):
-                    materias.append({
-                        "codigo": codigo,
-                        "nombre": nombre,
-                        "creditos": int(creditos),
-                        "tipo": "OPT" if tipo == "OPT" else "OBL",
-                        "semestre": None
-                    })
+                    materias.append(PlanMateria(codigo, nombre, int(creditos), "OPT" if tipo == "OPT" else "OBL"))
             continue
 
-        # 2.2 Parseo columna a columna
-        for _, row in df2.iterrows():
-            raw_codigo = row[col_codigo] if col_codigo else ""
-            raw_nombre = row[col_nombre] if col_nombre else ""
-            raw_tipo   = row[col_tipo] if col_tipo else ""
-            raw_cred   = row[col_cred] if col_cred else ""
+        # 2.2 Parseo columna a columna (posición de cada columna encontrada)
+        pos = {c: columns.index(c) for c in (col_codigo, col_nombre, col_tipo, col_cred, col_req, col_cred_req) if c}
+        for row in rows:
+            raw_codigo = row[pos[col_codigo]] if col_codigo else ""
+            raw_nombre = row[pos[col_nombre]] if col_nombre else ""
+            raw_tipo   = row[pos[col_tipo]] if col_tipo else ""
+            raw_cred   = row[pos[col_cred]] if col_cred else ""
+            raw_req    = row[pos[col_req]] if col_req else ""
+            raw_cred_req = row[pos[col_cred_req]] if col_cred_req else ""
 
             # Filtrado de encabezados/ruido
             line_join = " ".join([raw_codigo, raw_nombre, raw_tipo, raw_cred]).upper()
@@ -554,28 +859,26 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
             creditos = to_int_strict(raw_cred, None)
 
             if codigo and nombre and is_small_credit(creditos):
-                materias.append({
-                    "codigo": codigo,
-                    "nombre": nombre,
-                    "creditos": int(creditos),
-                    "tipo": "OPT" if tipo == "OPT" else "OBL",
-                    "semestre": None
-                })
+                materias.append(PlanMateria(
+                    codigo, nombre, int(creditos), "OPT" if tipo == "OPT" else "OBL",
+                    requisitos=[r for r in parse_requisitos(raw_req) if r != codigo],
+                    creditos_requisito=to_int_strict(raw_cred_req, None) or None,
+                ))
 
     # Cierra último bloque de acentuación abierto
-    if acent_mode and 'acent_actual' in locals() and acent_actual and acent_actual["materias"]:
+    if acent_actual and acent_actual["materias"]:
         acentuaciones.append(acent_actual)
 
     # Deduplicar por código (con preferencia por OBL si hay conflicto)
     by_code = {}
     for m in materias:
-        if m["codigo"] in by_code:
-            prev = by_code[m["codigo"]]
+        if m.codigo in by_code:
+            prev = by_code[m.codigo]
             # si uno es OBL y otro OPT, conserva OBL
-            if prev["tipo"] == "OPT" and m["tipo"] == "OBL":
-                by_code[m["codigo"]] = m
+            if prev.tipo == "OPT" and m.tipo == "OBL":
+                by_code[m.codigo] = m
         else:
-            by_code[m["codigo"]] = m
+            by_code[m.codigo] = m
     materias = list(by_code.values())
 
     # Debug sample
@@ -584,10 +887,10 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
         for df in frames:
             if len(debug_rows) >= 12:
                 break
-            for _, row in df.iterrows():
+            for row in df.itertuples(index=False, name=None):
                 if len(debug_rows) >= 12:
                     break
-                debug_rows.append(" | ".join([norm(str(v)) for v in row.tolist()]))
+                debug_rows.append(" | ".join([norm(str(v)) for v in row]))
 
     return materias, acentuaciones, debug_rows
 
@@ -662,7 +965,7 @@ def parse_plan_info(text: str):
 def sanitize_materias(mats):
     out = []
     for m in mats:
-        n = m["nombre"]
+        n = m.nombre
         # Normaliza espacios
         n = re.sub(r"\s{2,}", " ", n)
         # Une guiones cortados: "CENEVAL- EGEL" -> "CENEVAL-EGEL"
@@ -673,56 +976,82 @@ def sanitize_materias(mats):
         n = re.sub(r"\b(Clave\s+Materia\s+Creditos)\b.*$", "", n, flags=re.I).strip(" -")
         # Limpieza artículos iniciales sueltos
         n = re.sub(r"^(DE|LA|EL)\s+(?=[A-ZÁÉÍÓÚÑ])", "", n, flags=re.I)
-        m["nombre"] = n.strip()
+        m.nombre = sys.intern(n.strip())
         out.append(m)
     return out
 
 
 # ----------------------------- Main -----------------------------
-def main():
-    debug = any(a == "--debug" for a in sys.argv[1:])
-    if len(sys.argv) < 2:
-        print(json.dumps({"ok": False, "error": "Uso: plan_estudio.py <archivo.pdf> [--debug]"}))
-        return
-
-    pdf_path = None
-    for a in sys.argv[1:]:
+def arg_value(name: str, default=None, argv: list[str] | None = None):
+    """Lee `--name=valor` o `--name valor` de argv (por defecto sys.argv)."""
+    args = sys.argv[1:] if argv is None else argv
+    for i, a in enumerate(args):
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+        if a == f"--{name}" and i + 1 < len(args):
+            return args[i + 1]
+    return default
+
+
+# opciones que consumen el siguiente argumento (para no confundirlo con el PDF)
+VALUE_OPTS = {"--backend", "--cache-db", "--catalog"}
+
+
+def positional_args(argv: list[str] | None = None) -> list[str]:
+    out, skip = [], False
+    for a in sys.argv[1:] if argv is None else argv:
+        if skip:
+            skip = False
+            continue
+        if a in VALUE_OPTS:
+            skip = True
+            continue
         if not a.startswith("--"):
-            pdf_path = a
-            break
-    if not pdf_path:
-        print(json.dumps({"ok": False, "error": "Falta ruta del PDF"}))
-        return
+            out.append(a)
+    return out
 
-    path = Path(pdf_path)
-    if not path.exists():
-        print(json.dumps({"ok": False, "error": f"No existe {path}"}))
-        return
 
-    # Texto base (para origen, versión y total créditos)
-    text = read_text_basic(path)
+def parse_plan(path: Path, backend: str = "tabula", debug: bool = False, max_cont=None) -> dict:
+    """Pipeline completo sobre un PDF; devuelve el JSON de salida (dict)."""
+    # Texto base por página (para origen, versión, total créditos y clasificación)
+    set_stage("texto")
+    pages = read_pages_basic(path)
+    count_pages(len(pages))
+    text = "\n".join(pages)
     origen = detect_origen(text)
 
-    # Frames por Tabula; si no, Camelot
-    frames = try_tabula_frames(path)
-    extractor = "tabula"
-    if not frames:
-        frames = try_camelot_frames(path)
-        extractor = "camelot"
-
     materias, debug_rows = [], []
     acentuaciones = []
+    frames = []
+    extractor = BACKENDS[backend][0][0]
+    page_map = classify_pages(pages) if origen == "OFICIAL" else None
+
+    if page_map and page_map["malla"]:
+        # OFICIAL: solo páginas de malla y acentuaciones van a los extractores
+        frames, acent_frames, extractor = extract_frames_oficial(path, page_map, backend)
+        set_stage("parseo_oficial")
+        materias, acentuaciones, debug_rows = parse_frames_oficial(
+            frames, text_full=text, want_debug=debug, acent_frames=acent_frames
+        )
 
-    if origen == "OFICIAL":
-        materias, acentuaciones, debug_rows = parse_frames_oficial(frames, text_full=text, want_debug=debug)
-    else:
-        # Portal alumno o desconocido → usa el parser de “pegado de líneas”
-        materias, debug_rows = parse_frames_portal_alumno(frames, want_debug=debug)
+    if not materias:
+        # Sin clasificación útil (o no salió nada): todo el documento.
+        frames, extractor = extract_frames(path, backend)
+        set_stage("parseo")
+
+        if origen == "OFICIAL":
+            materias, acentuaciones, debug_rows = parse_frames_oficial(frames, text_full=text, want_debug=debug)
+        else:
+            # Portal alumno o desconocido → usa el parser de “pegado de líneas”
+            materias, debug_rows = parse_frames_portal_alumno(frames, want_debug=debug, max_cont=max_cont)
 
     materias = sanitize_materias(materias)
     version, total = parse_plan_info(text)
+    warnings = [] if materias else [f"No se detectaron materias con {extractor}."]
+    if backend == "plumber":
+        warnings.append(PLUMBER_CAVEAT)
 
-    result = {
+    return {
         "ok": bool(materias),
         "plan": {
             "nombre": "Ingeniería en Sistemas de Información",
@@ -730,17 +1059,185 @@ def main():
             "total_creditos": total,
             "semestres_sugeridos": 0
         },
-        "materias": materias,
+        "materias": [m.to_dict() for m in materias],
         "origen": origen,
         **({"acentuaciones": acentuaciones} if acentuaciones else {}),
-        "warnings": [] if materias else [f"No se detectaron materias con {extractor}."],
+        "warnings": warnings,
         "debug": {
             "extractor": extractor,
             "frames_detected": len(frames),
+            **({"pages": page_map} if page_map else {}),
             "row_text_examples": debug_rows
         } if debug else None
     }
+
+
+def compare_backends(path: Path, a: str = "tabula", b: str = "plumber") -> dict:
+    """
+    Paridad de salida entre dos backends sobre el mismo PDF: materias que solo
+    aparecen en uno, diferencias de campos por código y acentuaciones.
+    """
+    import time
+
+    runs = {}
+    for backend in (a, b):
+        t0 = time.perf_counter()
+        res = parse_plan(path, backend=backend)
+        runs[backend] = (res, round((time.perf_counter() - t0) * 1000, 1))
+
+    def by_code(res):
+        return {m["codigo"]: m for m in res["materias"]}
+
+    def acents(res):
+        return {ac["nombre"]: sorted(m["codigo"] for m in ac["materias"]) for ac in res.get("acentuaciones", [])}
+
+    ma, mb = by_code(runs[a][0]), by_code(runs[b][0])
+    diffs = []
+    for cod in sorted(set(ma) & set(mb)):
+        fields = [f for f in ("nombre", "creditos", "tipo") if ma[cod][f] != mb[cod][f]]
+        if fields:
+            diffs.append({"codigo": cod, **{f: [ma[cod][f], mb[cod][f]] for f in fields}})
+
+    only_a = sorted(set(ma) - set(mb))
+    only_b = sorted(set(mb) - set(ma))
+    same_acent = acents(runs[a][0]) == acents(runs[b][0])
+    return {
+        "ok": True,
+        "origen": runs[a][0]["origen"],
+        "backends": {
+            name: {"materias": len(res["materias"]), "acentuaciones": len(res.get("acentuaciones", [])), "ms": ms}
+            for name, (res, ms) in runs.items()
+        },
+        f"solo_{a}": only_a,
+        f"solo_{b}": only_b,
+        "diferencias": diffs,
+        "acentuaciones_iguales": same_acent,
+        "paridad": not only_a and not only_b and not diffs and same_acent,
+    }
+
+
+def deps_available() -> dict:
+    """Qué dependencias opcionales hay instaladas, sin importarlas."""
+    import importlib.util
+    return {m: importlib.util.find_spec(m) is not None for m in HEAVY_MODULES}
+
+
+def selftest() -> dict:
+    """Chequeo rápido de las heurísticas puras (sin PDF ni dependencias pesadas)."""
+    oficial = (
+        "DIRECCIÓN DE SERVICIOS ESCOLARES\nHoja : 1 de 3\nPLAN: 2182\n"
+        "Clave Materia Tipo Créditos Horas Teo. Horas Lab. Eje Req.\n"
+        "6881 ESTRUCTURAS DE DATOS OBL 8\n6882 BASES DE DATOS OBL 8\n"
+    )
+    acent = "MATERIAS QUE CONFORMAN LAS ACENTUACIONES\nDESARROLLO WEB\n7001 PROGRAMACIÓN WEB 8\n"
+    checks = {
+        "normalize_code": normalize_code("4110.0") == "04110" and normalize_code("121") == "00121",
+        "to_int_strict": to_int_strict("3.0") == 3 and to_int_strict("x") is None,
+        "detect_origen": detect_origen(oficial + acent) == "OFICIAL",
+        "classify_pages": classify_pages(["PORTADA", oficial, acent])
+        == {"malla": [2], "acentuaciones": [3]},
+        "parse_plan_info": parse_plan_info(oficial)[0] == "2182",
+        "parse_requisitos": parse_requisitos("6881, 6884.0 Y 120") == ["06881", "06884", "00120"],
+        "ofi_column": ofi_column(["CLAVE", "CRÉDITOS", "CRÉDITOS REQ.", "REQ. MATERIAS REQUISTO"], "requisitos")
+        == "REQ. MATERIAS REQUISTO",
+    }
+    return {
+        "ok": all(checks.values()),
+        "version": __version__,
+        "checks": checks,
+        "deps": deps_available(),
+    }
+
+
+def run(argv: list[str]) -> dict:
+    """
+    Ejecuta el CLI sobre `argv` (sin el nombre del script) y devuelve el dict
+    de salida. main() lo imprime; el servicio de parsers lo llama en proceso.
+    """
+    if "--version" in argv:
+        return {"ok": True, "script": "plan_estudio.py", "version": __version__}
+    if "--selftest" in argv:
+        return selftest()
+
+    debug = "--debug" in argv
+    if not argv:
+        return {"ok": False, "error": "Uso: plan_estudio.py <archivo.pdf> [--debug] [--backend tabula|plumber]"}
+
+    pos = positional_args(argv)
+    pdf_path = pos[0] if pos else None
+    if not pdf_path:
+        return {"ok": False, "error": "Falta ruta del PDF"}
+
+    backend = arg_value("backend", "tabula", argv)
+    if backend not in BACKENDS:
+        return {"ok": False, "error": f"Backend desconocido: {backend}"}
+
+    # `-` = bytes por stdin; --mmap mapea el archivo en vez de leerlo
+    if pdf_path != "-" and not Path(pdf_path).exists():
+        return {"ok": False, "error": f"No existe {pdf_path}"}
+
+    # El PDF se lee una sola vez (y se hashea en la misma pasada); todos los
+    # extractores comparten ese buffer (ver pdf_source.py)
+    with source_from_argv(pdf_path, argv) as src:
+        if "--probe" in argv:
+            # Clasificación en milisegundos sin parseo completo (pdf_probe.py)
+            from pdf_probe import probe
+            return probe(src)
+
+        try:
+            # Límites de pared/CPU/RSS por documento (ver parse_limits.py)
+            with guarded("plan"):
+                return run_parse(src, argv, backend, debug)
+        except ParseLimitExceeded as e:
+            return e.to_dict()
+
+
+def run_parse(path: PdfSource, argv: list[str], backend: str, debug: bool) -> dict:
+    """Parte de run() que toca el PDF (parseo, caché y delta)."""
+    if "--parity" in argv:
+        # Compara tabula/camelot vs plumber sobre el mismo PDF
+        return compare_backends(path)
+
+    cont = arg_value("cont", None, argv)
+    max_cont = int(cont) if cont is not None else None
+
+    use_cache = "--cache" in argv
+    compare = "--compare-to-cache" in argv
+    if not (use_cache or compare):
+        result = parse_plan(path, backend=backend, debug=debug, max_cont=max_cont)
+    else:
+        # Caché por hash de archivo (+ índice por version/origen), ver plan_cache.py
+        from plan_cache import PlanCache
+
+        file_hash = path.sha256
+        with PlanCache(arg_value("cache-db", None, argv)) as cache:
+            result = cache.get(file_hash, __version__, backend) if not debug else None
+            hit = result is not None
+            if not hit:
+                result = parse_plan(path, backend=backend, debug=debug, max_cont=max_cont)
+            info = {"hit": hit, "file_hash": file_hash}
+            if compare:
+                info.update(cache.compare(file_hash, result))
+            if not hit:
+                cache.put(file_hash, result, __version__, backend)
+        result["cache"] = info
+
+    catalog_path = arg_value("catalog", None, argv)
+    if catalog_path and result["ok"]:
+        # Delta contra el catálogo actual: `materias` queda solo con altas y cambios
+        from plan_delta import load_catalog, apply_delta
+
+        apply_delta(result, load_catalog(Path(catalog_path), version=result["plan"]["version"]))
+
+    return result
+
+
+def main():
+    argv = sys.argv[1:]
+    result = run(argv)
     print(json.dumps(result, ensure_ascii=False))
+    if "--selftest" in argv and not result["ok"]:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Requisitos de un plan compilados a un DAG con bitsets (sin dependencias).
+
+plan_estudio.py deja en cada materia del OFICIAL `requisitos` (claves) y
+`creditos_requisito`. Aquí cada versión de plan se compila una vez:
+
+- Orden topológico (Kahn) y nivel = camino más largo desde una materia sin
+  requisitos. Cada materia es un bit en ese orden.
+- req[i]: máscara de requisitos directos; cierre[i]: todos los transitivos.
+- Requisitos que no están en el plan van a `externos` y no bloquean; si el PDF
+  trae un ciclo, esas materias se reportan en `ciclos` y van al final del orden.
+
+Consulta "¿qué materias puede inscribir?" en lote: se invierte la matriz y
+cada materia lleva una máscara de *alumnos* (bit k = alumno k del lote). Así
+  elegibles_i = ~aprobada_i & ~cursando_i & AND(aprobada_j, j ∈ req[i]) & creditos_ok_i
+son unas cuantas operaciones por materia para todo el lote, no por alumno.
+
+Uso:
+  python plan_requisitos.py <plan.json>                 # DAG compilado (JSON)
+  python plan_requisitos.py <plan.json> --alumnos=<ndjson|-> [--plan=2182] [--lote=4096]
+      → una línea {expediente, plan, elegibles: [codigo]} por alumno
+
+<plan.json>: salida de plan_estudio.py o una lista de ellas (.json), o NDJSON
+            (una por línea; cualquier otra extensión se lee así, ver json_docs.py).
+Alumnos (NDJSON), cualquiera de:
+  - salida de degree_audit.py: {expediente, plan, materias: {codigo: status}, creditos: {aprobados}}
+  - {expediente, plan?, aprobadas: [codigo], cursando?: [codigo], creditos?: int}
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from json_docs import iter_json_docs
+from plan_delta import canon_codigo
+
+
+def iter_bits(mask: int):
+    """Posiciones de los bits encendidos, de menor a mayor."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class RequisiteDAG:
+    __slots__ = ("version", "codigos", "index", "creditos", "req", "cierre",
+                 "creditos_req", "niveles", "externos", "ciclos")
+
+    def __init__(self, plan_out: dict):
+        self.version = str((plan_out.get("plan") or {}).get("version") or "").strip()
+
+        materias = {}
+        for m in plan_out.get("materias") or []:
+            codigo = canon_codigo(m.get("codigo"))
+            if codigo and codigo not in materias:
+                materias[codigo] = m
+
+        deps = {}
+        self.externos = {}
+        for codigo, m in materias.items():
+            reqs = []
+            for r in m.get("requisitos") or []:
+                r = canon_codigo(r)
+                if r == codigo or not r:
+                    continue
+                if r in materias:
+                    reqs.append(r)
+                else:
+                    self.externos.setdefault(codigo, []).append(r)
+            deps[codigo] = reqs
+
+        # Kahn por niveles; dentro de un nivel, por código para que sea estable
+        pending = {c: len(set(r)) for c, r in deps.items()}
+        users = {c: [] for c in deps}
+        for c, reqs in deps.items():
+            for r in set(reqs):
+                users[r].append(c)
+        nivel = {}
+        frontier = sorted(c for c, n in pending.items() if n == 0)
+        orden, depth = [], 0
+        while frontier:
+            nxt = []
+            for c in frontier:
+                nivel[c] = depth
+                orden.append(c)
+                for u in users[c]:
+                    pending[u] -= 1
+                    if pending[u] == 0:
+                        nxt.append(u)
+            frontier = sorted(nxt)
+            depth += 1
+        self.ciclos = sorted(c for c in deps if c not in nivel)
+        orden.extend(self.ciclos)
+
+        self.codigos = orden
+        self.index = {c: i for i, c in enumerate(orden)}
+        self.creditos = [int(materias[c].get("creditos") or 0) for c in orden]
+        self.creditos_req = [int(materias[c].get("creditos_requisito") or 0) for c in orden]
+        self.niveles = [nivel.get(c, -1) for c in orden]
+        self.req = [0] * len(orden)
+        for c, reqs in deps.items():
+            for r in reqs:
+                self.req[self.index[c]] |= 1 << self.index[r]
+
+        # En orden topológico los requisitos ya tienen su cierre calculado
+        self.cierre = [0] * len(orden)
+        for i in range(len(orden)):
+            acc = self.req[i]
+            for j in iter_bits(self.req[i]):
+                acc |= self.cierre[j]
+            self.cierre[i] = acc
+
+    # ---- máscaras de materias (un alumno) ----
+    def mask(self, codigos) -> int:
+        m = 0
+        for c in codigos:
+            i = self.index.get(canon_codigo(c))
+            if i is not None:
+                m |= 1 << i
+        return m
+
+    def decode(self, mask: int) -> list[str]:
+        return [self.codigos[i] for i in iter_bits(mask)]
+
+    def elegibles(self, aprobadas: int, creditos: int = 0, cursando: int = 0) -> int:
+        """Máscara de materias inscribibles para un alumno."""
+        out = 0
+        tomadas = aprobadas | cursando
+        for i, req in enumerate(self.req):
+            if not (tomadas >> i) & 1 and not req & ~aprobadas and creditos >= self.creditos_req[i]:
+                out |= 1 << i
+        return out
+
+    # ---- lote (máscaras de alumnos) ----
+    def elegibles_lote(self, alumnos: list) -> list[list[str]]:
+        """
+        alumnos: [(aprobadas: set[codigo], creditos: int, cursando: set[codigo])].
+        Devuelve, por alumno, las claves elegibles en orden topológico.
+        """
+        n = len(alumnos)
+        todos = (1 << n) - 1
+        aprob = [0] * len(self.codigos)
+        tomadas = [0] * len(self.codigos)
+        index = self.index
+        for k, (aprobadas, _, cursando) in enumerate(alumnos):
+            bit = 1 << k
+            for c in aprobadas:
+                i = index.get(c)
+                if i is not None:
+                    aprob[i] |= bit
+                    tomadas[i] |= bit
+            for c in cursando:
+                i = index.get(c)
+                if i is not None:
+                    tomadas[i] |= bit
+
+        # Un umbral de créditos distinto = una máscara de alumnos (suelen ser pocos)
+        cred_ok = {0: todos}
+        for umbral in set(self.creditos_req):
+            if umbral not in cred_ok:
+                cred_ok[umbral] = sum(1 << k for k, a in enumerate(alumnos) if a[1] >= umbral)
+
+        out = [[] for _ in range(n)]
+        for i, req in enumerate(self.req):
+            m = todos & ~tomadas[i] & cred_ok[self.creditos_req[i]]
+            for j in iter_bits(req):
+                m &= aprob[j]
+                if not m:
+                    break
+            codigo = self.codigos[i]
+            for k in iter_bits(m):
+                out[k].append(codigo)
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "ok": True,
+            "version": self.version,
+            "materias": len(self.codigos),
+            "orden": self.codigos,
+            "niveles": {c: self.niveles[i] for i, c in enumerate(self.codigos)},
+            "requisitos": {c: self.decode(self.req[i]) for i, c in enumerate(self.codigos) if self.req[i]},
+            "creditos_requisito": {
+                c: self.creditos_req[i] for i, c in enumerate(self.codigos) if self.creditos_req[i]
+            },
+            "externos": self.externos,
+            "ciclos": self.ciclos,
+        }
+
+
+# ----------------------------- Entradas -----------------------------
+def load_dags(path: Path) -> dict:
+    dags = {}
+    for out in iter_json_docs(path):
+        if out.get("ok", True) and out.get("materias"):
+            dag = RequisiteDAG(out)
+            dags[dag.version] = dag  # la última salida de una versión gana
+    return dags
+
+
+def alumno_sets(a: dict):
+    """Línea de alumno → (aprobadas, creditos, cursando) como conjuntos de claves canónicas."""
+    if isinstance(a.get("materias"), dict):  # degree_audit.py
+        st = a["materias"]
+        aprobadas = {canon_codigo(c) for c, s in st.items() if s == "approved"}
+        cursando = {canon_codigo(c) for c, s in st.items() if s == "in_progress"}
+        creditos = (a.get("creditos") or {}).get("aprobados") or 0
+    else:
+        aprobadas = {canon_codigo(c) for c in a.get("aprobadas") or []}
+        cursando = {canon_codigo(c) for c in a.get("cursando") or []}
+        creditos = a.get("creditos") or 0
+    return aprobadas, int(creditos), cursando
+
+
+def run_alumnos(dags: dict, lines, default_plan: str | None, lote: int, write) -> dict:
+    """Agrupa alumnos por plan en lotes de `lote` y escribe una línea por alumno."""
+    buffers: dict = {}
+    n = sin_plan = 0
+
+    def flush(version):
+        batch = buffers.pop(version, [])
+        if not batch:
+            return
+        res = dags[version].elegibles_lote([sets for _, sets in batch])
+        for (exp, _), elegibles in zip(batch, res):
+            write(json.dumps({"expediente": exp, "plan": version, "elegibles": elegibles},
+                             ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    for line in lines:
+        if not line.strip():
+            continue
+        a = json.loads(line)
+        if not a.get("ok", True):
+            continue
+        n += 1
+        version = str(a.get("plan") or "").strip() or default_plan
+        if version not in dags and len(dags) == 1 and not default_plan:
+            version = next(iter(dags))
+        exp = (a.get("expediente") or "").strip()
+        if version not in dags:
+            sin_plan += 1
+            write(json.dumps({"expediente": exp, "plan": version, "ok": False,
+                              "error": f"Plan de estudios no disponible: versión {version}"},
+                             ensure_ascii=False) + "\n")
+            continue
+        buffers.setdefault(version, []).append((exp, alumno_sets(a)))
+        if len(buffers[version]) >= lote:
+            flush(version)
+    for version in list(buffers):
+        flush(version)
+    return {"alumnos": n, "sin_plan": sin_plan}
+
+
+def main() -> None:
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    inputs = [Path(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if not inputs:
+        print(json.dumps({"ok": False, "error": "Uso: plan_requisitos.py <plan.json> [--alumnos=<ndjson|->]"}, ensure_ascii=False))
+        sys.exit(1)
+    if not inputs[0].exists():
+        print(json.dumps({"ok": False, "error": f"No existe el archivo: {inputs[0]}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    dags = load_dags(inputs[0])
+    if not dags:
+        print(json.dumps({"ok": False, "error": "No se cargó ningún plan válido"}, ensure_ascii=False))
+        sys.exit(1)
+
+    alumnos = opts.get("alumnos")
+    if not alumnos:
+        out = [d.to_dict() for d in dags.values()]
+        print(json.dumps(out[0] if len(out) == 1 else out, ensure_ascii=False))
+        return
+
+    t0 = time.perf_counter()
+    stream = sys.stdin if alumnos == "-" else open(alumnos, encoding="utf-8")
+    with stream:
+        stats = run_alumnos(dags, stream, opts.get("plan"), int(opts.get("lote") or 4096), sys.stdout.write)
+    sys.stdout.flush()
+    stats["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precarga del proceso forkserver del servicio de parsers.
+
+parser_service.py registra este módulo con set_forkserver_preload(): se importa
+una sola vez en el proceso forkserver y cada worker nace con fork() de ese
+proceso, así que todo lo cargado aquí queda compartido copy-on-write entre
+workers (también los que se reciclan con --max-tasks-per-child).
+
+Al importarse:
+1) Importa kardex.py, plan_estudio.py y las dependencias pesadas instaladas
+   (pdfplumber, pdfminer, ftfy, pandas, PyPDF2, wrappers de tabula/camelot).
+   Tabula/camelot solo se importan: nada de arrancar la JVM antes del fork.
+2) Corre un parseo de prueba de kárdex y de plan sobre un PDF mínimo en
+   memoria, para llenar las cachés perezosas (fuentes base y CMaps de
+   pdfminer, tablas de ftfy, regex compiladas, optional_import) y la caché
+   de fuentes entre documentos (font_cache.py).
+3) gc.freeze(): pasa todo a la generación permanente; así el GC de cada worker
+   no recorre esos objetos ni ensucia (copia) sus páginas.
+
+Cualquier fallo aquí se ignora: el worker simplemente carga lo que falte al
+primer uso, como antes.
+"""
+
+import gc
+import time
+
+HEAVY_IMPORTS = (
+    "pdfplumber",
+    "pdfminer.high_level",
+    "ftfy",
+    "pandas",
+    "PyPDF2",
+    "tabula",
+    "camelot",
+)
+
+REPORT: dict = {"imported": [], "warm": {}, "ms": None}
+
+
+def tiny_pdf(lines: list[str]) -> bytes:
+    """PDF de una página con `lines` en Helvetica (xref con offsets correctos)."""
+    text = "BT /F1 10 Tf 40 760 Td 12 TL " + " ".join(
+        "(" + ln.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for ln in lines
+    ) + " ET"
+    stream = text.encode("latin-1")
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+KARDEX_SAMPLE = [
+    "UNIVERSIDAD DE SONORA KARDEX ELECTRONICO",
+    "PROGRAMA: INGENIERIA EN SISTEMAS DE INFORMACION  PLAN: 2182",
+    "EXPEDIENTE: 222202156 NOMBRE DE PRUEBA",
+    "06 6881 ESTRUCTURAS DE DATOS O A 090 2231 01 00 00",
+]
+PLAN_SAMPLE = [
+    "DIRECCION DE SERVICIOS ESCOLARES  Hoja : 1 de 1  PLAN: 2182",
+    "Clave Materia Tipo Creditos",
+    "6881 ESTRUCTURAS DE DATOS OBL 8",
+]
+
+
+def _import_heavy():
+    import importlib
+
+    for name in HEAVY_IMPORTS:
+        try:
+            importlib.import_module(name)
+            REPORT["imported"].append(name)
+        except Exception:
+            pass
+
+
+def _warm(name: str, fn):
+    t0 = time.perf_counter()
+    try:
+        fn()
+        REPORT["warm"][name] = round((time.perf_counter() - t0) * 1000, 1)
+    except BaseException as e:  # SystemExit("Instala ...") incluido
+        REPORT["warm"][name] = f"omitido: {type(e).__name__}"
+
+
+def _warm_kardex():
+    import kardex
+    from pdf_source import PdfSource
+
+    kardex.selftest()
+    kardex.parse_kardex(PdfSource(tiny_pdf(KARDEX_SAMPLE), "preload"), schema="all")
+
+
+def _warm_plan():
+    import plan_estudio
+    from pdf_source import PdfSource
+
+    plan_estudio.selftest()
+    # plumber: no toca la JVM (tabula) ni Ghostscript (camelot)
+    plan_estudio.parse_plan(PdfSource(tiny_pdf(PLAN_SAMPLE), "preload"), backend="plumber")
+
+
+def preload() -> dict:
+    t0 = time.perf_counter()
+    _import_heavy()
+    try:
+        import font_cache
+
+        # Las fuentes del parseo de prueba quedan en la caché heredada por los workers
+        REPORT["font_cache"] = font_cache.install()
+    except Exception:
+        pass
+    _warm("kardex", _warm_kardex)
+    _warm("plan", _warm_plan)
+    gc.collect()
+    gc.freeze()
+    REPORT["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return REPORT
+
+
+preload()
@@ -22,6 +22,15 @@ type PlanPayload = {
   };
   materias: PlanMateria[];
   warnings?: string[];
+  // Presente cuando el parser corrió con --catalog: `materias` trae solo altas y cambios
+  materias_total?: number;
+  delta?: {
+    inserted: PlanMateria[];
+    updated: Array<{ codigo: string; campos: string[] }>;
+    removed: string[];
+    unchanged: number;
+    acentuaciones?: { added: unknown[]; removed: unknown[] };
+  };
   // origen?: "OFICIAL" | "ALUMNO" | "DESCONOCIDO";
 };
 
@@ -186,7 +195,13 @@ if (existente) {
       }
     }
 
-    const totalInput = materiasInput.length;
+    const totalInput = payload.materias_total ?? materiasInput.length;
+    // Con delta, lo que no vino en `materias` ya estaba igual en el catálogo
+    if (payload.delta) unchanged += payload.delta.unchanged;
+    const removed = payload.delta?.removed ?? [];
+    if (removed.length) {
+      warnings.push(`Materias en catálogo que ya no aparecen en el plan: ${removed.join(", ")}`);
+    }
     const noChanges = (added === 0 && updated === 0);
 
     await audRepo.save(audRepo.create({
@@ -202,6 +217,8 @@ if (existente) {
       added,
       updated,
       unchanged,
+      // códigos del catálogo de este plan que ya no vienen en el PDF (no se borran)
+      removed,
       warnings,
       action: noChanges ? "SKIPPED_NO_CHANGES" : "UPSERTED",
     };
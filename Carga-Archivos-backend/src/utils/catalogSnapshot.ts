@@ -0,0 +1,29 @@
+// src/utils/catalogSnapshot.ts
+import fs from "fs";
+import os from "os";
+import path from "path";
+import { AppDataSource } from "../config/data-source";
+
+/**
+ * Escribe las materias actuales del plan (nombre, version) ya parseado
+ * ([{ codigo, nombre, creditos, tipo }, ...]) para que plan_delta.py emita
+ * solo el delta. Solo se vuelca ese plan, no el catálogo completo; si el plan
+ * aún no existe el snapshot queda vacío (todo es alta).
+ */
+export async function writeCatalogSnapshot(
+  tag: string | number,
+  plan: { nombre: string; version: string }
+): Promise<string> {
+  const rows: Array<{ codigo: string; nombre: string; creditos: number; tipo: string }> =
+    await AppDataSource.query(
+      `SELECT m.codigo, m.nombre, m.creditos, m.tipo::text AS tipo
+         FROM materia m
+         JOIN plan_estudio p ON p.id = m.plan_estudio_id
+        WHERE p.nombre = $1 AND p.version = $2`,
+      [plan.nombre, plan.version]
+    );
+
+  const file = path.join(os.tmpdir(), `catalogo_plan_${tag}_${Date.now()}.json`);
+  await fs.promises.writeFile(file, JSON.stringify(rows), "utf-8");
+  return file;
+}
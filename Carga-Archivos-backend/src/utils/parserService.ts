@@ -0,0 +1,38 @@
+import axios from "axios";
+import path from "path";
+
+export type ParserTipo = "kardex" | "plan";
+export type ParserPrioridad = "interactive" | "bulk";
+
+/**
+ * Llama al servicio de parsers (src/scripts/parser_service.py) si PARSER_SERVICE_URL
+ * está definido. Devuelve `undefined` cuando no hay servicio configurado para que
+ * el llamador caiga al spawn de siempre.
+ */
+export async function callParserService(
+  tipo: ParserTipo,
+  pdfPath: string,
+  args: string[] = [],
+  prioridad: ParserPrioridad = "interactive"
+): Promise<any | undefined> {
+  const base = process.env.PARSER_SERVICE_URL;
+  if (!base) return undefined;
+
+  const res = await axios.post(
+    `${base.replace(/\/$/, "")}/parse`,
+    { tipo, path: path.resolve(pdfPath), args, prioridad },
+    { validateStatus: () => true, timeout: Number(process.env.PARSER_SERVICE_TIMEOUT_MS || 120000) }
+  );
+
+  if (res.status === 429) {
+    const retry = res.headers["retry-after"];
+    const err: any = new Error(`Servicio de parsers saturado (${res.data?.reason}); reintentar en ${retry}s`);
+    err.status = 429;
+    err.retryAfter = Number(retry) || 1;
+    throw err;
+  }
+  if (res.status !== 200) {
+    throw new Error(`Servicio de parsers respondió ${res.status}: ${res.data?.error ?? ""}`);
+  }
+  return res.data;
+}
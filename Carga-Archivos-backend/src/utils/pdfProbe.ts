@@ -0,0 +1,48 @@
+export type PdfClase = "KARDEX" | "PLAN_OFICIAL" | "PLAN_ALUMNO" | "UNKNOWN";
+
+export interface PdfProbe {
+  ok: boolean;
+  probe: true;
+  clase: PdfClase;
+  paginas?: number;
+  tiene_texto?: boolean;
+  cifrado?: boolean;
+  // cifrado y NO abre con contraseña de usuario vacía (los de solo dueño sí se leen)
+  requiere_password?: boolean;
+  expediente?: string;
+  plan?: string;
+  metodo?: "raw" | "pdfminer";
+  ms?: number;
+  error?: string;
+}
+
+const NOMBRE_CLASE: Record<PdfClase, string> = {
+  KARDEX: "un kárdex",
+  PLAN_OFICIAL: "un plan de estudios oficial",
+  PLAN_ALUMNO: "un plan de estudios del portal de alumnos",
+  UNKNOWN: "un documento desconocido",
+};
+
+/**
+ * Decide con el resultado de `--probe` (pdf_probe.py) si el PDF se rechaza antes
+ * del parseo completo. Devuelve el motivo, o null si hay que seguir.
+ * UNKNOWN no se rechaza: el sondeo es heurístico y el parser completo decide.
+ */
+export function motivoRechazoProbe(
+  probe: PdfProbe | null | undefined,
+  esperado: "KARDEX" | "PLAN",
+  opts: { permitirSinTexto?: boolean } = {}
+): string | null {
+  if (!probe) return null; // si el sondeo falla, no bloquea
+  if (!probe.ok) return probe.error ?? "PDF inválido";
+  if (probe.requiere_password) return "El PDF está protegido con contraseña";
+  if (probe.tiene_texto === false && !opts.permitirSinTexto) {
+    return "El PDF no tiene capa de texto (¿es un escaneo?)";
+  }
+  const coincide = esperado === "KARDEX" ? probe.clase === "KARDEX" : probe.clase.startsWith("PLAN_");
+  if (probe.clase !== "UNKNOWN" && !coincide) {
+    const want = esperado === "KARDEX" ? "un kárdex" : "un plan de estudios";
+    return `El archivo parece ser ${NOMBRE_CLASE[probe.clase]}, no ${want}`;
+  }
+  return null;
+}
@@ -1,12 +1,19 @@
 import { spawn } from "node:child_process";
 import path from "node:path";
+import { callParserService } from "./parserService";
+
+export async function runPythonKardex(pdfPath: string, args: string[] = []): Promise<any> {
+    const viaService = await callParserService("kardex", pdfPath, args);
+    if (viaService !== undefined) {
+        if (viaService.ok === false) throw new Error(`Python exited 1: ${JSON.stringify(viaService)}`);
+        return viaService;
+    }
 
-export function runPythonKardex(pdfPath: string): Promise<any> {
     return new Promise((resolve, reject) => {
         const pythonExe = "python";
         const script = path.join(process.cwd(), "src/scripts/kardex.py");
 
-        const child = spawn(pythonExe, [script, pdfPath], {
+        const child = spawn(pythonExe, [script, pdfPath, ...args], {
             cwd: process.cwd(),
             stdio: ["ignore", "pipe", "pipe"],
         });
@@ -30,4 +37,36 @@ export function runPythonKardex(pdfPath: string): Promise<any> {
             }
         })
     })
-}
\ No newline at end of file
+}
+
+/**
+ * `kardex.py --probe`: devuelve el JSON del sondeo también cuando trae ok:false
+ * (no es PDF, etc.) para que motivoRechazoProbe dé el motivo; solo lanza si el
+ * proceso no produjo JSON.
+ */
+export async function probeKardex(pdfPath: string): Promise<any> {
+    const viaService = await callParserService("kardex", pdfPath, ["--probe"]);
+    if (viaService !== undefined) return viaService;
+
+    return new Promise((resolve, reject) => {
+        const script = path.join(process.cwd(), "src/scripts/kardex.py");
+        const child = spawn("python", [script, pdfPath, "--probe"], {
+            cwd: process.cwd(),
+            stdio: ["ignore", "pipe", "pipe"],
+        });
+
+        let stdout = "";
+        let stderr = "";
+
+        child.stdout.on("data", (d) => (stdout += d.toString("utf-8")));
+        child.stderr.on("data", (d) => (stderr += d.toString("utf-8")));
+        child.on("error", reject);
+        child.on("close", (code) => {
+            try {
+                resolve(JSON.parse(stdout));
+            } catch (e) {
+                reject(new Error(`Python exited ${code}: ${stderr || stdout}`));
+            }
+        });
+    });
+}
@@ -1,7 +1,11 @@
 import { spawn } from "child_process";
 import path from "path";
+import { callParserService } from "./parserService";
+
+export async function runPythonPlan(pdfPath: string, args: string[] = []): Promise<any> {
+  const viaService = await callParserService("plan", pdfPath, args);
+  if (viaService !== undefined) return viaService;
 
-export function runPythonPlan(pdfPath: string, args: string[] = []): Promise<any> {
   return new Promise((resolve, reject) => {
     const scriptPath = path.join(process.cwd(), "src", "scripts", "plan_estudio.py");
     const py = spawn("python", [scriptPath, pdfPath, ...args], {
@@ -23,3 +27,32 @@ export function runPythonPlan(pdfPath: string, args: string[] = []): Promise<any
     });
   });
 }
+
+/**
+ * Aplica plan_delta.py a un resultado ya parseado contra un snapshot del
+ * catálogo: `materias` queda con altas y cambios, más `materias_total` y `delta`.
+ */
+export async function runPlanDelta(parsed: any, catalogPath: string): Promise<any> {
+  return new Promise((resolve, reject) => {
+    const scriptPath = path.join(process.cwd(), "src", "scripts", "plan_delta.py");
+    const py = spawn("python", [scriptPath, "-", `--catalog=${catalogPath}`], {
+      env: { ...process.env, PYTHONIOENCODING: "utf-8" },
+    });
+
+    let out = "";
+    let err = "";
+
+    py.stdout.on("data", (d) => (out += d.toString()));
+    py.stderr.on("data", (d) => (err += d.toString()));
+    py.on("error", reject);
+    py.on("close", (code) => {
+      if (code !== 0) return reject(new Error(err || out || `Python exit code ${code}`));
+      try {
+        resolve(JSON.parse(out));
+      } catch (e) {
+        reject(new Error(`Salida de Python no es JSON válido: ${e}\n${out}`));
+      }
+    });
+    py.stdin.end(JSON.stringify(parsed), "utf-8");
+  });
+}
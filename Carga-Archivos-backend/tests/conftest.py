@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""Pruebas de src/scripts: los scripts se importan como módulos sueltos."""
+
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "src" / "scripts"
+sys.path.insert(0, str(SCRIPTS))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""alertas_faltas.py: cola por trigger, COMMIT fuera de orden, borrados y recálculo."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pandas")
+psycopg = pytest.importorskip("psycopg")
+
+from alertas_faltas import refresh, selftest  # noqa: E402
+
+# lo que route.ts suma por (alumno, grupo): totales materializados + cola
+EN_VIVO_SQL = """
+SELECT a.id,
+       COALESCE(af.faltas_brutas, 0) + COALESCE(n.faltas, 0),
+       COALESCE(af.justificaciones, 0) + COALESCE(n.justificaciones, 0)
+  FROM alumno a
+  LEFT JOIN alerta_faltas af ON af.alumno_id = a.id
+  LEFT JOIN (SELECT alumno_id, SUM(faltas_brutas) AS faltas, SUM(justificaciones) AS justificaciones
+               FROM alerta_faltas_pendiente GROUP BY alumno_id) n ON n.alumno_id = a.id
+ ORDER BY a.id
+"""
+REAL_SQL = """
+SELECT a.id, count(i.id) FILTER (WHERE i.tipo = 'FALTA'), count(i.id) FILTER (WHERE i.tipo = 'JUSTIFICACION')
+  FROM alumno a LEFT JOIN incidencia i ON i.alumno_id = a.id
+ GROUP BY a.id ORDER BY a.id
+"""
+
+
+@pytest.fixture
+def db(pg_dsn):
+    with psycopg.connect(pg_dsn, autocommit=True) as conn:
+        plan = conn.execute(
+            "INSERT INTO plan_estudio (nombre, version, total_creditos, semestres_sugeridos) "
+            "VALUES ('ISI', '2182', 393, 9) RETURNING id").fetchone()[0]
+        for exp in ("222200001", "222200002"):
+            conn.execute("INSERT INTO alumno (matricula, expediente, nombre, apellido_paterno, plan_estudio_id) "
+                         "VALUES (%s, %s, 'ALUMNO', 'PRUEBA', %s)", (exp, exp, plan))
+        conn.execute("INSERT INTO materia (codigo, nombre, creditos, plan_estudio_id) "
+                     "VALUES ('4134', 'PRÁCTICA', 8, %s)", (plan,))
+        conn.execute("INSERT INTO periodo (anio, ciclo, etiqueta, fecha_inicio, fecha_fin) "
+                     "VALUES (2025, 2, '2025-2', '2025-08-01', '2025-12-15')")
+        conn.execute("INSERT INTO grupo (materia_id, periodo_id, clave_grupo, cupo) "
+                     "SELECT m.id, p.id, '1', 40 FROM materia m, periodo p")
+        conn.execute("INSERT INTO usuario (email, password_hash) VALUES ('p@x', 'x')")
+        conn.execute("INSERT INTO profesor (nombre, apellido_paterno, correo, num_empleado, usuario_id) "
+                     "SELECT 'PROFE', 'PRUEBA', 'p@x', 10, id FROM usuario")
+    return pg_dsn
+
+
+def incidencia(conn, alumno_id, tipo="FALTA", dia=1):
+    return conn.execute(
+        "INSERT INTO incidencia (alumno_id, profesor_id, materia_id, grupo_id, tipo, fecha, descripcion) "
+        "SELECT %s, p.id, g.materia_id, g.id, %s, make_date(2025, 9, %s), 'prueba' "
+        "FROM profesor p, grupo g RETURNING id", (alumno_id, tipo, dia)).fetchone()[0]
+
+
+def query(dsn, sql):
+    with psycopg.connect(dsn) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def materializado(dsn):
+    return query(dsn, "SELECT alumno_id, faltas_brutas, justificaciones, faltas, tipo "
+                      "FROM alerta_faltas ORDER BY alumno_id")
+
+
+def test_selftest():
+    assert selftest()["ok"]
+
+
+def test_primera_corrida_recalcula_y_luego_usa_la_cola(db):
+    with psycopg.connect(db, autocommit=True) as conn:
+        for dia in range(1, 9):
+            incidencia(conn, 1, dia=dia)
+    res = refresh(db)
+    assert res["modo"] == "completo" and res["filas_leidas"] == 8
+    assert materializado(db) == [(1, 8, 0, 8, "ADVERTENCIA")]
+    assert query(db, "SELECT count(*) FROM alerta_faltas_pendiente") == [(0,)]
+
+    with psycopg.connect(db, autocommit=True) as conn:
+        incidencia(conn, 2, "JUSTIFICACION")
+    assert query(db, EN_VIVO_SQL) == query(db, REAL_SQL)  # entre corridas
+    res = refresh(db)
+    assert res["modo"] == "incremental" and res["filas_leidas"] == 1
+    assert materializado(db)[1] == (2, 0, 1, 0, "NORMAL")
+
+
+def test_commit_tardio_con_id_menor_no_se_pierde(db):
+    refresh(db)
+    lenta = psycopg.connect(db)
+    try:
+        id_bajo = incidencia(lenta, 1)  # toma su id pero no confirma
+        with psycopg.connect(db, autocommit=True) as conn:
+            id_alto = incidencia(conn, 1, dia=2)
+        assert id_bajo < id_alto
+
+        refresh(db)
+        assert materializado(db) == [(1, 1, 0, 1, "NORMAL")]
+        lenta.commit()
+    finally:
+        lenta.close()
+
+    assert query(db, EN_VIVO_SQL) == query(db, REAL_SQL)
+    refresh(db)
+    assert materializado(db) == [(1, 2, 0, 2, "NORMAL")]
+
+
+def test_borrados_y_cambios_de_tipo(db):
+    with psycopg.connect(db, autocommit=True) as conn:
+        ids = [incidencia(conn, 1, dia=d) for d in range(1, 15)]
+    refresh(db)
+    assert materializado(db) == [(1, 14, 0, 14, "REPROBADO")]
+
+    with psycopg.connect(db, autocommit=True) as conn:
+        conn.execute("DELETE FROM incidencia WHERE id = %s", (ids[0],))
+        conn.execute("UPDATE incidencia SET tipo = 'JUSTIFICACION' WHERE id = %s", (ids[1],))
+        conn.execute("UPDATE incidencia SET descripcion = 'otra' WHERE id = %s", (ids[2],))
+    assert query(db, EN_VIVO_SQL) == query(db, REAL_SQL)
+    refresh(db)
+    incremental = materializado(db)
+    assert incremental == [(1, 12, 1, 11, "ADVERTENCIA")]
+
+    assert refresh(db, full=True)["modo"] == "completo"
+    assert materializado(db) == incremental
+
+
+ROUTE_TS = (Path(__file__).resolve().parents[2]
+            / "sistema-gestion-academica" / "src" / "app" / "api" / "attendance" / "alerts" / "route.ts")
+
+
+def route_queries():
+    """[(query, legacy)] de route.ts: por grupo y por profesor, con $1 → %(p)s."""
+    if not ROUTE_TS.exists():
+        pytest.skip("sin sistema-gestion-academica")
+    sqls = re.findall(r"(query|legacy) = `(.*?)`;", ROUTE_TS.read_text(encoding="utf-8"), re.S)
+    sqls = [sql.replace("$1", "%(p)s") for _, sql in sqls]
+    return list(zip(sqls[::2], sqls[1::2]))
+
+
+def alertas(dsn, sql, p):
+    """(alumno, faltas) con faltas > 6, como filtra la campana en route.ts."""
+    with psycopg.connect(dsn) as conn:
+        rows = conn.execute(sql, {"p": p}).fetchall()
+    faltas = [(r[0], max(0, int(r[6]) - int(r[7]))) for r in rows]
+    return sorted(f for f in faltas if f[1] > 6)
+
+
+def test_route_materializada_igual_a_conteo_en_vivo(db):
+    (por_grupo, por_grupo_legacy), (campana, campana_legacy) = route_queries()
+    with psycopg.connect(db, autocommit=True) as conn:
+        conn.execute("INSERT INTO alumno_grupo (alumno_id, grupo_id) SELECT 1, id FROM grupo")
+        conn.execute("INSERT INTO asignacion_profesor (grupo_id, profesor_id) SELECT g.id, p.id FROM grupo g, profesor p")
+        for d in range(1, 8):
+            incidencia(conn, 1, dia=d)
+    refresh(db)
+    with psycopg.connect(db, autocommit=True) as conn:
+        incidencia(conn, 1, dia=9)  # en la cola
+        incidencia(conn, 2, dia=9)  # alumno 2 aún no está ligado al grupo
+        conn.execute("INSERT INTO alumno_grupo (alumno_id, grupo_id) SELECT 2, id FROM grupo")
+
+    grupo_id = query(db, "SELECT id FROM grupo")[0][0]
+    with psycopg.connect(db) as conn:
+        vivo = conn.execute(por_grupo, {"p": grupo_id}).fetchall()
+        antes = conn.execute(por_grupo_legacy, {"p": grupo_id}).fetchall()
+    assert vivo == antes and [(r[0], r[6], r[7]) for r in vivo] == [(1, 8, 0), (2, 1, 0)]
+    assert alertas(db, campana, 1) == alertas(db, campana_legacy, 1) == [(1, 8)]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""asistencia.py --emit=copy + asistencia_copy_load.py contra PostgreSQL (init.sql)."""
+
+import io
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+psycopg = pytest.importorskip("psycopg")
+
+from asistencia import emit_copy, read_lista  # noqa: E402
+from asistencia_copy_load import load_copy  # noqa: E402
+
+PERIODO = "2025-2"
+
+
+def lista(path, grupo="1 - TEORIA", alumnos=(("222200001", "F"), ("222200002", ""))):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Lista de Asistencia del mes de SEPTIEMBRE"])
+    ws.append([f"Materia: 4134 - PRÁCTICA DE DESARROLLO Grupo: {grupo} Lugar: 5G-A201"])
+    ws.append(["Expediente", "Nombre", "L", "M", "∑F"])
+    ws.append(["-", "-", 1, 2])
+    for exp, marca in alumnos:
+        ws.append([exp, f"ALUMNO {exp}", marca, "", 1 if marca else 0])
+    wb.save(path)
+    return path
+
+
+def copy_stream(*paths) -> io.StringIO:
+    buf = io.StringIO()
+    emit_copy(list(paths), PERIODO, 2025, 1, buf.write)
+    buf.seek(0)
+    return buf
+
+
+@pytest.fixture
+def db(pg_dsn):
+    with psycopg.connect(pg_dsn, autocommit=True) as conn:
+        plan = conn.execute(
+            "INSERT INTO plan_estudio (nombre, version, total_creditos, semestres_sugeridos) "
+            "VALUES ('ISI', '2182', 393, 9) RETURNING id").fetchone()[0]
+        for exp in ("222200001", "222200002", "222200003"):
+            conn.execute(
+                "INSERT INTO alumno (matricula, expediente, nombre, apellido_paterno, plan_estudio_id) "
+                "VALUES (%s, %s, 'ALUMNO', 'PRUEBA', %s)", (exp, exp, plan))
+        conn.execute("INSERT INTO materia (codigo, nombre, creditos, plan_estudio_id) "
+                     "VALUES ('4134', 'PRÁCTICA DE DESARROLLO', 8, %s)", (plan,))
+        conn.execute("INSERT INTO periodo (anio, ciclo, etiqueta, fecha_inicio, fecha_fin) "
+                     "VALUES (2025, 2, %s, '2025-08-01', '2025-12-15')", (PERIODO,))
+    return pg_dsn
+
+
+def query(dsn, sql, *params):
+    with psycopg.connect(dsn) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def grupo(dsn, clave):
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        return conn.execute(
+            "INSERT INTO grupo (materia_id, periodo_id, clave_grupo, cupo) "
+            "SELECT m.id, p.id, %s, 40 FROM materia m, periodo p RETURNING id", (clave,)).fetchone()[0]
+
+
+def registrar(dsn, stored_name):
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        return conn.execute(
+            "INSERT INTO archivo_cargado (tipo, nombre_archivo, hash, usuario, stored_name) "
+            "VALUES ('ASISTENCIA', 'AlumnosMateria.xlsx', 'x', 'prueba', %s) RETURNING id",
+            (stored_name,)).fetchone()[0]
+
+
+def test_meta_anio_queda_nulo(tmp_path):
+    out = read_lista(lista(tmp_path / "a.xlsx"), 2025)
+    assert out["meta"]["anio"] is None
+    assert out["incidencias"] == [{"expediente": "222200001", "fecha": "2025-09-01", "tipo": "FALTA"}]
+
+
+def test_sin_grupo_se_crea_uno_y_las_demas_listas_lo_reusan(db, tmp_path):
+    a = lista(tmp_path / "a.xlsx", grupo="1 - TEORIA")
+    b = lista(tmp_path / "b.xlsx", grupo="2 - TEORIA", alumnos=(("222200003", ""),))
+    archivo_a = registrar(db, "a.xlsx")
+
+    res = load_copy(copy_stream(a, b), db)
+
+    assert res["grupos_creados"] == 1 and res["alumnos_vinculados"] == 3
+    assert res["inscripciones_creadas"] == 3
+    assert res["archivos_sin_registro"] == ["b.xlsx"]
+    assert query(db, "SELECT clave_grupo, cupo FROM grupo") == [("1 - TEORIA", 0)]
+    assert query(db, "SELECT a.expediente, ag.archivo_id, ag.fuente FROM alumno_grupo ag "
+                     "JOIN alumno a ON a.id = ag.alumno_id ORDER BY 1") == [
+        ("222200001", archivo_a, "LISTA_ASISTENCIA"),
+        ("222200002", archivo_a, "LISTA_ASISTENCIA"),
+        ("222200003", None, "LISTA_ASISTENCIA"),
+    ]
+
+
+def test_clave_exacta_y_unico_grupo(db, tmp_path):
+    g1 = grupo(db, "1 - TEORIA")
+    res = load_copy(copy_stream(lista(tmp_path / "a.xlsx", grupo="9 - LAB")), db)
+    assert res["grupos_creados"] == 0 and res["alumnos_vinculados"] == 2
+    assert query(db, "SELECT DISTINCT grupo_id FROM alumno_grupo") == [(g1,)]
+
+    g2 = grupo(db, "2 - TEORIA")
+    b = lista(tmp_path / "b.xlsx", grupo="2 - TEORIA", alumnos=(("222200003", ""),))
+    load_copy(copy_stream(b), db)
+    assert query(db, "SELECT grupo_id FROM alumno_grupo ag JOIN alumno a ON a.id = ag.alumno_id "
+                     "WHERE a.expediente = '222200003'") == [(g2,)]
+
+
+def test_varios_grupos_sin_clave_solo_inscribe(db, tmp_path):
+    grupo(db, "1 - TEORIA")
+    grupo(db, "2 - TEORIA")
+    res = load_copy(copy_stream(lista(tmp_path / "a.xlsx", grupo="9 - LAB")), db)
+
+    assert res["alumnos_sin_grupo"] == 2 and res["alumnos_vinculados"] == 0
+    assert res["inscripciones_creadas"] == 2 and res["archivos_sin_grupo"] == ["a.xlsx"]
+    assert query(db, "SELECT count(*) FROM grupo") == [(2,)]
+
+
+def test_periodo_inexistente_es_error(db, tmp_path):
+    buf = io.StringIO()
+    emit_copy([lista(tmp_path / "a.xlsx")], "2030-1", 2030, 1, buf.write)
+    buf.seek(0)
+    with pytest.raises(ValueError, match='periodo con etiqueta "2030-1"'):
+        load_copy(buf, db)
+    assert query(db, "SELECT count(*) FROM inscripcion") == [(0,)]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""font_cache.py: la caché guarda tablas de fuente, no documentos."""
+
+import gc
+import weakref
+
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+pytest.importorskip("reportlab")
+
+import font_cache  # noqa: E402
+from bench_fonts import find_ttfs, synthetic_kardex  # noqa: E402
+
+
+def kardex_con_fuentes(path, expediente):
+    """El mismo PDF sintético que genera bench_fonts.py sin argumentos."""
+    ttfs = find_ttfs()
+    if not ttfs:
+        pytest.skip("sin fuente TrueType para incrustar")
+    return synthetic_kardex(path, ttfs, expediente, materias=10, seed=expediente)
+
+
+def texto(path, docs=None):
+    with pdfplumber.open(str(path)) as pdf:
+        if docs is not None:
+            docs.append(weakref.ref(pdf.doc))
+        return pdf.pages[0].extract_text()
+
+
+def test_no_retiene_documentos(tmp_path):
+    a = kardex_con_fuentes(tmp_path / "a.pdf", 222200001)
+    b = kardex_con_fuentes(tmp_path / "b.pdf", 222200002)
+    sin_cache = [texto(a), texto(b)]
+    assert sin_cache[0] != sin_cache[1]
+
+    assert font_cache.install()
+    font_cache.clear()
+    docs = []
+    assert texto(a, docs) == sin_cache[0]
+    misses = font_cache.stats()["misses"]
+    assert misses >= 1 and font_cache.stats()["hits"] == 0
+    assert texto(b, docs) == sin_cache[1]
+    assert font_cache.stats()["hits"] >= misses  # el segundo documento reutiliza todas
+
+    gc.collect()
+    assert [d() for d in docs] == [None, None], "una fuente cacheada mantiene vivo el documento"
+    for font in list(font_cache._fonts.values()):
+        for attr in font_cache.DOC_ATTRS:
+            assert not getattr(font, attr, None)
+        assert not any(font_cache._holds_doc(v) for v in vars(font).values())
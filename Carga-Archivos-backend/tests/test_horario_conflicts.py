@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""horario_conflicts.py: barrido por recurso y día contra la comparación por pares."""
+
+import random
+from itertools import combinations
+
+from horario_conflicts import DIAS, DIMENSIONES, ScheduleIndex, build_slots, detect, same_class
+
+
+def fila(materia, ini, fin, dia="LUN", **kw):
+    return {"nombreMateria": materia, **kw, "slots": [{"dia": dia, "horaInicio": ini, "horaFin": fin}]}
+
+
+def por_pares(slots, dims=DIMENSIONES):
+    counts = dict.fromkeys(dims, 0)
+    for a, b in combinations(slots, 2):
+        for dim in dims:
+            ra, rb = getattr(a, dim), getattr(b, dim)
+            if ra and ra == rb and a.dia == b.dia and a.ini < b.fin and b.ini < a.fin \
+                    and not same_class(dim, a, b):
+                counts[dim] += 1
+    return counts
+
+
+def test_contiguos_no_chocan_y_aula_normalizada():
+    res = detect([
+        fila("A", "11:00", "12:00", aula="5G-101", noEmpleado="10", nrc="1"),
+        fila("B", "12:00", "13:00", aula="5G 101", noEmpleado="10", nrc="2"),
+        fila("C", "12:30", "13:30", aula="5g101", noEmpleado="20", nrc="3"),
+    ])
+    assert res["conflictos"] == {"aula": 1, "profesor": 0, "grupo": 0}
+    (d,) = res["detalle"]
+    assert (d["recurso"], d["traslape"], d["a"]["materia"], d["b"]["materia"]) == ("5G101", "12:30-13:00", "B", "C")
+
+
+def test_misma_clase_en_isi_y_prelistas():
+    isi = fila("REDES", "09:00", "10:00", aula="5G-101", profesor="JUAN PEREZ")
+    pre = fila("REDES", "09:00", "10:00", aula="5G-101", noEmpleado="10", nrc="4455")
+    res = detect({"fromISI": [isi], "fromPrelistas": [pre]})
+    assert res["slots"] == 2 and sum(res["conflictos"].values()) == 0
+
+    # el mismo NRC a dos horas que se traslapan sí es choque de grupo
+    otra = fila("REDES", "09:30", "10:30", aula="5G-102", noEmpleado="10", nrc="4455")
+    assert detect([pre, otra])["conflictos"] == {"aula": 0, "profesor": 1, "grupo": 1}
+
+
+def test_repetidos_y_descartados():
+    a = fila("A", "08:00", "09:00", aula="1", nrc="1")
+    malos = [fila("X", "10:00", "09:00"), fila("X", "", "09:00"), fila("X", "08:00", "09:00", dia="DOM")]
+    slots, descartados = build_slots([a, dict(a), *malos])
+    assert len(slots) == 1 and descartados == 3
+
+
+def test_barrido_igual_a_pares():
+    rnd = random.Random(47)
+    data = []
+    for i in range(300):
+        ini = rnd.randrange(7 * 60, 20 * 60, 30)
+        fin = ini + rnd.choice((60, 90, 120, 180))
+        data.append(fila(f"M{rnd.randrange(40)}", f"{ini // 60}:{ini % 60:02d}", f"{fin // 60}:{fin % 60:02d}",
+                         dia=rnd.choice(DIAS), aula=f"A{rnd.randrange(12)}",
+                         noEmpleado=str(rnd.randrange(25)), nrc=str(rnd.randrange(60))))
+    slots, _ = build_slots(data)
+    res = detect(data, max_detalle=None)
+    assert res["conflictos"] == por_pares(slots)
+    assert len(res["detalle"]) == sum(res["conflictos"].values()) and not res["detalle_truncado"]
+
+    idx = ScheduleIndex(slots)
+    for ini, fin in ((420, 480), (600, 601), (700, 900)):
+        for aula in ("A0", "A5"):
+            esperado = {id(s) for s in slots if s.aula == aula and s.dia == "MAR" and s.ini < fin and ini < s.fin}
+            assert {id(s) for s in idx.overlapping("aula", aula, "MAR", ini, fin)} == esperado
+
+
+def test_solo_y_max_detalle():
+    data = [fila("A", "08:00", "10:00", aula="1", nrc="1"), fila("B", "09:00", "11:00", aula="1", nrc="1")]
+    res = detect(data, ("aula",), max_detalle=0)
+    assert res["conflictos"] == {"aula": 1}
+    assert res["detalle"] == [] and res["detalle_truncado"]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""kardex_core.py: filas por celdas, por tokens y desde el texto; adaptadores."""
+
+from kardex_alumnos import alumnos_output
+from kardex_core import build_rows, to_alumnos_row, to_carga_row
+
+CELDAS = ["06", "6881", "ESTRUCTURAS DE DATOS", "O", "A", "090", "", "2231", "01", "00", "00"]
+TEXTO = (
+    "PLAN: 2182\nEXPEDIENTE: 222202156 NOMBRE DE PRUEBA\n"
+    "CR CVE MATERIA E1 E2 ORD REG CIC I R B\n"
+    "06 6881 ESTRUCTURAS DE DATOS O A 090 2231 01 00 00\n"
+    "08 6882 BASES DE DATOS O A 085 2231 01 00 00\n"
+)
+
+
+def test_kardex_sin_tablas_sale_del_texto():
+    rows = build_rows([], TEXTO)
+    assert [to_carga_row(r)["CVE"] for r in rows] == ["6881", "6882"]
+    assert to_carga_row(rows[1])["ORD"] == "085"
+
+
+def test_dedup_por_clave_sin_ceros_y_ciclo():
+    otra_pagina = ["06", "06881", "ESTRUCTURAS DE DATOS I", "O", "A", "090", "", "2231", "01", "00", "00"]
+    otro_ciclo = ["06", "6881", "ESTRUCTURAS DE DATOS", "O", "A", "", "070", "2232", "01", "01", "00"]
+    rows = build_rows([CELDAS, otra_pagina, otro_ciclo], TEXTO)
+    assert [(r.codigo, r.cic) for r in rows] == [("6881", "2231"), ("6881", "2232"), ("6882", "2231")]
+    assert rows[0].nombre == "ESTRUCTURAS DE DATOS"  # gana la primera
+
+
+def test_esquema_alumnos():
+    out = alumnos_output(TEXTO, build_rows([CELDAS], TEXTO))
+    assert out["alumno"]["expediente"] == "222202156"
+    assert out["materias"][0] == {
+        "cr": 6, "codigo": "6881", "nombre": "ESTRUCTURAS DE DATOS", "e1": "O", "e2": "A",
+        "ord": 90, "reg": None, "cic": "2231", "inscripciones": 1, "reprobaciones": 0,
+        "bajas": 0, "periodo": "2023-1",
+    }
+    con_tipo = alumnos_output(TEXTO, build_rows([CELDAS], TEXTO), make_row=lambda r: ("fila", r.codigo))
+    assert con_tipo["materias"] == [("fila", "6881"), ("fila", "6882")]
+
+
+def test_celdas_y_tokens_coinciden():
+    por_celdas = build_rows([CELDAS], "")
+    por_tokens = build_rows([], TEXTO.splitlines()[3])
+    assert [to_alumnos_row(r) for r in por_celdas] == [to_alumnos_row(r) for r in por_tokens]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""page_cache.py: la misma página en otra descarga (fecha, hora, "Página N de M") es acierto."""
+
+from pathlib import Path
+
+import pytest
+
+import page_cache
+from page_cache import PageCache, mask_volatile, page_fingerprint, refresh_text
+
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+pdfplumber = pytest.importorskip("pdfplumber")
+
+CUERPO = [f"0{c % 9 + 1} 06{800 + c} MATERIA {c} O A {60 + c % 40:03d} 2231 01 00 00" for c in range(20)]
+
+
+def kardex_pdf(path, fecha="12/08/2025", hora="10:31", pagina="1 de 2", cuerpo=CUERPO):
+    c = canvas.Canvas(str(path))
+    y = 800
+    for linea in [f"KARDEX ELECTRÓNICO  Fecha: {fecha} {hora}", f"Página {pagina}", *cuerpo]:
+        c.drawString(40, y, linea)
+        y -= 14
+    c.save()
+    return path
+
+
+def pagina(path):
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[0]
+        return page_fingerprint(page), page.extract_text()
+
+
+def test_mask_volatile_y_refresh_text():
+    tokens = []
+    masked = mask_volatile(b"(Fecha: 12/08/2025 10:31:05) Tj (P\xe1gina 3 de 12) Tj (2231 01)", tokens)
+    assert masked == b"(Fecha: \x00 \x00) Tj (P\xe1gina \x00) Tj (2231 01)"
+    assert tokens == ["12/08/2025", "10:31:05", "3 de 12"]
+
+    texto = "Fecha: 12/08/2025 10:31:05\nPágina 3 de 12"
+    assert refresh_text(texto, tokens, ["01/02/2026", "09:00:00", "4 de 12"]) == \
+        "Fecha: 01/02/2026 09:00:00\nPágina 4 de 12"
+    assert refresh_text(texto, tokens, tokens) is texto
+    assert refresh_text(texto, tokens, ["01/02/2026", "09:00:00"]) is None  # no cuadran los tokens
+    assert refresh_text("sin fecha", ["12/08/2025"], ["01/02/2026"]) is None
+
+
+def test_otra_descarga_es_acierto_con_los_tokens_nuevos(tmp_path):
+    fp1, texto1 = pagina(kardex_pdf(tmp_path / "a.pdf"))
+    fp2, texto2 = pagina(kardex_pdf(tmp_path / "b.pdf", fecha="03/02/2026", hora="18:05", pagina="2 de 3"))
+    assert fp1[0] == fp2[0] and fp1[1] == ["12/08/2025", "10:31", "1 de 2"] and fp2[1] == ["03/02/2026", "18:05", "2 de 3"]
+
+    with PageCache(tmp_path / "pages.sqlite") as cache:
+        cache.put(fp1, {"text": texto1, "rows": [["06800"]]})
+        hit = cache.get(fp2)
+        assert hit == {"text": texto2, "rows": [["06800"]]}
+        assert "03/02/2026 18:05" in hit["text"] and "2 de 3" in hit["text"]
+        assert cache.stats() == {"hits": 1, "misses": 0}
+
+
+def test_cambio_en_el_cuerpo_o_en_los_tokens_es_fallo(tmp_path):
+    fp1, texto1 = pagina(kardex_pdf(tmp_path / "a.pdf"))
+    fp2, _ = pagina(kardex_pdf(tmp_path / "b.pdf", cuerpo=[*CUERPO[:-1], CUERPO[-1].replace("079", "080")]))
+    assert fp1[0] != fp2[0]
+
+    with PageCache(tmp_path / "pages.sqlite") as cache:
+        cache.put(fp1, {"text": texto1})
+        assert cache.get(fp2) is None
+        assert cache.get((fp1[0], fp1[1][:2])) is None  # mismo hash, otro número de tokens
+        assert cache.get(None) is None
+        assert cache.stats() == {"hits": 0, "misses": 3}
+
+    with PageCache(tmp_path / "pages.sqlite", parser="otro") as cache:
+        assert cache.get(fp1) is None
+
+
+def test_bd_por_defecto_junto_al_backend(monkeypatch, tmp_path):
+    monkeypatch.delenv("KARDEX_PAGE_CACHE_DB", raising=False)
+    monkeypatch.chdir(tmp_path)
+    backend = Path(page_cache.__file__).resolve().parents[2]
+    assert page_cache.default_db_path() == backend / "cache" / "kardex_pages.sqlite"
+    monkeypatch.setenv("KARDEX_PAGE_CACHE_DB", str(tmp_path / "x.sqlite"))
+    assert page_cache.default_db_path() == tmp_path / "x.sqlite"
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""parse_limits.guarded(): SIGALRM, RLIMIT_CPU, vigía de RSS (SIGUSR1) y respaldo duro."""
+
+import json
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import parse_limits
+from parse_limits import EXIT_HARD_TIMEOUT, ParseLimitExceeded, guarded, set_stage
+
+resource = pytest.importorskip("resource")
+if not parse_limits.POSIX_SIGNALS:
+    pytest.skip("sin SIGALRM/SIGXCPU/SIGUSR1", allow_module_level=True)
+
+SIGNALS = (signal.SIGALRM, signal.SIGXCPU, signal.SIGUSR1)
+SCRIPTS = Path(parse_limits.__file__).resolve().parent
+
+
+def estado():
+    return ([signal.getsignal(s) for s in SIGNALS], resource.getrlimit(resource.RLIMIT_CPU),
+            signal.getitimer(signal.ITIMER_REAL))
+
+
+def limite(monkeypatch, **lim):
+    for key, value in {"wall_s": 30, "cpu_s": 30, "rss_mb": 1 << 20, **lim}.items():
+        monkeypatch.setenv(f"PARSE_KARDEX_{key.upper()}", str(value))
+
+
+def test_timeout_por_sigalrm_con_la_etapa(monkeypatch):
+    limite(monkeypatch, wall_s=0.2)
+    antes = estado()
+    with pytest.raises(ParseLimitExceeded) as exc:
+        with guarded("kardex"):
+            set_stage("tablas:p3")
+            time.sleep(5)
+    assert exc.value.to_dict() == {"ok": False, "error": "timeout", "stage": "tablas:p3",
+                                   "limite": {"wall_s": 0.2, "cpu_s": 30.0, "rss_mb": float(1 << 20)}}
+    assert estado() == antes
+
+
+def test_cpu_limit_por_rlimit_cpu(monkeypatch):
+    limite(monkeypatch, cpu_s=0.5)
+    antes = estado()
+    with pytest.raises(ParseLimitExceeded) as exc:
+        with guarded("kardex"):
+            set_stage("texto")
+            while True:
+                pass
+    assert (exc.value.error, exc.value.stage) == ("cpu_limit", "texto")
+    assert estado() == antes
+
+
+def test_memory_limit_por_el_vigia(monkeypatch):
+    limite(monkeypatch, rss_mb=1)
+    antes = estado()
+    with pytest.raises(ParseLimitExceeded) as exc:
+        with guarded("kardex"):
+            set_stage("camelot")
+            time.sleep(5)
+    assert (exc.value.error, exc.value.stage) == ("memory_limit", "camelot")
+    assert estado() == antes
+
+
+def test_sin_rebasar_restaura_senales_rlimit_y_telemetria(monkeypatch):
+    limite(monkeypatch)
+    antes = estado()
+    with guarded("kardex") as lim:
+        assert lim["wall_s"] == 30
+        assert signal.getsignal(signal.SIGALRM) is not antes[0][0]
+        assert resource.getrlimit(resource.RLIMIT_CPU)[0] != resource.RLIM_INFINITY
+        set_stage("texto:p1")
+        parse_limits.count_pages(2)
+    assert estado() == antes
+    tel = parse_limits.telemetry()
+    assert set(tel["stages"]) == {"inicio", "texto"} and tel["pages"] == 2
+
+
+ATORADO = """
+import signal, sys, time
+sys.path.insert(0, {scripts!r})
+import parse_limits
+parse_limits.HARD_GRACE_S = 0.2
+parse_limits.set_hard_report({report!r})
+with parse_limits.guarded("kardex"):
+    parse_limits.set_stage("tablas:p7")
+    # como código C que no vuelve al intérprete: las señales no llegan
+    signal.pthread_sigmask(signal.SIG_BLOCK, {{signal.SIGALRM, signal.SIGXCPU, signal.SIGUSR1}})
+    time.sleep(30)
+"""
+
+
+@pytest.mark.parametrize("a_archivo", [False, True])
+def test_respaldo_duro_termina_el_proceso(tmp_path, monkeypatch, a_archivo):
+    limite(monkeypatch, wall_s=0.2)
+    report = tmp_path / "estado.json"
+    report.write_text("viejo")  # reporte anterior: set_hard_report() lo borra
+    code = ATORADO.format(scripts=str(SCRIPTS), report=str(report) if a_archivo else None)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=20)
+
+    assert proc.returncode == EXIT_HARD_TIMEOUT
+    if a_archivo:
+        assert proc.stdout == ""  # el stdout del worker es el del servicio
+        out = json.loads(report.read_text(encoding="utf-8"))
+    else:
+        out = json.loads(proc.stdout)
+        assert report.read_text() == "viejo"
+    assert (out["ok"], out["error"], out["stage"], out["hard"]) == (False, "timeout", "tablas:p7", True)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""parse_metrics.py: formato de texto de Prometheus y escritura atómica del archivo."""
+
+import os
+
+import parse_metrics
+from parse_metrics import Registry
+
+
+def test_histograma_acumulado_inf_sum_y_count():
+    r = Registry()
+    h = r.histogram("parse_seconds", "Duración", ("tipo",), buckets=(5, 1))
+    for v in (0.5, 3, 3, 10):
+        h.observe(v, tipo="kardex")
+    h.observe(1, tipo="plan")
+
+    assert r.render().splitlines() == [
+        "# HELP parse_seconds Duración",
+        "# TYPE parse_seconds histogram",
+        'parse_seconds_bucket{tipo="kardex",le="1"} 1',
+        'parse_seconds_bucket{tipo="kardex",le="5"} 3',
+        'parse_seconds_bucket{tipo="kardex",le="+Inf"} 4',
+        'parse_seconds_sum{tipo="kardex"} 16.5',
+        'parse_seconds_count{tipo="kardex"} 4',
+        'parse_seconds_bucket{tipo="plan",le="1"} 1',  # le es inclusivo
+        'parse_seconds_bucket{tipo="plan",le="5"} 1',
+        'parse_seconds_bucket{tipo="plan",le="+Inf"} 1',
+        'parse_seconds_sum{tipo="plan"} 1',
+        'parse_seconds_count{tipo="plan"} 1',
+    ]
+
+
+def test_counter_gauge_y_escape_de_etiquetas():
+    r = Registry()
+    c = r.counter("errores_total", "Errores", ("error",))
+    g = r.gauge("workers", "Tamaño del pool")
+    c.inc(error='ruta "C:\\tmp"\nx')
+    c.inc(2, error='ruta "C:\\tmp"\nx')
+    g.set(4)
+    g.set(0.25)
+
+    assert r.render() == (
+        "# HELP errores_total Errores\n"
+        "# TYPE errores_total counter\n"
+        'errores_total{error="ruta \\"C:\\\\tmp\\"\\nx"} 3\n'
+        "# HELP workers Tamaño del pool\n"
+        "# TYPE workers gauge\n"
+        "workers 0.25\n"
+    )
+    g.remove()
+    assert g.keys() == [] and r.render().endswith("# TYPE workers gauge\n")
+
+
+def test_write_file_reemplaza_de_forma_atomica(tmp_path, monkeypatch):
+    r = Registry()
+    r.counter("docs_total", "Documentos").inc(7)
+    path = tmp_path / "parser.prom"
+    path.write_text("viejo\n", encoding="utf-8")
+    replace = os.replace
+    vistos = []
+
+    def espia(src, dst):
+        # justo antes del rename: el destino sigue completo con lo anterior
+        vistos.append((path.read_text(encoding="utf-8"), open(src, encoding="utf-8").read()))
+        replace(src, dst)
+
+    monkeypatch.setattr(parse_metrics.os, "replace", espia)
+    r.write_file(str(path))
+
+    assert vistos == [("viejo\n", r.render())]
+    assert path.read_text(encoding="utf-8") == r.render()
+    assert os.listdir(tmp_path) == ["parser.prom"]  # sin temporales
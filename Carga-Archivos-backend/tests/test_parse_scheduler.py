@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Cierre del planificador: ningún Future queda sin resolver."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parse_scheduler import Scheduler, SchedulerClosed
+
+
+def test_close_falla_lo_encolado_y_deja_terminar_lo_que_corre():
+    started, gate = threading.Event(), threading.Event()
+
+    def lento():
+        started.set()
+        return gate.wait(5)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        sched = Scheduler(pool, workers=1)
+        corriendo = sched.submit("a", "interactive", lento)
+        assert started.wait(5)
+        encolados = [sched.submit(k, lane, lambda: "x") for k, lane in (("b", "interactive"), ("c", "bulk"))]
+        sched.close()
+        gate.set()
+
+        assert corriendo.result(timeout=5) is True
+        for fut in encolados:
+            with pytest.raises(SchedulerClosed):
+                fut.result(timeout=5)
+        with pytest.raises(SchedulerClosed):
+            sched.submit("d", "interactive", lambda: "x")
+        assert sched.stats()["queued"] == {"interactive": 0, "bulk": 0}
+
+
+def test_close_con_trabajos_en_carrera():
+    # muchos cierres con trabajos recién encolados: todos los Future se resuelven
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in range(200):
+            sched = Scheduler(pool, workers=2)
+            futs = [sched.submit(i, "bulk", lambda i=i: i) for i in range(4)]
+            sched.close()
+            for fut in futs:
+                assert fut.exception(timeout=5) is None or isinstance(fut.exception(), SchedulerClosed)
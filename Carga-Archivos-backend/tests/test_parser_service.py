@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""parser_service.py: respaldo duro del vigía dentro del pool y métricas del servicio."""
+
+import os
+import signal
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import parse_limits
+import parser_service
+from parser_service import ParserService, ServiceMetrics
+
+
+def job_de_prueba(tipo, argv, status_path=None):
+    """En el worker (spawn): "atorado.pdf" se cuelga con las señales bloqueadas; el resto tarda 2 s."""
+    name = Path(argv[0]).name
+    if name == "atorado.pdf":
+        parse_limits.HARD_GRACE_S = 0.3
+        parse_limits.set_hard_report(status_path)
+        with parse_limits.guarded(tipo):
+            parse_limits.set_stage("tablas:p2")
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM, signal.SIGXCPU, signal.SIGUSR1})
+            time.sleep(30)
+    time.sleep(2)
+    return {"out": {"ok": True, "archivo": name}, "telemetry": {}}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("PARSE_PLAN_WALL_S", "0.2")
+    monkeypatch.setattr(parser_service, "run_job", job_de_prueba)
+    svc = ParserService(2, None, 1e9, start_method="spawn")
+    yield svc
+    svc.close()
+
+
+@pytest.mark.skipif(not parse_limits.POSIX_SIGNALS, reason="sin SIGALRM/SIGXCPU/SIGUSR1")
+def test_timeout_duro_al_padre_y_reenvio_de_los_demas(service, tmp_path):
+    for name in ("normal.pdf", "atorado.pdf"):
+        (tmp_path / name).write_bytes(name.encode())
+    res = {}
+
+    def parse(name):
+        res[name] = service.parse("plan", tmp_path / name, [], "interactive")
+
+    hilos = [threading.Thread(target=parse, args=(name,)) for name in ("atorado.pdf", "normal.pdf")]
+    for t in hilos:
+        t.start()
+        time.sleep(0.1)
+    for t in hilos:
+        t.join(60)
+
+    assert res["atorado.pdf"] == {"ok": False, "error": "timeout", "stage": "tablas:p2", "hard": True,
+                                  "limite": {"wall_s": 0.2, "cpu_s": 240, "rss_mb": 2048}}
+    assert res["normal.pdf"] == {"ok": True, "archivo": "normal.pdf"}
+    stats = service.scheduler.stats()
+    assert (stats["submitted"], stats["failed"], stats["completed"]) == (3, 2, 1)  # normal.pdf, reenviado
+
+
+class Stats:
+    def stats(self):
+        return {"workers": 2, "queued": {"interactive": 3, "bulk": 0}, "running": {"interactive": 1, "bulk": 1}}
+
+
+def metricas():
+    return ServiceMetrics(SimpleNamespace(scheduler=Stats()))
+
+
+def lineas(m, prefijo):
+    return [line for line in m.render().splitlines() if line.startswith(prefijo)]
+
+
+def test_metricas_de_un_parseo_terminado():
+    m = metricas()
+    tel = {"stages": {"texto": 0.4, "tablas": 1.2}, "pages": 6, "pid": os.getpid(), "rss_mb": 10.0,
+           "fonts": {"hits": 3, "misses": 0}}
+    m.on_event("dispatched", lane="interactive", wait_ms=250)
+    m.on_event("finished", key=("kardex", "h", ()), lane="interactive", ms=2000, error=None,
+               result={"out": {"ok": True, "cache": {"hit": False}}, "telemetry": tel})
+
+    debajo = ("0.05", "0.1", "0.25", "0.5", "1")  # cotas menores que 2 s
+    assert lineas(m, "parser_parse_seconds_bucket") == [
+        f'parser_parse_seconds_bucket{{tipo="kardex",lane="interactive",le="{le}"}} {0 if le in debajo else 1}'
+        for le in (*debajo, "2.5", "5", "10", "30", "60", "120", "300", "+Inf")
+    ]
+    assert lineas(m, "parser_parse_seconds_sum") == ['parser_parse_seconds_sum{tipo="kardex",lane="interactive"} 2']
+    assert lineas(m, "parser_stage_seconds_count") == [
+        'parser_stage_seconds_count{tipo="kardex",stage="tablas"} 1',
+        'parser_stage_seconds_count{tipo="kardex",stage="texto"} 1',
+    ]
+    pps = lineas(m, "parser_pages_per_second_bucket")  # 6 páginas en 2 s
+    assert 'parser_pages_per_second_bucket{tipo="kardex",le="2"} 0' in pps
+    assert 'parser_pages_per_second_bucket{tipo="kardex",le="5"} 1' in pps
+    assert lineas(m, "parser_pages_total") == ['parser_pages_total{tipo="kardex"} 6']
+    assert lineas(m, "parser_documents_total") == ['parser_documents_total{tipo="kardex",ok="true"} 1']
+    assert lineas(m, "parser_font_cache_total") == ['parser_font_cache_total{tipo="kardex",result="hit"} 3']
+    assert lineas(m, "parser_cache_requests_total") == ['parser_cache_requests_total{tipo="kardex",result="miss"} 1']
+    assert lineas(m, "parser_queue_wait_seconds_sum") == ['parser_queue_wait_seconds_sum{lane="interactive"} 0.25']
+    assert lineas(m, "parser_worker_rss_bytes") == [f'parser_worker_rss_bytes{{pid="{os.getpid()}"}} 10485760']
+    assert lineas(m, "parser_queue_depth") == ['parser_queue_depth{lane="bulk"} 0',
+                                               'parser_queue_depth{lane="interactive"} 3']
+    assert lineas(m, "parser_workers") == ["parser_workers 2"]
+
+
+def test_metricas_de_errores_y_workers_muertos(tmp_path):
+    m = metricas()
+    for result, error in (({"out": {"ok": False, "error": "timeout", "stage": "tablas"}}, None),
+                          ({"out": {"ok": False, "error": 'PDF "roto"'}}, None),
+                          (None, BrokenProcessPool("murió"))):
+        m.on_event("finished", key=("plan", "h", ()), lane="bulk", ms=10, result=result, error=error)
+    m.on_event("coalesced", lane="bulk")
+    m.on_event("rejected", lane="interactive", reason="queue_full")
+    m.worker_rss.set(1, pid="999999999")  # ya no existe
+
+    assert lineas(m, "parser_errors_total") == [
+        'parser_errors_total{tipo="plan",error="parse_error"} 1',
+        'parser_errors_total{tipo="plan",error="timeout"} 1',
+        'parser_errors_total{tipo="plan",error="worker_crashed"} 1',
+    ]
+    assert lineas(m, "parser_documents_total") == ['parser_documents_total{tipo="plan",ok="false"} 3']
+    assert lineas(m, "parser_singleflight_coalesced_total") == ['parser_singleflight_coalesced_total{lane="bulk"} 1']
+    assert lineas(m, "parser_rejected_total") == ['parser_rejected_total{lane="interactive",reason="queue_full"} 1']
+    assert lineas(m, "parser_worker_rss_bytes{") == []
+
+    path = tmp_path / "parser.prom"
+    m.write_file(str(path))
+    assert path.read_text(encoding="utf-8") == m.render()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""pdf_probe.py sobre PDFs generados con reportlab (kárdex, plan oficial, cifrados)."""
+
+import pytest
+
+from pdf_probe import probe, readable, skip_stream
+
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+pdfencrypt = pytest.importorskip("reportlab.lib.pdfencrypt")
+
+KARDEX_LINEAS = [
+    "UNIVERSIDAD DE SONORA",
+    "EXPEDIENTE: 222200000   ESTATUS: A   PLAN: 2182",
+    "CR CVE MATERIA E1 E2 ORD REG CIC I R B",
+] + [f"0{c % 9 + 1} 06{800 + c} 1 O A {60 + c % 40:03d} 000 2231 01 00 00" for c in range(40)]
+
+PLAN_LINEAS = [
+    "DIRECCIÓN DE SERVICIOS ESCOLARES",
+    "Listado de Materias Oficial   Hoja : 1 de 3",
+    "Plan 2182 INGENIERÍA EN SISTEMAS DE INFORMACIÓN",
+    "Clave Materia Cred. Horas Teo. Horas Lab. Eje Req.",
+] + [f"06{800 + c} PROGRAMACIÓN {c} 8 3 2 BÁSICO 06{799 + c}" for c in range(20)]
+
+
+def pdf(path, lineas, encrypt=None):
+    c = canvas.Canvas(str(path), encrypt=encrypt)
+    y = 800
+    for linea in lineas:
+        c.drawString(40, y, linea)
+        y -= 14
+    c.save()
+    return path
+
+
+def test_kardex_con_muchos_digitos_se_clasifica_por_el_camino_crudo(tmp_path):
+    out = probe(pdf(tmp_path / "k.pdf", KARDEX_LINEAS))
+
+    assert out["ok"] and out["clase"] == "KARDEX" and out["metodo"] == "raw"
+    assert out["expediente"] == "222200000" and out["plan"] == "2182"
+    assert out["paginas"] == 1 and not out["cifrado"] and not out["requiere_password"]
+
+
+def test_plan_oficial(tmp_path):
+    out = probe(pdf(tmp_path / "p.pdf", PLAN_LINEAS))
+
+    assert out["clase"] == "PLAN_OFICIAL" and out["metodo"] == "raw"
+
+
+def test_readable_acepta_digitos_y_rechaza_glifos_sin_mapear():
+    assert readable("06881 08 O A 095 000 2231 01 00 00")
+    assert not readable("\x01\x02\x03\x04\x05\x06\x07\x08\x0b\x0c\x0e\x0f\x10\x11\x12\x13\x14 AB")
+
+
+def test_solo_password_de_dueno_se_lee(tmp_path):
+    enc = pdfencrypt.StandardEncryption("", ownerPassword="dueño", canPrint=0)
+    out = probe(pdf(tmp_path / "k.pdf", KARDEX_LINEAS, enc))
+
+    assert out["cifrado"] and not out["requiere_password"]
+    assert out["clase"] == "KARDEX" and out["metodo"] == "pdfminer" and out["tiene_texto"]
+
+
+def test_password_de_usuario_no_se_puede_leer(tmp_path):
+    enc = pdfencrypt.StandardEncryption("secreto", ownerPassword="dueño")
+    out = probe(pdf(tmp_path / "k.pdf", KARDEX_LINEAS, enc))
+
+    assert out["cifrado"] and out["requiere_password"]
+    assert out["clase"] == "UNKNOWN"
+
+
+@pytest.mark.parametrize("head, skip", [
+    (b"<< /Length 900 /Filter /FlateDecode >>", False),
+    (b"<< /Length 5000 /Length1 12000 /Filter /FlateDecode >>", True),        # TrueType (FontFile2)
+    (b"<< /Length 800 /Length1 500 /Length2 7000 /Length3 0 >>", True),       # Type1 (FontFile)
+    (b"<< /Subtype /Type1C /Length 3000 /Filter /FlateDecode >>", True),      # FontFile3
+    (b"<< /Type /Metadata /Subtype /XML /Length 3000 >>", True),
+    (b"<< /Type /XObject /Subtype /Image /Width 10 >>", True),
+    (b"<< /Type /XObject /Subtype /Form /BBox [0 0 10 10] >>", False),       # los formularios dibujan texto
+])
+def test_streams_que_no_son_contenido_se_saltan(head, skip):
+    assert skip_stream(head) is skip
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""pdf_source.py: stdin, lectura por bloques y mmap dan el mismo SHA-256 y el mismo parseo."""
+
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+
+import pdf_source
+from pdf_source import PdfSource, source_from_argv
+
+pytest.importorskip("reportlab")
+pytest.importorskip("pdfplumber")
+
+import kardex  # noqa: E402
+from test_pdf_probe import KARDEX_LINEAS, pdf  # noqa: E402
+
+
+@pytest.fixture
+def kardex_pdf(tmp_path):
+    return pdf(tmp_path / "k.pdf", KARDEX_LINEAS)
+
+
+def stdin_con(monkeypatch, data: bytes):
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+
+
+def test_mismo_hash_y_bytes_por_las_tres_vias(kardex_pdf, monkeypatch):
+    data = kardex_pdf.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    monkeypatch.setattr(pdf_source, "CHUNK", 256)  # varios bloques al hashear
+    assert len(data) > 3 * pdf_source.CHUNK
+
+    stdin_con(monkeypatch, data)
+    fuentes = [PdfSource.from_stdin(), PdfSource.from_path(kardex_pdf),
+               PdfSource.from_path(kardex_pdf, use_mmap=True)]
+    for src in fuentes:
+        with src:
+            assert src.sha256 == digest and len(src) == len(data)
+            with src.open() as f:
+                assert f.read() == data
+                f.seek(-10, io.SEEK_END)
+                assert f.read() == data[-10:] and f.tell() == len(data)
+                f.seek(5)
+                assert f.read(7) == data[5:12]
+    assert not isinstance(fuentes[2].data, bytes)  # mmap + _MemoryReader
+
+
+def test_filename_temporal_solo_para_stdin(kardex_pdf, monkeypatch):
+    stdin_con(monkeypatch, kardex_pdf.read_bytes())
+    with PdfSource.from_stdin() as src:
+        tmp = src.filename()
+        assert tmp != str(kardex_pdf) and src.filename() == tmp  # se escribe una sola vez
+        with open(tmp, "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == src.sha256
+    assert not os.path.exists(tmp)
+    with PdfSource.from_path(kardex_pdf, use_mmap=True) as src:
+        assert src.filename() == str(kardex_pdf)
+
+
+def test_sha256_del_llamador_no_se_recalcula(kardex_pdf):
+    for argv in ([], ["--mmap"]):
+        with source_from_argv(str(kardex_pdf), [*argv, "--sha256=abc"]) as src:
+            assert src.sha256 == "abc" and len(src) == kardex_pdf.stat().st_size
+
+
+def test_mismo_parseo_por_stdin_bloques_y_mmap(kardex_pdf, monkeypatch):
+    digest = hashlib.sha256(kardex_pdf.read_bytes()).hexdigest()
+    stdin_con(monkeypatch, kardex_pdf.read_bytes())
+    outs = [kardex.run(["-"]), kardex.run([str(kardex_pdf)]), kardex.run([str(kardex_pdf), "--mmap"]),
+            kardex.run([str(kardex_pdf), "--mmap", f"--sha256={digest}"])]
+
+    assert outs[0]["ok"] and outs[0]["materias"] and outs[0]["file_hash"] == digest
+    assert all(out == outs[0] for out in outs[1:])
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""plan_cache.py: llave (archivo, backend), versión del parser, compare() y caché heredada."""
+
+import sqlite3
+
+from plan_cache import PlanCache, content_hash
+
+
+def resultado(materias=(("06881", 8), ("04134", 6)), version="2182", origen="OFICIAL", **extra):
+    return {"ok": True, "origen": origen, "plan": {"version": version},
+            "materias": [{"codigo": c, "nombre": f"MATERIA {c}", "creditos": cr, "tipo": "OBL"} for c, cr in materias],
+            "acentuaciones": [], **extra}
+
+
+def test_miss_con_otro_backend_u_otra_version_del_parser(tmp_path):
+    with PlanCache(tmp_path / "plan.sqlite") as cache:
+        cache.put("a" * 64, resultado(), "3.1.0", backend="tabula")
+
+        assert cache.get("a" * 64, "3.1.0", "tabula") == resultado()
+        assert cache.get("a" * 64, None, "tabula") == resultado()  # sin versión: no se compara
+        assert cache.get("a" * 64, "3.1.0", "plumber") is None
+        assert cache.get("a" * 64, "3.2.0", "tabula") is None
+        assert cache.get("b" * 64, "3.1.0", "tabula") is None
+
+        plumber = resultado(materias=(("06881", 8),))
+        cache.put("a" * 64, plumber, "3.1.0", backend="plumber")
+        assert cache.get("a" * 64, "3.1.0", "plumber") == plumber
+        assert cache.get("a" * 64, "3.1.0", "tabula") == resultado()
+
+
+def test_put_ignora_fallidos_y_no_guarda_debug(tmp_path):
+    with PlanCache(tmp_path / "plan.sqlite") as cache:
+        fallido = {"ok": False, "error": "sin materias"}
+        assert cache.put("a" * 64, fallido) == content_hash(fallido)
+        assert cache.get("a" * 64) is None
+
+        cache.put("b" * 64, resultado(debug={"lineas": ["x"]}, cache={"hit": False}))
+        assert cache.get("b" * 64) == resultado()
+
+
+def test_compare_excluye_el_mismo_archivo(tmp_path):
+    with PlanCache(tmp_path / "plan.sqlite") as cache:
+        r = resultado()
+        cache.put("a" * 64, r)
+        primero = cache.compare("a" * 64, r)
+        assert primero["previous_file_hash"] is None and not primero["same_as_latest"]
+        assert primero["same_content_as"] == []
+
+        # otra descarga del mismo plan (otro hash de archivo, mismo contenido)
+        cache.put("b" * 64, r, backend="tabula")
+        cache.put("b" * 64, r, backend="plumber")
+        rep = cache.compare("b" * 64, r)
+        assert rep["previous_file_hash"] == "a" * 64 and rep["same_as_latest"]
+        assert rep["same_content_as"] == ["a" * 64]
+        assert cache.same_content(content_hash(r)) == ["a" * 64, "b" * 64]
+
+        cambiado = resultado(materias=(("06881", 8), ("04134", 7)))
+        rep = cache.compare("c" * 64, cambiado)
+        assert rep["previous_file_hash"] == "b" * 64 and not rep["same_as_latest"]
+        assert rep["same_content_as"] == []
+
+
+def test_tabla_heredada_sin_backend_se_descarta(tmp_path):
+    db = tmp_path / "plan.sqlite"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE plan_cache (file_hash TEXT PRIMARY KEY, version TEXT, origen TEXT, "
+                     "content_hash TEXT, result TEXT, created_at REAL)")
+        conn.execute("INSERT INTO plan_cache VALUES ('aaa', '2182', 'OFICIAL', 'x', '{\"ok\": true}', 0)")
+    conn.close()
+
+    with PlanCache(db) as cache:
+        assert cache.get("aaa") is None
+        cols = {r[1] for r in cache.conn.execute("PRAGMA table_info(plan_cache)")}
+        assert "backend" in cols
+        cache.put("aaa", resultado())
+        assert cache.get("aaa") == resultado()
+    with PlanCache(db) as cache:  # ya migrada: no se vuelve a borrar
+        assert cache.get("aaa") == resultado()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""plan_delta.py: formatos del snapshot, códigos/tipos canonizados y delta de materias y acentuaciones."""
+
+import json
+
+import pytest
+
+from plan_delta import apply_delta, canon_codigo, canon_tipo, compute_delta, load_catalog
+
+# catálogo en la BD: códigos sin ceros, tipos largos
+CATALOGO = [
+    {"codigo": "6881", "nombre": "ESTRUCTURAS DE DATOS", "creditos": "8", "tipo": "OBLIGATORIA", "acentuacion": ""},
+    {"codigo": "4134", "nombre": "REDES  I", "creditos": "6.0", "tipo": "OPTATIVA", "acentuacion": "REDES"},
+    {"codigo": "7001", "nombre": "BASES DE DATOS", "creditos": "8", "tipo": "OBLIGATORIA", "acentuacion": "DATOS"},
+    {"codigo": "7002", "nombre": "MINERÍA DE DATOS", "creditos": "6", "tipo": "OPTATIVA", "acentuacion": "DATOS"},
+]
+ESPERADO = {
+    "06881": {"codigo": "06881", "nombre": "ESTRUCTURAS DE DATOS", "creditos": 8, "tipo": "OBL"},
+    "04134": {"codigo": "04134", "nombre": "REDES I", "creditos": 6, "tipo": "OPT"},
+    "07001": {"codigo": "07001", "nombre": "BASES DE DATOS", "creditos": 8, "tipo": "OBL"},
+    "07002": {"codigo": "07002", "nombre": "MINERÍA DE DATOS", "creditos": 6, "tipo": "OPT"},
+}
+ACENTS = {"REDES": {"04134"}, "DATOS": {"07001", "07002"}}
+
+
+def snapshot(tmp_path, formato):
+    if formato == "csv":
+        path = tmp_path / "catalogo.csv"
+        lineas = ["Codigo,Nombre,Creditos,Tipo,Acentuacion"]
+        lineas += [",".join(m[k] for k in ("codigo", "nombre", "creditos", "tipo", "acentuacion")) for m in CATALOGO]
+        path.write_text("\ufeff" + "\n".join(lineas) + "\n", encoding="utf-8")  # BOM de Excel
+        return path
+    bloques = [{"nombre": "REDES", "materias": ["4134"]},
+               {"nombre": "DATOS", "materias": [{"codigo": "07001"}, "7002"]}]
+    sin_acent = [{k: v for k, v in m.items() if k != "acentuacion"} for m in CATALOGO]
+    data = {
+        "lista": CATALOGO,
+        "objeto": {"materias": sin_acent, "acentuaciones": bloques},
+        "version": {"2009": [], "2182": {"materias": sin_acent, "acentuaciones": bloques}},
+    }[formato]
+    path = tmp_path / "catalogo.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def plan(materias, acentuaciones=None):
+    return {"ok": True, "plan": {"version": "2182"}, "materias": materias, "acentuaciones": acentuaciones or []}
+
+
+@pytest.mark.parametrize("formato", ["csv", "lista", "objeto", "version"])
+def test_formatos_de_snapshot_dan_el_mismo_catalogo(tmp_path, formato):
+    cat = load_catalog(snapshot(tmp_path, formato), version="2182")
+    assert cat == {"materias": ESPERADO, "acentuaciones": ACENTS}
+
+
+def test_snapshot_por_version_sin_la_version_y_sin_membresias(tmp_path):
+    assert load_catalog(snapshot(tmp_path, "version"), version="1999") == {"materias": {}, "acentuaciones": None}
+    path = tmp_path / "solo_materias.json"
+    path.write_text(json.dumps({"materias": CATALOGO[:1]}), encoding="utf-8")
+    cat = load_catalog(path)
+    assert cat["acentuaciones"] is None
+    assert "acentuaciones" not in compute_delta(plan([]), cat)
+
+
+def test_codigos_y_tipos_canonizados():
+    assert [canon_codigo(c) for c in ("6881", "06881", 6881, "6881.0", "ISI-123", "123456", "", None)] == \
+        ["06881", "06881", "06881", "06881", "00123", "123456", "", ""]
+    assert [canon_tipo(t) for t in ("OBLIGATORIA", "obl", "OPTATIVA", "OPT", "ELECTIVA", "SELECTIVA", None)] == \
+        ["OBL", "OBL", "OPT", "OPT", "OPT", "OPT", "OBL"]
+
+
+def test_delta_altas_cambios_bajas_e_iguales(tmp_path):
+    cat = load_catalog(snapshot(tmp_path, "lista"))
+    parseado = [
+        {"codigo": "06881", "nombre": "ESTRUCTURAS DE DATOS", "creditos": 8, "tipo": "OBL"},   # igual (ceros, tipo corto)
+        {"codigo": "04134", "nombre": "REDES I", "creditos": 6, "tipo": "OPT"},                # igual (espacios)
+        {"codigo": "7001", "nombre": "BASES DE DATOS I", "creditos": 9, "tipo": "OPT"},         # cambia
+        {"codigo": "08000", "nombre": "ÉTICA", "creditos": 4, "tipo": "OBL"},                   # alta
+    ]
+    acent = [{"nombre": "REDES", "materias": [{"codigo": "4134"}, {"codigo": "8000"}]},
+             {"nombre": "DATOS", "materias": ["07001"]}, {"nombre": "IA", "materias": ["6881"]}]
+    delta = compute_delta(plan(parseado, acent), cat)
+
+    assert delta["inserted"] == [parseado[3]]
+    assert delta["updated"] == [{
+        "codigo": "07001", "campos": ["nombre", "creditos", "tipo"],
+        "antes": {"nombre": "BASES DE DATOS", "creditos": 8, "tipo": "OBL"},
+        "despues": {"nombre": "BASES DE DATOS I", "creditos": 9, "tipo": "OPT"},
+    }]
+    assert delta["removed"] == ["07002"] and delta["unchanged"] == 2
+    assert delta["acentuaciones"] == {
+        "added": [{"nombre": "IA", "codigo": "06881"}, {"nombre": "REDES", "codigo": "08000"}],
+        "removed": [{"nombre": "DATOS", "codigo": "07002"}],
+    }
+
+    result = apply_delta(plan(parseado, acent), cat)
+    assert result["materias_total"] == 4
+    assert result["materias"] == [parseado[3], parseado[2]]  # altas primero, luego cambios
+    assert result["delta"] == delta
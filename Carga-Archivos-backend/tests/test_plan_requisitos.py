@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""plan_requisitos.py: DAG compilado, elegibles por alumno y en lote."""
+
+import json
+
+from plan_requisitos import RequisiteDAG, alumno_sets, load_dags
+
+
+def plan(version="2182", materias=()):
+    return {"ok": True, "plan": {"version": version}, "materias": list(materias)}
+
+
+def mat(codigo, requisitos=(), creditos=8, creditos_requisito=0):
+    return {"codigo": codigo, "creditos": creditos, "requisitos": list(requisitos),
+            "creditos_requisito": creditos_requisito}
+
+
+PLAN = plan(materias=[
+    mat("6892", ["6891"]),           # clave sin ceros: se canoniza a 06892
+    mat("06891"),
+    mat("06893", ["06892", "99999"]),  # 99999 no está en el plan: externo
+    mat("06900", creditos_requisito=100),
+])
+
+
+def test_orden_topologico_y_cierre():
+    dag = RequisiteDAG(PLAN)
+    assert dag.codigos == ["06891", "06900", "06892", "06893"]
+    d = dag.to_dict()
+    assert d["niveles"] == {"06891": 0, "06900": 0, "06892": 1, "06893": 2}
+    assert d["externos"] == {"06893": ["99999"]}
+    assert dag.decode(dag.cierre[dag.index["06893"]]) == ["06891", "06892"]
+
+
+def test_ciclo_va_al_final():
+    dag = RequisiteDAG(plan(materias=[mat("00001", ["00002"]), mat("00002", ["00001"]), mat("00003")]))
+    assert dag.ciclos == ["00001", "00002"]
+    assert dag.codigos[-2:] == ["00001", "00002"]
+
+
+def test_lote_igual_a_uno_por_uno():
+    dag = RequisiteDAG(PLAN)
+    alumnos = [
+        (set(), 0, set()),
+        ({"06891"}, 120, set()),
+        ({"06891", "06892"}, 16, {"06893"}),
+    ]
+    lote = dag.elegibles_lote(alumnos)
+    uno = [dag.decode(dag.elegibles(dag.mask(a), c, dag.mask(cu))) for a, c, cu in alumnos]
+    assert lote == uno
+    assert lote[0] == ["06891"]
+    assert lote[1] == ["06900", "06892"]
+    assert lote[2] == []
+
+
+def test_alumno_sets_desde_degree_audit():
+    a = {"expediente": "1", "materias": {"6891": "approved", "06892": "in_progress", "06893": "failed"},
+         "creditos": {"aprobados": 8}}
+    assert alumno_sets(a) == ({"06891"}, 8, {"06892"})
+
+
+def test_load_dags_json_y_ndjson(tmp_path):
+    otro = plan("2200", [mat("00010")])
+    lista = tmp_path / "planes.json"
+    lista.write_text(json.dumps([PLAN, otro], indent=2), encoding="utf-8")
+    ndjson = tmp_path / "planes.ndjson"
+    ndjson.write_text(json.dumps(PLAN) + "\n\n" + json.dumps(otro) + "\n", encoding="utf-8")
+    for path in (lista, ndjson):
+        assert sorted(load_dags(path)) == ["2182", "2200"]
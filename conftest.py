@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures compartidas por las pruebas de los scripts Python de los backends.
+
+- Alumnos-backend/tests y Carga-Archivos-backend/tests ponen su src/scripts en
+  sys.path (ambos tienen un kardex.py distinto), así que se corren por separado:
+    python -m pytest -q Alumnos-backend/tests
+    python -m pytest -q Carga-Archivos-backend/tests
+- `pg_dsn`: base PostgreSQL desechable con el esquema de init.sql, nueva por
+  prueba (copia de una plantilla). Usa $TEST_DATABASE_URL (un servidor al que
+  se le puedan crear bases) o, si no está, levanta uno local con pgserver
+  (pip install pgserver). Sin ninguno de los dos, o sin psycopg, esas pruebas
+  se saltan.
+"""
+
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+INIT_SQL = Path(__file__).resolve().parent / "init.sql"
+TEMPLATE_DB = "pruebas_plantilla"
+
+
+def _with_db(uri: str, dbname: str) -> str:
+    """Misma conexión que `uri` pero contra la base `dbname`."""
+    from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+    params = conninfo_to_dict(uri)
+    params["dbname"] = dbname
+    return make_conninfo(**params)
+
+
+def _load_schema(conn) -> None:
+    import psycopg
+
+    sql = INIT_SQL.read_text(encoding="utf-8")
+    try:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    except psycopg.errors.FeatureNotSupported:
+        # pgserver no trae pgcrypto; solo lo usan las contraseñas (secciones 7 y 8)
+        sql = sql.replace("CREATE EXTENSION IF NOT EXISTS pgcrypto;", "")
+        sql = sql.split("-- 7) Función crear_usuario_con_password")[0]
+    conn.execute(sql)
+
+
+@pytest.fixture(scope="session")
+def pg_server():
+    """URI de un servidor PostgreSQL con la base plantilla ya creada."""
+    psycopg = pytest.importorskip("psycopg")
+    uri = os.environ.get("TEST_DATABASE_URL")
+    server = None
+    if not uri:
+        pgserver = pytest.importorskip("pgserver", reason="sin $TEST_DATABASE_URL ni pgserver")
+        server = pgserver.get_server(tempfile.mkdtemp(prefix="pg_pruebas_"), cleanup_mode="stop")
+        uri = server.get_uri()
+
+    with psycopg.connect(uri, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {TEMPLATE_DB}")
+        conn.execute(f"CREATE DATABASE {TEMPLATE_DB}")
+    with psycopg.connect(_with_db(uri, TEMPLATE_DB), autocommit=True) as conn:
+        _load_schema(conn)
+    yield uri
+    with psycopg.connect(uri, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {TEMPLATE_DB}")
+    if server is not None:
+        server.cleanup()
+
+
+@pytest.fixture
+def pg_dsn(pg_server):
+    """DSN de una base nueva con el esquema de init.sql; se borra al terminar."""
+    import psycopg
+
+    name = f"prueba_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(pg_server, autocommit=True) as conn:
+        conn.execute(f"CREATE DATABASE {name} TEMPLATE {TEMPLATE_DB}")
+    yield _with_db(pg_server, name)
+    with psycopg.connect(pg_server, autocommit=True) as conn:
+        conn.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
@@ -14,12 +14,52 @@ export async function GET(req: NextRequest) {
 
   try {
     let query = "";
+    // Misma consulta con los COUNT(*) correlacionados, para antes de la primera
+    // corrida de alertas_faltas.py (todavía no existen sus tablas)
+    let legacy = "";
     // Corregimos el tipo de 'params' para evitar error de TypeScript
     let params: any[] = [];
 
+    // Los miembros salen en vivo de alumno_grupo (y kárdex, en la vista por grupo);
+    // las faltas, de alerta_faltas más lo que siga en la cola que llena el trigger
+    // de incidencia (alerta_faltas_pendiente). LEFT JOIN a las dos: un alumno
+    // recién ligado o sin faltas no tiene fila en ninguna.
+
     // CASO 1: Consulta por Grupo (Para la pantalla de gestión)
     if (grupoId) {
-       query = `
+      query = `
+        WITH miembros AS (
+          SELECT ag.alumno_id FROM alumno_grupo ag WHERE ag.grupo_id = $1
+          UNION
+          SELECT k.alumno_id FROM kardex k JOIN grupo g ON g.id = $1
+          WHERE k.materia_id = g.materia_id AND k.periodo_id = g.periodo_id
+        ),
+        nuevas AS (
+          SELECT p.alumno_id,
+                 SUM(p.faltas_brutas) AS faltas,
+                 SUM(p.justificaciones) AS justificaciones
+          FROM alerta_faltas_pendiente p
+          WHERE p.grupo_id = $1
+          GROUP BY p.alumno_id
+        )
+        SELECT
+          a.id AS alumno_id,
+          a.expediente,
+          TRIM(a.apellido_paterno || ' ' || COALESCE(a.apellido_materno, '') || ' ' || a.nombre) as "nombreCompleto",
+          a.correo,
+          g.clave_grupo,
+          m.nombre as materia_nombre,
+          COALESCE(af.faltas_brutas, 0) + COALESCE(n.faltas, 0) as faltas_brutas,
+          COALESCE(af.justificaciones, 0) + COALESCE(n.justificaciones, 0) as justificaciones
+        FROM miembros mb
+        JOIN alumno a ON a.id = mb.alumno_id
+        JOIN grupo g ON g.id = $1
+        JOIN materia m ON g.materia_id = m.id
+        LEFT JOIN alerta_faltas af ON af.grupo_id = g.id AND af.alumno_id = a.id
+        LEFT JOIN nuevas n ON n.alumno_id = a.id
+        ORDER BY a.apellido_paterno, a.nombre;
+      `;
+      legacy = `
         SELECT
           a.id AS alumno_id,
           a.expediente,
@@ -43,7 +83,37 @@ export async function GET(req: NextRequest) {
     } 
     // CASO 2: Consulta Global por Profesor (Para la campana de notificaciones)
     else if (profesorId) {
+      // Sin alerta guardada (o NORMAL) y sin incidencias en la cola no puede salir en la campana
       query = `
+        WITH nuevas AS (
+          SELECT p.alumno_id, p.grupo_id,
+                 SUM(p.faltas_brutas) AS faltas,
+                 SUM(p.justificaciones) AS justificaciones
+          FROM alerta_faltas_pendiente p
+          WHERE p.grupo_id IN (SELECT ap.grupo_id FROM asignacion_profesor ap WHERE ap.profesor_id = $1)
+          GROUP BY p.alumno_id, p.grupo_id
+        )
+        SELECT
+          a.id AS alumno_id,
+          a.expediente,
+          TRIM(a.apellido_paterno || ' ' || COALESCE(a.apellido_materno, '') || ' ' || a.nombre) as "nombreCompleto",
+          a.correo,
+          g.clave_grupo,
+          m.nombre as materia_nombre,
+          COALESCE(af.faltas_brutas, 0) + COALESCE(n.faltas, 0) as faltas_brutas,
+          COALESCE(af.justificaciones, 0) + COALESCE(n.justificaciones, 0) as justificaciones
+        FROM alumno_grupo ag
+        JOIN alumno a ON a.id = ag.alumno_id
+        JOIN grupo g ON ag.grupo_id = g.id
+        JOIN materia m ON g.materia_id = m.id
+        JOIN asignacion_profesor ap ON ap.grupo_id = g.id
+        LEFT JOIN alerta_faltas af ON af.grupo_id = ag.grupo_id AND af.alumno_id = ag.alumno_id
+        LEFT JOIN nuevas n ON n.grupo_id = ag.grupo_id AND n.alumno_id = ag.alumno_id
+        WHERE ap.profesor_id = $1
+          AND (af.tipo <> 'NORMAL' OR n.alumno_id IS NOT NULL)
+        ORDER BY faltas_brutas DESC;
+      `;
+      legacy = `
         SELECT
           a.id AS alumno_id,
           a.expediente,
@@ -64,7 +134,11 @@ export async function GET(req: NextRequest) {
       params = [profesorId];
     }
 
-    const result = await pool.query(query, params);
+    // 42P01 (undefined_table): alertas_faltas.py no ha corrido nunca
+    const result = await pool.query(query, params).catch((e: any) => {
+      if (e?.code === "42P01") return pool.query(legacy, params);
+      throw e;
+    });
 
     // Procesar datos (calcular semáforo)
     const alumnosProcesados = result.rows.map((row) => {